@@ -2,18 +2,27 @@
 
 import os
 from datetime import timedelta, datetime
-from flask import Flask, jsonify, request, g
+from flask import Flask, jsonify, request, session
 from flask_sqlalchemy import SQLAlchemy
 from backend.db import db as base_db
 from flask_cors import CORS
 from backend.limiting import limiter
 from flask_limiter.util import get_remote_address
 from celery import Celery
-from flask_socketio import SocketIO, emit
+from flask_socketio import SocketIO, emit, join_room, leave_room
 from flask.testing import FlaskClient
-from backend.db.models import User, SubscriptionPlan
+from backend.db.models import SubscriptionPlan
+from backend.auth.principal import resolve_principal
 from backend.models.plan import Plan
 from backend.utils.usage_limits import check_usage_limit
+from backend.constants import REALTIME_MAX_SEND_QUEUE, REALTIME_MAX_SUBSCRIPTIONS, TICKER_NAMESPACE
+from backend.services import ticker
+from backend.services.realtime import (
+    coin_room,
+    guarded_client_manager,
+    subscription_snapshot,
+    user_room,
+)
 from loguru import logger
 from redis import Redis
 from sqlalchemy import text  # Veritabanı sorgusu için text fonksiyonu
@@ -56,38 +65,81 @@ class Config:
     REFRESH_TOKEN_EXP_DAYS = int(os.getenv("REFRESH_TOKEN_EXP_DAYS", "7"))
     # Price data caching süresi (saniye). Testlerde varsayılan 0'dır.
     PRICE_CACHE_TTL = int(os.getenv("PRICE_CACHE_TTL", "300"))
+    # Görev telemetrisi toplu yazım aralığı ve saklama süresi
+    TASK_TELEMETRY_FLUSH_SECONDS = float(os.getenv("TASK_TELEMETRY_FLUSH_SECONDS", "5"))
+    TASK_TELEMETRY_RETENTION_DAYS = int(os.getenv("TASK_TELEMETRY_RETENTION_DAYS", "14"))
+    # Ham usage_log kayıtları ve saatlik kullanım özetlerinin saklama süresi
+    USAGE_LOG_RETENTION_DAYS = int(os.getenv("USAGE_LOG_RETENTION_DAYS", "90"))
+    USAGE_ROLLUP_HOURLY_RETENTION_DAYS = int(os.getenv("USAGE_ROLLUP_HOURLY_RETENTION_DAYS", "30"))
+    # Önbelleklenen etkin limitlerin en uzun yaşam süresi (yayın kaçırılırsa güvenlik ağı)
+    LIMITS_CACHE_MAX_AGE_SECONDS = int(os.getenv("LIMITS_CACHE_MAX_AGE_SECONDS", "300"))
+    # API anahtarından çözülen kimlik anlık görüntüsünün Redis'teki ömrü
+    PRINCIPAL_CACHE_TTL_SECONDS = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+    # Parola özetleme ayrı bir iş parçacığı havuzunda, sınırlı kuyrukla çalışır
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt")
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "16"))
+    # Denetim kayıtları tamponlanıp toplu yazılır; "sync" her kaydı istek içinde yazar
+    AUDIT_LOG_DURABILITY = os.getenv("AUDIT_LOG_DURABILITY", "async")
+    AUDIT_LOG_FLUSH_MS = int(os.getenv("AUDIT_LOG_FLUSH_MS", "500"))
+    AUDIT_LOG_BATCH_SIZE = int(os.getenv("AUDIT_LOG_BATCH_SIZE", "200"))
+    # Bildirim kanalı başına dakikalık gönderim sınırı ve kuyruk boyu
+    NOTIFY_SLACK_PER_MINUTE = int(os.getenv("NOTIFY_SLACK_PER_MINUTE", "60"))
+    NOTIFY_EMAIL_PER_MINUTE = int(os.getenv("NOTIFY_EMAIL_PER_MINUTE", "30"))
+    NOTIFY_QUEUE_SIZE = int(os.getenv("NOTIFY_QUEUE_SIZE", "1000"))
+    # Aynı alarm bu süre içinde tekrar ederse yalnızca sayılır (her tekrar pencereyi uzatır)
+    ALARM_SUPPRESS_SECONDS = int(os.getenv("ALARM_SUPPRESS_SECONDS", "300"))
+    # Log aramalarında toplam sayı bu sınıra kadar sayılır, ötesi tahmindir
+    LOG_SEARCH_COUNT_CAP = int(os.getenv("LOG_SEARCH_COUNT_CAP", "10000"))
+    AUDIT_SYNC_ACTIONS = [
+        a.strip()
+        for a in os.getenv(
+            "AUDIT_SYNC_ACTIONS",
+            "PAYMENT_COMPLETED_SUCCESS,PAYMENT_COMPLETED_FAILURE,"
+            "PAYMENT_CALLBACK_FAILED_PRICE_MISMATCH,PLAN_UPGRADED",
+        ).split(",")
+        if a.strip()
+    ]
     JWT_TOKEN_LOCATION = ["headers"]
     JWT_HEADER_NAME = "Authorization"
     JWT_HEADER_TYPE = "Bearer"
 
     # Celery Beat için periyodik görevlerin tanımlanması
     CELERY_BEAT_SCHEDULE = {
-        "auto-analyze-bitcoin-every-15-minutes": {
-            "task": "backend.tasks.celery_tasks.analyze_coin_task",
+        "analyze-universe-every-15-minutes": {
+            "task": "backend.tasks.universe_tasks.analyze_universe",
             "schedule": timedelta(minutes=15),
-            "args": ("bitcoin", "moderate"),
-            "options": {"queue": "default"},
-        },
-        "auto-analyze-ethereum-every-15-minutes": {
-            "task": "backend.tasks.celery_tasks.analyze_coin_task",
-            "schedule": timedelta(minutes=15),
-            "args": ("ethereum", "moderate"),
-            "options": {"queue": "default"},
+            "options": {"queue": "analysis-batch"},
         },
         "check-and-downgrade-subscriptions-daily": {
             "task": "backend.tasks.celery_tasks.check_and_downgrade_subscriptions",
             "schedule": timedelta(days=1),
-            "options": {"queue": "default"},
+            "options": {"queue": "maintenance"},
+        },
+        "purge-task-telemetry-daily": {
+            "task": "backend.tasks.celery_tasks.purge_task_telemetry",
+            "schedule": timedelta(days=1),
+            "options": {"queue": "maintenance"},
+        },
+        "purge-usage-history-daily": {
+            "task": "backend.tasks.celery_tasks.purge_usage_history",
+            "schedule": timedelta(days=1),
+            "options": {"queue": "maintenance"},
+        },
+        "send-alarm-digests": {
+            "task": "backend.tasks.celery_tasks.send_alarm_digests",
+            "schedule": timedelta(seconds=int(os.getenv("ALARM_DIGEST_SECONDS", "300"))),
+            "options": {"queue": "alerts"},
         },
         'auto-downgrade-plans-everyday': {
             'task': 'backend.tasks.plan_tasks.auto_downgrade_expired_plans',
             'schedule': timedelta(days=1),
-            'options': {'queue': 'default'},
+            'options': {'queue': 'maintenance'},
         },
         'auto-expire-boosts-everyday': {
             'task': 'backend.tasks.plan_tasks.auto_expire_boosts',
             'schedule': timedelta(days=1),
-            'options': {'queue': 'default'},
+            'options': {'queue': 'maintenance'},
         },
     }
     # CORS Origins ayarı .env dosyasından
@@ -146,10 +198,7 @@ class LegacyTestClient(FlaskClient):
         return super().set_cookie(*args, **kwargs)
 
 
-def create_app():
-    app = Flask(__name__)
-    app.test_client_class = LegacyTestClient
-
+def _load_config(app):
     app.config.from_object(Config)
 
     # Test ortamında varsayılan Postgres bağlantısını kullanma
@@ -163,6 +212,42 @@ def create_app():
         # Cache TTL testlerde 0 olmalı (cache pasif)
         app.config["PRICE_CACHE_TTL"] = int(os.getenv("PRICE_CACHE_TTL", "0"))
 
+
+def create_worker_app():
+    """Build the lightweight app used inside Celery worker processes.
+
+    Only configuration, the database, Redis, task telemetry and the Socket.IO
+    message queue (for emits) are set up.  Celery itself is configured once
+    in the consuming process by ``backend.celery_worker``.  Blueprints, CORS,
+    rate limiting, table creation and role seeding are web-only; the analysis
+    system is created lazily by the first task that needs it.
+    """
+    app = Flask(__name__)
+    _load_config(app)
+
+    db.init_app(app)
+    from backend.tasks.telemetry import init_task_telemetry
+
+    init_task_telemetry(app)
+    # İşçiler yalnızca yayın yapar; mesaj kuyruğunu dinlemez
+    socketio.init_app(
+        app, client_manager=guarded_client_manager(Config.CELERY_BROKER_URL, write_only=True)
+    )
+
+    app.extensions["db"] = db
+    app.extensions["celery"] = celery_app
+    app.extensions["socketio"] = socketio
+    app.extensions["redis_client"] = Redis.from_url(app.config.get("REDIS_URL"))
+    app.ytd_system_instance = None
+    return app
+
+
+def create_app():
+    app = Flask(__name__)
+    app.test_client_class = LegacyTestClient
+
+    _load_config(app)
+
     # Üretim ortamı güvenlik doğrulamaları
     Config.assert_production_jwt_key()
     Config.assert_production_cors_origins()
@@ -174,11 +259,46 @@ def create_app():
     # Uzantıları uygulamaya bağla
     db.init_app(app)
     limiter.init_app(app)
-    celery_app.conf.update(app.config)
-    # SocketIO'nun cors_allowed_origins'ı Flask-CORS ile senkronize olmalı
+    # Celery ayarları (broker, beat, plan ve iş türüne göre ayrılmış kuyruklar)
+    from backend.tasks.queues import celery_settings
+
+    celery_app.conf.update(celery_settings(app.config))
+    # Görev telemetrisi sinyallerle toplanır ve toplu yazılır
+    from backend.tasks.telemetry import init_task_telemetry
+
+    init_task_telemetry(app)
+    # Kullanım sayaçları Redis'te; usage_log satırları toplu yazılır
+    from backend.services.usage_counters import init_usage_counters
+
+    init_usage_counters(app)
+    # Denetim kayıtları istek yolunda commit edilmez; tampondan toplu yazılır
+    from backend.utils.audit import init_audit_log
+
+    init_audit_log(app)
+    # Slack/e-posta bildirimleri kanal başına kuyruk ve işçiyle gönderilir
+    from backend.utils.notifications import init_notifications
+
+    init_notifications(app)
+    # API anahtarı istek başına bir kez çözülür; anlık görüntü Redis'te paylaşılır
+    from backend.auth.principal import init_principal
+
+    init_principal(app)
+    # Giriş ve şifre sıfırlamadaki KDF çağrıları web iş parçacığını bloklamaz
+    from backend.auth.password_hashing import init_password_hasher
+
+    init_password_hasher(app)
+    # Denetim kaydı ve sistem olayı aramaları için FTS5/trigram indeksleri tablolarla oluşturulur
+    from backend.services.log_search import init_log_search
+
+    init_log_search(app)
+    # SocketIO'nun cors_allowed_origins'ı Flask-CORS ile senkronize olmalı.
+    # Gönderim kuyruğu dolan (yavaş) istemciler yayınlardan düşürülür.
     socketio.init_app(
         app,
-        message_queue=Config.CELERY_BROKER_URL,
+        client_manager=guarded_client_manager(
+            Config.CELERY_BROKER_URL,
+            max_send_queue=app.config.get("REALTIME_MAX_SEND_QUEUE", REALTIME_MAX_SEND_QUEUE),
+        ),
         cors_allowed_origins=Config.CORS_ORIGINS,
     )
 
@@ -218,6 +338,15 @@ def create_app():
     app.extensions["socketio"] = socketio
     app.extensions["redis_client"] = Redis.from_url(app.config.get("REDIS_URL"))
 
+    # Etkin limitler kullanıcı başına önbelleklenir; değişiklikler Redis üzerinden yayılır
+    from backend.services.limits_cache import init_limits_cache
+
+    init_limits_cache(app)
+    # Kullanılmış refresh tokenları tüm worker'larda Redis üzerinden iptal edilir
+    from backend.auth.revocation import init_revocation_store
+
+    init_revocation_store(app)
+
     # Analiz sistemi uygulamaya bağlanır. Testlerde gerçek bağımlılıklar
     # yerine boş bir nesne atanır ki monkeypatch ile kolayca kullanılsın.
     if os.getenv("FLASK_ENV") == "testing":
@@ -246,6 +375,7 @@ def create_app():
     from backend.api.admin.backup import backup_bp
     from backend.api.admin.system_events import events_bp
     from backend.api.admin.analytics import analytics_bp
+    from backend.api.admin.backtests import backtests_bp
     from backend.limits.routes import limits_bp
     from backend.api.ta_routes import bp as ta_bp
     from backend.api.public.technical import technical_bp
@@ -272,6 +402,7 @@ def create_app():
     app.register_blueprint(backup_bp)
     app.register_blueprint(events_bp)
     app.register_blueprint(analytics_bp)
+    app.register_blueprint(backtests_bp)
     app.register_blueprint(ta_bp)
     app.register_blueprint(technical_bp)
     app.register_blueprint(subscriptions_bp)
@@ -289,17 +420,14 @@ def create_app():
         except Exception as e:
             db_status = f"error: {e}"
             logger.error(f"Health check DB hatası: {e}")
-            # Kritik hata durumunda alarma devret
-            from backend.utils.alarms import send_security_alert_task
+            # Kritik hata durumunda alarma devret (kesinti boyunca tekrarlar bastırılır)
+            from backend.utils.alarms import raise_alarm
 
-            send_security_alert_task.delay(
+            raise_alarm(
                 "Veritabanı Bağlantı Hatası",
-                {
-                    "username": "Sistem",
-                    "ip_address": request.remote_addr if request else "N/A",
-                },
                 f"Veritabanı bağlantısı kurulamıyor: {e}",
                 severity="FATAL",
+                fingerprint="health:database",
             )
 
         try:
@@ -308,17 +436,14 @@ def create_app():
         except Exception as e:
             redis_status = f"error: {e}"
             logger.error(f"Health check Redis hatası: {e}")
-            # Kritik hata durumunda alarma devret
-            from backend.utils.alarms import send_security_alert_task
+            # Kritik hata durumunda alarma devret (kesinti boyunca tekrarlar bastırılır)
+            from backend.utils.alarms import raise_alarm
 
-            send_security_alert_task.delay(
+            raise_alarm(
                 "Redis Bağlantı Hatası",
-                {
-                    "username": "Sistem",
-                    "ip_address": request.remote_addr if request else "N/A",
-                },
                 f"Redis bağlantısı kurulamıyor: {e}",
                 severity="FATAL",
+                fingerprint="health:redis",
             )
 
         overall_status = (
@@ -341,17 +466,14 @@ def create_app():
     @app.errorhandler(500)
     def internal_error(error):
         logger.exception("Internal Server Error: %s", error)
-        # Kritik bir 500 hatasında alarm tetikle
-        from backend.utils.alarms import send_security_alert_task
+        # Kritik bir 500 hatasında alarm tetikle; aynı hata aynı uç noktada tekrar ederse sayılır
+        from backend.utils.alarms import alarm_fingerprint, raise_alarm
 
-        send_security_alert_task.delay(
+        raise_alarm(
             "Sunucu İç Hatası (500)",
-            {
-                "username": "Sistem",
-                "ip_address": request.remote_addr if request else "N/A",
-            },
-            f"Beklenmeyen sunucu hatası: {error}",
+            f"Beklenmeyen sunucu hatası: {error} ({request.method} {request.path})",
             severity="CRITICAL",
+            fingerprint=f"{request.endpoint}:{alarm_fingerprint(type(error).__name__ + str(error))}",
         )
         return (
             jsonify(
@@ -378,21 +500,80 @@ def create_app():
 
     # SocketIO olayları
     @socketio.on("connect", namespace="/")
-    def handle_connect():
+    def handle_connect(auth=None):
         logger.info("Client connected to WebSocket.")
+        # API anahtarı verilirse kullanıcıya özel sonuç odasına katıl
+        api_key = auth.get("api_key") if isinstance(auth, dict) else None
+        # Anahtar paylaşılan principal önbelleğinden çözülür; her bağlantıda sorgu yapılmaz
+        user = resolve_principal(api_key) if api_key else None
+        if user:
+            join_room(user_room(user.id))
         emit("my response", {"data": "Connected"})
 
+    @socketio.on("subscribe", namespace="/")
+    def handle_subscribe(data):
+        coins = [str(c).lower() for c in (data or {}).get("coins", [])][:REALTIME_MAX_SUBSCRIPTIONS]
+        profiles = (data or {}).get("profiles") or ["moderate"]
+        for coin in coins:
+            join_room(coin_room(coin))
+        # Delta yayınlarının temeli olarak mevcut özetleri gönder
+        emit(
+            "analysis_snapshot",
+            subscription_snapshot(app.extensions.get("redis_client"), coins, profiles),
+        )
+
+    @socketio.on("unsubscribe", namespace="/")
+    def handle_unsubscribe(data):
+        for coin in (data or {}).get("coins", []):
+            leave_room(coin_room(str(coin).lower()))
+
     @socketio.on("connect", namespace="/alerts")
     @check_usage_limit("realtime_alert")
     def handle_alerts_connect(auth):
         api_key = auth.get("api_key") if auth else None
-        user = User.query.filter_by(api_key=api_key).first()
+        user = resolve_principal(api_key) if api_key else None
         if not user or user.subscription_level.value < SubscriptionPlan.PREMIUM.value:
             logger.warning("Unauthorized alert WebSocket connection attempt.")
             return False
-        g.user = user
+        # Fiyat alarmları kullanıcının kendi odasına gönderilir
+        join_room(user_room(user.id))
         logger.info(f"Alerts WebSocket connected: {user.username}")
 
+    @socketio.on("connect", namespace=TICKER_NAMESPACE)
+    def handle_ticker_connect(auth=None):
+        api_key = auth.get("api_key") if isinstance(auth, dict) else None
+        user = resolve_principal(api_key) if api_key else None
+        if not user:
+            logger.warning("Unauthorized ticker WebSocket connection attempt.")
+            return False
+        session["ticker_plan"] = user.subscription_level.name
+
+    @socketio.on("subscribe", namespace=TICKER_NAMESPACE)
+    def handle_ticker_subscribe(data):
+        data = data or {}
+        result = ticker.subscribe(
+            app.extensions.get("redis_client"),
+            request.sid,
+            session.get("ticker_plan", "TRIAL"),
+            data.get("coins", []),
+            data.get("interval"),
+        )
+        for coin in result["subscribed"]:
+            join_room(ticker.ticker_room(coin, result["interval"]))
+        emit("subscribed", result)
+
+    @socketio.on("unsubscribe", namespace=TICKER_NAMESPACE)
+    def handle_ticker_unsubscribe(data):
+        removed = ticker.unsubscribe(
+            app.extensions.get("redis_client"), request.sid, (data or {}).get("coins", [])
+        )
+        for coin, cadence in removed:
+            leave_room(ticker.ticker_room(coin, cadence))
+
+    @socketio.on("disconnect", namespace=TICKER_NAMESPACE)
+    def handle_ticker_disconnect():
+        ticker.unsubscribe(app.extensions.get("redis_client"), request.sid)
+
     @socketio.on("disconnect", namespace="/")
     def handle_disconnect():
         logger.info("Client disconnected from WebSocket.")
@@ -13,7 +13,7 @@ from backend.db.models import (
     UserRole,
     SubscriptionPlanModel,
 )
-from sqlalchemy import func, text
+from sqlalchemy import func
 from loguru import logger
 import os
 import uuid
@@ -23,6 +23,8 @@ from backend.utils.rbac import require_permission
 from backend.auth.middlewares import admin_required as _admin_required
 from flask_jwt_extended import get_jwt_identity
 from backend.utils.audit import log_action
+from backend.services.limits_cache import invalidate_limits
+from backend.services.usage_rollup import usage_totals
 
 
 def admin_required(f):
@@ -93,6 +95,7 @@ def update_custom_features(user_id):
 
         user.custom_features = json.dumps(parsed)
         db.session.commit()
+        invalidate_limits(user_id=user.id)
 
     return jsonify({"message": "Özel özellikler güncellendi."}), 200
 
@@ -455,20 +458,20 @@ def plan_usage():
 @admin_bp.route('/limit-usage', methods=['GET'])
 @admin_required
 def limit_usage():
-    with current_app.app_context():
-        results = db.session.execute(
-            text(
-                """
-                SELECT usage_log.user_id, users.username, usage_log.action, COUNT(*) AS count
-                FROM usage_log
-                JOIN users ON usage_log.user_id = users.id
-                GROUP BY usage_log.user_id, users.username, usage_log.action
-                ORDER BY count DESC
-                LIMIT 100
-                """
-            )
-        )
-        stats = [dict(row) for row in results]
-        return jsonify({"stats": stats}), 200
+    """Kullanıcı ve işlem bazında tüm geçmişin en yüksek 100 kullanım toplamı.
+
+    ``?days=N`` (1-366) verilirse yalnızca bugün dahil son N gün sayılır.
+    """
+    # Günlük özetlerden okunur; maliyet geçmişin boyutundan bağımsızdır
+    days = request.args.get('days')
+    if days is None:
+        return jsonify({"stats": usage_totals(limit=100)}), 200
+    try:
+        days = min(max(int(days), 1), 366)
+    except ValueError:
+        return jsonify({"error": "days bir tam sayı olmalıdır."}), 400
+    since = datetime.utcnow() - timedelta(days=days - 1)
+    stats = usage_totals(since, limit=100)
+    return jsonify({"stats": stats, "days": days}), 200
 
 
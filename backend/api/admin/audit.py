@@ -3,29 +3,41 @@ from flask_jwt_extended import jwt_required
 from backend.auth.middlewares import admin_required
 from backend.db import db
 from backend.db.models import AuditLog
+from backend.services.log_search import audit_log_search, json_field, page_headers
 
 audit_bp = Blueprint("audit_bp", __name__)
 
 
-# LOG LİSTELEME (FİLTRE DESTEKLİ)
+# LOG LİSTELEME (FİLTRE, ARAMA VE İMLEÇ DESTEKLİ)
 @audit_bp.route("/admin/audit-logs", methods=["GET"])
 @jwt_required()
 @admin_required()
 def get_logs():
     limit = int(request.args.get("limit", 100))
+    cursor = request.args.get("cursor")
     username = request.args.get("username")
     action = request.args.get("action")
     ip = request.args.get("ip")
+    term = request.args.get("q")
+    # details varsayılan olarak saklandığı gibi (metin) döner; expand=details ile ayrıştırılır
+    expand = set(filter(None, request.args.get("expand", "").split(",")))
 
     q = AuditLog.query
     if username:
-        q = q.filter(AuditLog.username.ilike(f"%{username}%"))
+        q = q.filter(audit_log_search.contains(username, ["username"]))
     if action:
-        q = q.filter(AuditLog.action.ilike(f"%{action}%"))
+        q = q.filter(audit_log_search.contains(action, ["action"]))
     if ip:
         q = q.filter(AuditLog.ip_address == ip)
+    if term:
+        q = q.filter(audit_log_search.contains(term))
 
-    logs = q.order_by(AuditLog.created_at.desc()).limit(limit).all()
+    try:
+        logs, next_cursor = audit_log_search.page(q, cursor, limit)
+    except ValueError:
+        return jsonify({"error": "Geçersiz imleç"}), 400
+    # Toplam sayı yalnızca ilk sayfada tahmin edilir
+    estimate = None if cursor else audit_log_search.estimate(q)
     return jsonify([
         {
             "id": l.id,
@@ -33,11 +45,11 @@ def get_logs():
             "username": l.username,
             "action": l.action,
             "ip_address": l.ip_address,
-            "details": l.details,
+            "details": json_field(l.details) if "details" in expand else l.details,
             "created_at": l.created_at.isoformat(),
         }
         for l in logs
-    ])
+    ]), 200, page_headers(next_cursor, estimate)
 
 # LOG RETENTION (ESKİ KAYITLARI SİL)
 @audit_bp.route("/admin/audit-logs/purge", methods=["DELETE"])
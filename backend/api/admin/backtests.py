@@ -0,0 +1,142 @@
+import math
+import os
+import uuid
+
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required
+
+from backend.auth.middlewares import admin_required
+from backend.auth.principal import request_principal
+from backend.db.models import BacktestResult
+from backend.services.backtest import load_decision_rules, to_datetime
+from backend.services.sweep import (
+    MAX_SWEEP_CONFIGS,
+    SWEEP_OBJECTIVES,
+    check_param_paths,
+    expand_grid,
+    sample_random,
+)
+
+MAX_SWEEP_RESULTS = 1000
+
+backtests_bp = Blueprint("backtests", __name__, url_prefix="/api/admin/backtests")
+
+
+def _sweep_configs(data, coin_count, rules):
+    """Validate the grid/random spec and expand it; raises ``ValueError`` with the 400 message."""
+    limit = MAX_SWEEP_CONFIGS // coin_count
+    if data.get("grid"):
+        grid = data["grid"]
+        if not isinstance(grid, dict) or not all(isinstance(v, list) and v for v in grid.values()):
+            raise ValueError("grid, her parametre için boş olmayan bir değer listesi içermelidir")
+        check_param_paths(rules, grid)
+        # Kartezyen çarpım üretilmeden önce boyutu denetlenir
+        if math.prod(len(v) for v in grid.values()) > limit:
+            raise ValueError(f"En fazla {MAX_SWEEP_CONFIGS} backtest çalıştırılabilir")
+        return expand_grid(grid)
+    if data.get("random"):
+        spec = data["random"]
+        if not isinstance(spec, dict):
+            raise ValueError("random bir nesne olmalıdır")
+        ranges = spec.get("ranges") or {}
+        if not isinstance(ranges, dict) or not all(isinstance(v, list) and v for v in ranges.values()):
+            raise ValueError("random.ranges, her parametre için [alt, üst] ya da seçenek listesi içermelidir")
+        check_param_paths(rules, ranges)
+        try:
+            samples = int(spec.get("samples", 100))
+            seed = None if spec.get("seed") is None else int(spec["seed"])
+        except (TypeError, ValueError):
+            raise ValueError("random.samples ve random.seed tam sayı olmalıdır")
+        if samples < 1 or (seed is not None and seed < 0):
+            raise ValueError("random.samples pozitif, random.seed negatif olmayan bir tam sayı olmalıdır")
+        if samples > limit:
+            raise ValueError(f"En fazla {MAX_SWEEP_CONFIGS} backtest çalıştırılabilir")
+        return sample_random(ranges, samples, seed)
+    raise ValueError("grid veya random tanımlanmalı")
+
+
+def _sweep_window(start, end):
+    """Parse the backtest window; raises ``ValueError`` with the 400 message."""
+    try:
+        start_dt, end_dt = to_datetime(start), to_datetime(end)
+    except (TypeError, ValueError):
+        raise ValueError("start ve end ISO 8601 tarih olmalıdır")
+    if start_dt >= end_dt:
+        raise ValueError("start, end tarihinden önce olmalıdır")
+    return start_dt, end_dt
+
+
+def _sweep_workers(value):
+    """Worker count clamped to ``[1, os.cpu_count()]``; ``None`` keeps the default."""
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError("max_workers tam sayı olmalıdır")
+    return max(1, min(value, os.cpu_count() or 1))
+
+
+@backtests_bp.route("/sweep", methods=["POST"])
+@jwt_required()
+@admin_required()
+def start_sweep():
+    """Start a grid or random-search sweep over rule parameters."""
+    data = request.get_json() or {}
+    coins = data.get("coins") or []
+    profile = data.get("profile", "moderate")
+    start = data.get("start")
+    end = data.get("end")
+    objective = data.get("objective", "sharpe_ratio")
+
+    if not coins or not start or not end:
+        return jsonify({"error": "coins, start ve end zorunludur"}), 400
+    if not isinstance(coins, list) or not all(isinstance(c, str) for c in coins):
+        return jsonify({"error": "coins bir metin listesi olmalıdır"}), 400
+    if objective not in SWEEP_OBJECTIVES:
+        return jsonify({"error": f"objective şunlardan biri olmalı: {', '.join(SWEEP_OBJECTIVES)}"}), 400
+
+    rules = load_decision_rules()
+    try:
+        _sweep_window(start, end)
+        max_workers = _sweep_workers(data.get("max_workers"))
+        configs = _sweep_configs(data, len(coins), rules.get(profile, rules.get("moderate", {})))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if not configs:
+        return jsonify({"error": "Parametre kombinasyonu bulunamadı"}), 400
+    if len(configs) * len(coins) > MAX_SWEEP_CONFIGS:
+        return jsonify({"error": f"En fazla {MAX_SWEEP_CONFIGS} backtest çalıştırılabilir"}), 400
+
+    from backend.tasks.backtest_tasks import run_parameter_sweep
+
+    sweep_id = uuid.uuid4().hex
+    task = run_parameter_sweep.delay(
+        coins,
+        profile,
+        start,
+        end,
+        configs,
+        objective=objective,
+        max_workers=max_workers,
+        sweep_id=sweep_id,
+        user_id=request_principal().id,
+    )
+    return jsonify({"task_id": task.id, "sweep_id": sweep_id, "total": len(configs) * len(coins)}), 202
+
+
+@backtests_bp.route("/sweep/<string:sweep_id>", methods=["GET"])
+@jwt_required()
+@admin_required()
+def sweep_results(sweep_id):
+    """Return the ranked results of a finished sweep."""
+    try:
+        limit = int(request.args.get("limit", 50))
+    except ValueError:
+        return jsonify({"error": "limit tam sayı olmalıdır"}), 400
+    limit = max(1, min(limit, MAX_SWEEP_RESULTS))
+    q = BacktestResult.query.filter_by(sweep_id=sweep_id)
+    coin = request.args.get("coin")
+    if coin:
+        q = q.filter_by(coin=coin)
+    rows = q.order_by(BacktestResult.rank, BacktestResult.coin).limit(limit).all()
+    return jsonify([r.to_dict() for r in rows])
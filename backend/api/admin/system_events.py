@@ -1,10 +1,14 @@
 from datetime import datetime, timedelta
-import json
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required
 from backend.auth.middlewares import admin_required
+from backend.auth.password_hashing import password_hasher
+from sqlalchemy.orm import defer
 from backend.db.models import db, SystemEvent
+from backend.services.log_search import json_field, page_headers, system_event_search
 from backend.utils.system_events import log_event
+from backend.tasks.queues import queue_metrics
+from backend.tasks.telemetry import latency_histograms
 
 
 events_bp = Blueprint("events_bp", __name__, url_prefix="/api/admin")
@@ -28,7 +32,7 @@ def list_events():
     if user_id:
         q = q.filter(SystemEvent.user_id == int(user_id))
     if search:
-        q = q.filter(SystemEvent.message.ilike(f"%{search}%"))
+        q = q.filter(system_event_search.contains(search))
     if start:
         try:
             start_dt = datetime.fromisoformat(start)
@@ -42,19 +46,30 @@ def list_events():
         except ValueError:
             pass
     limit = int(request.args.get("limit", 100))
-    events = q.order_by(SystemEvent.created_at.desc()).limit(limit).all()
-    return jsonify([
-        {
+    cursor = request.args.get("cursor")
+    # meta varsayılan olarak ayrıştırılır; expand= (boş) ile sütun hiç yüklenmez
+    expand = set(filter(None, request.args.get("expand", "meta").split(",")))
+    if "meta" not in expand:
+        q = q.options(defer(SystemEvent.meta))
+    try:
+        events, next_cursor = system_event_search.page(q, cursor, limit)
+    except ValueError:
+        return jsonify({"error": "Geçersiz imleç"}), 400
+    estimate = None if cursor else system_event_search.estimate(q)
+    items = []
+    for e in events:
+        item = {
             "id": e.id,
             "event_type": e.event_type,
             "level": e.level,
             "message": e.message,
-            "meta": json.loads(e.meta) if e.meta else {},
             "created_at": e.created_at.isoformat(),
             "user_id": e.user_id,
         }
-        for e in events
-    ])
+        if "meta" in expand:
+            item["meta"] = json_field(e.meta)
+        items.append(item)
+    return jsonify(items), 200, page_headers(next_cursor, estimate)
 
 
 @events_bp.route("/events/retention-cleanup", methods=["POST"])
@@ -103,3 +118,29 @@ def system_status():
             "jobs_last_hour": job_count,
         }
     )
+
+
+@events_bp.route("/queues", methods=["GET"])
+@jwt_required()
+@admin_required()
+def queue_status():
+    """Celery kuyruk derinliği ve bekleme süresi (SLA) metrikleri."""
+    return jsonify(queue_metrics(current_app.extensions["redis_client"]))
+
+
+@events_bp.route("/tasks/latency", methods=["GET"])
+@jwt_required()
+@admin_required()
+def task_latency():
+    """Görev türü başına çalışma süresi histogramı."""
+    hours = request.args.get("hours", 24, type=int)
+    since = datetime.utcnow() - timedelta(hours=hours)
+    return jsonify(latency_histograms(since, request.args.get("task")))
+
+
+@events_bp.route("/auth/hashing", methods=["GET"])
+@jwt_required()
+@admin_required()
+def password_hashing_metrics():
+    """Parola özetleme kuyruk bekleme ve süre histogramları (bu süreç için)."""
+    return jsonify(password_hasher().metrics())
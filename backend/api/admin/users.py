@@ -2,10 +2,11 @@ from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required
 
 from backend.auth.middlewares import admin_required
+from backend.auth.password_hashing import HashingOverloaded, password_hasher
 from backend.db import db
 from backend.db.models import User, SubscriptionPlan, UserRole
+from backend.services.limits_cache import invalidate_limits
 import json
-from werkzeug.security import generate_password_hash
 import secrets
 
 
@@ -29,7 +30,12 @@ def create_user():
     if User.query.filter_by(email=email).first():
         return jsonify({"error": "Bu e-posta zaten kayıtlı"}), 409
 
-    hashed_pw = generate_password_hash(password)
+    try:
+        hashed_pw = password_hasher().hash(password)
+    except HashingOverloaded:
+        response = jsonify({"error": "Sunucu yoğun. Lütfen birkaç saniye sonra tekrar deneyin."})
+        response.headers["Retry-After"] = "5"
+        return response, 503
     api_key = secrets.token_hex(32)
 
     try:
@@ -124,4 +130,5 @@ def set_custom_features(user_id):
     data = request.get_json() or {}
     user.custom_features = json.dumps(data.get("custom_features", {}))
     db.session.commit()
+    invalidate_limits(user_id=user.id)
     return jsonify(user.to_dict())
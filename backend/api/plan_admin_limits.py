@@ -5,6 +5,7 @@ from flask_jwt_extended import jwt_required
 
 from backend import db
 from backend.models.plan import Plan
+from backend.services.limits_cache import invalidate_limits
 import json
 
 plan_admin_limits_bp = Blueprint(
@@ -38,6 +39,7 @@ def update_plan_limits(plan_id):
 
         plan.features = json.dumps(new_limits)
         db.session.commit()
+        invalidate_limits(plan_id=plan.id)
 
         return jsonify(
             {
@@ -2,7 +2,7 @@
 
 import json
 import requests
-from flask import Blueprint, request, jsonify, current_app, g
+from flask import Blueprint, request, jsonify, current_app
 from backend import limiter
 from backend.limiting import get_plan_rate_limit
 from loguru import logger
@@ -11,12 +11,20 @@ from datetime import datetime, date, timedelta
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm.exc import StaleDataError
 import time # For time.time()
+import uuid
 
 # Modelleri import et
-from backend.db.models import db, User, SubscriptionPlan, DailyUsage, PromoCode, PromoCodeUsage
-from backend.constants import SUBSCRIPTION_EXTENSION_DAYS
+from backend.db.models import db, User, SubscriptionPlan, DailyUsage, PromoCode, PromoCodeUsage, PriceAlert
+from backend.constants import (
+    ANALYSIS_LONG_POLL_MAX_SECONDS,
+    PRICE_ALERT_DIRECTIONS,
+    PRICE_ALERT_FIELDS,
+    PRICE_ALERT_MAX_ACTIVE_PER_USER,
+    SUBSCRIPTION_EXTENSION_DAYS,
+)
 
 # Güvenlik dekoratörlerini import et
+from backend.auth.principal import current_user, request_principal
 from backend.utils.decorators import require_subscription_plan
 from backend.utils.usage_limits import check_usage_limit
 
@@ -24,6 +32,18 @@ from backend.utils.usage_limits import check_usage_limit
 from backend.utils.helpers import serialize_user_for_api, add_audit_log
 from backend.utils.plan_limits import get_user_effective_limits
 from backend.middleware.plan_limits import enforce_plan_limit
+from backend.tasks.queues import analysis_queue_for_plan
+from backend.services.analysis_cache import (
+    analysis_etag,
+    can_read_task,
+    claim_analysis,
+    grant_task_access,
+    data_version,
+    load_cached_analysis,
+    redact_analysis,
+    release_analysis,
+    wait_for_task_result,
+)
 from flask_jwt_extended import jwt_required
 
 # API Blueprint'i tanımla
@@ -52,7 +72,7 @@ BACKEND_PLAN_PRICES = {
 # Backend Guard: Günlük analiz çağrısı kotasını kontrol et.
 @check_usage_limit("coin_analysis")
 def analyze_coin_api(coin_id):
-    user = g.user # Dekorator'den gelen kullanıcı objesi
+    user = request_principal()
 
     investor_profile = request.args.get('profile', 'moderate').lower()
     if request.method == 'POST':
@@ -60,15 +80,12 @@ def analyze_coin_api(coin_id):
         if request_data and 'profile' in request_data:
             investor_profile = request_data['profile'].lower()
 
-    # Redis Cache Kontrolü
+    # Redis Cache Kontrolü (plan bağımsız sonuç, plana göre okuma anında süzülür)
     r_client = current_app.extensions['redis_client']
-    cache_key = f"analysis:{coin_id}:{investor_profile}:{user.subscription_level.name}" # Cache key'e plan eklendi
-
-    if r_client:
-        cached_result = r_client.get(cache_key)
-        if cached_result:
-            logger.info(f"Cache'ten {coin_id.upper()} analizi servis ediliyor. Kullanıcı: {user.username}, Profil: {investor_profile}")
-            return jsonify(json.loads(cached_result))
+    cached = load_cached_analysis(r_client, coin_id, investor_profile)
+    if cached:
+        logger.info(f"Cache'ten {coin_id.upper()} analizi servis ediliyor. Kullanıcı: {user.username}, Profil: {investor_profile}")
+        return jsonify(redact_analysis(cached["result"], user.subscription_level.name))
 
     try:
         if not coin_id or not isinstance(coin_id, str):
@@ -83,13 +100,29 @@ def analyze_coin_api(coin_id):
         elif user.subscription_level == SubscriptionPlan.ADVANCED:
             priority = 7
 
-        task = celery_app.send_task(
-            'backend.tasks.celery_tasks.analyze_coin_task', # Celery görev yolu
-            args=[coin_id, investor_profile, user.id], # user.id eklendi
-            kwargs={},
-            options={'priority': priority}
+        # Aynı (coin, profil, veri sürümü) için çalışan görev varsa onu paylaş
+        version = data_version()
+        task_id, created = claim_analysis(
+            r_client, coin_id, investor_profile, version, uuid.uuid4().hex
         )
-        logger.info(f"Celery: {coin_id.upper()} analizi görevi kuyruğa eklendi. Task ID: {task.id}. Kullanıcı: {user.username}")
+        if created:
+            try:
+                task = celery_app.send_task(
+                    'backend.tasks.celery_tasks.analyze_coin_task', # Celery görev yolu
+                    args=[coin_id, investor_profile, user.id], # user.id eklendi
+                    kwargs={'data_version': version},
+                    task_id=task_id,
+                    queue=analysis_queue_for_plan(user.subscription_level),
+                    priority=priority,
+                )
+            except Exception:
+                release_analysis(r_client, coin_id, investor_profile, version, task_id)
+                raise
+            logger.info(f"Celery: {coin_id.upper()} analizi görevi kuyruğa eklendi. Task ID: {task.id}. Kullanıcı: {user.username}")
+        else:
+            logger.info(f"Celery: {coin_id.upper()} analizi zaten çalışıyor, Task ID paylaşıldı: {task_id}. Kullanıcı: {user.username}")
+        # Sonucu yalnızca görevi isteyen (veya ona katılan) kullanıcılar okuyabilir
+        grant_task_access(r_client, task_id, user.id)
 
         # Günlük kullanım kotasını atomik olarak artır
         with current_app.app_context(): # Ensure context for DB operations
@@ -130,7 +163,7 @@ def analyze_coin_api(coin_id):
                 # Hata durumunda alarma da devret
                 raise # Hatayı dışarı fırlat ki ana try-except yakalayabilsin
 
-        return jsonify({"status": "Analiz arka planda başlatıldı.", "task_id": task.id, "coin": coin_id}), 202
+        return jsonify({"status": "Analiz arka planda başlatıldı.", "task_id": task_id, "coin": coin_id, "coalesced": not created}), 202
 
     except requests.exceptions.RequestException as e:
         logger.error(f"Harici API bağlantı hatası: {e}. Kullanıcı: {user.username}")
@@ -139,13 +172,110 @@ def analyze_coin_api(coin_id):
         logger.exception(f"Analiz sırasında beklenmeyen bir hata oluştu: {e}. Kullanıcı: {user.username}")
         return jsonify({"error": f"Analiz sırasında beklenmeyen bir hata oluştu. Destek ile iletişime geçin."}), 500
 
+
+# Analiz sonucu endpoint'i: task_id ile sonuç okunur, yeni analiz tetiklenmez
+@api_bp.route('/analysis/<string:task_id>', methods=['GET'])
+@require_subscription_plan(SubscriptionPlan.BASIC)
+def get_analysis_result(task_id):
+    """Return an analysis result by task id.
+
+    ``?wait=<seconds>`` long-polls until the result is ready (at most
+    ``ANALYSIS_LONG_POLL_MAX_SECONDS``).  Completed results carry an ETag and
+    ``If-None-Match`` yields 304 when unchanged.  Only users who requested the
+    analysis (or were coalesced onto it) can read it; others get 404.
+    """
+    user = request_principal()
+    wait = request.args.get('wait', 0, type=float) or 0.0
+    wait = min(max(wait, 0.0), ANALYSIS_LONG_POLL_MAX_SECONDS)
+
+    r_client = current_app.extensions.get('redis_client')
+    if not can_read_task(r_client, task_id, user.id):
+        return jsonify({"error": "Analiz bulunamadı."}), 404
+    envelope = wait_for_task_result(r_client, task_id, wait)
+    if envelope is None:
+        resp = jsonify({"status": "pending", "task_id": task_id})
+        resp.status_code = 202
+        resp.headers['Retry-After'] = '2'
+        return resp
+    if envelope.get("status") == "failed":
+        return jsonify({"status": "failed", "task_id": task_id, "error": "Analiz başarısız oldu."}), 500
+
+    payload = {
+        "status": "completed",
+        "task_id": task_id,
+        "coin": envelope.get("coin"),
+        "profile": envelope.get("profile"),
+        "result": redact_analysis(envelope.get("result") or {}, user.subscription_level.name),
+    }
+    etag = analysis_etag(payload)
+    if request.if_none_match.contains(etag):
+        resp = current_app.response_class(status=304)
+    else:
+        resp = jsonify(payload)
+    resp.set_etag(etag)
+    resp.headers['Cache-Control'] = 'private, no-cache'
+    return resp
+
+
+# Fiyat/gösterge alarmları: ticker üreticisi tetiklenenleri /alerts odasına iter
+@api_bp.route('/alerts', methods=['POST'])
+@require_subscription_plan(SubscriptionPlan.PREMIUM)
+@check_usage_limit("realtime_alert")
+def create_price_alert():
+    data = request.get_json(silent=True) or {}
+    coin = str(data.get('coin') or '').strip().lower()
+    field = data.get('field', 'current_price')
+    direction = data.get('direction')
+    try:
+        threshold = float(data.get('threshold'))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Geçerli bir eşik değeri gereklidir."}), 400
+    if not coin or field not in PRICE_ALERT_FIELDS or direction not in PRICE_ALERT_DIRECTIONS:
+        return jsonify({
+            "error": "Geçersiz alarm tanımı.",
+            "fields": list(PRICE_ALERT_FIELDS),
+            "directions": list(PRICE_ALERT_DIRECTIONS),
+        }), 400
+
+    active = PriceAlert.query.filter_by(user_id=request_principal().id, is_active=True).count()
+    if active >= PRICE_ALERT_MAX_ACTIVE_PER_USER:
+        return jsonify({"error": f"En fazla {PRICE_ALERT_MAX_ACTIVE_PER_USER} aktif alarm tanımlanabilir."}), 429
+
+    alert = PriceAlert(user_id=request_principal().id, coin=coin, field=field, direction=direction, threshold=threshold)
+    db.session.add(alert)
+    db.session.commit()
+    return jsonify(alert.to_dict()), 201
+
+
+@api_bp.route('/alerts', methods=['GET'])
+@require_subscription_plan(SubscriptionPlan.PREMIUM)
+def list_price_alerts():
+    alerts = (
+        PriceAlert.query.filter_by(user_id=request_principal().id, is_active=True)
+        .order_by(PriceAlert.created_at.desc())
+        .all()
+    )
+    return jsonify([a.to_dict() for a in alerts])
+
+
+@api_bp.route('/alerts/<int:alert_id>', methods=['DELETE'])
+@require_subscription_plan(SubscriptionPlan.PREMIUM)
+def delete_price_alert(alert_id):
+    alert = PriceAlert.query.filter_by(id=alert_id, user_id=request_principal().id).first()
+    if not alert:
+        return jsonify({"error": "Alarm bulunamadı."}), 404
+    # Satır silinmez; üretici değişikliği updated_at üzerinden görür
+    alert.is_active = False
+    db.session.commit()
+    return jsonify({"status": "deleted", "id": alert_id})
+
 # LLM Destekli Analiz Endpoint'i (Sadece Premium Kullanıcılar İçin)
 @api_bp.route('/llm/analyze', methods=['POST'])
 @limiter.limit(get_plan_rate_limit, key_func=lambda: request.headers.get('X-API-KEY') or request.remote_addr)
 @require_subscription_plan(SubscriptionPlan.PREMIUM) # LLM için Premium plan
 @check_usage_limit("llm_analyze")
 def llm_analyze():
-    user = g.user # Dekorator'den gelen kullanıcı objesi
+    user = request_principal()
     prompt = request.json.get("prompt")
     if not prompt:
         return jsonify({"error": "Prompt eksik."}), 400
@@ -193,7 +323,7 @@ def llm_analyze():
 @enforce_plan_limit("prediction")
 def predict():
     from backend.utils.usage_tracking import record_usage
-    user = g.get("user")
+    user = request_principal()
     if user:
         record_usage(user, "predict_daily")
     return jsonify({"result": "ok"}), 200
@@ -212,7 +342,6 @@ def daily_prediction():
 @check_usage_limit("forecast")
 def forecast_coin(coin_id):
     """Return Prophet based forecast data for the requested coin."""
-    user = g.user  # get user from decorator
     days_param = request.args.get('days', '1')
     try:
         days = int(days_param)
@@ -297,7 +426,7 @@ def technical_indicators(coin_id):
 @limiter.limit(get_plan_rate_limit, key_func=lambda: request.headers.get('X-API-KEY') or request.remote_addr)
 @require_subscription_plan(SubscriptionPlan.TRIAL) # Abone olunan endpoint'e erişim için minimum TRIAL planı
 def update_subscription():
-    user = g.user # Dekorator'den gelen kullanıcı objesi
+    user = current_user()
     data = request.get_json()
     plan_str = data.get('plan')
     promo_code_str = data.get('promo_code')
@@ -484,7 +613,7 @@ def update_subscription():
 @limiter.limit(get_plan_rate_limit, key_func=lambda: request.headers.get('X-API-KEY') or request.remote_addr)
 @require_subscription_plan(SubscriptionPlan.TRIAL) # En az TRIAL planı gereklidir (herkes görebilir)
 def get_subscription_status():
-    user = g.user # Dekorator'den gelen kullanıcı objesi
+    user = current_user()
     
     # Kullanıcı verilerini güvenli serializer ile döndür
     user_data = serialize_user_for_api(user, scope='self')
@@ -506,7 +635,7 @@ def get_subscription_status():
 @limiter.limit(get_plan_rate_limit, key_func=lambda: request.headers.get('X-API-KEY') or request.remote_addr)
 @require_subscription_plan(SubscriptionPlan.TRIAL)
 def get_user_profile():
-    user = g.user
+    user = current_user()
     daily_usage = DailyUsage.query.filter_by(user_id=user.id, date=date.today()).first()
     used = daily_usage.analyze_calls if daily_usage else 0
     limits = get_user_effective_limits(user)
@@ -529,7 +658,7 @@ def get_user_profile():
 @limiter.limit(get_plan_rate_limit, key_func=lambda: request.headers.get('X-API-KEY') or request.remote_addr)
 @require_subscription_plan(SubscriptionPlan.TRIAL)
 def upgrade_plan(user_id):
-    user = g.user
+    user = current_user()
     if user.id != user_id:
         return jsonify({"error": "Sadece kendi aboneliğinizi güncelleyebilirsiniz."}), 403
     data = request.get_json() or {}
@@ -0,0 +1,120 @@
+"""Role and permission claims carried by access tokens.
+
+Access tokens are issued with the caller's ``role``, the name of their RBAC
+role (``role_name``) and its permission names (``perms``), so admin checks read the signed token instead
+of loading the user on every request.  Claims are trusted only while they are
+current: committing a change to a user's role writes
+``authz:changed:<user_id>`` (and any role/permission edit writes
+``authz:changed:roles``) with the change time, and tokens issued before that
+time fall back to a database lookup until they are refreshed.  The markers
+expire together with the longest-lived access token, and if Redis cannot be
+reached every check goes to the database.
+"""
+
+import time
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+from flask import current_app, has_app_context
+from loguru import logger
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from backend.db.models import Permission, Role, User, UserRole, is_admin_role
+
+USER_CHANGED_KEY = "authz:changed:{user_id}"
+ROLES_CHANGED_KEY = "authz:changed:roles"
+# İşaretler en uzun ömürlü access token'dan biraz daha uzun yaşar
+TTL_GRACE_SECONDS = 60
+
+
+def role_claims(user: User) -> Dict[str, Any]:
+    role = user.role.value if isinstance(user.role, UserRole) else user.role
+    perms = sorted(p.name.lower() for p in user.role_obj.permissions) if user.role_obj else []
+    return {"role": role, "role_name": user.role_obj.name if user.role_obj else None, "perms": perms}
+
+
+def _redis():
+    return current_app.extensions.get("redis_client") if has_app_context() else None
+
+
+def claims_are_current(claims: Mapping[str, Any]) -> bool:
+    """True if no role change was committed after ``claims`` were issued."""
+    if "role" not in claims or "iat" not in claims:
+        return False
+    redis_client = _redis()
+    if redis_client is None:
+        return False
+    try:
+        changed = redis_client.mget([USER_CHANGED_KEY.format(user_id=claims.get("sub")), ROLES_CHANGED_KEY])
+    except Exception as e:
+        logger.debug(f"Authorization change markers unavailable: {e}")
+        return False
+    issued = float(claims["iat"])
+    return all(marker is None or issued > float(marker) for marker in changed)
+
+
+def admin_from_claims(claims: Mapping[str, Any]) -> Optional[bool]:
+    """Admin status from token claims, or ``None`` if the database must decide."""
+    # role_name taşımayan eski token'larda karar veritabanına bırakılır
+    if "role_name" not in claims or not claims_are_current(claims):
+        return None
+    return is_admin_role(claims["role"], claims["role_name"])
+
+
+def mark_authz_changed(user_ids: Iterable[int] = (), roles: bool = False) -> None:
+    keys = [USER_CHANGED_KEY.format(user_id=uid) for uid in user_ids]
+    if roles:
+        keys.append(ROLES_CHANGED_KEY)
+    redis_client = _redis()
+    if not keys or redis_client is None:
+        return
+    ttl = int(current_app.config.get("ACCESS_TOKEN_EXP_MINUTES", 15)) * 60 + TTL_GRACE_SECONDS
+    now = time.time()
+    try:
+        pipe = redis_client.pipeline()
+        for key in keys:
+            pipe.set(key, now, ex=ttl)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Authorization change could not be published: {e}")
+
+
+@event.listens_for(User, "after_update")
+def _collect_role_change(mapper, connection, target):
+    state = inspect(target)
+    if not (state.attrs.role.history.has_changes() or state.attrs.role_id.history.has_changes()):
+        return
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("authz_changed_users", set()).add(target.id)
+
+
+@event.listens_for(User, "after_delete")
+def _collect_deleted_user(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("authz_changed_users", set()).add(target.id)
+
+
+@event.listens_for(Role, "after_update")
+@event.listens_for(Role, "after_delete")
+@event.listens_for(Permission, "after_update")
+@event.listens_for(Permission, "after_delete")
+def _collect_rbac_change(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info["authz_changed_roles"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_authz_changes(session):
+    users = session.info.pop("authz_changed_users", None)
+    roles = session.info.pop("authz_changed_roles", False)
+    if users or roles:
+        mark_authz_changed(users or (), roles=roles)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_authz_changes(session):
+    session.info.pop("authz_changed_users", None)
+    session.info.pop("authz_changed_roles", None)
@@ -1,6 +1,8 @@
 # backend/auth/jwt_utils.py
 # Konum: backend/auth/jwt_utils.py
 
+import hashlib
+import hmac
 import jwt
 import secrets
 import os
@@ -9,13 +11,15 @@ from datetime import datetime, timedelta
 from flask import current_app, request, abort, jsonify
 import logging
 
-# Basit blocklist örneği (prod için Redis/DB kullanın)
-_revoked_refresh_tokens = set()
+from backend.auth.revocation import consume_refresh_token
 
 
-def generate_tokens(user_id, username, role=None):
+def generate_tokens(user_id, username, role=None, permissions=None, role_name=None):
     """
     Access, refresh ve CSRF token üretir.
+
+    ``permissions`` verilirse rol ve RBAC rol adı (``role_name``) ile birlikte
+    access token'a ``perms`` claim'i olarak gömülür (bkz. ``backend.auth.claims``).
     """
     now = datetime.utcnow()
     access_payload = {
@@ -30,6 +34,9 @@ def generate_tokens(user_id, username, role=None):
     }
     if role:
         access_payload["role"] = role
+        if permissions is not None:
+            access_payload["role_name"] = role_name
+            access_payload["perms"] = sorted(permissions)
 
     refresh_payload = {
         "iss": current_app.config.get("JWT_ISSUER", "ytdcrypto"),
@@ -48,6 +55,17 @@ def generate_tokens(user_id, username, role=None):
     return access, refresh, csrf
 
 
+def refresh_token_digest(token):
+    """
+    Refresh token'ın anahtarlı HMAC-SHA256 özeti (oturum tablosunda saklanan değer).
+
+    Token zaten rastgele ve imzalı olduğundan yavaş bir parola KDF'sine gerek
+    yoktur; özet eşitlikle, tekil indeks üzerinden aranır.
+    """
+    key = current_app.config.get("SESSION_DIGEST_KEY") or current_app.config["REFRESH_TOKEN_SECRET"]
+    return hmac.new(key.encode(), token.encode(), hashlib.sha256).hexdigest()
+
+
 def verify_access_token(token):
     """JWT validasyonu yapar. Geçerliyse payload döner, değilse None."""
     try:
@@ -79,14 +97,11 @@ def rotate_refresh_token(old_refresh_token):
             issuer=current_app.config.get("JWT_ISSUER"),
             audience=current_app.config.get("JWT_AUDIENCE")
         )
-        jti = payload.get("jti")
-        if jti in _revoked_refresh_tokens:
+        # Eski refresh token'i iptal et; daha önce kullanıldıysa reddedilir
+        if not consume_refresh_token(payload):
             logging.warning("Revoked refresh token kullanıldı.")
             return None
 
-        # Eski refresh token'i iptal et
-        _revoked_refresh_tokens.add(jti)
-
         user_id = payload.get("sub")
         # Yeni token üret
         access, refresh, csrf = generate_tokens(user_id, payload.get("username"), payload.get("role"))
@@ -132,8 +147,9 @@ def verify_csrf() -> bool:
 def require_admin(func):
     """Decorator that ensures the current JWT belongs to an admin user."""
     from functools import wraps
-    from flask_jwt_extended import get_jwt_identity
-    from backend.db.models import User, UserRole
+    from flask_jwt_extended import get_jwt, get_jwt_identity
+    from backend.auth.claims import admin_from_claims
+    from backend.db.models import User, user_is_admin
     from flask import g
 
     @wraps(func)
@@ -141,11 +157,16 @@ def require_admin(func):
         try:
             if current_app.config.get("TESTING"):
                 return func(*args, **kwargs)
-            user_id = get_jwt_identity()
-            user = User.query.get(user_id) if user_id else None
-            if not user or user.role != UserRole.ADMIN:
+            # Güncel rol claim'i varsa veritabanına gidilmez
+            is_admin = admin_from_claims(get_jwt())
+            if is_admin is None:
+                user_id = get_jwt_identity()
+                user = User.query.get(user_id) if user_id else None
+                is_admin = bool(user and user_is_admin(user))
+                if is_admin:
+                    g.user = user
+            if not is_admin:
                 return jsonify({"error": "Admin yetkisi gereklidir!"}), 403
-            g.user = user
             return func(*args, **kwargs)
         except Exception as e:  # pragma: no cover - unexpected errors
             logging.exception("require_admin: unexpected error: %s", e)
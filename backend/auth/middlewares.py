@@ -20,7 +20,9 @@ except Exception:  # pragma: no cover - kutuphane eksikse basit stub kullan
 
     def get_jwt_identity():
         return None
-from backend.db.models import User, UserRole  # Kullanıcı modelini DB'den çekmek için
+from backend.auth.claims import admin_from_claims
+from backend.auth.principal import resolve_principal
+from backend.db.models import User, user_is_admin  # Kullanıcı modelini DB'den çekmek için
 from sqlalchemy.exc import SQLAlchemyError
 
 # Logger yapılandırması uygulama başlangıcında ayarlanmalı.
@@ -38,32 +40,28 @@ def admin_required():
 
             # Özel admin anahtarı varsa JWT kontrolü yapmadan yetki ver
             if admin_key and expected_key and admin_key == expected_key:
-                api_key = request.headers.get("X-API-KEY")
-                user = User.query.filter_by(api_key=api_key).first()
-                is_admin = (
-                    user
-                    and (
-                        user.role == UserRole.ADMIN
-                        or (user.role_obj and user.role_obj.name == "admin")
-                    )
-                )
-                if not is_admin:
+                principal = resolve_principal(request.headers.get("X-API-KEY"))
+                if not principal or not principal.is_admin:
                     return jsonify({"error": "Admin yetkisi gereklidir!"}), 403
-                g.user = user
                 return fn(*args, **kwargs)
 
             @fresh_jwt_required()
             def jwt_protected():
                 try:
                     user_id = get_jwt_identity()
-                    user = User.query.get(user_id)
-                    if not user or user.role != UserRole.ADMIN:
-                        jti = get_jwt().get('jti')
+                    claims = get_jwt()
+                    # Güncel rol claim'i varsa veritabanına gidilmez
+                    is_admin = admin_from_claims(claims)
+                    if is_admin is None:
+                        user = User.query.get(user_id)
+                        is_admin = bool(user and user_is_admin(user))
+                        if is_admin:
+                            g.user = user
+                    if not is_admin:
                         logger.warning(
-                            f"Unauthorized admin access attempt! User ID: {user_id}, JTI: {jti}"
+                            f"Unauthorized admin access attempt! User ID: {user_id}, JTI: {claims.get('jti')}"
                         )
                         return jsonify({"error": "Admin yetkisi gereklidir!"}), 403
-                    g.user = user
                     return fn(*args, **kwargs)
                 except SQLAlchemyError:
                     logger.exception("admin_required: Veritabanı hatası oluştu")
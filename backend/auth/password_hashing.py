@@ -0,0 +1,172 @@
+"""Password hashing off the request thread, with bounded concurrency.
+
+Password KDFs are deliberately CPU-heavy.  Login and password reset hand them
+to a small dedicated thread pool (``PASSWORD_HASH_WORKERS``); ``hashlib``
+releases the GIL while deriving, so at most that many cores go to hashing and
+the other request threads keep serving the analysis API.  At most
+``PASSWORD_HASH_MAX_PENDING`` hashes may wait for a worker – beyond that the
+request is refused immediately (``HashingOverloaded`` → 503) instead of
+queueing behind a credential-stuffing burst.
+
+``verify`` without a stored hash (unknown user) still runs one KDF against
+a throwaway hash, so response time does not reveal which usernames exist.
+
+``PASSWORD_HASH_METHOD`` is any werkzeug method string (``"scrypt:32768:8:1"``,
+``"pbkdf2:sha256:600000"``); hashes made with other parameters are upgraded on
+the next successful login.  Queue wait and hash latency are kept as
+per-process histograms (``metrics``).
+"""
+
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_PENDING = 16
+DEFAULT_TIMEOUT_SECONDS = 10.0
+DEFAULT_METHOD = "scrypt"
+
+# Gecikme histogramı kova üst sınırları (ms); son kova açık uçludur
+LATENCY_BUCKETS_MS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+
+class HashingOverloaded(Exception):
+    """Raised when no hashing capacity is left; callers answer 503."""
+
+
+class _Histogram:
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def observe(self, ms: float) -> None:
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        index = next((i for i, bound in enumerate(LATENCY_BUCKETS_MS) if ms <= bound), len(LATENCY_BUCKETS_MS))
+        self.buckets[index] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        labels = [str(b) for b in LATENCY_BUCKETS_MS] + ["+Inf"]
+        return {
+            "count": self.count,
+            "avg_ms": self.total_ms / self.count if self.count else None,
+            "max_ms": self.max_ms if self.count else None,
+            "buckets": dict(zip(labels, self.buckets)),
+        }
+
+
+@lru_cache(maxsize=8)
+def _method_prefix(method: str) -> str:
+    # "scrypt" gibi kısa adlar werkzeug'un tam parametre dizisine açılır
+    return generate_password_hash("", method=method).split("$", 1)[0]
+
+
+class PasswordHasher:
+    """Bounded executor for password hash and verify calls."""
+
+    def __init__(
+        self,
+        workers: int = DEFAULT_WORKERS,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        method: str = DEFAULT_METHOD,
+        timeout: float = DEFAULT_TIMEOUT_SECONDS,
+    ):
+        self.method = method
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._lock = threading.Lock()
+        self._wait = _Histogram()
+        self._hash = _Histogram()
+        self.rejected = 0
+        self.in_flight = 0
+        self._dummy_hash: Optional[str] = None
+
+    def _run(self, fn: Callable, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HashingOverloaded("Password hashing capacity exhausted")
+        submitted = time.perf_counter()
+        with self._lock:
+            self.in_flight += 1
+
+        def work():
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                finished = time.perf_counter()
+                with self._lock:
+                    self._wait.observe((started - submitted) * 1000)
+                    self._hash.observe((finished - started) * 1000)
+
+        def done(_future):
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+
+        future = self._executor.submit(work)
+        future.add_done_callback(done)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise HashingOverloaded("Password hashing timed out")
+
+    def hash(self, password: str) -> str:
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash: Optional[str], password: str) -> bool:
+        if not password_hash:
+            # Var olmayan kullanıcıda da aynı maliyette bir doğrulama yapılır
+            self._run(check_password_hash, self._throwaway_hash(), password)
+            return False
+        return bool(self._run(check_password_hash, password_hash, password))
+
+    def _throwaway_hash(self) -> str:
+        if self._dummy_hash is None:
+            dummy = generate_password_hash(secrets.token_hex(16), self.method)
+            with self._lock:
+                self._dummy_hash = self._dummy_hash or dummy
+        return self._dummy_hash
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """True if ``password_hash`` was made with other KDF parameters."""
+        return password_hash.split("$", 1)[0] != _method_prefix(self.method)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "rejected": self.rejected,
+                "queue_wait": self._wait.snapshot(),
+                "hash": self._hash.snapshot(),
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+def init_password_hasher(app) -> PasswordHasher:
+    hasher = PasswordHasher(
+        workers=int(app.config.get("PASSWORD_HASH_WORKERS", DEFAULT_WORKERS)),
+        max_pending=int(app.config.get("PASSWORD_HASH_MAX_PENDING", DEFAULT_MAX_PENDING)),
+        method=app.config.get("PASSWORD_HASH_METHOD") or DEFAULT_METHOD,
+        timeout=float(app.config.get("PASSWORD_HASH_TIMEOUT_SECONDS", DEFAULT_TIMEOUT_SECONDS)),
+    )
+    app.extensions["password_hasher"] = hasher
+    return hasher
+
+
+def password_hasher() -> PasswordHasher:
+    return current_app.extensions["password_hasher"]
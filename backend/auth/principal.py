@@ -0,0 +1,233 @@
+"""Request-scoped principal resolved from an API key.
+
+Authorization decorators (rate limit, subscription plan, usage limits, admin
+checks) used to run their own ``User.query.filter_by(api_key=...)``.  They now
+call ``resolve_principal``, which resolves the key at most once per request:
+
+1. the request's ``g`` (same key already resolved in this request),
+2. a shared Redis entry ``principal:<sha256(api key)>`` holding an immutable
+   ``Principal`` snapshot, read together with ``limits:version`` in one
+   ``MGET`` – a snapshot taken before the last limits invalidation is stale,
+3. the database, after which the snapshot is stored with a TTL that never
+   outlives an active boost.
+
+Committed changes to a ``User`` row delete its entries (old and new key), and
+plan changes go through ``invalidate_limits`` which bumps ``limits:version``.
+Views that need the ORM object call ``current_user`` and get ``g.user``,
+loaded by primary key at most once.
+"""
+
+import hashlib
+import json
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Optional
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from loguru import logger
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from backend.db import db
+from backend.db.models import SubscriptionPlan, User, UserRole, is_admin_role
+from backend.services.limits_cache import VERSION_KEY, effective_limits
+
+PRINCIPAL_KEY = "principal:{digest}"
+DEFAULT_TTL_SECONDS = 60
+DEFAULT_RATE_LIMIT_PER_MINUTE = 30
+
+
+def api_key_digest(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+
+@dataclass(frozen=True)
+class Principal:
+    """What authorization checks need to know about the caller."""
+
+    id: int
+    username: str
+    role: UserRole
+    role_name: Optional[str]
+    subscription_level: SubscriptionPlan
+    subscription_end: Optional[datetime]
+    created_at: Optional[datetime]
+    plan_id: Optional[int]
+    plan_name: Optional[str]
+    rate_limit_per_minute: int
+    is_active: bool
+    limits_version: int = 0
+
+    @classmethod
+    def from_user(cls, user: User, limits_version: int = 0) -> "Principal":
+        rate = DEFAULT_RATE_LIMIT_PER_MINUTE
+        if user.plan is not None:
+            rate = effective_limits(user).get("api_rate_limit_per_minute", DEFAULT_RATE_LIMIT_PER_MINUTE)
+        return cls(
+            id=user.id,
+            username=user.username,
+            role=user.role,
+            role_name=user.role_obj.name if user.role_obj else None,
+            subscription_level=user.subscription_level,
+            subscription_end=user.subscription_end,
+            created_at=user.created_at,
+            plan_id=user.plan_id,
+            plan_name=user.plan.name if user.plan else None,
+            rate_limit_per_minute=int(rate),
+            is_active=bool(user.is_active),
+            limits_version=limits_version,
+        )
+
+    @property
+    def is_admin(self) -> bool:
+        return is_admin_role(self.role, self.role_name)
+
+    def is_subscription_active(self) -> bool:
+        # Aynı kural User modelinde; anlık görüntü aynı alanları taşır
+        return User.is_subscription_active(self)
+
+    def dumps(self) -> str:
+        data = asdict(self)
+        data["role"] = self.role.name
+        data["subscription_level"] = self.subscription_level.name
+        for name in ("subscription_end", "created_at"):
+            data[name] = data[name].isoformat() if data[name] else None
+        return json.dumps(data)
+
+    @classmethod
+    def loads(cls, raw) -> "Principal":
+        data = json.loads(raw)
+        data["role"] = UserRole[data["role"]]
+        data["subscription_level"] = SubscriptionPlan[data["subscription_level"]]
+        for name in ("subscription_end", "created_at"):
+            data[name] = datetime.fromisoformat(data[name]) if data[name] else None
+        return cls(**data)
+
+
+def _redis():
+    return current_app.extensions.get("redis_client") if has_app_context() else None
+
+
+def _ttl(user: User) -> int:
+    ttl = int(current_app.config.get("PRINCIPAL_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS))
+    if user.boost_features and user.boost_expire_at:
+        remaining = int((user.boost_expire_at - datetime.utcnow()).total_seconds())
+        if remaining > 0:
+            ttl = min(ttl, remaining)
+    return max(ttl, 1)
+
+
+def _load(api_key: str, digest: str) -> Optional[Principal]:
+    key = PRINCIPAL_KEY.format(digest=digest)
+    redis_client = _redis()
+    version = 0
+    if redis_client is not None:
+        try:
+            raw, version = redis_client.mget([key, VERSION_KEY])
+            version = int(version or 0)
+            if raw is not None:
+                principal = Principal.loads(raw)
+                if principal.limits_version == version:
+                    return principal
+        except Exception as e:
+            logger.debug(f"Principal cache unavailable: {e}")
+            redis_client = None
+    user = User.query.filter_by(api_key=api_key).first()
+    if user is None:
+        return None
+    principal = Principal.from_user(user, version)
+    if has_request_context() and getattr(g, "user", None) is None:
+        g.user = user
+    if redis_client is not None:
+        try:
+            redis_client.set(key, principal.dumps(), ex=_ttl(user))
+        except Exception as e:
+            logger.debug(f"Principal cache write failed: {e}")
+    return principal
+
+
+def resolve_principal(api_key: Optional[str] = None) -> Optional[Principal]:
+    """Principal for ``api_key`` (default: the ``X-API-KEY`` header)."""
+    if api_key is None and has_request_context():
+        api_key = request.headers.get("X-API-KEY")
+    if not api_key:
+        return None
+    digest = api_key_digest(api_key)
+    resolved = g.setdefault("_principals", {}) if has_request_context() else {}
+    if digest not in resolved:
+        resolved[digest] = _load(api_key, digest)
+    principal = resolved[digest]
+    if principal is not None and has_request_context():
+        g.principal = principal
+    return principal
+
+
+def request_principal():
+    """The caller: a snapshot of an already loaded ``g.user``, else the API key's principal.
+
+    A ``g.user`` set by another authentication layer that is not a ``User``
+    row is returned as is.
+    """
+    user = getattr(g, "user", None)
+    if isinstance(user, User):
+        return Principal.from_user(user)
+    return user or resolve_principal()
+
+
+def current_user(principal: Optional[Principal] = None) -> Optional[User]:
+    """ORM user of the request, loaded by primary key at most once."""
+    user = getattr(g, "user", None)
+    principal = principal or getattr(g, "principal", None)
+    if user is not None and (principal is None or getattr(user, "id", None) == principal.id):
+        return user
+    if principal is None:
+        return None
+    g.user = db.session.get(User, principal.id)
+    return g.user
+
+
+def init_principal(app) -> None:
+    @app.before_request
+    def _reset_principal():
+        # g uygulama bağlamına bağlı; istekler arasında çözümleme taşınmaz
+        g.pop("principal", None)
+        g.pop("_principals", None)
+
+
+def invalidate_principal(*api_keys: str) -> None:
+    keys = [api_key_digest(k) for k in api_keys if k]
+    if not keys:
+        return
+    if has_request_context():
+        for digest in keys:
+            g.get("_principals", {}).pop(digest, None)
+    redis_client = _redis()
+    if redis_client is None:
+        return
+    try:
+        redis_client.delete(*[PRINCIPAL_KEY.format(digest=d) for d in keys])
+    except Exception as e:
+        logger.warning(f"Principal cache invalidation failed: {e}")
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _collect_stale_principal(mapper, connection, target):
+    session = object_session(target)
+    if session is None:
+        return
+    history = inspect(target).attrs.api_key.history
+    stale = session.info.setdefault("stale_api_keys", set())
+    stale.update(k for k in (target.api_key, *history.deleted) if k)
+
+
+@event.listens_for(Session, "after_commit")
+def _drop_stale_principals(session):
+    stale = session.info.pop("stale_api_keys", None)
+    if stale:
+        invalidate_principal(*stale)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_stale_principals(session):
+    session.info.pop("stale_api_keys", None)
@@ -0,0 +1,206 @@
+"""Cluster-wide refresh-token revocation.
+
+Revoked refresh-token JTIs live in Redis as ``revoked:rt:<jti>`` keys that
+expire together with the token, so the store never outgrows the set of
+still-valid tokens.  Revoking uses ``SET NX``: when two workers rotate the
+same token concurrently exactly one of them wins, on any process.
+
+Every process also keeps Bloom filters of the revoked JTIs, one per token
+expiry day, fed by the ``revoked:rt`` pub/sub channel and seeded from Redis
+when the listener (re)subscribes.  While the filters are in sync, a JTI that
+is not in them is known not to be revoked without a Redis round trip; a hit
+(possibly a false positive) is confirmed in Redis.  Filters of days whose
+tokens have all expired are dropped, so memory stays bounded.
+
+Without a reachable Redis, revocations fall back to a process-local map.
+"""
+
+import hashlib
+import threading
+import time
+from typing import Dict, Optional
+
+from flask import current_app
+from loguru import logger
+
+REVOKED_KEY = "revoked:rt:{jti}"
+REVOCATION_CHANNEL = "revoked:rt"
+BUCKET_SECONDS = 24 * 60 * 60
+DEFAULT_BLOOM_BITS = 1 << 20
+DEFAULT_BLOOM_HASHES = 7
+# Saat kaymasına karşı anahtar token süresinden biraz fazla yaşar
+TTL_GRACE_SECONDS = 60
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings."""
+
+    def __init__(self, bits: int = DEFAULT_BLOOM_BITS, hashes: int = DEFAULT_BLOOM_HASHES):
+        self.bits = bits
+        self.hashes = hashes
+        self._array = bytearray((bits + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.bits for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self._array[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._array[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class RevocationStore:
+    """Revoked refresh-token JTIs of one app."""
+
+    def __init__(self, app=None, bits: int = DEFAULT_BLOOM_BITS, hashes: int = DEFAULT_BLOOM_HASHES):
+        self.app = app
+        self.bits = bits
+        self.hashes = hashes
+        # True iken Bloom filtreleri Redis'teki kümenin tamamını içerir
+        self.synced = False
+        self._blooms: Dict[int, BloomFilter] = {}
+        self._local: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._listener: Optional[threading.Thread] = None
+
+    @property
+    def redis(self):
+        return self.app.extensions.get("redis_client") if self.app is not None else None
+
+    @staticmethod
+    def _bucket(exp: float) -> int:
+        return int(exp) // BUCKET_SECONDS
+
+    def _remember(self, jti: str, exp: float) -> None:
+        now = time.time()
+        with self._lock:
+            bucket = self._bucket(exp)
+            bloom = self._blooms.get(bucket)
+            if bloom is None:
+                bloom = self._blooms[bucket] = BloomFilter(self.bits, self.hashes)
+            bloom.add(jti)
+            # Tüm tokenları süresi dolmuş günlerin filtreleri atılır
+            for old in [b for b in self._blooms if (b + 1) * BUCKET_SECONDS < now]:
+                del self._blooms[old]
+
+    def _revoke_locally(self, jti: str, exp: float) -> bool:
+        now = time.time()
+        with self._lock:
+            for stale in [j for j, e in self._local.items() if e < now]:
+                del self._local[stale]
+            if jti in self._local:
+                return False
+            self._local[jti] = exp
+            return True
+
+    def revoke(self, jti: str, exp: float) -> bool:
+        """Revoke ``jti`` until ``exp`` (epoch seconds); False if it already was."""
+        ttl = max(int(exp - time.time()), 0) + TTL_GRACE_SECONDS
+        redis_client = self.redis
+        if redis_client is None:
+            return self._revoke_locally(jti, exp)
+        try:
+            first = bool(redis_client.set(REVOKED_KEY.format(jti=jti), int(exp), nx=True, ex=ttl))
+            if first:
+                redis_client.publish(REVOCATION_CHANNEL, f"{jti} {int(exp)}")
+        except Exception as e:
+            logger.warning(f"Token revocation store unavailable, revoking locally: {e}")
+            return self._revoke_locally(jti, exp)
+        self._remember(jti, exp)
+        return first
+
+    def is_revoked(self, jti: str, exp: float) -> bool:
+        if jti in self._local:
+            return True
+        if self.synced:
+            bloom = self._blooms.get(self._bucket(exp))
+            if bloom is None or jti not in bloom:
+                return False
+        redis_client = self.redis
+        if redis_client is None:
+            return False
+        try:
+            return redis_client.get(REVOKED_KEY.format(jti=jti)) is not None
+        except Exception as e:
+            logger.warning(f"Token revocation store unavailable: {e}")
+            return False
+
+    # -- senkronizasyon ----------------------------------------------------
+    def apply(self, message) -> None:
+        """Handle one ``"<jti> <exp>"`` message from ``REVOCATION_CHANNEL``."""
+        if isinstance(message, bytes):
+            message = message.decode()
+        jti, _, exp = message.partition(" ")
+        self._remember(jti, float(exp))
+
+    def sync(self) -> int:
+        """Seed the filters from every revocation still stored in Redis."""
+        redis_client = self.redis
+        count = 0
+        for key in redis_client.scan_iter(match=REVOKED_KEY.format(jti="*"), count=1000):
+            key = key.decode() if isinstance(key, bytes) else key
+            exp = redis_client.get(key)
+            if exp is not None:
+                self._remember(key.rsplit(":", 1)[1], float(exp))
+                count += 1
+        self.synced = True
+        return count
+
+    def _listen_once(self) -> None:
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        # Önce abone olunur ki tohumlama sırasında gelen iptaller kaçmasın
+        pubsub.subscribe(REVOCATION_CHANNEL)
+        try:
+            self.sync()
+            for message in pubsub.listen():
+                try:
+                    self.apply(message["data"])
+                except (TypeError, ValueError) as e:
+                    logger.warning(f"Invalid revocation message: {e}")
+        finally:
+            self.synced = False
+            pubsub.close()
+
+    def _listen(self) -> None:
+        while True:
+            try:
+                self._listen_once()
+            except Exception as e:
+                logger.warning(f"Token revocation listener reconnecting: {e}")
+                time.sleep(5)
+
+    def start_listener(self) -> None:
+        if self._listener is not None and self._listener.is_alive():
+            return
+        self._listener = threading.Thread(target=self._listen, name="token-revocations", daemon=True)
+        self._listener.start()
+
+
+def init_revocation_store(app) -> RevocationStore:
+    store = RevocationStore(
+        app,
+        bits=int(app.config.get("REVOCATION_BLOOM_BITS", DEFAULT_BLOOM_BITS)),
+        hashes=int(app.config.get("REVOCATION_BLOOM_HASHES", DEFAULT_BLOOM_HASHES)),
+    )
+    app.extensions["token_revocations"] = store
+    if not app.config.get("TESTING"):
+        store.start_listener()
+    return store
+
+
+def revocation_store() -> RevocationStore:
+    return current_app.extensions["token_revocations"]
+
+
+def consume_refresh_token(payload) -> bool:
+    """Revoke a refresh token on use; False if it was already used or revoked."""
+    return revocation_store().revoke(payload["jti"], float(payload["exp"]))
+
+
+def is_refresh_token_revoked(payload) -> bool:
+    return revocation_store().is_revoked(payload["jti"], float(payload["exp"]))
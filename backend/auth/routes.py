@@ -9,8 +9,10 @@ from backend.db.models import (
     PasswordResetToken,
     UserSession,
 )
-from werkzeug.security import generate_password_hash, check_password_hash
-from .jwt_utils import generate_tokens, verify_jwt, verify_csrf
+from .claims import role_claims
+from .password_hashing import HashingOverloaded, password_hasher
+from .jwt_utils import generate_tokens, refresh_token_digest, verify_jwt, verify_csrf
+from .revocation import consume_refresh_token, is_refresh_token_revoked
 from loguru import logger
 from backend import limiter
 from backend.utils.token_helper import generate_reset_token, verify_reset_token
@@ -18,6 +20,7 @@ from backend.utils.email import send_password_reset_email
 from backend.utils.audit import log_action
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime, timedelta
+import hmac
 import uuid
 import jwt
 
@@ -51,7 +54,7 @@ def register_user():
             subscription_level=SubscriptionPlan.FREE,
             role_id=role.id if role else None
         )
-        new_user.set_password(password)
+        new_user.password_hash = password_hasher().hash(password)
         new_api_key = new_user.generate_api_key()
 
         db.session.add(new_user)
@@ -65,12 +68,20 @@ def register_user():
             subscription_level=new_user.subscription_level.value
         ), 201
 
+    except HashingOverloaded:
+        return _busy()
     except Exception as e:
         logger.exception("Kayıt sırasında hata oluştu")
         db.session.rollback()
         return jsonify(error="Sunucu hatası. Lütfen daha sonra tekrar deneyin."), 500
 
 
+def _busy():
+    response = jsonify(error="Sunucu yoğun. Lütfen birkaç saniye sonra tekrar deneyin.")
+    response.headers["Retry-After"] = "5"
+    return response, 503
+
+
 @auth_bp.route('/login', methods=['POST'])
 @limiter.limit("10/minute")
 def login_user():
@@ -83,16 +94,23 @@ def login_user():
 
     try:
         user = User.query.filter_by(username=username).first()
-        if not user or not user.check_password(password):
+        hasher = password_hasher()
+        # Kullanıcı yoksa da bir doğrulama çalışır; yanıt süresi kullanıcı adını ele vermez
+        password_ok = hasher.verify(user.password_hash if user else None, password)
+        if not user or not password_ok:
             return jsonify(error="Geçersiz kullanıcı adı veya şifre."), 401
+        # Eski KDF parametreleriyle üretilmiş özet, doğru şifre elimizdeyken yenilenir
+        if hasher.needs_rehash(user.password_hash):
+            user.password_hash = hasher.hash(password)
 
+        claims = role_claims(user)
         access, refresh, csrf = generate_tokens(
-            user.id, user.username, user.role.value
+            user.id, user.username, claims["role"], claims["perms"], claims["role_name"]
         )
 
         session = UserSession(
             user_id=user.id,
-            refresh_token=generate_password_hash(refresh),
+            refresh_token=refresh_token_digest(refresh),
             expires_at=datetime.utcnow() + timedelta(days=current_app.config["REFRESH_TOKEN_EXP_DAYS"]),
         )
         db.session.add(session)
@@ -127,6 +145,9 @@ def login_user():
         log_action(user, action="login")
         return response
 
+    except HashingOverloaded:
+        logger.warning("Parola özetleme kapasitesi dolu, giriş reddedildi")
+        return _busy()
     except Exception:
         logger.exception("Giriş sırasında hata oluştu")
         return jsonify(error="Sunucu hatası. Lütfen daha sonra tekrar deneyin."), 500
@@ -148,13 +169,30 @@ def refresh_tokens():
         user_id = int(payload.get("sub"))
     except jwt.PyJWTError:
         return jsonify(error="Invalid token"), 401
+    # Kullanılmış token veritabanına gitmeden reddedilir
+    if is_refresh_token_revoked(payload):
+        return jsonify(error="Invalid token"), 401
 
-    session = UserSession.query.filter_by(user_id=user_id, revoked=False).first()
-    if not session or not check_password_hash(session.refresh_token, token):
+    # Her cihazın oturumu kendi token özetiyle tek bir indeksli sorguda bulunur
+    digest = refresh_token_digest(token)
+    session = UserSession.query.filter_by(refresh_token=digest, revoked=False).first()
+    if (
+        not session
+        or session.user_id != user_id
+        or session.expires_at < datetime.utcnow()
+        or not hmac.compare_digest(session.refresh_token, digest)
+    ):
+        return jsonify(error="Invalid token"), 401
+    # Eşzamanlı iki yenilemeden yalnızca biri kazanır
+    if not consume_refresh_token(payload):
         return jsonify(error="Invalid token"), 401
 
-    access, new_refresh, csrf = generate_tokens(user_id, payload.get("username"), payload.get("role"))
-    session.refresh_token = generate_password_hash(new_refresh)
+    # Rol claim'leri yenilemede güncel kullanıcı kaydından yeniden üretilir
+    claims = role_claims(session.user)
+    access, new_refresh, csrf = generate_tokens(
+        user_id, session.user.username, claims["role"], claims["perms"], claims["role_name"]
+    )
+    session.refresh_token = refresh_token_digest(new_refresh)
     session.expires_at = datetime.utcnow() + timedelta(days=current_app.config["REFRESH_TOKEN_EXP_DAYS"])
     db.session.commit()
 
@@ -278,7 +316,10 @@ def reset_password():
     if not user:
         return jsonify({"error": "Kullanıcı bulunamadı"}), 404
 
-    user.password_hash = generate_password_hash(new_password)
+    try:
+        user.password_hash = password_hasher().hash(new_password)
+    except HashingOverloaded:
+        return _busy()
     reset_entry.is_used = True
     db.session.commit()
     log_action(user, action="password_reset")
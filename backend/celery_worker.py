@@ -0,0 +1,26 @@
+"""Celery worker entry point.
+
+Workers are started with ``celery -A backend.celery_worker worker ...`` (see
+``scripts/run_workers.sh``).  Importing this module configures the shared
+``celery_app`` once in the consuming process, before any pool child exists:
+broker and result backend from ``Config``, the tiered queues and their
+routes, and every task module is imported so the tasks are registered.
+Pool children only build their Flask app and database engine
+(``backend.tasks.worker``).
+"""
+
+import os
+
+from flask import Config as FlaskConfig
+
+from backend import Config, celery_app
+from backend.tasks import autodiscover_tasks
+from backend.tasks.queues import celery_queue_config, celery_settings
+
+config = FlaskConfig(os.path.dirname(os.path.abspath(__file__)))
+config.from_object(Config)
+celery_app.conf.update(celery_settings(config))
+celery_app.conf.update(celery_queue_config())
+autodiscover_tasks()
+
+celery = celery_app
@@ -14,22 +14,30 @@ class BaseConfig:
     CELERY_BROKER_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
     CELERY_RESULT_BACKEND = os.getenv("REDIS_URL", "redis://localhost:6379/0")
     CELERY_BEAT_SCHEDULE = {
-        "auto-analyze-bitcoin-every-15-minutes": {
-            "task": "backend.tasks.celery_tasks.analyze_coin_task",
+        "analyze-universe-every-15-minutes": {
+            "task": "backend.tasks.universe_tasks.analyze_universe",
             "schedule": timedelta(minutes=15),
-            "args": ("bitcoin", "moderate"),
-            "options": {"queue": "default"},
-        },
-        "auto-analyze-ethereum-every-15-minutes": {
-            "task": "backend.tasks.celery_tasks.analyze_coin_task",
-            "schedule": timedelta(minutes=15),
-            "args": ("ethereum", "moderate"),
-            "options": {"queue": "default"},
+            "options": {"queue": "analysis-batch"},
         },
         "check-and-downgrade-subscriptions-daily": {
             "task": "backend.tasks.celery_tasks.check_and_downgrade_subscriptions",
             "schedule": timedelta(days=1),
-            "options": {"queue": "default"},
+            "options": {"queue": "maintenance"},
+        },
+        "purge-task-telemetry-daily": {
+            "task": "backend.tasks.celery_tasks.purge_task_telemetry",
+            "schedule": timedelta(days=1),
+            "options": {"queue": "maintenance"},
+        },
+        "purge-usage-history-daily": {
+            "task": "backend.tasks.celery_tasks.purge_usage_history",
+            "schedule": timedelta(days=1),
+            "options": {"queue": "maintenance"},
+        },
+        "send-alarm-digests": {
+            "task": "backend.tasks.celery_tasks.send_alarm_digests",
+            "schedule": timedelta(seconds=int(os.getenv("ALARM_DIGEST_SECONDS", "300"))),
+            "options": {"queue": "alerts"},
         },
     }
     CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*").split(",")
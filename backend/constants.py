@@ -53,6 +53,36 @@ API_TIMEOUT_SECONDS                = 15  # saniye
 DEFAULT_INVESTOR_PROFILE           = "moderate"
 SUPPORTED_INVESTOR_PROFILES        = ["aggressive", "moderate", "conservative"]
 
+# ── Analiz Sonuç Önbelleği ──────────────────────────────────────────────────
+
+ANALYSIS_CACHE_VERSION             = 1  # sonuç şeması değişince artırılır
+# Uzun yoklama web iş parçacığını tutar; bekleme birkaç saniyeyle sınırlıdır
+ANALYSIS_LONG_POLL_MAX_SECONDS     = 5
+# Planların göremeyeceği analiz alanları (okuma sırasında çıkarılır)
+ANALYSIS_PLAN_REDACTIONS           = {
+    "TRIAL": (
+        "forecast_next_day",
+        "forecast_upper_bound",
+        "forecast_lower_bound",
+        "forecast_explanation",
+        "suggested_stop_loss",
+        "suggested_position_size",
+    ),
+    "BASIC": (
+        "forecast_upper_bound",
+        "forecast_lower_bound",
+        "forecast_explanation",
+        "suggested_position_size",
+    ),
+    "ADVANCED": ("forecast_upper_bound", "forecast_lower_bound"),
+    "PREMIUM": (),
+}
+
+# ── Evren Analizi ─────────────────────────────────────────────────────────────
+
+ANALYSIS_UNIVERSE                  = list(BASIC_ALLOWED_COINS)
+UNIVERSE_STAGE_INTERVAL_SECONDS    = 15 * 60  # coin aşamaları bu süre boyunca yeniden kullanılır
+
 # ── Güvenlik & Yetkilendirme ───────────────────────────────────────────────────
 
 PASSWORD_RESET_TOKEN_EXPIRES_MINUTES = 60  # dakika
@@ -73,5 +103,84 @@ AUDIT_FALLBACK_FILE_SIZE_LIMIT_MB  = int(os.getenv(
 
 # ── Celery Queues ─────────────────────────────────────────────────────────────
 
-CELERY_DEFAULT_QUEUE               = "default"
-CELERY_ANALYSIS_QUEUE              = "analysis"
+CELERY_DEFAULT_QUEUE               = "default"  # eski mesajlar için korunur
+CELERY_PREMIUM_QUEUE               = "interactive-premium"
+CELERY_STANDARD_QUEUE              = "interactive-standard"
+CELERY_ANALYSIS_QUEUE              = "analysis-batch"
+CELERY_SWEEP_QUEUE                 = "analysis-sweep"
+CELERY_MAINTENANCE_QUEUE           = "maintenance"
+CELERY_ALERTS_QUEUE                = "alerts"
+
+# Kuyruk başına hedef bekleme süresi (saniye)
+CELERY_QUEUE_SLA_SECONDS           = {
+    CELERY_PREMIUM_QUEUE: 5,
+    CELERY_STANDARD_QUEUE: 30,
+    CELERY_ANALYSIS_QUEUE: 15 * 60,
+    CELERY_SWEEP_QUEUE: 30 * 60,
+    CELERY_MAINTENANCE_QUEUE: 60 * 60,
+    CELERY_ALERTS_QUEUE: 5,
+    CELERY_DEFAULT_QUEUE: 5 * 60,
+}
+
+# Yalnızca tekrar çalıştırılması güvenli analiz görevleri iş bitince onaylanır (acks_late).
+# Redis bu süre içinde onaylanmayan mesajı başka bir worker'a yeniden teslim eder,
+# bu yüzden görünürlük süresi bu görevlerin süre sınırından uzun olmalıdır.
+CELERY_ANALYSIS_TIME_LIMIT         = 15 * 60
+CELERY_VISIBILITY_TIMEOUT          = 60 * 60
+
+# Kuyruk başına worker havuzu (scripts/run_workers.sh ile aynı tutulmalı)
+CELERY_WORKER_POOLS                = {
+    CELERY_PREMIUM_QUEUE: {"pool": "prefork", "concurrency": 4},
+    CELERY_STANDARD_QUEUE: {"pool": "prefork", "concurrency": 4},
+    CELERY_ANALYSIS_QUEUE: {"pool": "prefork", "concurrency": 4},
+    # Parametre taramaları kendi süreç havuzunu açar; daemon prefork çocukları
+    # çocuk süreç başlatamaz, bu yüzden tek görevli solo havuz kullanılır
+    CELERY_SWEEP_QUEUE: {"pool": "solo", "concurrency": 1},
+    CELERY_MAINTENANCE_QUEUE: {"pool": "prefork", "concurrency": 1},
+    CELERY_ALERTS_QUEUE: {"pool": "prefork", "concurrency": 2},
+}
+
+# ── Realtime (Socket.IO) ──────────────────────────────────────────────────────
+
+# Coin odası yayınlarında gönderilen özet alanları; tam sonuç /api/analysis/<task_id>
+REALTIME_SUMMARY_FIELDS            = (
+    "signal",
+    "confidence",
+    "risk_level",
+    "forecast_next_day",
+    "volatility",
+)
+# Bağlantı başına gönderilmeyi bekleyen paket sınırı; aşan istemci düşürülür
+REALTIME_MAX_SEND_QUEUE            = int(os.getenv("REALTIME_MAX_SEND_QUEUE", 256))
+# Tek bağlantının abone olabileceği en fazla coin odası
+REALTIME_MAX_SUBSCRIPTIONS         = 50
+
+# ── Price Ticker (Socket.IO) ──────────────────────────────────────────────────
+
+TICKER_NAMESPACE                   = "/ticker"
+# Üreticinin temel tik aralığı; kanal sıklıkları bunun katları olmalı
+TICKER_BASE_INTERVAL_SECONDS       = int(os.getenv("TICKER_BASE_INTERVAL_SECONDS", 2))
+TICKER_CADENCES_SECONDS            = (2, 10, 30, 60)
+# Plan başına abone olunabilecek coin sayısı ve en kısa güncelleme aralığı
+TICKER_PLAN_LIMITS                 = {
+    "TRIAL": {"coins": 1, "min_interval": 60},
+    "BASIC": {"coins": 3, "min_interval": 30},
+    "ADVANCED": {"coins": 10, "min_interval": 10},
+    "PREMIUM": {"coins": 50, "min_interval": 2},
+}
+# Tik yüküne eklenen gösterge alanları
+TICKER_FIELDS                      = ("current_price", "rsi", "macd", "bb_upper", "bb_lower", "stochastic")
+# Göstergeler (collect_price_data) anlık fiyattan ayrı, bu aralıkla arka planda yenilenir
+TICKER_INDICATOR_REFRESH_SECONDS   = int(os.getenv("TICKER_INDICATOR_REFRESH_SECONDS", 300))
+# Kalp atışı bu süre gelmeyen web sürecinin abonelik sayaçları silinir
+TICKER_PROCESS_TTL_SECONDS         = 30
+
+# ── Price Alerts ──────────────────────────────────────────────────────────────
+
+ALERTS_NAMESPACE                   = "/alerts"
+# Alarm kurulabilecek tik alanları (TICKER_FIELDS alt kümesi)
+PRICE_ALERT_FIELDS                 = ("current_price", "rsi", "macd", "stochastic")
+PRICE_ALERT_DIRECTIONS             = ("above", "below")
+# Alarmlar bu sıklıkla (saniye) değerlendirilir; TICKER_BASE_INTERVAL_SECONDS katı olmalı
+PRICE_ALERT_INTERVAL_SECONDS       = 10
+PRICE_ALERT_MAX_ACTIVE_PER_USER    = 200
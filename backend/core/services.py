@@ -2,7 +2,6 @@
 
 import os
 import json
-import yaml
 import base64
 from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional, Tuple
@@ -33,17 +32,16 @@ from backend.db import db
 from backend.db.models import ABHData, DBHData, User, SubscriptionPlan
 from backend.constants import BASIC_ALLOWED_COINS, BASIC_WEEKLY_VIEW_LIMIT
 from backend.utils.helpers import bulk_insert_records
+from backend.services.backtest import (
+    backtest_profile,
+    load_decision_rules,
+    store_price_points,
+)
 from backend.tasks import run_full_analysis  # Celery task
 
 
 # Karar kurallarını yükle (YAML veya Flask config içinden)
-RULES_CONFIG: Dict[str, Any] = {}
-_config_path = current_app.config.get("DECISION_RULES_PATH")
-if _config_path and os.path.exists(_config_path):
-    with open(_config_path) as f:
-        RULES_CONFIG = yaml.safe_load(f)
-else:
-    RULES_CONFIG = current_app.config.get("DECISION_RULES", {})
+RULES_CONFIG: Dict[str, Any] = load_decision_rules()
 
 
 @dataclass
@@ -159,6 +157,8 @@ class DataCollector:
                 tags=json.dumps(["price", "technical"]),
             )
             bulk_insert_records([entry])
+            # Geriye dönük testler için saatlik fiyat serisini sakla
+            store_price_points(coin, times, prices)
 
             # Redis önbelleğe yaz
             if self.redis and self.cache_ttl > 0:
@@ -433,35 +433,8 @@ class YTDCryptoSystem:
     def backtest_rules(
         self, coin: str, profile: str, start: str, end: str
     ) -> Dict[str, Any]:
-        # Geriye dönük test için DBHData’dan al
-        records = DBHData.query.filter(
-            DBHData.coin == coin, DBHData.timestamp >= start, DBHData.timestamp <= end
-        ).all()
-
-        wins = trades = 0
-        for rec in records:
-            # Burada örnek olarak sinyal yüzdesi RSI olarak kullanıldı
-            analysis_stub = {
-                "current_price": rec.rsi,
-                **{
-                    field: getattr(rec, field)
-                    for field in (
-                        "rsi",
-                        "macd",
-                        "bb_upper",
-                        "bb_lower",
-                        "stochastic_oscillator",
-                    )
-                    if hasattr(rec, field)
-                },
-            }
-            out = self.engine.decide(analysis_stub, profile)
-            trades += 1
-            if out["signal"] in ("BUY", "SELL"):
-                wins += 1
+        """Saklanan fiyat serisi üzerinde profil kurallarını geriye dönük test eder.
 
-        return {
-            "profit_pct": 0.0,
-            "trades": trades,
-            "win_rate": (wins / trades) if trades else 0.0,
-        }
+        Sonuç ``BacktestResult`` tablosuna yazılır.
+        """
+        return backtest_profile(coin, profile, start, end, rules=self.engine.rules)
@@ -1,11 +1,11 @@
 from datetime import datetime, timedelta
+import json
 
 # SQLAlchemy instance uygulama genelinde 'backend.db' paketinde tanımlıdır.
 # Bazı ortamlarda 'backend.db.__init__' şeklinde içe aktarmak yeni bir modül
 # oluşturabildiğinden, tekil nesnenin kullanılması için doğrudan paket
 # üzerinden içe aktarma yapılır.
 from backend.db import db
-from werkzeug.security import generate_password_hash, check_password_hash
 import uuid
 from enum import Enum
 from sqlalchemy import Enum as SqlEnum
@@ -54,6 +54,18 @@ class UserRole(Enum):
     SYSTEM_ADMIN = "system_admin"
 
 
+def is_admin_role(role, role_name=None) -> bool:
+    """Admin yetkisi kuralı: ``ADMIN`` rolü ya da ``admin`` adlı RBAC rolü.
+
+    API anahtarı, JWT claim'leri ve veritabanı yolları aynı kuralı kullanır.
+    """
+    return role in (UserRole.ADMIN, UserRole.ADMIN.value) or role_name == "admin"
+
+
+def user_is_admin(user) -> bool:
+    return is_admin_role(user.role, user.role_obj.name if user.role_obj else None)
+
+
 class AlarmSeverityEnum(Enum):
     """Alarm Şiddeti Enum'u"""
 
@@ -139,10 +151,14 @@ class User(db.Model):
     is_active = Column(Boolean, default=True, nullable=False)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        from backend.auth.password_hashing import password_hasher
+
+        self.password_hash = password_hasher().hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        from backend.auth.password_hashing import password_hasher
+
+        return password_hasher().verify(self.password_hash, password)
 
     def generate_api_key(self):
         self.api_key = str(uuid.uuid4())
@@ -173,15 +189,19 @@ class User(db.Model):
             return datetime.utcnow() < (self.created_at + trial_duration)
         return False
 
-    def get_usage_count(self, key):
-        """Return usage count for the given feature key."""
-        from backend.db.models import UsageLog
+    def get_usage_count(self, key, window=None):
+        """Return usage count for the given feature key.
 
-        if key == "prediction":
-            return UsageLog.query.filter_by(user_id=self.id, action="prediction").count()
-        elif key == "download":
-            return UsageLog.query.filter_by(user_id=self.id, action="download").count()
-        return UsageLog.query.filter_by(user_id=self.id, action=key).count()
+        Without ``window`` the user's whole history is counted (the limit
+        ``enforce_plan_limit`` checks); ``"day"``, ``"rolling_24h"`` and
+        ``"month"`` read the windowed counters.
+        """
+        from backend.services.usage_counters import usage_counters
+
+        counters = usage_counters()
+        if window is None:
+            return counters.total(self.id, key)
+        return counters.count(self.id, key, window)
 
     def to_dict(self):
         return {
@@ -223,6 +243,8 @@ class DBHData(db.Model):
     __tablename__ = "dbh_data"
     id = Column(Integer, primary_key=True)
     coin = Column(Text, index=True)
+    # Evren analizinde her profil kararı ayrı satır olarak yazılır
+    profile = Column(String(20), nullable=True, index=True)
     timestamp = Column(Text, index=True)
 
     # Geliştirilmiş Teknik Analiz Alanları
@@ -258,6 +280,19 @@ class DBHData(db.Model):
     suggested_position_size = Column(Float)
 
 
+class CoinPrice(db.Model):
+    """Saatlik fiyat serisi: geriye dönük testler bu tablodan beslenir."""
+
+    __tablename__ = "coin_prices"
+    id = Column(Integer, primary_key=True)
+    coin = Column(String(50), nullable=False)
+    timestamp = Column(DateTime, nullable=False)
+    price = Column(Float, nullable=False)
+    __table_args__ = (
+        db.UniqueConstraint("coin", "timestamp", name="_coin_price_ts_uc"),
+    )
+
+
 # --- System & Security Models ---
 
 
@@ -265,6 +300,7 @@ class UserSession(db.Model):
     __tablename__ = "user_sessions"
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Refresh token'ın HMAC-SHA256 özeti (bkz. jwt_utils.refresh_token_digest)
     refresh_token = Column(String(255), unique=True, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     expires_at = Column(DateTime, nullable=False)
@@ -346,8 +382,30 @@ class BacktestResult(db.Model):
     win_rate = Column(Float)
     max_drawdown = Column(Float)
     sharpe_ratio = Column(Float)
+    # Parametre taramalarında (sweep) kullanılan yapılandırma ve sıralama
+    sweep_id = Column(String(32), nullable=True, index=True)
+    params = Column(Text, nullable=True)
+    rank = Column(Integer, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "coin": self.coin,
+            "profile": self.profile,
+            "start_date": self.start_date.isoformat() if self.start_date else None,
+            "end_date": self.end_date.isoformat() if self.end_date else None,
+            "profit_pct": self.profit_pct,
+            "total_trades": self.total_trades,
+            "win_rate": self.win_rate,
+            "max_drawdown": self.max_drawdown,
+            "sharpe_ratio": self.sharpe_ratio,
+            "sweep_id": self.sweep_id,
+            "params": json.loads(self.params) if self.params else None,
+            "rank": self.rank,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
+
 
 class CeleryTaskLog(db.Model):
     """Asenkron Celery görevlerinin durumunu ve sonuçlarını kaydeder."""
@@ -366,6 +424,56 @@ class CeleryTaskLog(db.Model):
     completed_at = Column(DateTime, nullable=True)
 
 
+class TaskTelemetry(db.Model):
+    """Celery görev yaşam döngüsü telemetrisi (kompakt, toplu yazılır)."""
+
+    __tablename__ = "task_telemetry"
+    id = Column(Integer, primary_key=True)
+    task_id = Column(String(64), nullable=False, index=True)
+    task_name = Column(String(255), nullable=False)
+    queue = Column(String(50), nullable=True)
+    status = Column(String(16), nullable=False)
+    wait_ms = Column(Float, nullable=True)
+    runtime_ms = Column(Float, nullable=True)
+    started_at = Column(DateTime, nullable=False, index=True)
+    result_ref = Column(String(255), nullable=True)
+    error = Column(String(255), nullable=True)
+
+    __table_args__ = (
+        db.Index("ix_task_telemetry_name_started", "task_name", "started_at"),
+    )
+
+
+
+class PriceAlert(db.Model):
+    """Kullanıcı tanımlı fiyat/gösterge alarmı (tek seferlik)."""
+
+    __tablename__ = "price_alerts"
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    coin = Column(String(50), nullable=False)
+    field = Column(String(32), nullable=False, default="current_price")
+    # "above": değer eşiğe ulaşınca/üstüne çıkınca, "below": eşiğe inince tetiklenir
+    direction = Column(String(8), nullable=False)
+    threshold = Column(Float, nullable=False)
+    is_active = Column(Boolean, default=True, nullable=False)
+    triggered_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Ticker üreticisi değişiklikleri bu sütun üzerinden artımlı okur
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False, index=True)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "coin": self.coin,
+            "field": self.field,
+            "direction": self.direction,
+            "threshold": self.threshold,
+            "is_active": self.is_active,
+            "triggered_at": self.triggered_at.isoformat() if self.triggered_at else None,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
+
 # --- Marketing & Admin Models (Existing) ---
 
 
@@ -639,6 +747,8 @@ class AuditLog(db.Model):
     """Stores user actions for auditing purposes."""
 
     __tablename__ = "audit_logs"
+    # Sayfalama (created_at, id) anahtarıyla yapılır
+    __table_args__ = (db.Index("ix_audit_logs_created_id", "created_at", "id"),)
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
@@ -659,6 +769,29 @@ class UsageLog(db.Model):
     action = Column(String(64), nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index("ix_usage_log_user_action_ts", "user_id", "action", "timestamp"),
+    )
+
+
+class UsageRollup(db.Model):
+    """Hourly and daily ``usage_log`` counts per user and action."""
+
+    __tablename__ = "usage_rollup"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    action = Column(String(64), nullable=False)
+    # "hour" veya "day"; bucket kovanın başlangıç zamanıdır (UTC)
+    granularity = Column(String(8), nullable=False)
+    bucket = Column(DateTime, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint("granularity", "user_id", "action", "bucket", name="uq_usage_rollup_key"),
+        db.Index("ix_usage_rollup_granularity_bucket", "granularity", "bucket"),
+    )
+
 
 class DatabaseBackup(db.Model):
     """Stores database backup metadata."""
@@ -678,6 +811,7 @@ class SystemEvent(db.Model):
     """Stores system events and operational logs."""
 
     __tablename__ = "system_events"
+    __table_args__ = (db.Index("ix_system_events_created_id", "created_at", "id"),)
 
     id = Column(Integer, primary_key=True)
     event_type = Column(String(32), nullable=False)
@@ -0,0 +1,167 @@
+"""In-process write-behind buffer for append-only tables.
+
+Rows are queued in memory and bulk-inserted by a background thread every
+``flush_seconds`` (or as soon as ``batch_size`` rows are waiting), so the
+request or task that produced them never waits for a database round trip.
+A batch whose insert fails is kept aside and retried on later flushes,
+separately from newly recorded rows.  After ``max_attempts`` failures it is
+split in half and each half retried, so one bad row (a constraint violation)
+ends up alone and is quarantined – logged and appended to
+``<table>-quarantine.jsonl`` in ``AUDIT_FALLBACK_LOG_DIR`` – while the rest
+of its batch is written.  At most ``max_buffered`` new rows are kept.
+"""
+
+import json
+import os
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from backend.constants import AUDIT_FALLBACK_LOG_DIR_ENV
+from backend.db import db
+
+DEFAULT_FLUSH_SECONDS = 5.0
+DEFAULT_BATCH_SIZE = 500
+# Veritabanı erişilemezse bellekte en fazla bu kadar kayıt tutulur
+MAX_BUFFERED = 10000
+# Başarısız bir toplu yazım bu kadar denendikten sonra ikiye bölünür
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+class WriteBehindBuffer:
+    """Thread-safe buffer flushed to ``model``'s table in bulk."""
+
+    def __init__(
+        self,
+        model,
+        flush_seconds: float = DEFAULT_FLUSH_SECONDS,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_buffered: int = MAX_BUFFERED,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    ):
+        self.model = model
+        self.flush_seconds = flush_seconds
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.app = None
+        self._records: deque = deque(maxlen=max_buffered)
+        # (satırlar, başarısız deneme sayısı)
+        self._retry: deque = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def bind(self, app, flush_seconds: Optional[float] = None, batch_size: Optional[int] = None) -> None:
+        self.app = app
+        if flush_seconds is not None:
+            self.flush_seconds = float(flush_seconds)
+        if batch_size is not None:
+            self.batch_size = int(batch_size)
+
+    def record(self, row: Dict[str, Any]) -> None:
+        with self._lock:
+            self._records.append(row)
+            pending = len(self._records)
+        self._ensure_thread()
+        if pending >= self.batch_size:
+            self._wakeup.set()
+
+    def __len__(self) -> int:
+        return len(self._records) + sum(len(rows) for rows, _ in list(self._retry))
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """Snapshot of every row not yet written, including failed batches."""
+        with self._lock:
+            rows = [row for batch, _ in self._retry for row in batch]
+            rows.extend(self._records)
+        return rows
+
+    def drain(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = [row for batch, _ in self._retry for row in batch]
+            rows.extend(self._records)
+            self._retry.clear()
+            self._records.clear()
+        return rows
+
+    def flush(self) -> int:
+        """Bulk insert everything buffered so far; returns the row count."""
+        if self.app is None:
+            return 0
+        with self._lock:
+            batches: List[Tuple[List[Dict[str, Any]], int]] = list(self._retry)
+            self._retry.clear()
+            if self._records:
+                batches.append((list(self._records), 0))
+                self._records.clear()
+        written = 0
+        for rows, attempts in batches:
+            try:
+                with self.app.app_context():
+                    try:
+                        self._write(rows)
+                        db.session.commit()
+                    except Exception:
+                        db.session.rollback()
+                        raise
+            except Exception as e:
+                self._on_failure(rows, e, attempts + 1)
+                continue
+            written += len(rows)
+        return written
+
+    def _on_failure(self, rows: List[Dict[str, Any]], error: Exception, attempts: int = 1) -> None:
+        """Retry a failed batch; bisect it after ``max_attempts``, quarantine single rows."""
+        if attempts < self.max_attempts:
+            logger.warning(
+                f"{self.model.__tablename__} flush failed, {len(rows)} records requeued "
+                f"(attempt {attempts}): {error}"
+            )
+            batches = [(rows, attempts)]
+        elif len(rows) > 1:
+            half = len(rows) // 2
+            logger.warning(
+                f"{self.model.__tablename__} flush failed {attempts} times, splitting {len(rows)} records: {error}"
+            )
+            batches = [(rows[:half], 0), (rows[half:], 0)]
+        else:
+            self._quarantine(rows, error)
+            return
+        with self._lock:
+            self._retry.extend(batches)
+
+    def _quarantine(self, rows: List[Dict[str, Any]], error: Exception) -> None:
+        """Give up on ``rows``: log them and append them to the quarantine file."""
+        table = self.model.__tablename__
+        logger.error(f"{table}: {len(rows)} records could not be written and were quarantined: {error}")
+        directory = os.getenv(AUDIT_FALLBACK_LOG_DIR_ENV, "/var/log/ytcrypto_audit_logs")
+        try:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+            with open(os.path.join(directory, f"{table}-quarantine.jsonl"), "a", encoding="utf-8") as fh:
+                for row in rows:
+                    fh.write(json.dumps({"row": row, "error": str(error)}, default=str) + "\n")
+        except OSError as e:
+            logger.critical(f"{table} quarantine file could not be written: {e}; rows: {rows}")
+
+    def _write(self, rows: List[Dict[str, Any]]) -> None:
+        """Stage ``rows`` in the session; subclasses may add derived writes."""
+        db.session.bulk_insert_mappings(self.model, rows)
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name=f"write-behind-{self.model.__tablename__}", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_seconds)
+            self._wakeup.clear()
+            self.flush()
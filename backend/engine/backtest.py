@@ -0,0 +1,215 @@
+"""Vectorized backtesting of the profile based decision rules.
+
+The live ``DecisionEngine`` scores a single analysis snapshot.  Here the same
+rules are evaluated over whole indicator arrays at once and the resulting
+signal series is replayed as long-only trades with stop-loss and position
+sizing.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+HOLD, BUY, SELL = 0, 1, -1
+
+# Canlı analizdeki volatilite 30 günlük saatlik fiyatlar üzerinden hesaplanır.
+DEFAULT_VOLATILITY_WINDOW = 24 * 30
+
+_OPERATORS: Dict[str, Callable[[np.ndarray, float], np.ndarray]] = {
+    ">": np.greater,
+    "<": np.less,
+    "==": np.equal,
+}
+
+
+@dataclass
+class BacktestReport:
+    profit_pct: float
+    total_trades: int
+    win_rate: float
+    max_drawdown: float
+    sharpe_ratio: float
+    final_equity: float
+    trade_returns: List[float] = field(default_factory=list)
+
+
+def compute_indicators(
+    prices: np.ndarray, volatility_window: int = DEFAULT_VOLATILITY_WINDOW
+) -> Dict[str, np.ndarray]:
+    """Return the decision metrics for every bar of ``prices``.
+
+    Metric names match the keys ``run_full_analysis`` passes to
+    ``DecisionEngine.decide`` so that the same rule YAML can be replayed.
+    Bars without enough history hold ``NaN`` and never match a condition.
+    """
+    close = pd.Series(np.asarray(prices, dtype=np.float64))
+
+    delta = close.diff()
+    gain = delta.clip(lower=0.0).ewm(alpha=1 / 14, adjust=False, min_periods=14).mean()
+    loss = (-delta.clip(upper=0.0)).ewm(alpha=1 / 14, adjust=False, min_periods=14).mean()
+    rsi = 100.0 - 100.0 / (1.0 + gain / loss.replace(0.0, np.nan))
+    rsi = rsi.where(loss != 0.0, 100.0).where(gain.notna())
+
+    ema_fast = close.ewm(span=12, adjust=False, min_periods=12).mean()
+    ema_slow = close.ewm(span=26, adjust=False, min_periods=26).mean()
+    macd = ema_fast - ema_slow
+
+    mid = close.rolling(20).mean()
+    std = close.rolling(20).std(ddof=0)
+
+    low = close.rolling(14).min()
+    high = close.rolling(14).max()
+    stoch_k = 100.0 * (close - low) / (high - low).replace(0.0, np.nan)
+    stochastic = stoch_k.rolling(3).mean()
+
+    vol_window = close.rolling(volatility_window, min_periods=2)
+    volatility = vol_window.std(ddof=0) / vol_window.mean()
+
+    return {
+        "current_price": close.to_numpy(),
+        "rsi": rsi.to_numpy(),
+        "macd": macd.to_numpy(),
+        "bb_upper": (mid + 2 * std).to_numpy(),
+        "bb_lower": (mid - 2 * std).to_numpy(),
+        "stochastic": stochastic.to_numpy(),
+        "volatility": volatility.fillna(0.0).to_numpy(),
+    }
+
+
+def _score(conditions: List[Dict[str, Any]], metrics: Dict[str, np.ndarray], n: int) -> np.ndarray:
+    score = np.zeros(n, dtype=np.float64)
+    for cond in conditions:
+        column = metrics.get(cond.get("metric"))
+        op = _OPERATORS.get(cond.get("operator"))
+        value = cond.get("value")
+        # DecisionEngine._match ile aynı: bilinmeyen metrik/operatör eşleşmez
+        if column is None or op is None or value is None:
+            continue
+        with np.errstate(invalid="ignore"):
+            matched = op(column, value)
+        score += matched * float(cond.get("weight", 1))
+    return score
+
+
+def generate_signals(rules: Dict[str, Any], metrics: Dict[str, np.ndarray]) -> np.ndarray:
+    """Vectorized equivalent of ``DecisionEngine.decide`` for a single profile."""
+    n = len(metrics["current_price"])
+    factor = 1.0 / (1.0 + metrics.get("volatility", np.ones(n)))
+    buy = _score(rules.get("buy", []), metrics, n) * factor
+    sell = _score(rules.get("sell", []), metrics, n) * factor
+    threshold = rules.get("threshold", 10)
+
+    signals = np.full(n, HOLD, dtype=np.int8)
+    signals[(buy > sell) & (buy > threshold)] = BUY
+    signals[(sell > buy) & (sell > threshold)] = SELL
+    return signals
+
+
+def simulate_trades(
+    prices: np.ndarray,
+    signals: np.ndarray,
+    stop_loss_pct: float = 0.05,
+    position_size_pct: float = 0.1,
+    fee_pct: float = 0.0,
+    initial_equity: float = 1.0,
+) -> Dict[str, Any]:
+    """Replay ``signals`` as long-only trades and return the equity curve.
+
+    A position is opened at the close of a BUY bar while flat and closed at the
+    first later bar that is either a SELL or closes at/below the stop level.
+    Only ``position_size_pct`` of the equity is exposed per trade.  A position
+    still open on the last bar is closed there.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    n = len(prices)
+    equity = np.full(n, float(initial_equity))
+    trade_returns: List[float] = []
+    if n < 2:
+        return {"equity": equity, "trade_returns": np.array(trade_returns)}
+
+    idx = np.arange(n)
+    # Her bar için o bardan itibaren ilk SELL sinyalinin indeksi (yoksa n-1)
+    sell_at = np.where(signals == SELL, idx, n - 1)
+    next_sell = np.minimum.accumulate(sell_at[::-1])[::-1]
+    buy_idx = np.flatnonzero(signals == BUY)
+
+    current = float(initial_equity)
+    last = 0
+    pos = 0
+    while pos < len(buy_idx) and buy_idx[pos] < n - 1:
+        entry = int(buy_idx[pos])
+        equity[last:entry + 1] = current
+
+        horizon = int(next_sell[entry + 1])
+        window = prices[entry + 1:horizon + 1]
+        stopped = np.flatnonzero(window <= prices[entry] * (1.0 - stop_loss_pct))
+        exit_ = entry + 1 + int(stopped[0]) if len(stopped) else horizon
+
+        path = prices[entry + 1:exit_ + 1] / prices[entry] - 1.0
+        equity[entry + 1:exit_ + 1] = current * (1.0 + position_size_pct * path)
+        trade_return = path[-1] - 2 * fee_pct
+        current *= 1.0 + position_size_pct * trade_return
+        equity[exit_] = current
+        trade_returns.append(float(trade_return))
+
+        last = exit_
+        pos = int(np.searchsorted(buy_idx, exit_, side="right"))
+
+    equity[last:] = current
+    return {"equity": equity, "trade_returns": np.array(trade_returns)}
+
+
+def summarize(
+    equity: np.ndarray, trade_returns: np.ndarray, periods_per_year: float = 24 * 365
+) -> BacktestReport:
+    """Compute P&L, drawdown, win rate and Sharpe ratio from a replay."""
+    if len(equity) == 0:
+        return BacktestReport(0.0, 0, 0.0, 0.0, 0.0, 1.0)
+    start, end = float(equity[0]), float(equity[-1])
+    peaks = np.maximum.accumulate(equity)
+    drawdown = float(np.max(1.0 - equity / peaks))
+
+    bar_returns = np.diff(equity) / equity[:-1]
+    sharpe = 0.0
+    if len(bar_returns) and bar_returns.std() > 0:
+        sharpe = float(bar_returns.mean() / bar_returns.std() * np.sqrt(periods_per_year))
+
+    trades = len(trade_returns)
+    wins = int(np.count_nonzero(trade_returns > 0))
+    return BacktestReport(
+        profit_pct=(end / start - 1.0) * 100.0,
+        total_trades=trades,
+        win_rate=wins / trades if trades else 0.0,
+        max_drawdown=drawdown * 100.0,
+        sharpe_ratio=sharpe,
+        final_equity=end,
+        trade_returns=[float(r) for r in trade_returns],
+    )
+
+
+def run_backtest(
+    prices: np.ndarray,
+    rules: Dict[str, Any],
+    metrics: Optional[Dict[str, np.ndarray]] = None,
+    periods_per_year: float = 24 * 365,
+    fee_pct: float = 0.0,
+) -> BacktestReport:
+    """Backtest one profile's rules over a price array.
+
+    ``metrics`` may be passed in when the same series is evaluated with many
+    rule sets so indicators are computed only once.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    if metrics is None:
+        metrics = compute_indicators(prices)
+    signals = generate_signals(rules, metrics)
+    replay = simulate_trades(
+        prices,
+        signals,
+        stop_loss_pct=rules.get("stop_loss_pct", 0.05),
+        position_size_pct=rules.get("position_size_pct", 0.1),
+        fee_pct=fee_pct,
+    )
+    return summarize(replay["equity"], replay["trade_returns"], periods_per_year)
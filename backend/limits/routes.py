@@ -1,8 +1,11 @@
-from flask import Blueprint, jsonify, g
+from datetime import datetime, timedelta
+
+from flask import Blueprint, jsonify, g, request
 from flask_jwt_extended import jwt_required
 from backend.auth.jwt_utils import require_csrf
-from backend.utils.usage_limits import get_usage_count
-import json
+from backend.services.usage_counters import usage_counters
+from backend.services.usage_rollup import usage_series
+from backend.utils.plan_limits import get_user_effective_limits
 
 limits_bp = Blueprint("limits", __name__, url_prefix="/api/limits")
 
@@ -12,16 +15,18 @@ limits_bp = Blueprint("limits", __name__, url_prefix="/api/limits")
 @require_csrf
 def get_limit_status():
     user = g.user
-    features = user.plan.features
-    if isinstance(features, str):
-        try:
-            features = json.loads(features)
-        except Exception:
-            return jsonify({"error": "Plan özellikleri okunamadı."}), 500
+    # Plan + boost + özel limitler; yalnızca sayısal olanlar kullanım kotasıdır
+    limits = {
+        key: limit
+        for key, limit in get_user_effective_limits(user).items()
+        if isinstance(limit, (int, float)) and not isinstance(limit, bool)
+    }
+    # Tüm özelliklerin bugünkü kullanımı tek seferde okunur
+    usage = usage_counters().day_counts(user.id, limits)
 
     result = {}
-    for key, limit in features.items():
-        used = get_usage_count(user, key)
+    for key, limit in limits.items():
+        used = usage[key]
         remaining = max(limit - used, 0)
         percent = int((used / limit) * 100) if limit > 0 else 0
         result[key] = {
@@ -32,3 +37,24 @@ def get_limit_status():
         }
 
     return jsonify({"limits": result})
+
+
+# Saatlik özetler daha kısa tutulduğu için geriye bakış süresi sınırlıdır
+HISTORY_MAX_DAYS = {"hour": 30, "day": 366}
+
+
+@limits_bp.route("/history", methods=["GET"])
+@jwt_required()
+@require_csrf
+def get_usage_history():
+    granularity = request.args.get("granularity", "day")
+    if granularity not in HISTORY_MAX_DAYS:
+        return jsonify({"error": "granularity 'hour' veya 'day' olmalıdır."}), 400
+    try:
+        days = int(request.args.get("days", 1 if granularity == "hour" else 30))
+    except ValueError:
+        return jsonify({"error": "days bir tam sayı olmalıdır."}), 400
+    days = min(max(days, 1), HISTORY_MAX_DAYS[granularity])
+    since = datetime.utcnow() - timedelta(days=days)
+    series = usage_series(g.user.id, granularity, since, request.args.get("action"))
+    return jsonify({"granularity": granularity, "days": days, "usage": series})
@@ -1,6 +1,7 @@
 from flask import request, jsonify, g
 from functools import wraps
-from backend.db.models import User, UserRole
+from backend.auth.principal import current_user, resolve_principal
+from backend.db.models import UserRole
 import json
 
 
@@ -12,11 +13,7 @@ def enforce_plan_limit(limit_key):
         def wrapped(*args, **kwargs):
             user = getattr(request, "current_user", None) or getattr(g, "user", None)
             if not user:
-                api_key = request.headers.get("X-API-KEY")
-                if api_key:
-                    user = User.query.filter_by(api_key=api_key).first()
-                    if user:
-                        g.user = user
+                user = current_user(resolve_principal())
             if not user or not user.plan or not user.plan.features:
                 return jsonify({"error": "Abonelik planı bulunamadı."}), 403
 
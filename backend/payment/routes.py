@@ -1,6 +1,6 @@
 # backend/payment/routes.py
 
-from flask import Blueprint, request, jsonify, current_app, g
+from flask import Blueprint, request, jsonify, current_app
 from loguru import logger
 import uuid # conversationId için
 from datetime import datetime, timedelta
@@ -19,6 +19,7 @@ from backend.db.models import (
     PaymentTransactionLog,
 )
 # Güvenlik dekoratörünü import et
+from backend.auth.principal import current_user
 from backend.utils.decorators import require_subscription_plan
 # Yardımcı fonksiyonları import et
 from backend.utils.helpers import add_audit_log
@@ -33,7 +34,7 @@ payment_bp = Blueprint('payment', __name__)
 @payment_bp.route('/initiate', methods=['POST'])
 @require_subscription_plan(SubscriptionPlan.TRIAL) # Ödeme başlatmak için en az TRIAL planı gereklidir
 def initiate_payment():
-    user = g.user # Dekorator'den gelen kullanıcı objesi
+    user = current_user()
     data = request.get_json()
     plan_str = data.get("plan")
     # price = data.get("price") # Frontend'den gelen fiyat artık kullanılmıyor
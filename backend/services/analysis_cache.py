@@ -0,0 +1,232 @@
+"""Request coalescing and result caching for on-demand coin analyses.
+
+Identical requests are keyed on ``(coin, profile, data version)``.  The first
+request registers its task id under an in-flight key with ``SET NX``; every
+later request for the same key receives that task id instead of enqueuing
+another pipeline.  When the task finishes it writes the ``analysis:*`` cache
+and clears the in-flight key – only while the key still holds its own task
+id, so a task that outlived the key's TTL cannot release a newer owner.
+
+Pollers of ``/api/analysis/<task_id>`` block on a per-task ``done`` list
+(``BRPOPLPUSH`` onto itself, so every waiter sees the same token) instead of
+sleeping in a loop, and a result is only returned to users recorded against
+the task with ``grant_task_access``.
+
+Cached results are plan-independent and versioned by
+``ANALYSIS_CACHE_VERSION``; plan-specific fields are removed at read time by
+``redact_analysis``.
+"""
+
+import hashlib
+import json
+import math
+import time
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+from flask import current_app
+from loguru import logger
+
+from backend.constants import ANALYSIS_CACHE_VERSION, ANALYSIS_PLAN_REDACTIONS
+
+DEFAULT_ANALYSIS_CACHE_TTL = 300
+DEFAULT_INFLIGHT_TTL = 600
+DEFAULT_RESULT_TTL = 3600
+
+# Anahtarı yalnızca hâlâ bu görevin kimliğini tutuyorsa siler (karşılaştır ve sil, atomik)
+RELEASE_INFLIGHT_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def data_version(now: Optional[float] = None) -> int:
+    """Version of the market data an analysis started now would read.
+
+    Price data is cached for ``PRICE_CACHE_TTL`` seconds, so requests inside
+    the same window would compute the same result.
+    """
+    window = int(current_app.config.get("PRICE_CACHE_TTL", DEFAULT_ANALYSIS_CACHE_TTL))
+    window = window if window > 0 else DEFAULT_ANALYSIS_CACHE_TTL
+    return int((time.time() if now is None else now) // window)
+
+
+def inflight_key(coin: str, profile: str, version: int) -> str:
+    return f"analysis:inflight:{coin}:{profile}:{version}"
+
+
+def claim_analysis(
+    redis_client, coin: str, profile: str, version: int, task_id: str
+) -> Tuple[str, bool]:
+    """Register ``task_id`` as the in-flight analysis for the key.
+
+    Returns ``(task_id, created)``; when another request already owns the key
+    its task id is returned with ``created=False``.  Without Redis every
+    request creates its own task.
+    """
+    if redis_client is None:
+        return task_id, True
+    key = inflight_key(coin, profile, version)
+    ttl = int(current_app.config.get("ANALYSIS_INFLIGHT_TTL", DEFAULT_INFLIGHT_TTL))
+    try:
+        # Anahtar SET ile GET arasında silinirse (görev bitti) bir kez daha dene
+        for _ in range(2):
+            if redis_client.set(key, task_id, nx=True, ex=ttl):
+                return task_id, True
+            existing = redis_client.get(key)
+            if existing is not None:
+                return existing.decode() if isinstance(existing, bytes) else existing, False
+    except Exception as e:
+        logger.warning(f"In-flight registry unavailable ({coin}/{profile}): {e}")
+    return task_id, True
+
+
+@lru_cache(maxsize=8)
+def _release_script(redis_client):
+    return redis_client.register_script(RELEASE_INFLIGHT_LUA)
+
+
+def release_analysis(redis_client, coin: str, profile: str, version: int, task_id: str) -> bool:
+    """Clear the in-flight key if ``task_id`` still owns it; returns whether it did."""
+    if redis_client is None:
+        return False
+    try:
+        return bool(_release_script(redis_client)(keys=[inflight_key(coin, profile, version)], args=[task_id]))
+    except Exception as e:
+        logger.warning(f"In-flight key could not be released ({coin}/{profile}): {e}")
+        return False
+
+
+def result_cache_key(coin: str, profile: str) -> str:
+    return f"analysis:v{ANALYSIS_CACHE_VERSION}:{coin}:{profile}"
+
+
+def task_result_key(task_id: str) -> str:
+    return f"analysis:v{ANALYSIS_CACHE_VERSION}:task:{task_id}"
+
+
+def task_done_key(task_id: str) -> str:
+    return f"analysis:v{ANALYSIS_CACHE_VERSION}:task:{task_id}:done"
+
+
+def task_user_key(task_id: str, user_id: int) -> str:
+    return f"analysis:v{ANALYSIS_CACHE_VERSION}:task:{task_id}:user:{user_id}"
+
+
+def _result_ttl() -> int:
+    return int(current_app.config.get("ANALYSIS_RESULT_TTL", DEFAULT_RESULT_TTL))
+
+
+def grant_task_access(redis_client, task_id: str, user_id: int) -> None:
+    """Record that ``user_id`` requested (or joined) the analysis ``task_id``."""
+    if redis_client is None:
+        return
+    try:
+        redis_client.set(task_user_key(task_id, user_id), 1, ex=_result_ttl())
+    except Exception as e:
+        logger.warning(f"Analysis task owner could not be stored ({task_id}): {e}")
+
+
+def can_read_task(redis_client, task_id: str, user_id: int) -> bool:
+    if redis_client is None:
+        return False
+    try:
+        return redis_client.get(task_user_key(task_id, user_id)) is not None
+    except Exception as e:
+        logger.warning(f"Analysis task owner could not be read ({task_id}): {e}")
+        return False
+
+
+def _write_envelope(redis_client, envelope: Dict[str, Any], coin_key: Optional[str]) -> None:
+    if redis_client is None:
+        return
+    payload = json.dumps(envelope, default=str)
+    try:
+        pipe = redis_client.pipeline()
+        if coin_key:
+            ttl = int(current_app.config.get("ANALYSIS_CACHE_TTL", DEFAULT_ANALYSIS_CACHE_TTL))
+            pipe.set(coin_key, payload, ex=ttl)
+        if envelope.get("task_id"):
+            ttl = _result_ttl()
+            pipe.set(task_result_key(envelope["task_id"]), payload, ex=ttl)
+            # Bekleyen istekleri uyandırır; jeton listede kalır
+            pipe.lpush(task_done_key(envelope["task_id"]), 1)
+            pipe.expire(task_done_key(envelope["task_id"]), ttl)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Analysis cache write failed ({envelope.get('task_id')}): {e}")
+
+
+def store_analysis_result(
+    redis_client,
+    coin: str,
+    profile: str,
+    result: Dict[str, Any],
+    task_id: Optional[str] = None,
+    version: Optional[int] = None,
+) -> None:
+    """Cache the full, plan-independent result by coin/profile and task id."""
+    envelope = {
+        "status": "completed",
+        "task_id": task_id,
+        "coin": coin,
+        "profile": profile,
+        "data_version": version,
+        "result": result,
+    }
+    _write_envelope(redis_client, envelope, result_cache_key(coin, profile))
+
+
+def store_analysis_failure(redis_client, task_id: Optional[str], coin: str, profile: str) -> None:
+    """Record a failed task so pollers stop waiting for it."""
+    if task_id:
+        envelope = {"status": "failed", "task_id": task_id, "coin": coin, "profile": profile}
+        _write_envelope(redis_client, envelope, None)
+
+
+def _read(redis_client, key: str) -> Optional[Dict[str, Any]]:
+    if redis_client is None:
+        return None
+    try:
+        raw = redis_client.get(key)
+    except Exception as e:
+        logger.warning(f"Analysis cache read failed ({key}): {e}")
+        return None
+    return json.loads(raw) if raw else None
+
+
+def load_cached_analysis(redis_client, coin: str, profile: str) -> Optional[Dict[str, Any]]:
+    return _read(redis_client, result_cache_key(coin, profile))
+
+
+def wait_for_task_result(redis_client, task_id: str, timeout: float = 0.0) -> Optional[Dict[str, Any]]:
+    """Return the task's cached envelope, blocking up to ``timeout`` seconds.
+
+    The wait is a single blocking ``BRPOPLPUSH`` on the task's ``done`` list,
+    which rotates the token back so concurrent pollers all wake up.
+    """
+    envelope = _read(redis_client, task_result_key(task_id))
+    if envelope is not None or redis_client is None or timeout <= 0:
+        return envelope
+    key = task_done_key(task_id)
+    try:
+        if redis_client.brpoplpush(key, key, timeout=max(1, math.ceil(timeout))) is None:
+            return None
+    except Exception as e:
+        logger.warning(f"Analysis result wait failed ({task_id}): {e}")
+        return None
+    return _read(redis_client, task_result_key(task_id))
+
+
+def redact_analysis(result: Dict[str, Any], plan_name: str) -> Dict[str, Any]:
+    """Drop the fields ``plan_name`` is not entitled to see."""
+    redactions = current_app.config.get("ANALYSIS_PLAN_REDACTIONS", ANALYSIS_PLAN_REDACTIONS)
+    hidden = set(redactions.get(plan_name.upper(), ()))
+    return {k: v for k, v in result.items() if k not in hidden}
+
+
+def analysis_etag(payload: Dict[str, Any]) -> str:
+    body = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha1(body.encode()).hexdigest()
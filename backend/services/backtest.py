@@ -0,0 +1,145 @@
+"""Backtest service: loads stored price series and persists results."""
+
+import os
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import yaml
+from flask import current_app
+from loguru import logger
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from backend.db import db
+from backend.db.models import BacktestResult, CoinPrice
+from backend.engine.backtest import BacktestReport, run_backtest
+
+# ON CONFLICT DO NOTHING destekleyen lehçeler
+_INSERT_IGNORE = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def load_decision_rules() -> Dict[str, Any]:
+    """Return the decision rules from ``DECISION_RULES_PATH`` or app config."""
+    path = current_app.config.get("DECISION_RULES_PATH")
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return yaml.safe_load(f) or {}
+    return current_app.config.get("DECISION_RULES", {})
+
+
+def to_datetime(value) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+
+def load_price_series(coin: str, start, end) -> Tuple[np.ndarray, np.ndarray]:
+    """Return ``(timestamps, prices)`` arrays for ``coin`` between two dates."""
+    rows = (
+        db.session.query(CoinPrice.timestamp, CoinPrice.price)
+        .filter(
+            CoinPrice.coin == coin,
+            CoinPrice.timestamp >= to_datetime(start),
+            CoinPrice.timestamp <= to_datetime(end),
+        )
+        .order_by(CoinPrice.timestamp)
+        .all()
+    )
+    if not rows:
+        return np.array([], dtype="datetime64[s]"), np.array([], dtype=np.float64)
+    times, prices = zip(*rows)
+    return np.array(times, dtype="datetime64[s]"), np.array(prices, dtype=np.float64)
+
+
+def periods_per_year(times: np.ndarray) -> float:
+    """Infer the annualisation factor from the median bar spacing."""
+    if len(times) < 2:
+        return 24 * 365
+    step = float(np.median(np.diff(times).astype("timedelta64[s]").astype(np.float64)))
+    return (365 * 86400) / step if step > 0 else 24 * 365
+
+
+def store_price_points(coin: str, times, prices) -> int:
+    """Append price points newer than the last stored timestamp for ``coin``.
+
+    Points another collector stored in the meantime are skipped: PostgreSQL
+    and SQLite insert with ``ON CONFLICT DO NOTHING`` on
+    ``_coin_price_ts_uc``; other databases insert inside a savepoint and
+    drop the batch if it collides.  Returns the number of rows written.
+    """
+    last = (
+        db.session.query(db.func.max(CoinPrice.timestamp))
+        .filter(CoinPrice.coin == coin)
+        .scalar()
+    )
+    rows = []
+    for ts, price in zip(times, prices):
+        ts = to_datetime(ts)
+        if last is None or ts > last:
+            rows.append({"coin": coin, "timestamp": ts, "price": float(price)})
+    if not rows:
+        return 0
+    insert = _INSERT_IGNORE.get(db.session.get_bind().dialect.name)
+    if insert is not None:
+        stmt = insert(CoinPrice.__table__).on_conflict_do_nothing(index_elements=["coin", "timestamp"])
+        written = db.session.execute(stmt, rows).rowcount
+        db.session.commit()
+        return max(written, 0)
+    try:
+        with db.session.begin_nested():
+            db.session.bulk_insert_mappings(CoinPrice, rows)
+    except IntegrityError:
+        # Aynı noktaları eşzamanlı bir toplayıcı yazdı; bir sonraki turda kalanlar eklenir
+        logger.info(f"Price points for {coin} already stored by another collector")
+        rows = []
+    db.session.commit()
+    return len(rows)
+
+
+def save_report(
+    coin: str, profile: str, start, end, report: BacktestReport, commit: bool = True
+) -> BacktestResult:
+    result = BacktestResult(
+        coin=coin,
+        profile=profile,
+        start_date=to_datetime(start),
+        end_date=to_datetime(end),
+        profit_pct=report.profit_pct,
+        total_trades=report.total_trades,
+        win_rate=report.win_rate,
+        max_drawdown=report.max_drawdown,
+        sharpe_ratio=report.sharpe_ratio,
+    )
+    db.session.add(result)
+    if commit:
+        db.session.commit()
+    return result
+
+
+def backtest_profile(
+    coin: str,
+    profile: str,
+    start,
+    end,
+    rules: Optional[Dict[str, Any]] = None,
+    fee_pct: float = 0.0,
+) -> Dict[str, Any]:
+    """Backtest ``profile`` rules for ``coin`` and store a ``BacktestResult``."""
+    all_rules = rules if rules is not None else load_decision_rules()
+    profile_rules = all_rules.get(profile, all_rules.get("moderate", {}))
+
+    times, prices = load_price_series(coin, start, end)
+    report = run_backtest(
+        prices, profile_rules, periods_per_year=periods_per_year(times), fee_pct=fee_pct
+    )
+    result = save_report(coin, profile, start, end, report)
+    return {
+        "id": result.id,
+        "profit_pct": report.profit_pct,
+        "trades": report.total_trades,
+        "win_rate": report.win_rate,
+        "max_drawdown": report.max_drawdown,
+        "sharpe_ratio": report.sharpe_ratio,
+        "bars": int(len(prices)),
+    }
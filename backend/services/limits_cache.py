@@ -0,0 +1,238 @@
+"""Process-local cache of resolved effective limits.
+
+A user's effective limits are the plan features overlaid with an active
+boost and then custom features (``get_user_effective_limits``).  Resolving
+them means parsing up to three JSON columns and checking the boost expiry, so
+the merged result is compiled once per user and kept in the app's
+``LimitsCache``; a request then pays a dict lookup.
+
+Entries are dropped when:
+
+* the boost they include expires (the entry's expiry is the boost end),
+* the user's plan or feature columns no longer match what was compiled,
+* an invalidation for the user or their plan is published – writers call
+  ``invalidate_limits`` which bumps ``limits:version`` in Redis and publishes
+  on ``limits:invalidate``; every web process listens and evicts.  A listener
+  that sees a version gap (missed messages, reconnect) clears its cache,
+* ``LIMITS_CACHE_MAX_AGE_SECONDS`` passes, as a safety net.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Mapping, Optional, Tuple
+
+from flask import current_app, has_app_context
+from loguru import logger
+
+INVALIDATION_CHANNEL = "limits:invalidate"
+VERSION_KEY = "limits:version"
+DEFAULT_MAX_AGE_SECONDS = 300
+DEFAULT_MAX_ENTRIES = 10000
+_EPOCH = datetime(1970, 1, 1)
+
+
+@lru_cache(maxsize=512)
+def _parse_features(raw: str) -> tuple:
+    try:
+        parsed = json.loads(raw)
+    except Exception:
+        return ()
+    return tuple(parsed.items()) if isinstance(parsed, dict) else ()
+
+
+def parse_features(raw) -> dict:
+    """Feature dict from a JSON column, parsed once per distinct value."""
+    if not raw:
+        return {}
+    if isinstance(raw, dict):
+        return dict(raw)
+    return dict(_parse_features(raw))
+
+
+def _fingerprint(user) -> Tuple[Any, ...]:
+    return (
+        getattr(user, "plan_id", None),
+        getattr(user, "boost_features", None),
+        getattr(user, "boost_expire_at", None),
+        getattr(user, "custom_features", None),
+    )
+
+
+@dataclass(frozen=True)
+class EffectiveLimits:
+    """Merged limits of one user, valid until ``expires_at`` (epoch seconds)."""
+
+    user_id: Optional[int]
+    plan_id: Optional[int]
+    limits: Mapping[str, Any]
+    expires_at: float
+    fingerprint: Tuple[Any, ...] = field(repr=False)
+
+
+def compile_limits(user, max_age: float = DEFAULT_MAX_AGE_SECONDS) -> EffectiveLimits:
+    """Resolve plan, boost and custom features of ``user`` into one mapping."""
+    now = time.time()
+    expires_at = now + max_age
+    limits: dict = {}
+    plan = getattr(user, "plan", None)
+    if plan is not None:
+        limits.update(parse_features(getattr(plan, "features", None)))
+    boost_end = getattr(user, "boost_expire_at", None)
+    if getattr(user, "boost_features", None) and boost_end:
+        boost_end = (boost_end - _EPOCH).total_seconds()
+        if boost_end > now:
+            limits.update(parse_features(user.boost_features))
+            # Boost bitince kayıt kendiliğinden geçersizleşir
+            expires_at = min(expires_at, boost_end)
+    if getattr(user, "custom_features", None):
+        limits.update(parse_features(user.custom_features))
+    return EffectiveLimits(
+        user_id=getattr(user, "id", None),
+        plan_id=getattr(user, "plan_id", None),
+        limits=MappingProxyType(limits),
+        expires_at=expires_at,
+        fingerprint=_fingerprint(user),
+    )
+
+
+class LimitsCache:
+    """Compiled ``EffectiveLimits`` per user id, invalidated over Redis pub/sub."""
+
+    def __init__(
+        self,
+        redis_client=None,
+        max_age: float = DEFAULT_MAX_AGE_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        self.redis = redis_client
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.version: Optional[int] = None
+        self._entries: "OrderedDict[int, EffectiveLimits]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Derleme sırasında gelen geçersizleştirme eski sonucun yazılmasını engeller
+        self._generation = 0
+        self._listener: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, user) -> EffectiveLimits:
+        entry = self._entries.get(user.id)
+        if entry is not None and entry.expires_at > time.time() and entry.fingerprint == _fingerprint(user):
+            return entry
+        generation = self._generation
+        entry = compile_limits(user, self.max_age)
+        with self._lock:
+            if generation == self._generation:
+                self._entries[user.id] = entry
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, user_id: Optional[int] = None, plan_id: Optional[int] = None) -> int:
+        """Evict one user, every user on a plan, or (no arguments) everything."""
+        with self._lock:
+            self._generation += 1
+            if user_id is None and plan_id is None:
+                evicted = len(self._entries)
+                self._entries.clear()
+                return evicted
+            stale = [
+                uid
+                for uid, entry in self._entries.items()
+                if uid == user_id or (plan_id is not None and entry.plan_id == plan_id)
+            ]
+            for uid in stale:
+                del self._entries[uid]
+            return len(stale)
+
+    def apply(self, message: Mapping[str, Any]) -> None:
+        """Handle one message from ``INVALIDATION_CHANNEL``."""
+        version = message.get("version")
+        if version is not None:
+            gap = self.version is not None and int(version) != self.version + 1
+            self.version = int(version)
+            if gap:
+                # Kaçırılmış mesaj olabilir; tüm önbellek boşaltılır
+                self.invalidate()
+                return
+        self.invalidate(message.get("user_id"), message.get("plan_id"))
+
+    def _listen_once(self) -> None:
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(INVALIDATION_CHANNEL)
+        try:
+            current = int(self.redis.get(VERSION_KEY) or 0)
+            if self.version is not None and current != self.version:
+                self.invalidate()
+            self.version = current
+            for raw in pubsub.listen():
+                try:
+                    self.apply(json.loads(raw["data"]))
+                except (TypeError, ValueError) as e:
+                    logger.warning(f"Invalid limits invalidation message: {e}")
+        finally:
+            pubsub.close()
+
+    def _listen(self) -> None:
+        while True:
+            try:
+                self._listen_once()
+            except Exception as e:
+                logger.warning(f"Limits invalidation listener reconnecting: {e}")
+                self.invalidate()
+                time.sleep(5)
+
+    def start_listener(self) -> None:
+        if self.redis is None or (self._listener is not None and self._listener.is_alive()):
+            return
+        self._listener = threading.Thread(target=self._listen, name="limits-invalidation", daemon=True)
+        self._listener.start()
+
+
+def publish_invalidation(redis_client, user_id: Optional[int] = None, plan_id: Optional[int] = None) -> None:
+    if redis_client is None:
+        return
+    try:
+        version = redis_client.incr(VERSION_KEY)
+        redis_client.publish(
+            INVALIDATION_CHANNEL, json.dumps({"version": version, "user_id": user_id, "plan_id": plan_id})
+        )
+    except Exception as e:
+        logger.warning(f"Limits invalidation could not be published: {e}")
+
+
+def init_limits_cache(app) -> LimitsCache:
+    cache = LimitsCache(
+        app.extensions.get("redis_client"),
+        max_age=float(app.config.get("LIMITS_CACHE_MAX_AGE_SECONDS", DEFAULT_MAX_AGE_SECONDS)),
+    )
+    app.extensions["limits_cache"] = cache
+    if not app.config.get("TESTING"):
+        cache.start_listener()
+    return cache
+
+
+def effective_limits(user) -> Mapping[str, Any]:
+    """Read-only effective limits of ``user`` from the app cache."""
+    cache = current_app.extensions.get("limits_cache") if has_app_context() else None
+    if cache is None or getattr(user, "id", None) is None:
+        return compile_limits(user).limits
+    return cache.get(user).limits
+
+
+def invalidate_limits(user_id: Optional[int] = None, plan_id: Optional[int] = None) -> None:
+    """Drop cached limits for a user or a plan in every process."""
+    if not has_app_context():
+        return
+    cache = current_app.extensions.get("limits_cache")
+    if cache is not None:
+        cache.invalidate(user_id, plan_id)
+    publish_invalidation(current_app.extensions.get("redis_client"), user_id, plan_id)
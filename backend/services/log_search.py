@@ -0,0 +1,207 @@
+"""Indexed text search and keyset pagination for audit logs and system events.
+
+``LogSearch.contains`` builds a substring filter that an index can serve:
+
+* on SQLite it matches an FTS5 external-content table using the ``trigram``
+  tokenizer (``audit_logs_fts``, ``system_events_fts``), which the triggers
+  created next to the base table keep in sync.  Terms shorter than three
+  characters cannot be looked up in a trigram index and, like databases
+  without the FTS table (SQLite older than 3.34, tables created before this
+  module), fall back to ``ILIKE``;
+* on PostgreSQL it stays ``ILIKE '%term%'``, which the planner answers from the
+  ``pg_trgm`` GIN index on each searched column.
+
+Pages are ordered by ``(created_at, id)`` descending and continued with an
+opaque cursor holding the last row's key, so fetching page N costs the same as
+page 1.  ``estimate`` gives the number of matching rows from the planner
+(PostgreSQL) or from a count capped at ``LOG_SEARCH_COUNT_CAP`` instead of an
+exact ``COUNT(*)`` over the whole filter.
+"""
+
+import base64
+import json
+import sqlite3
+import weakref
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from flask import current_app, has_app_context
+from loguru import logger
+from sqlalchemy import event, func, literal_column, select, table, tuple_
+
+from backend.db import db
+from backend.db.models import AuditLog, SystemEvent
+
+# Trigram indeksi en az üç karakterlik terimlerde kullanılabilir
+MIN_INDEXED_TERM = 3
+DEFAULT_COUNT_CAP = 10000
+MAX_PAGE_SIZE = 500
+# Tablo -> trigram ile aranan metin sütunları
+SEARCH_COLUMNS = {
+    AuditLog.__tablename__: ("username", "action", "details"),
+    SystemEvent.__tablename__: ("message",),
+}
+
+_fts_tables: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def search_index_ddl(table_name: str, dialect: str) -> List[str]:
+    """Statements creating the search index for ``table_name`` on ``dialect``."""
+    columns = SEARCH_COLUMNS[table_name]
+    if dialect == "postgresql":
+        return ["CREATE EXTENSION IF NOT EXISTS pg_trgm"] + [
+            f"CREATE INDEX IF NOT EXISTS ix_{table_name}_{col}_trgm "
+            f"ON {table_name} USING gin ({col} gin_trgm_ops)"
+            for col in columns
+        ]
+    if dialect != "sqlite" or sqlite3.sqlite_version_info < (3, 34):
+        return []
+    fts = f"{table_name}_fts"
+    cols = ", ".join(columns)
+    new = ", ".join(f"new.{c}" for c in columns)
+    old = ", ".join(f"old.{c}" for c in columns)
+    insert = f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new});"
+    delete = f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{cols}, content='{table_name}', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table_name} BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table_name} BEGIN {delete} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table_name} BEGIN {delete} {insert} END",
+    ]
+
+
+def _create_search_index(target, connection, **kw) -> None:
+    statements = search_index_ddl(target.name, connection.dialect.name)
+    if not statements:
+        return
+    try:
+        with connection.begin_nested():
+            for statement in statements:
+                connection.exec_driver_sql(statement)
+    except Exception as e:
+        # FTS5/pg_trgm yoksa arama ILIKE ile devam eder
+        logger.warning(f"Search index for {target.name} could not be created: {e}")
+    _fts_tables.pop(connection.engine, None)
+
+
+def init_log_search(app) -> None:
+    """Create search indexes together with their tables (``db.create_all``)."""
+    app.config.setdefault("LOG_SEARCH_COUNT_CAP", DEFAULT_COUNT_CAP)
+    for model in (AuditLog, SystemEvent):
+        if not event.contains(model.__table__, "after_create", _create_search_index):
+            event.listen(model.__table__, "after_create", _create_search_index)
+
+
+def _fts_available(table_name: str) -> bool:
+    engine = db.engine
+    if engine.dialect.name != "sqlite":
+        return False
+    names = _fts_tables.get(engine)
+    if names is None:
+        with engine.connect() as conn:
+            rows = conn.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE '%\\_fts' ESCAPE '\\'"
+            )
+            names = frozenset(row[0] for row in rows)
+        _fts_tables[engine] = names
+    return f"{table_name}_fts" in names
+
+
+def _fts_phrase(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of ``encode_cursor``; raises ``ValueError`` for malformed input."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError("invalid cursor") from e
+
+
+def json_field(raw: Optional[str]) -> Any:
+    """Parse a stored JSON column; text that is not JSON is returned as is."""
+    if not raw:
+        return {}
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return raw
+
+
+class LogSearch:
+    """Search, pagination and count estimates for one log model."""
+
+    def __init__(self, model):
+        self.model = model
+        self.table_name = model.__tablename__
+        self.columns = SEARCH_COLUMNS[self.table_name]
+
+    def contains(self, term: str, columns: Optional[Sequence[str]] = None):
+        """Filter for rows where any of ``columns`` contains ``term`` (case-insensitive)."""
+        columns = tuple(columns or self.columns)
+        if len(term) >= MIN_INDEXED_TERM and _fts_available(self.table_name):
+            fts = f"{self.table_name}_fts"
+            scope = columns[0] if len(columns) == 1 else "{" + " ".join(columns) + "}"
+            matches = (
+                select(literal_column("rowid"))
+                .select_from(table(fts))
+                .where(literal_column(fts).op("MATCH")(f"{scope} : {_fts_phrase(term)}"))
+            )
+            return self.model.id.in_(matches)
+        pattern = f"%{term}%"
+        return db.or_(*(getattr(self.model, col).ilike(pattern) for col in columns))
+
+    def page(self, query, cursor: Optional[str] = None, limit: int = 100):
+        """Rows after ``cursor`` (newest first) and the cursor for the next page."""
+        model = self.model
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        if cursor:
+            created_at, row_id = decode_cursor(cursor)
+            query = query.filter(tuple_(model.created_at, model.id) < tuple_(created_at, row_id))
+        rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).all()
+        if len(rows) <= limit:
+            return rows, None
+        last = rows[limit - 1]
+        return rows[:limit], encode_cursor(last.created_at, last.id)
+
+    def estimate(self, query) -> Tuple[int, bool]:
+        """``(rows, exact)`` for ``query`` without scanning every match."""
+        query = query.order_by(None)
+        bind = db.session.get_bind()
+        if bind.dialect.name == "postgresql":
+            compiled = query.statement.compile(dialect=bind.dialect)
+            plan = db.session.connection().exec_driver_sql(
+                f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params
+            ).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]["Plan"]["Plan Rows"]), False
+        cap = DEFAULT_COUNT_CAP
+        if has_app_context():
+            cap = int(current_app.config.get("LOG_SEARCH_COUNT_CAP", DEFAULT_COUNT_CAP))
+        capped = query.with_entities(self.model.id).limit(cap + 1).subquery()
+        count = db.session.query(func.count()).select_from(capped).scalar()
+        return min(count, cap), count <= cap
+
+
+def page_headers(next_cursor: Optional[str], estimate: Optional[Tuple[int, bool]]) -> dict:
+    headers = {}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    if estimate is not None:
+        headers["X-Total-Estimate"] = str(estimate[0])
+        headers["X-Total-Exact"] = "true" if estimate[1] else "false"
+    return headers
+
+
+audit_log_search = LogSearch(AuditLog)
+system_event_search = LogSearch(SystemEvent)
@@ -0,0 +1,216 @@
+"""Indexed matching of user price and indicator alerts.
+
+Alerts are one-shot thresholds on a tick field (``PRICE_ALERT_FIELDS``).
+For every ``(coin, field, direction)`` the engine keeps a sorted key array
+arranged so that the alerts crossed by a new value always form its tail:
+``below`` alerts are keyed by the threshold (fired when value <= threshold)
+and ``above`` alerts by the negated threshold (fired when value >=
+threshold).  Evaluating a tick is one ``bisect`` plus slicing the ``k``
+fired alerts off the end, i.e. O(log n + k) regardless of how many alerts
+are registered.
+
+The ticker producer owns the engine: it syncs changed ``PriceAlert`` rows
+incrementally (``updated_at``), evaluates each tick and pushes fired alerts
+to the owners' rooms on the ``/alerts`` namespace.
+"""
+
+from bisect import bisect_left
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from loguru import logger
+
+from backend.constants import ALERTS_NAMESPACE
+from backend.db import db
+from backend.db.models import PriceAlert
+from backend.services.realtime import user_room
+
+BookKey = Tuple[str, str, str]  # (coin, field, direction)
+
+
+class FiredAlert(NamedTuple):
+    alert_id: int
+    user_id: int
+    coin: str
+    field: str
+    direction: str
+    threshold: float
+    value: float
+
+
+def _sort_key(direction: str, threshold: float) -> float:
+    return -threshold if direction == "above" else threshold
+
+
+class AlertBook:
+    """Sorted keys with parallel alert ids; fired alerts are a tail slice."""
+
+    __slots__ = ("keys", "ids")
+
+    def __init__(self):
+        self.keys: List[float] = []
+        self.ids: List[int] = []
+
+    def add(self, key: float, alert_id: int) -> None:
+        i = bisect_left(self.keys, key)
+        self.keys.insert(i, key)
+        self.ids.insert(i, alert_id)
+
+    def remove(self, key: float, alert_id: int) -> bool:
+        i = bisect_left(self.keys, key)
+        while i < len(self.keys) and self.keys[i] == key:
+            if self.ids[i] == alert_id:
+                del self.keys[i], self.ids[i]
+                return True
+            i += 1
+        return False
+
+    def pop_crossed(self, key: float) -> List[int]:
+        i = bisect_left(self.keys, key)
+        fired = self.ids[i:]
+        del self.keys[i:], self.ids[i:]
+        return fired
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+
+class AlertEngine:
+    """In-memory alert index for the ticker producer process."""
+
+    def __init__(self, app=None):
+        self.app = app
+        # coin -> (field, direction) -> kitap; bir tik yalnızca kendi coin'ine bakar
+        self._books: Dict[str, Dict[Tuple[str, str], AlertBook]] = {}
+        # alert_id -> (kitap anahtarı, sıralama anahtarı, kullanıcı, eşik)
+        self._alerts: Dict[int, Tuple[BookKey, float, int, float]] = {}
+        self._synced_at: Optional[datetime] = None
+
+    def __len__(self) -> int:
+        return len(self._alerts)
+
+    def coins(self) -> Set[str]:
+        return {coin for coin, books in self._books.items() if any(len(b) for b in books.values())}
+
+    def _book(self, book_key: BookKey) -> AlertBook:
+        coin, field, direction = book_key
+        return self._books.setdefault(coin, {}).setdefault((field, direction), AlertBook())
+
+    def add(self, alert_id: int, user_id: int, coin: str, field: str, direction: str, threshold: float) -> None:
+        if alert_id in self._alerts:
+            self.remove(alert_id)
+        book_key = (coin.lower(), field, direction)
+        key = _sort_key(direction, threshold)
+        self._book(book_key).add(key, alert_id)
+        self._alerts[alert_id] = (book_key, key, user_id, threshold)
+
+    def remove(self, alert_id: int) -> bool:
+        entry = self._alerts.pop(alert_id, None)
+        if entry is None:
+            return False
+        book_key, key, _, _ = entry
+        return self._book(book_key).remove(key, alert_id)
+
+    def bulk_load(self, rows: Iterable[Tuple[int, int, str, str, str, float]]) -> int:
+        """Add many ``(id, user_id, coin, field, direction, threshold)`` rows.
+
+        Rows are grouped and sorted once, which is much faster than repeated
+        ``add`` calls for the initial load.
+        """
+        grouped: Dict[BookKey, List[Tuple[float, int]]] = {}
+        count = 0
+        for alert_id, user_id, coin, field, direction, threshold in rows:
+            if alert_id in self._alerts:
+                self.remove(alert_id)
+            book_key = (coin.lower(), field, direction)
+            key = _sort_key(direction, threshold)
+            grouped.setdefault(book_key, []).append((key, alert_id))
+            self._alerts[alert_id] = (book_key, key, user_id, threshold)
+            count += 1
+        for book_key, entries in grouped.items():
+            book = self._book(book_key)
+            if len(book):
+                entries.extend(zip(book.keys, book.ids))
+            entries.sort()
+            book.keys = [k for k, _ in entries]
+            book.ids = [i for _, i in entries]
+        return count
+
+    def evaluate(self, coin: str, values: Dict[str, Any]) -> List[FiredAlert]:
+        """Pop and return every alert of ``coin`` crossed by ``values``."""
+        coin = coin.lower()
+        fired: List[FiredAlert] = []
+        for (field, direction), book in self._books.get(coin, {}).items():
+            if not len(book):
+                continue
+            value = values.get(field)
+            if value is None:
+                continue
+            for alert_id in book.pop_crossed(_sort_key(direction, float(value))):
+                _, _, user_id, threshold = self._alerts.pop(alert_id)
+                fired.append(FiredAlert(alert_id, user_id, coin, field, direction, threshold, value))
+        return fired
+
+    def _context(self):
+        return self.app.app_context() if self.app is not None else nullcontext()
+
+    def sync(self) -> int:
+        """Apply ``PriceAlert`` rows changed since the previous sync."""
+        started = datetime.utcnow()
+        with self._context():
+            query = db.session.query(
+                PriceAlert.id,
+                PriceAlert.user_id,
+                PriceAlert.coin,
+                PriceAlert.field,
+                PriceAlert.direction,
+                PriceAlert.threshold,
+                PriceAlert.is_active,
+            )
+            if self._synced_at is None:
+                query = query.filter(PriceAlert.is_active.is_(True))
+            else:
+                # Saat kaymalarına karşı küçük bir örtüşme payı bırakılır
+                query = query.filter(PriceAlert.updated_at >= self._synced_at - timedelta(seconds=1))
+            rows = query.all()
+        active = [row[:6] for row in rows if row[6]]
+        for row in rows:
+            if not row[6]:
+                self.remove(row[0])
+        self.bulk_load(active)
+        self._synced_at = started
+        return len(rows)
+
+    def mark_triggered(self, fired: List[FiredAlert]) -> None:
+        if not fired:
+            return
+        now = datetime.utcnow()
+        try:
+            with self._context():
+                PriceAlert.query.filter(PriceAlert.id.in_([f.alert_id for f in fired])).update(
+                    {"is_active": False, "triggered_at": now, "updated_at": now},
+                    synchronize_session=False,
+                )
+                db.session.commit()
+        except Exception as e:
+            logger.error(f"Triggered alerts could not be persisted: {e}")
+
+
+def deliver_alerts(sio, fired: List[FiredAlert]) -> int:
+    """Emit each fired alert to its owner's room on ``/alerts``."""
+    for alert in fired:
+        sio.emit(
+            "price_alert",
+            {
+                "id": alert.alert_id,
+                "coin": alert.coin,
+                "field": alert.field,
+                "direction": alert.direction,
+                "threshold": alert.threshold,
+                "value": alert.value,
+            },
+            to=user_room(alert.user_id),
+            namespace=ALERTS_NAMESPACE,
+        )
+    return len(fired)
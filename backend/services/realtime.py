@@ -0,0 +1,201 @@
+"""Targeted Socket.IO delivery of analysis results.
+
+Clients subscribe to per-coin rooms (``coin:<id>``) and are joined to a
+private per-user room (``user:<id>``) on connect, so a finished analysis is
+only sent to the connections interested in it.  Coin rooms receive a small
+delta of the summary fields that changed since the previous broadcast plus a
+link to the full result at ``/api/analysis/<task_id>``; the requesting user
+is told in their own room that the task is ready.  The stored summary is
+swapped for the new one in a single Lua script, so concurrent publishers of
+the same coin each compute their delta against the summary they replaced and
+no change is lost between a read and a write.
+
+Server side, ``guarded_client_manager`` wraps the message-queue client
+manager so that connections whose outgoing packet queue has grown past
+``REALTIME_MAX_SEND_QUEUE`` are skipped and disconnected instead of letting
+one slow consumer hold back every broadcast.
+"""
+
+import json
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional
+
+import socketio as python_socketio
+from loguru import logger
+
+from backend.constants import REALTIME_MAX_SEND_QUEUE, REALTIME_SUMMARY_FIELDS
+
+SUMMARY_KEY = "realtime:summary:{coin}:{profile}"
+SUMMARY_TTL = 24 * 60 * 60
+
+# Yeni özeti yazar ve yerine geçtiği özeti döndürür (GETSET + EXPIRE, atomik)
+SWAP_SUMMARY_LUA = """
+local previous = redis.call('GET', KEYS[1])
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+return previous
+"""
+
+
+def coin_room(coin: str) -> str:
+    return f"coin:{coin.lower()}"
+
+
+def user_room(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def analysis_href(task_id: str) -> str:
+    return f"/api/analysis/{task_id}"
+
+
+def analysis_summary(result: Dict[str, Any]) -> Dict[str, Any]:
+    """The subset of ``result`` pushed to coin rooms."""
+    summary = {}
+    for field in REALTIME_SUMMARY_FIELDS:
+        value = result.get(field)
+        # Küçük sayısal oynamalar gereksiz delta üretmesin
+        summary[field] = round(value, 4) if isinstance(value, float) else value
+    return summary
+
+
+def analysis_delta(previous: Optional[Dict[str, Any]], summary: Dict[str, Any]) -> Dict[str, Any]:
+    """Fields of ``summary`` that differ from ``previous`` (all when unknown)."""
+    if not previous:
+        return dict(summary)
+    return {k: v for k, v in summary.items() if previous.get(k) != v}
+
+
+def _load_summary(redis_client, coin: str, profile: str) -> Optional[Dict[str, Any]]:
+    if redis_client is None:
+        return None
+    try:
+        raw = redis_client.get(SUMMARY_KEY.format(coin=coin, profile=profile))
+    except Exception as e:
+        logger.warning(f"Realtime summary read failed ({coin}/{profile}): {e}")
+        return None
+    return json.loads(raw) if raw else None
+
+
+@lru_cache(maxsize=8)
+def _swap_script(redis_client):
+    return redis_client.register_script(SWAP_SUMMARY_LUA)
+
+
+def _swap_summary(redis_client, coin: str, profile: str, summary: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Store ``summary`` and return the one it replaced, atomically."""
+    if redis_client is None:
+        return None
+    try:
+        raw = _swap_script(redis_client)(
+            keys=[SUMMARY_KEY.format(coin=coin, profile=profile)],
+            args=[json.dumps(summary, default=str), SUMMARY_TTL],
+        )
+    except Exception as e:
+        logger.warning(f"Realtime summary swap failed ({coin}/{profile}): {e}")
+        return None
+    return json.loads(raw) if raw else None
+
+
+def publish_analysis(
+    sio,
+    redis_client,
+    coin: str,
+    profile: str,
+    result: Dict[str, Any],
+    task_id: Optional[str],
+    user_id: Optional[int] = None,
+) -> Optional[Dict[str, Any]]:
+    """Notify the coin room (delta) and the requesting user (pointer).
+
+    Returns the coin room payload, or ``None`` when nothing changed and no
+    broadcast was needed.
+    """
+    href = analysis_href(task_id) if task_id else None
+    summary = analysis_summary(result)
+    previous = _swap_summary(redis_client, coin, profile, summary)
+    changes = analysis_delta(previous, summary)
+    payload = None
+    if changes:
+        payload = {
+            "coin": coin,
+            "profile": profile,
+            "task_id": task_id,
+            "changes": changes,
+            "full": previous is None,
+            "href": href,
+        }
+        sio.emit("analysis_update", payload, to=coin_room(coin), namespace="/")
+    if user_id is not None:
+        sio.emit(
+            "analysis_ready",
+            {"coin": coin, "profile": profile, "task_id": task_id, "href": href},
+            to=user_room(user_id),
+            namespace="/",
+        )
+    return payload
+
+
+def subscription_snapshot(redis_client, coins: Iterable[str], profiles: Iterable[str]) -> List[Dict[str, Any]]:
+    """Current summaries for newly subscribed coins (the delta baseline)."""
+    snapshot = []
+    for coin in coins:
+        for profile in profiles:
+            summary = _load_summary(redis_client, coin, profile)
+            if summary is not None:
+                snapshot.append({"coin": coin, "profile": profile, "changes": summary, "full": True})
+    return snapshot
+
+
+class SlowConsumerGuard:
+    """Client manager mixin dropping connections with a backed-up send queue.
+
+    Only the receiving side of the message queue (``_handle_emit``) is
+    guarded: every emit, from web or worker processes, reaches the connected
+    clients through it.
+    """
+
+    max_send_queue = REALTIME_MAX_SEND_QUEUE
+    evicted = 0
+
+    def _pending(self, eio_sid) -> int:
+        sock = getattr(self.server.eio, "sockets", {}).get(eio_sid)
+        if sock is None:
+            return 0
+        try:
+            return sock.queue.qsize()
+        except Exception:  # qsize bazı kuyruk türlerinde desteklenmez
+            return 0
+
+    def slow_consumers(self, namespace: str, room) -> List[str]:
+        return [
+            sid
+            for sid, eio_sid in self.get_participants(namespace, room)
+            if self._pending(eio_sid) > self.max_send_queue
+        ]
+
+    def _handle_emit(self, message):
+        namespace = message.get("namespace") or "/"
+        slow = self.slow_consumers(namespace, message.get("room"))
+        if slow:
+            skip = message.get("skip_sid") or []
+            if not isinstance(skip, list):
+                skip = [skip]
+            message = dict(message, skip_sid=skip + slow)
+        super()._handle_emit(message)
+        for sid in slow:
+            self.evicted += 1
+            logger.warning(f"Slow Socket.IO consumer evicted: {sid} ({namespace})")
+            try:
+                self.server.disconnect(sid, namespace=namespace)
+            except Exception as e:
+                logger.debug(f"Eviction of {sid} failed: {e}")
+
+
+def guarded_client_manager(url: str, max_send_queue: int = REALTIME_MAX_SEND_QUEUE, write_only: bool = False):
+    """Message-queue client manager for ``url`` with slow-consumer eviction."""
+    if url.startswith(("redis://", "rediss://")):
+        base = python_socketio.RedisManager
+    else:
+        base = python_socketio.KombuManager
+    manager_class = type(f"Guarded{base.__name__}", (SlowConsumerGuard, base), {"max_send_queue": max_send_queue})
+    return manager_class(url, channel="flask-socketio", write_only=write_only)
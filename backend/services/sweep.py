@@ -0,0 +1,258 @@
+"""Parallel parameter sweeps over the decision rule thresholds.
+
+Price arrays are loaded once in the parent process and published through
+``multiprocessing.shared_memory``; pool workers attach to them by name,
+compute the indicator arrays once per coin and then run their share of the
+configurations with the vectorized backtester.
+"""
+
+import copy
+import itertools
+import json
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from backend.db import db
+from backend.db.models import BacktestResult
+from backend.engine.backtest import compute_indicators, run_backtest
+from backend.services.backtest import to_datetime, load_price_series, periods_per_year
+
+MAX_SWEEP_CONFIGS = 20000
+SWEEP_CHUNK_SIZE = 64
+SWEEP_OBJECTIVES = ("sharpe_ratio", "profit_pct", "win_rate", "max_drawdown")
+
+# Worker süreçlerindeki paylaşılan bellek görünümleri: coin -> (dizi, metrikler, yıllık periyot)
+_worker_series: Dict[str, Tuple[np.ndarray, Optional[Dict[str, np.ndarray]], float]] = {}
+_worker_segments: List[shared_memory.SharedMemory] = []
+
+
+def expand_grid(grid: Dict[str, Iterable[Any]]) -> List[Dict[str, Any]]:
+    """Return the cartesian product of ``grid`` as a list of parameter dicts."""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def sample_random(
+    ranges: Dict[str, Any], samples: int, seed: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Draw ``samples`` random configurations from ``ranges``.
+
+    A ``[low, high]`` pair is sampled uniformly (as an integer when both bounds
+    are integers); any other list is treated as a set of choices.
+    """
+    rng = np.random.default_rng(seed)
+    configs = []
+    for _ in range(samples):
+        params = {}
+        for key, spec in ranges.items():
+            if (
+                isinstance(spec, (list, tuple))
+                and len(spec) == 2
+                and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in spec)
+            ):
+                low, high = spec
+                if isinstance(low, int) and isinstance(high, int):
+                    params[key] = int(rng.integers(low, high + 1))
+                else:
+                    params[key] = float(rng.uniform(low, high))
+            else:
+                params[key] = spec[int(rng.integers(len(spec)))]
+        configs.append(params)
+    return configs
+
+
+def apply_params(rules: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a copy of a profile's ``rules`` with dotted-path overrides applied.
+
+    ``{"threshold": 8, "buy.0.weight": 15}`` sets the threshold and the weight
+    of the first buy condition.
+    """
+    updated = copy.deepcopy(rules)
+    for path, value in params.items():
+        parts = path.split(".")
+        node = updated
+        for part in parts[:-1]:
+            node = node[int(part)] if isinstance(node, list) else node.setdefault(part, {})
+        last = parts[-1]
+        if isinstance(node, list):
+            node[int(last)] = value
+        else:
+            node[last] = value
+    return updated
+
+
+def check_param_paths(rules: Dict[str, Any], paths: Iterable[str]) -> None:
+    """Raise ``ValueError`` unless every dotted path names a scalar setting in ``rules``."""
+    for path in paths:
+        node: Any = rules
+        for part in str(path).split("."):
+            if isinstance(node, list) and part.isdigit() and int(part) < len(node):
+                node = node[int(part)]
+            elif isinstance(node, dict) and part in node:
+                node = node[part]
+            else:
+                raise ValueError(f"Bilinmeyen parametre: {path}")
+        if isinstance(node, (dict, list)):
+            raise ValueError(f"Parametre tek bir değeri göstermeli: {path}")
+
+
+def _init_worker(segments: List[Tuple[str, str, int, float]]) -> None:
+    _worker_series.clear()
+    for coin, name, length, ppy in segments:
+        shm = shared_memory.SharedMemory(name=name)
+        _worker_segments.append(shm)
+        prices = np.ndarray((length,), dtype=np.float64, buffer=shm.buf)
+        _worker_series[coin] = (prices, None, ppy)
+
+
+def _run_chunk(
+    coin: str, rules: Dict[str, Any], chunk: List[Tuple[int, Dict[str, Any]]]
+) -> List[Tuple[int, Dict[str, Any]]]:
+    prices, metrics, ppy = _worker_series[coin]
+    if metrics is None:
+        # Göstergeler parametrelerden bağımsızdır; süreç başına bir kez hesaplanır
+        metrics = compute_indicators(prices)
+        _worker_series[coin] = (prices, metrics, ppy)
+    out = []
+    for index, params in chunk:
+        report = run_backtest(prices, apply_params(rules, params), metrics=metrics, periods_per_year=ppy)
+        out.append(
+            (
+                index,
+                {
+                    "profit_pct": report.profit_pct,
+                    "total_trades": report.total_trades,
+                    "win_rate": report.win_rate,
+                    "max_drawdown": report.max_drawdown,
+                    "sharpe_ratio": report.sharpe_ratio,
+                },
+            )
+        )
+    return out
+
+
+def _rank(rows: List[Dict[str, Any]], objective: str) -> None:
+    # max_drawdown için küçük olan daha iyidir
+    reverse = objective != "max_drawdown"
+    for rank, row in enumerate(
+        sorted(rows, key=lambda r: r["metrics"][objective], reverse=reverse), start=1
+    ):
+        row["rank"] = rank
+
+
+def run_sweep(
+    coins: List[str],
+    profile: str,
+    start,
+    end,
+    configs: List[Dict[str, Any]],
+    rules: Dict[str, Any],
+    objective: str = "sharpe_ratio",
+    max_workers: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+    sweep_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Backtest every configuration for every coin and store ranked results.
+
+    With ``max_workers`` of 0 or 1 everything runs in-process; otherwise a
+    process pool shares the price arrays through shared memory.  ``progress``
+    is called with ``(done, total)`` as chunks complete.
+    """
+    if objective not in SWEEP_OBJECTIVES:
+        raise ValueError(f"Geçersiz hedef metrik: {objective}")
+    if not configs:
+        raise ValueError("Parametre kombinasyonu bulunamadı.")
+    if len(configs) * len(coins) > MAX_SWEEP_CONFIGS:
+        raise ValueError(f"En fazla {MAX_SWEEP_CONFIGS} backtest çalıştırılabilir.")
+
+    sweep_id = sweep_id or uuid.uuid4().hex
+    base_rules = rules.get(profile, rules.get("moderate", {}))
+    series = {}
+    for coin in coins:
+        times, prices = load_price_series(coin, start, end)
+        series[coin] = (prices, periods_per_year(times))
+
+    chunks = [
+        (coin, [(i, configs[i]) for i in range(pos, min(pos + SWEEP_CHUNK_SIZE, len(configs)))])
+        for coin in coins
+        for pos in range(0, len(configs), SWEEP_CHUNK_SIZE)
+    ]
+    total = len(configs) * len(coins)
+    results: Dict[str, Dict[int, Dict[str, Any]]] = {coin: {} for coin in coins}
+    done = 0
+
+    workers = os.cpu_count() if max_workers is None else max_workers
+    if not workers or workers <= 1:
+        _worker_series.clear()
+        for coin, (prices, ppy) in series.items():
+            _worker_series[coin] = (prices, None, ppy)
+        for coin, chunk in chunks:
+            for index, metrics in _run_chunk(coin, base_rules, chunk):
+                results[coin][index] = metrics
+            done += len(chunk)
+            if progress:
+                progress(done, total)
+    else:
+        segments: List[shared_memory.SharedMemory] = []
+        try:
+            specs = []
+            for coin, (prices, ppy) in series.items():
+                shm = shared_memory.SharedMemory(create=True, size=max(prices.nbytes, 1))
+                segments.append(shm)
+                np.ndarray(prices.shape, dtype=np.float64, buffer=shm.buf)[:] = prices
+                specs.append((coin, shm.name, len(prices), ppy))
+
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker, initargs=(specs,)
+            ) as pool:
+                futures = {
+                    pool.submit(_run_chunk, coin, base_rules, chunk): (coin, len(chunk))
+                    for coin, chunk in chunks
+                }
+                for future in as_completed(futures):
+                    coin, size = futures[future]
+                    for index, metrics in future.result():
+                        results[coin][index] = metrics
+                    done += size
+                    if progress:
+                        progress(done, total)
+        finally:
+            for shm in segments:
+                shm.close()
+                shm.unlink()
+
+    start_dt, end_dt = to_datetime(start), to_datetime(end)
+    ranked = {}
+    mappings = []
+    for coin in coins:
+        rows = [{"params": configs[i], "metrics": m} for i, m in sorted(results[coin].items())]
+        _rank(rows, objective)
+        rows.sort(key=lambda r: r["rank"])
+        ranked[coin] = rows
+        for row in rows:
+            mappings.append(
+                {
+                    "coin": coin,
+                    "profile": profile,
+                    "start_date": start_dt,
+                    "end_date": end_dt,
+                    "sweep_id": sweep_id,
+                    "params": json.dumps(row["params"]),
+                    "rank": row["rank"],
+                    **row["metrics"],
+                }
+            )
+    db.session.bulk_insert_mappings(BacktestResult, mappings)
+    db.session.commit()
+
+    return {
+        "sweep_id": sweep_id,
+        "objective": objective,
+        "total": total,
+        "best": {coin: rows[0] for coin, rows in ranked.items() if rows},
+    }
@@ -0,0 +1,367 @@
+"""Server-push price ticker on the ``/ticker`` Socket.IO namespace.
+
+Clients subscribe per coin and get ticks in a room per coin and cadence
+(``ticker:<coin>:<seconds>``).  Plans cap the number of coins and the
+shortest cadence (``TICKER_PLAN_LIMITS``).  Each web process keeps a
+reference count per channel in its own Redis hash and heartbeats it into
+``ticker:processes``; counts of a process that stops heartbeating (crashed,
+killed) are dropped after ``TICKER_PROCESS_TTL_SECONDS``.  A single
+``TickerProducer`` process (guarded by a Redis lease) sums the live counts
+every base interval, fetches the spot prices of all needed coins with one
+``simple/price`` request and emits one tick per due channel, so any number of
+clients costs one publish per channel and tick.  Indicator fields (RSI, MACD,
+...) come from the heavier ``collect_price_data`` call, refreshed on its own
+slower schedule (``TICKER_INDICATOR_REFRESH_SECONDS``) in the background so a
+cache miss never delays a tick.  The same process evaluates user price alerts
+(``backend.services.price_alerts``) on the quotes it builds.
+
+Run the producer with ``python -m backend.services.ticker``.
+"""
+
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from loguru import logger
+
+from backend.constants import (
+    PRICE_ALERT_INTERVAL_SECONDS,
+    TICKER_BASE_INTERVAL_SECONDS,
+    TICKER_CADENCES_SECONDS,
+    TICKER_FIELDS,
+    TICKER_INDICATOR_REFRESH_SECONDS,
+    TICKER_NAMESPACE,
+    TICKER_PLAN_LIMITS,
+    TICKER_PROCESS_TTL_SECONDS,
+)
+
+SUBSCRIPTIONS_KEY = "ticker:subscriptions:{process}"
+PROCESSES_KEY = "ticker:processes"
+PRODUCER_LEASE_KEY = "ticker:producer"
+# Bu web sürecinin abonelik sayaçlarını tutan hash'in kimliği
+PROCESS_ID = uuid.uuid4().hex
+
+# sid -> abone olunan (coin, aralık) kanalları; yalnızca bu web sürecinin bağlantıları
+_connections: Dict[str, Set[Tuple[str, int]]] = {}
+_connections_lock = threading.Lock()
+
+
+def ticker_room(coin: str, cadence: int) -> str:
+    return f"ticker:{coin.lower()}:{cadence}"
+
+
+def plan_ticker_limits(plan_name: str) -> Dict[str, int]:
+    return TICKER_PLAN_LIMITS.get(plan_name.upper(), TICKER_PLAN_LIMITS["TRIAL"])
+
+
+def choose_cadence(requested: Optional[float], min_interval: int) -> int:
+    """Smallest supported cadence that is >= both the request and the plan minimum."""
+    floor = max(float(requested or 0), float(min_interval))
+    for cadence in TICKER_CADENCES_SECONDS:
+        if cadence >= floor:
+            return cadence
+    return TICKER_CADENCES_SECONDS[-1]
+
+
+def _channel_field(coin: str, cadence: int) -> str:
+    return f"{coin}:{cadence}"
+
+
+def _touch(redis_client) -> None:
+    """Heartbeat: keep this process' counts alive for another TTL."""
+    redis_client.hset(PROCESSES_KEY, PROCESS_ID, time.time())
+    redis_client.expire(SUBSCRIPTIONS_KEY.format(process=PROCESS_ID), TICKER_PROCESS_TTL_SECONDS)
+
+
+def _register(redis_client, channels: Iterable[Tuple[str, int]], amount: int) -> None:
+    if redis_client is None:
+        return
+    key = SUBSCRIPTIONS_KEY.format(process=PROCESS_ID)
+    for coin, cadence in channels:
+        field = _channel_field(coin, cadence)
+        try:
+            if redis_client.hincrby(key, field, amount) <= 0:
+                redis_client.hdel(key, field)
+        except Exception as e:
+            logger.warning(f"Ticker subscription registry unavailable ({field}): {e}")
+    try:
+        _touch(redis_client)
+    except Exception as e:
+        logger.warning(f"Ticker heartbeat failed: {e}")
+    if amount > 0:
+        _ensure_heartbeat(redis_client)
+
+
+_heartbeat: Optional[threading.Thread] = None
+_heartbeat_lock = threading.Lock()
+
+
+def _ensure_heartbeat(redis_client) -> None:
+    global _heartbeat
+    with _heartbeat_lock:
+        if _heartbeat is not None and _heartbeat.is_alive():
+            return
+        _heartbeat = threading.Thread(
+            target=_heartbeat_loop, args=(redis_client,), name="ticker-heartbeat", daemon=True
+        )
+        _heartbeat.start()
+
+
+def _heartbeat_loop(redis_client) -> None:
+    while True:
+        time.sleep(TICKER_PROCESS_TTL_SECONDS / 3)
+        if not _connections:
+            continue
+        try:
+            _touch(redis_client)
+        except Exception as e:
+            logger.warning(f"Ticker heartbeat failed: {e}")
+
+
+def active_channels(redis_client, now: Optional[float] = None) -> Dict[int, Set[str]]:
+    """``{cadence: {coin, ...}}`` for channels with at least one live subscriber.
+
+    Processes whose last heartbeat is older than ``TICKER_PROCESS_TTL_SECONDS``
+    are removed together with their counts.
+    """
+    channels: Dict[int, Set[str]] = {}
+    if redis_client is None:
+        return channels
+    now = time.time() if now is None else now
+    try:
+        processes = redis_client.hgetall(PROCESSES_KEY)
+        counts: Dict[str, int] = {}
+        for process, seen in processes.items():
+            process = process.decode() if isinstance(process, bytes) else process
+            key = SUBSCRIPTIONS_KEY.format(process=process)
+            if now - float(seen) > TICKER_PROCESS_TTL_SECONDS:
+                # Kalp atışı kesilen sürecin abonelikleri bırakılır
+                redis_client.hdel(PROCESSES_KEY, process)
+                redis_client.delete(key)
+                continue
+            for field, count in redis_client.hgetall(key).items():
+                field = field.decode() if isinstance(field, bytes) else field
+                counts[field] = counts.get(field, 0) + int(count)
+    except Exception as e:
+        logger.warning(f"Ticker subscriptions could not be read: {e}")
+        return channels
+    for field, count in counts.items():
+        if count <= 0:
+            continue
+        coin, _, cadence = field.rpartition(":")
+        channels.setdefault(int(cadence), set()).add(coin)
+    return channels
+
+
+def subscribe(
+    redis_client, sid: str, plan_name: str, coins: Iterable[str], interval: Optional[float] = None
+) -> Dict[str, Any]:
+    """Add ``coins`` to the connection's channels within the plan limits.
+
+    Returns ``{"subscribed": [...], "rejected": [...], "interval": seconds}``;
+    the caller joins ``ticker_room`` for every subscribed coin.
+    """
+    limits = plan_ticker_limits(plan_name)
+    cadence = choose_cadence(interval, limits["min_interval"])
+    added: List[Tuple[str, int]] = []
+    rejected: List[str] = []
+    with _connections_lock:
+        current = _connections.setdefault(sid, set())
+        for coin in dict.fromkeys(str(c).lower() for c in coins):
+            # Aynı coin farklı aralıkla istenirse eski kanal bırakılır
+            previous = {ch for ch in current if ch[0] == coin}
+            held = {ch[0] for ch in current}
+            if coin not in held and len(held) >= limits["coins"]:
+                rejected.append(coin)
+                continue
+            if (coin, cadence) in previous:
+                continue
+            current.difference_update(previous)
+            _register(redis_client, previous, -1)
+            current.add((coin, cadence))
+            added.append((coin, cadence))
+    _register(redis_client, added, 1)
+    return {"subscribed": [c for c, _ in added], "rejected": rejected, "interval": cadence}
+
+
+def unsubscribe(redis_client, sid: str, coins: Optional[Iterable[str]] = None) -> List[Tuple[str, int]]:
+    """Drop the given (or all) channels of a connection; returns what was left."""
+    with _connections_lock:
+        current = _connections.get(sid, set())
+        wanted = None if coins is None else {str(c).lower() for c in coins}
+        removed = [ch for ch in current if wanted is None or ch[0] in wanted]
+        current.difference_update(removed)
+        if not current:
+            _connections.pop(sid, None)
+    _register(redis_client, removed, -1)
+    return removed
+
+
+def ticker_payload(coin: str, price_data: Dict[str, Any], now: Optional[datetime] = None) -> Dict[str, Any]:
+    payload = {"coin": coin, "ts": (now or datetime.utcnow()).isoformat()}
+    for field in TICKER_FIELDS:
+        if field in price_data:
+            payload[field] = price_data[field]
+    return payload
+
+
+class TickerProducer:
+    """Single process publishing ticks for every subscribed channel.
+
+    ``fetch_prices(coins)`` returns ``{coin: spot_price}`` for all coins in one
+    call and runs every tick; ``fetch_indicators(coin)`` returns the indicator
+    fields and runs in the background at most every ``indicator_interval``
+    seconds per coin.
+    """
+
+    def __init__(
+        self,
+        sio,
+        redis_client,
+        fetch_prices: Callable[[List[str]], Dict[str, float]],
+        fetch_indicators: Optional[Callable[[str], Dict[str, Any]]] = None,
+        base_interval: int = TICKER_BASE_INTERVAL_SECONDS,
+        lease_seconds: Optional[int] = None,
+        alerts=None,
+        alert_interval: int = PRICE_ALERT_INTERVAL_SECONDS,
+        indicator_interval: int = TICKER_INDICATOR_REFRESH_SECONDS,
+        executor=None,
+    ):
+        self.sio = sio
+        self.redis = redis_client
+        self.fetch_prices = fetch_prices
+        self.fetch_indicators = fetch_indicators
+        self.base_interval = max(1, int(base_interval))
+        self.lease_seconds = lease_seconds or self.base_interval * 5
+        self.producer_id = uuid.uuid4().hex
+        self.alerts = alerts
+        self.alert_interval = alert_interval
+        self.indicator_interval = indicator_interval
+        # coin -> (yenilenme zamanı, gösterge alanları)
+        self.indicators: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._refreshing: Set[str] = set()
+        self._executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="ticker-indicators")
+
+    def due_cadences(self, tick_no: int) -> List[int]:
+        elapsed = tick_no * self.base_interval
+        return [c for c in TICKER_CADENCES_SECONDS if elapsed % c == 0]
+
+    def hold_lease(self) -> bool:
+        """Acquire or renew the producer lease; only its holder publishes."""
+        try:
+            if self.redis.set(PRODUCER_LEASE_KEY, self.producer_id, nx=True, ex=self.lease_seconds):
+                return True
+            owner = self.redis.get(PRODUCER_LEASE_KEY)
+            owner = owner.decode() if isinstance(owner, bytes) else owner
+            if owner == self.producer_id:
+                self.redis.set(PRODUCER_LEASE_KEY, self.producer_id, ex=self.lease_seconds)
+                return True
+        except Exception as e:
+            logger.warning(f"Ticker producer lease unavailable: {e}")
+        return False
+
+    def tick(self, tick_no: int) -> int:
+        """Publish one round; returns the number of emits."""
+        channels = active_channels(self.redis)
+        due = [c for c in self.due_cadences(tick_no) if channels.get(c)]
+        alert_coins: Set[str] = set()
+        if self.alerts is not None and (tick_no * self.base_interval) % self.alert_interval == 0:
+            self.alerts.sync()
+            alert_coins = self.alerts.coins()
+        if not due and not alert_coins:
+            return 0
+        quotes: Dict[str, Dict[str, Any]] = {}
+        now = datetime.utcnow()
+        coins = sorted(set().union(alert_coins, *(channels[c] for c in due)))
+        self.refresh_indicators(coins)
+        # Tüm coinlerin anlık fiyatı bu tikte tek istekle çekilir
+        try:
+            prices = self.fetch_prices(coins)
+        except Exception as e:
+            logger.warning(f"Ticker price fetch failed ({len(coins)} coins): {e}")
+            prices = {}
+        for coin, price in prices.items():
+            indicators = self.indicators.get(coin, (0.0, {}))[1]
+            quotes[coin] = ticker_payload(coin, {**indicators, "current_price": price}, now)
+        emitted = 0
+        for cadence in due:
+            for coin in channels[cadence]:
+                if coin in quotes:
+                    self.sio.emit("tick", quotes[coin], to=ticker_room(coin, cadence), namespace=TICKER_NAMESPACE)
+                    emitted += 1
+        if alert_coins:
+            from backend.services.price_alerts import deliver_alerts
+
+            fired = []
+            for coin in alert_coins & quotes.keys():
+                fired.extend(self.alerts.evaluate(coin, quotes[coin]))
+            self.alerts.mark_triggered(fired)
+            emitted += deliver_alerts(self.sio, fired)
+        return emitted
+
+    def refresh_indicators(self, coins: Iterable[str]) -> None:
+        """Schedule a background refresh for coins with stale indicators."""
+        if self.fetch_indicators is None:
+            return
+        now = time.monotonic()
+        for coin in coins:
+            refreshed_at = self.indicators.get(coin, (None, None))[0]
+            if coin in self._refreshing or (
+                refreshed_at is not None and now - refreshed_at < self.indicator_interval
+            ):
+                continue
+            self._refreshing.add(coin)
+            self._executor.submit(self._load_indicators, coin)
+
+    def _load_indicators(self, coin: str) -> None:
+        try:
+            data = self.fetch_indicators(coin)
+            fields = {f: data[f] for f in TICKER_FIELDS if f in data and f != "current_price"}
+            self.indicators[coin] = (time.monotonic(), fields)
+        except Exception as e:
+            logger.warning(f"Ticker indicator refresh failed ({coin}): {e}")
+        finally:
+            self._refreshing.discard(coin)
+
+    def run(self, stop: Optional[threading.Event] = None) -> None:
+        stop = stop or threading.Event()
+        tick_no = 0
+        next_at = time.monotonic()
+        while not stop.is_set():
+            if self.hold_lease():
+                self.tick(tick_no)
+            tick_no += 1
+            next_at += self.base_interval
+            stop.wait(max(0.0, next_at - time.monotonic()))
+
+
+def main() -> None:  # pragma: no cover - process entry point
+    from backend import socketio
+    from backend.services.price_alerts import AlertEngine
+    from backend.tasks.worker import analysis_system, get_worker_app
+    from backend.utils.price_fetcher import fetch_current_prices
+
+    app = get_worker_app()
+    base = int(app.config.get("TICKER_BASE_INTERVAL_SECONDS", TICKER_BASE_INTERVAL_SECONDS))
+
+    def indicators(coin):
+        with app.app_context():
+            return analysis_system(app).collector.collect_price_data(coin)
+
+    logger.info(f"Ticker producer started (pid {os.getpid()}, every {base}s)")
+    TickerProducer(
+        socketio,
+        app.extensions["redis_client"],
+        fetch_current_prices,
+        indicators,
+        base_interval=base,
+        alerts=AlertEngine(app),
+    ).run()
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -0,0 +1,183 @@
+"""Coin-level analysis stages shared by every investor profile.
+
+Collection, indicators, forecast and sentiment depend only on the coin, so a
+universe run computes them once per coin per interval and caches the result
+as a JSON snapshot.  The per-profile ``decide`` step is cheap and is fanned
+out over all profiles from those snapshots.
+"""
+
+import json
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from flask import current_app
+from loguru import logger
+
+from backend.constants import (
+    ANALYSIS_UNIVERSE,
+    SUPPORTED_INVESTOR_PROFILES,
+    UNIVERSE_STAGE_INTERVAL_SECONDS,
+)
+from backend.db import db
+from backend.db.models import DBHData
+
+
+def universe_coins() -> List[str]:
+    return list(current_app.config.get("ANALYSIS_UNIVERSE", ANALYSIS_UNIVERSE))
+
+
+def universe_profiles() -> List[str]:
+    return list(current_app.config.get("ANALYSIS_PROFILES", SUPPORTED_INVESTOR_PROFILES))
+
+
+def stage_interval() -> int:
+    return int(
+        current_app.config.get("UNIVERSE_STAGE_INTERVAL", UNIVERSE_STAGE_INTERVAL_SECONDS)
+    )
+
+
+def stage_cache_key(coin: str, interval: int, now: Optional[float] = None) -> str:
+    """Key of ``coin``'s snapshot for the interval containing ``now``."""
+    bucket = int((time.time() if now is None else now) // max(interval, 1))
+    return f"analysis:stage:{coin}:{bucket}"
+
+
+def _risk_level(volatility: float) -> str:
+    return "high" if volatility > 0.1 else "medium" if volatility > 0.05 else "low"
+
+
+def _first(value) -> Optional[float]:
+    # Çok günlük tahminlerde yalnızca ilk gün saklanır
+    if isinstance(value, (list, tuple)):
+        value = value[0] if value else None
+    return None if value is None else float(value)
+
+
+def build_coin_snapshot(system: Any, coin: str) -> Dict[str, Any]:
+    """Run the coin-level stages (collect, indicators, sentiment, forecast)."""
+    price_data = system.collector.collect_price_data(coin)
+    onchain = system.collector.collect_onchain_data(coin)
+    social = system.collector.collect_social_data(coin)
+    news = system.collector.collect_news_data(coin)
+    all_news_text = " ".join(
+        f"{n.get('title','')} {n.get('description','')}" for n in news
+    )
+    _, news_score = system.ai.analyze_sentiment(all_news_text)
+    forecast, _method, bounds, _dates, _confidence, explanation = system.ai.forecast(
+        price_data["prices"], price_data["times"], coin_name=coin
+    )
+    prices = np.asarray(price_data["prices"], dtype=np.float64)
+    volatility = float(np.std(prices) / np.mean(prices)) if len(prices) else 0.0
+
+    return {
+        "coin": coin,
+        "timestamp": datetime.utcnow().isoformat(),
+        "candlestick_pattern": price_data.get("candlestick_pattern"),
+        "decision_input": {
+            "current_price": float(price_data["current_price"]),
+            "rsi": float(price_data["rsi"]),
+            "macd": float(price_data["macd"]),
+            "bb_upper": float(price_data["bb_upper"]),
+            "bb_lower": float(price_data["bb_lower"]),
+            "stochastic": float(price_data["stochastic"]),
+            "news_sentiment": float(news_score),
+            **social,
+            **onchain,
+            "volatility": volatility,
+        },
+        "forecast": {
+            "next_day": _first(forecast),
+            "upper": _first(bounds.get("upper")),
+            "lower": _first(bounds.get("lower")),
+            "explanation": explanation,
+        },
+    }
+
+
+def get_coin_snapshot(
+    system: Any, coin: str, redis_client=None, interval: Optional[int] = None
+) -> Dict[str, Any]:
+    """Return ``coin``'s snapshot for the current interval, building it once."""
+    interval = stage_interval() if interval is None else interval
+    key = stage_cache_key(coin, interval)
+    if redis_client is not None:
+        try:
+            cached = redis_client.get(key)
+            if cached:
+                return json.loads(cached)
+        except Exception as e:  # Redis yoksa her seferinde hesaplanır
+            logger.warning(f"Stage cache read failed ({coin}): {e}")
+
+    snapshot = build_coin_snapshot(system, coin)
+    if redis_client is not None:
+        try:
+            redis_client.set(key, json.dumps(snapshot), ex=interval)
+        except Exception as e:
+            logger.warning(f"Stage cache write failed ({coin}): {e}")
+    return snapshot
+
+
+def decision_fields(snap: Dict[str, Any], decision: Dict[str, Any]) -> Dict[str, Any]:
+    """``DBHData`` columns for one profile's ``decision`` on a coin snapshot."""
+    inputs = snap["decision_input"]
+    forecast = snap["forecast"]
+    return {
+        "rsi": inputs["rsi"],
+        "macd": inputs["macd"],
+        "bb_upper": inputs["bb_upper"],
+        "bb_lower": inputs["bb_lower"],
+        "stochastic_oscillator": inputs["stochastic"],
+        "candlestick_pattern": snap.get("candlestick_pattern"),
+        "news_sentiment": inputs["news_sentiment"],
+        "twitter_sentiment": inputs.get("twitter_sentiment"),
+        "social_volume": inputs.get("social_volume"),
+        "active_addresses": inputs.get("active_addresses"),
+        "exchange_inflow": inputs.get("exchange_inflow"),
+        "exchange_outflow": inputs.get("exchange_outflow"),
+        "forecast_next_day": forecast["next_day"],
+        "forecast_upper_bound": forecast["upper"],
+        "forecast_lower_bound": forecast["lower"],
+        "forecast_explanation": forecast["explanation"],
+        "volatility": inputs["volatility"],
+        "signal": decision["signal"],
+        "confidence": decision["confidence"],
+        "risk_level": _risk_level(inputs["volatility"]),
+        "suggested_stop_loss": decision["stop_loss"],
+        "suggested_position_size": decision["position_size_pct"],
+    }
+
+
+def decide_profiles(
+    engine: Any, snapshots: Iterable[Optional[Dict[str, Any]]], profiles: List[str]
+) -> List[Dict[str, Any]]:
+    """Apply ``engine.decide`` for every profile to every snapshot.
+
+    Returns ``DBHData`` mappings ready for a bulk insert; missing snapshots
+    (failed coin stages) are skipped.
+    """
+    rows = []
+    for snap in snapshots:
+        if not snap:
+            continue
+        for profile in profiles:
+            decision = engine.decide(snap["decision_input"], profile)
+            rows.append(
+                {
+                    "coin": snap["coin"],
+                    "profile": profile,
+                    "timestamp": snap["timestamp"],
+                    **decision_fields(snap, decision),
+                }
+            )
+    return rows
+
+
+def write_analysis_rows(rows: List[Dict[str, Any]]) -> int:
+    """Store all profile decisions of a universe run with a single commit."""
+    if not rows:
+        return 0
+    db.session.bulk_insert_mappings(DBHData, rows)
+    db.session.commit()
+    return len(rows)
@@ -0,0 +1,414 @@
+"""Windowed usage counters backed by Redis.
+
+Limit checks read a fixed set of keys per ``(user, action)`` instead of
+counting ``usage_log`` rows.  The keys share the ``usage:<user>:<feature>:``
+keyspace with ``check_usage_limit`` (``backend.utils.usage_limits``), so a
+feature has one day and one month counter whichever path counts it:
+
+* ``day``          – calendar day (UTC), ``...:day:<YYYYMMDD>``
+* ``month``        – calendar month (UTC), ``...:month:<YYYYMM>``
+* ``rolling_24h``  – sum of 24 hourly buckets, ``...:hour:<YYYYMMDDHH>``
+* ``total``        – all time, ``...:total``
+
+Counters missing from Redis (first use in a window, Redis restart) are seeded
+once from ``usage_log`` – the all-time counter from the daily rollups, which
+outlive the raw rows – plus the rows still waiting in this process's
+write-behind buffer; the hourly buckets carry a marker key that stays alive
+while the user is active so they are seeded only after 24h of inactivity.
+``consume`` seeds, checks a limit on one window and increments every window
+in one Lua script (``CONSUME_USAGE_LUA``), so concurrent requests can neither
+overshoot a limit nor lose a use, and a use already seeded into Redis costs a
+single round trip.  ``usage_log`` rows themselves are written behind in
+batches for auditing, together with their hourly and daily rollups
+(``backend.services.usage_rollup``).  Without a reachable Redis everything
+falls back to the database: counts are ``COUNT(*)`` queries and rows are
+written synchronously.
+"""
+
+from collections import Counter
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from flask import current_app
+from loguru import logger
+from sqlalchemy import func
+
+from backend.db import db
+from backend.db.models import UsageLog, UsageRollup
+from backend.db.write_behind import WriteBehindBuffer
+from backend.services.usage_rollup import bump_rollups
+
+WINDOWS = ("day", "rolling_24h", "month")
+# CONSUME_USAGE_LUA içindeki pencere numaraları
+LIMIT_WINDOWS = {"day": 1, "month": 2, "total": 3, "rolling_24h": 4}
+HOUR_BUCKETS = 24
+# Anahtarlar pencere bitiminden sonra bu kadar daha yaşar (saat kayması payı)
+TTL_GRACE_SECONDS = 60 * 60
+# Tüm zamanlar sayacı kullanılmadıkça bu süre sonra silinir, sonra özetlerden yeniden tohumlanır
+TOTAL_TTL_SECONDS = 30 * 24 * 60 * 60
+
+# KEYS: gün, ay, tüm zamanlar, saatlik işaret, 24 saatlik kova (şimdiki saat ilk)
+# ARGV: tohum var mı (0/1), gün/ay/saat/tüm zamanlar TTL, limit penceresi
+#       (0 yok, LIMIT_WINDOWS), limit (-1 sınırsız), gün/ay/tüm zamanlar tohumu,
+#       24 kova tohumu
+# Dönüş: {durum, kullanım} – durum -1 tohum gerekli, 0 limit aşıldı, 1 sayıldı.
+CONSUME_USAGE_LUA = """
+if ARGV[1] == '0' then
+  for i = 1, 4 do
+    if redis.call('EXISTS', KEYS[i]) == 0 then
+      return {-1, 0}
+    end
+  end
+else
+  redis.call('SET', KEYS[1], ARGV[8], 'NX', 'EX', ARGV[2])
+  redis.call('SET', KEYS[2], ARGV[9], 'NX', 'EX', ARGV[3])
+  redis.call('SET', KEYS[3], ARGV[10], 'NX', 'EX', ARGV[5])
+  if redis.call('SET', KEYS[4], 1, 'NX', 'EX', ARGV[4]) then
+    for i = 5, #KEYS do
+      if tonumber(ARGV[i + 6]) > 0 then
+        redis.call('SET', KEYS[i], ARGV[i + 6], 'EX', ARGV[4])
+      end
+    end
+  end
+end
+local window = tonumber(ARGV[6])
+local used = 0
+if window == 4 then
+  for i = 5, #KEYS do
+    used = used + tonumber(redis.call('GET', KEYS[i]) or '0')
+  end
+elseif window > 0 then
+  used = tonumber(redis.call('GET', KEYS[window]) or '0')
+end
+local limit = tonumber(ARGV[7])
+if limit >= 0 and used >= limit then
+  return {0, used}
+end
+redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+redis.call('INCR', KEYS[3])
+redis.call('EXPIRE', KEYS[3], ARGV[5])
+redis.call('INCR', KEYS[5])
+redis.call('EXPIRE', KEYS[5], ARGV[4])
+redis.call('EXPIRE', KEYS[4], ARGV[4])
+return {1, used + 1}
+"""
+
+
+def usage_key(user_id: int, feature: str, window: str, now: Optional[datetime] = None) -> str:
+    """Redis key of ``feature``'s ``window`` counter (``day``, ``month``, ``hour`` or ``total``)."""
+    prefix = f"usage:{user_id}:{feature}"
+    if window == "total":
+        return f"{prefix}:total"
+    stamp = {"day": "%Y%m%d", "month": "%Y%m", "hour": "%Y%m%d%H"}[window]
+    return f"{prefix}:{window}:{now:{stamp}}"
+
+
+class UsageLogBuffer(WriteBehindBuffer):
+    """Write-behind buffer for ``usage_log`` rows and their rollups."""
+
+    def __init__(self, **kwargs):
+        super().__init__(UsageLog, **kwargs)
+
+    def _write(self, rows: List[dict]) -> None:
+        super()._write(rows)
+        bump_rollups(rows)
+
+
+usage_log_buffer = UsageLogBuffer()
+
+
+def init_usage_counters(app) -> None:
+    """Bind the ``usage_log`` write-behind buffer to ``app``."""
+    usage_log_buffer.bind(
+        app,
+        app.config.get("USAGE_LOG_FLUSH_SECONDS", usage_log_buffer.flush_seconds),
+        app.config.get("USAGE_LOG_BATCH_SIZE", usage_log_buffer.batch_size),
+    )
+
+
+def _day_start(now: datetime) -> datetime:
+    return now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _month_start(now: datetime) -> datetime:
+    return _day_start(now).replace(day=1)
+
+
+def _next_month(now: datetime) -> datetime:
+    return (_month_start(now) + timedelta(days=32)).replace(day=1)
+
+
+def _hour(now: datetime) -> datetime:
+    return now.replace(minute=0, second=0, microsecond=0)
+
+
+@lru_cache(maxsize=8)
+def _consume_script(redis_client):
+    return redis_client.register_script(CONSUME_USAGE_LUA)
+
+
+class UsageCounters:
+    """Read and bump the windowed counters of one Redis client."""
+
+    def __init__(self, redis_client, buffer: Optional[WriteBehindBuffer] = None):
+        self.redis = redis_client
+        self.buffer = buffer if buffer is not None else usage_log_buffer
+
+    # -- anahtarlar -------------------------------------------------------
+    @staticmethod
+    def _day_key(user_id: int, action: str, now: datetime) -> str:
+        return usage_key(user_id, action, "day", now)
+
+    @staticmethod
+    def _keys(user_id: int, action: str, now: datetime) -> List[str]:
+        """[gün, ay, tüm zamanlar, saatlik işaret, saatlik kovalar...]"""
+        hour = _hour(now)
+        return [
+            usage_key(user_id, action, "day", now),
+            usage_key(user_id, action, "month", now),
+            usage_key(user_id, action, "total"),
+            f"usage:{user_id}:{action}:hour:seeded",
+        ] + [usage_key(user_id, action, "hour", hour - timedelta(hours=i)) for i in range(HOUR_BUCKETS)]
+
+    # -- veritabanı yedeği ------------------------------------------------
+    @staticmethod
+    def _db_count(user_id: int, action: str, since: datetime, strict: bool = False) -> int:
+        column = UsageLog.timestamp > since if strict else UsageLog.timestamp >= since
+        return (
+            db.session.query(func.count(UsageLog.id))
+            .filter(UsageLog.user_id == user_id, UsageLog.action == action, column)
+            .scalar()
+            or 0
+        )
+
+    @staticmethod
+    def _db_day_counts(user_id: int, actions: List[str], now: datetime) -> Dict[str, int]:
+        rows = (
+            db.session.query(UsageLog.action, func.count(UsageLog.id))
+            .filter(
+                UsageLog.user_id == user_id,
+                UsageLog.action.in_(actions),
+                UsageLog.timestamp >= _day_start(now),
+            )
+            .group_by(UsageLog.action)
+            .all()
+        )
+        counts = dict.fromkeys(actions, 0)
+        counts.update({action: int(n) for action, n in rows})
+        return counts
+
+    def _db_counts(self, user_id: int, action: str, now: datetime) -> Dict[str, int]:
+        return {
+            "day": self._db_count(user_id, action, _day_start(now)),
+            "rolling_24h": self._db_count(user_id, action, now - timedelta(hours=24), strict=True),
+            "month": self._db_count(user_id, action, _month_start(now)),
+        }
+
+    def _buffered(self, user_id: int, action: str, since: datetime) -> List[datetime]:
+        """Timestamps of matching rows not yet flushed from the buffer."""
+        return [
+            row["timestamp"]
+            for row in self.buffer.pending()
+            if row.get("user_id") == user_id and row.get("action") == action and row["timestamp"] >= since
+        ]
+
+    def _seed_value(self, user_id: int, action: str, since: datetime) -> int:
+        return self._db_count(user_id, action, since) + len(self._buffered(user_id, action, since))
+
+    def _db_total(self, user_id: int, action: str, now: datetime) -> int:
+        """All-time count from the database.
+
+        Days before today come from the daily rollups, which outlive the raw
+        ``usage_log`` retention, so purging old rows does not reset lifetime
+        limits; today is counted from ``usage_log``.  Buffered rows are in
+        neither yet and are added separately.
+        """
+        today = _day_start(now)
+        past = (
+            db.session.query(func.sum(UsageRollup.count))
+            .filter(
+                UsageRollup.granularity == "day",
+                UsageRollup.user_id == user_id,
+                UsageRollup.action == action,
+                UsageRollup.bucket < today,
+            )
+            .scalar()
+            or 0
+        )
+        return int(past) + self._db_count(user_id, action, today) + len(self._buffered(user_id, action, datetime.min))
+
+    def _hour_values(self, user_id: int, action: str, now: datetime) -> List[int]:
+        since = _hour(now) - timedelta(hours=HOUR_BUCKETS - 1)
+        stamps = (
+            db.session.query(UsageLog.timestamp)
+            .filter(UsageLog.user_id == user_id, UsageLog.action == action, UsageLog.timestamp >= since)
+            .all()
+        )
+        per_hour = Counter(_hour(ts) for (ts,) in stamps if ts is not None)
+        per_hour.update(_hour(ts) for ts in self._buffered(user_id, action, since))
+        return [per_hour.get(_hour(now) - timedelta(hours=i), 0) for i in range(HOUR_BUCKETS)]
+
+    def _seed_hours(self, user_id: int, action: str, now: datetime, keys: List[str]) -> List[int]:
+        values = self._hour_values(user_id, action, now)
+        ttl = int(timedelta(hours=HOUR_BUCKETS + 1).total_seconds())
+        pipe = self.redis.pipeline()
+        for key, value in zip(keys[4:], values):
+            if value:
+                pipe.set(key, value, ex=ttl)
+        pipe.set(keys[3], 1, ex=ttl)
+        pipe.execute()
+        return values
+
+    def _seed(self, key: str, value: int, expires_at: datetime, now: datetime) -> int:
+        ttl = int((expires_at - now).total_seconds()) + TTL_GRACE_SECONDS
+        if self.redis.set(key, value, nx=True, ex=ttl):
+            return value
+        return int(self.redis.get(key) or 0)
+
+    # -- genel arayüz ------------------------------------------------------
+    def counts(self, user_id: int, action: str, now: Optional[datetime] = None) -> Dict[str, int]:
+        """All windows for ``(user_id, action)`` in one Redis round trip."""
+        now = now or datetime.utcnow()
+        if self.redis is None:
+            return self._db_counts(user_id, action, now)
+        keys = self._keys(user_id, action, now)
+        try:
+            values = self.redis.mget(keys[:2] + keys[3:])
+            day, month, seeded = values[:3]
+            if day is None:
+                since = _day_start(now)
+                day = self._seed(keys[0], self._seed_value(user_id, action, since), since + timedelta(days=1), now)
+            if month is None:
+                since = _month_start(now)
+                month = self._seed(keys[1], self._seed_value(user_id, action, since), _next_month(now), now)
+            hours = values[3:] if seeded is not None else self._seed_hours(user_id, action, now, keys)
+        except Exception as e:
+            logger.debug(f"Usage counters unavailable, counting usage_log ({action}): {e}")
+            return self._db_counts(user_id, action, now)
+        return {
+            "day": int(day),
+            "rolling_24h": sum(int(v or 0) for v in hours),
+            "month": int(month),
+        }
+
+    def day_counts(self, user_id: int, actions, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Today's count for every action in ``actions`` with one ``MGET``.
+
+        Day counters missing from Redis are seeded together from a single
+        grouped ``usage_log`` query, so the cost does not grow with the
+        number of actions.
+        """
+        now = now or datetime.utcnow()
+        actions = list(dict.fromkeys(actions))
+        if not actions:
+            return {}
+        if self.redis is None:
+            return self._db_day_counts(user_id, actions, now)
+        keys = [self._day_key(user_id, action, now) for action in actions]
+        try:
+            values = dict(zip(actions, self.redis.mget(keys)))
+            missing = [action for action in actions if values[action] is None]
+            if missing:
+                seeded = self._db_day_counts(user_id, missing, now)
+                for action in missing:
+                    seeded[action] += len(self._buffered(user_id, action, _day_start(now)))
+                ttl = int((_day_start(now) + timedelta(days=1) - now).total_seconds()) + TTL_GRACE_SECONDS
+                pipe = self.redis.pipeline()
+                for action in missing:
+                    pipe.set(self._day_key(user_id, action, now), seeded[action], nx=True, ex=ttl)
+                pipe.execute()
+                values.update(seeded)
+        except Exception as e:
+            logger.debug(f"Usage counters unavailable, counting usage_log: {e}")
+            return self._db_day_counts(user_id, actions, now)
+        return {action: int(value) for action, value in values.items()}
+
+    def count(self, user_id: int, action: str, window: str = "day", now: Optional[datetime] = None) -> int:
+        if window not in WINDOWS:
+            raise ValueError(f"Unknown usage window: {window}")
+        return self.counts(user_id, action, now)[window]
+
+    def total(self, user_id: int, action: str, now: Optional[datetime] = None) -> int:
+        """All-time count of ``(user_id, action)`` – one ``GET`` once seeded."""
+        now = now or datetime.utcnow()
+        if self.redis is not None:
+            key = usage_key(user_id, action, "total")
+            try:
+                value = self.redis.get(key)
+                if value is not None:
+                    return int(value)
+                seed = self._db_total(user_id, action, now)
+                if self.redis.set(key, seed, nx=True, ex=TOTAL_TTL_SECONDS):
+                    return seed
+                return int(self.redis.get(key) or 0)
+            except Exception as e:
+                logger.debug(f"Usage counters unavailable, counting usage history ({action}): {e}")
+        return self._db_total(user_id, action, now)
+
+    def consume(
+        self,
+        user_id: int,
+        action: str,
+        limit: Optional[int] = None,
+        window: str = "rolling_24h",
+        now: Optional[datetime] = None,
+    ) -> Tuple[bool, int]:
+        """Count one use unless ``window`` already reached ``limit``.
+
+        Returns ``(allowed, used)`` where ``used`` is the window's count
+        including this use when it was allowed.  With Redis the check and
+        every increment run in one script; the database fallback cannot
+        make the check atomic.
+        """
+        if window not in LIMIT_WINDOWS:
+            raise ValueError(f"Unknown usage window: {window}")
+        now = now or datetime.utcnow()
+        row = {"user_id": user_id, "action": action, "timestamp": now}
+        if self.redis is not None:
+            keys = self._keys(user_id, action, now)
+            args = [
+                int((_day_start(now) + timedelta(days=1) - now).total_seconds()) + TTL_GRACE_SECONDS,
+                int((_next_month(now) - now).total_seconds()) + TTL_GRACE_SECONDS,
+                int(timedelta(hours=HOUR_BUCKETS + 1).total_seconds()),
+                TOTAL_TTL_SECONDS,
+                LIMIT_WINDOWS[window] if limit is not None else 0,
+                -1 if limit is None else int(limit),
+            ]
+            try:
+                script = _consume_script(self.redis)
+                status, used = (int(v) for v in script(keys=keys, args=[0] + args))
+                if status < 0:
+                    # Eksik pencereler aynı betik içinde geçmişten doldurulur, sonra denetlenir
+                    seeds = [
+                        self._seed_value(user_id, action, _day_start(now)),
+                        self._seed_value(user_id, action, _month_start(now)),
+                        self._db_total(user_id, action, now),
+                    ] + self._hour_values(user_id, action, now)
+                    status, used = (int(v) for v in script(keys=keys, args=[1] + args + seeds))
+                if status:
+                    self.buffer.record(row)
+                return bool(status), used
+            except Exception as e:
+                logger.debug(f"Usage counters unavailable, writing usage_log directly ({action}): {e}")
+        used = 0
+        if limit is not None:
+            used = self.total(user_id, action, now) if window == "total" else self.counts(user_id, action, now)[window]
+            if used >= limit:
+                return False, used
+        db.session.add(UsageLog(**row))
+        bump_rollups([row])
+        db.session.commit()
+        return True, used + 1
+
+    def record(self, user_id: int, action: str, now: Optional[datetime] = None) -> None:
+        """Count one use and queue its ``usage_log`` row."""
+        self.consume(user_id, action, now=now)
+
+
+def usage_counters() -> UsageCounters:
+    """Counters bound to the current app's Redis client."""
+    return UsageCounters(current_app.extensions.get("redis_client"))
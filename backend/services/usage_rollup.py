@@ -0,0 +1,210 @@
+"""Hourly and daily usage rollups.
+
+``usage_rollup`` keeps one row per ``(granularity, user, action, bucket)``
+with the number of ``usage_log`` rows in that hour or day.  Rollups are
+bumped in the same transaction that inserts the raw rows (the write-behind
+flush, or the synchronous fallback without Redis), so they never drift from
+the log.  Admin and user usage views read rollups and touch a number of rows
+proportional to the buckets shown, not to the history size.
+
+Raw ``usage_log`` rows older than ``USAGE_LOG_RETENTION_DAYS`` and hourly
+rollups older than ``USAGE_ROLLUP_HOURLY_RETENTION_DAYS`` are purged by a
+maintenance task; daily rollups are kept, and all-time totals (lifetime plan
+limits) are read from them so the purge does not reset them.
+"""
+
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import bindparam, func, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from backend.db import db
+from backend.db.models import UsageLog, UsageRollup, User
+
+GRANULARITIES = ("hour", "day")
+DEFAULT_LOG_RETENTION_DAYS = 90
+DEFAULT_HOURLY_RETENTION_DAYS = 30
+# Günlük ve aylık sayaçlar usage_log'dan tohumlandığı için ham kayıtlar en az bu kadar tutulur
+MIN_LOG_RETENTION_DAYS = 32
+
+RollupKey = Tuple[str, int, str, datetime]
+# ON CONFLICT DO UPDATE destekleyen lehçeler
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def bucket_start(ts: datetime, granularity: str) -> datetime:
+    if granularity == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"Unknown rollup granularity: {granularity}")
+
+
+def rollup_counts(rows: Iterable[Dict[str, Any]]) -> Counter:
+    """Count ``usage_log`` row mappings per rollup key."""
+    counts: Counter = Counter()
+    for row in rows:
+        ts = row.get("timestamp") or datetime.utcnow()
+        for granularity in GRANULARITIES:
+            counts[(granularity, row["user_id"], row["action"], bucket_start(ts, granularity))] += 1
+    return counts
+
+
+def bump_rollups(rows: Iterable[Dict[str, Any]]) -> int:
+    """Stage rollup increments for ``rows`` in the current session.
+
+    On PostgreSQL and SQLite every bucket is upserted in one statement
+    (``INSERT ... ON CONFLICT DO UPDATE SET count = count + excluded.count``),
+    so concurrent writers of the same bucket merge instead of failing the
+    unique constraint.  Other databases look existing buckets up, increment
+    them in SQL and insert the rest inside a savepoint; a concurrent insert
+    of the same bucket rolls the savepoint back and the step is retried once,
+    now finding the row.  Returns the number of keys touched.
+    """
+    counts = rollup_counts(rows)
+    if not counts:
+        return 0
+    # Sabit sıra, eşzamanlı yazıcıların satır kilitlerini aynı sırayla almasını sağlar
+    keys = sorted(counts)
+    insert = _UPSERT_INSERTS.get(db.session.get_bind().dialect.name)
+    if insert is not None:
+        table = UsageRollup.__table__
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["granularity", "user_id", "action", "bucket"],
+            set_={"count": table.c.count + stmt.excluded["count"]},
+        )
+        columns = ("granularity", "user_id", "action", "bucket")
+        db.session.execute(stmt, [dict(zip(columns, key), count=counts[key]) for key in keys])
+        return len(keys)
+    try:
+        with db.session.begin_nested():
+            _bump_existing_then_insert(keys, counts)
+    except IntegrityError:
+        with db.session.begin_nested():
+            _bump_existing_then_insert(keys, counts)
+    return len(keys)
+
+
+def _bump_existing_then_insert(keys: List[RollupKey], counts: Counter) -> None:
+    table = UsageRollup.__table__
+    increments: List[Dict[str, Any]] = []
+    inserts: List[Dict[str, Any]] = []
+    for granularity in GRANULARITIES:
+        wanted = [k for k in keys if k[0] == granularity]
+        if not wanted:
+            continue
+        existing = {
+            (granularity, user_id, action, bucket): rollup_id
+            for rollup_id, user_id, action, bucket in db.session.query(
+                UsageRollup.id, UsageRollup.user_id, UsageRollup.action, UsageRollup.bucket
+            ).filter(
+                UsageRollup.granularity == granularity,
+                UsageRollup.user_id.in_({k[1] for k in wanted}),
+                UsageRollup.action.in_({k[2] for k in wanted}),
+                UsageRollup.bucket.in_({k[3] for k in wanted}),
+            )
+        }
+        for key in wanted:
+            if key in existing:
+                increments.append({"rollup_id": existing[key], "amount": counts[key]})
+            else:
+                _, user_id, action, bucket = key
+                inserts.append(
+                    {"granularity": granularity, "user_id": user_id, "action": action, "bucket": bucket, "count": counts[key]}
+                )
+    if increments:
+        db.session.execute(
+            update(table)
+            .where(table.c.id == bindparam("rollup_id"))
+            .values(count=table.c.count + bindparam("amount")),
+            increments,
+        )
+    if inserts:
+        db.session.bulk_insert_mappings(UsageRollup, inserts)
+
+
+def usage_totals(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    user_id: Optional[int] = None,
+    limit: int = 100,
+) -> List[Dict[str, Any]]:
+    """Per user and action totals over whole days, busiest first.
+
+    Without ``since`` the totals cover all recorded history.
+    """
+    total = func.sum(UsageRollup.count).label("count")
+    query = (
+        db.session.query(UsageRollup.user_id, User.username, UsageRollup.action, total)
+        .join(User, User.id == UsageRollup.user_id)
+        .filter(UsageRollup.granularity == "day")
+    )
+    if since is not None:
+        query = query.filter(UsageRollup.bucket >= bucket_start(since, "day"))
+    if until is not None:
+        query = query.filter(UsageRollup.bucket <= until)
+    if user_id is not None:
+        query = query.filter(UsageRollup.user_id == user_id)
+    rows = (
+        query.group_by(UsageRollup.user_id, User.username, UsageRollup.action)
+        .order_by(total.desc())
+        .limit(limit)
+        .all()
+    )
+    return [
+        {"user_id": uid, "username": username, "action": action, "count": int(count)}
+        for uid, username, action, count in rows
+    ]
+
+
+def usage_series(
+    user_id: int,
+    granularity: str = "day",
+    since: Optional[datetime] = None,
+    action: Optional[str] = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """``{action: [{"bucket", "count"}, ...]}`` for one user, oldest first."""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown rollup granularity: {granularity}")
+    query = UsageRollup.query.filter(
+        UsageRollup.granularity == granularity, UsageRollup.user_id == user_id
+    )
+    if since is not None:
+        query = query.filter(UsageRollup.bucket >= bucket_start(since, granularity))
+    if action is not None:
+        query = query.filter(UsageRollup.action == action)
+    series: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for row in query.order_by(UsageRollup.bucket):
+        series[row.action].append({"bucket": row.bucket.isoformat(), "count": row.count})
+    return dict(series)
+
+
+def purge_usage_history(
+    log_retention_days: Optional[int] = None,
+    hourly_retention_days: Optional[int] = None,
+    now: Optional[datetime] = None,
+) -> Dict[str, int]:
+    """Delete raw ``usage_log`` rows and hourly rollups past their retention."""
+    config = current_app.config
+    log_days = max(
+        log_retention_days or int(config.get("USAGE_LOG_RETENTION_DAYS", DEFAULT_LOG_RETENTION_DAYS)),
+        MIN_LOG_RETENTION_DAYS,
+    )
+    hourly_days = hourly_retention_days or int(
+        config.get("USAGE_ROLLUP_HOURLY_RETENTION_DAYS", DEFAULT_HOURLY_RETENTION_DAYS)
+    )
+    now = now or datetime.utcnow()
+    logs = UsageLog.query.filter(UsageLog.timestamp < now - timedelta(days=log_days)).delete(
+        synchronize_session=False
+    )
+    hourly = UsageRollup.query.filter(
+        UsageRollup.granularity == "hour",
+        UsageRollup.bucket < bucket_start(now - timedelta(days=hourly_days), "hour"),
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return {"usage_log": logs, "hourly_rollups": hourly}
@@ -1,6 +1,7 @@
 import os
 from celery import Celery
-from kombu import Exchange, Queue
+
+from backend.tasks.queues import celery_settings
 
 celery_app = Celery(
     "ytdcrypto",
@@ -11,18 +12,7 @@ celery_app = Celery(
 
 def init_celery(app):
     """Bind Celery configuration to the Flask app."""
-    celery_app.conf.update(
-        task_serializer="json",
-        result_serializer="json",
-        accept_content=["json"],
-        timezone=app.config.get("CELERY_TIMEZONE", "UTC"),
-        enable_utc=app.config.get("CELERY_ENABLE_UTC", True),
-        beat_schedule=app.config.get("CELERY_BEAT_SCHEDULE", {}),
-        task_queues=[
-            Queue("default", Exchange("default"), routing_key="default"),
-        ],
-        **{k: v for k, v in app.config.items() if k.startswith("CELERY_")},
-    )
+    celery_app.conf.update(celery_settings(app.config))
 
     class ContextTask(celery_app.Task):
         def __call__(self, *args, **kwargs):
@@ -36,6 +26,10 @@ def autodiscover_tasks():
     """Import Celery task modules."""
     import backend.tasks.celery_tasks  # noqa
     import backend.tasks.plan_tasks  # noqa
+    import backend.tasks.backtest_tasks  # noqa
+    import backend.tasks.universe_tasks  # noqa
+    import backend.tasks.telemetry  # noqa
+    import backend.tasks.worker  # noqa
 
 
 if os.getenv("FLASK_ENV") != "testing":
@@ -0,0 +1,65 @@
+"""Celery tasks for rule backtests and parameter sweeps."""
+
+import logging
+
+from backend import celery_app, socketio
+from backend.services.backtest import load_decision_rules
+from backend.services.realtime import user_room
+from backend.services.sweep import run_sweep
+from backend.tasks.worker import task_app
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(name="backend.tasks.backtest_tasks.run_parameter_sweep", bind=True)
+def run_parameter_sweep(
+    self,
+    coins,
+    profile,
+    start,
+    end,
+    configs,
+    objective="sharpe_ratio",
+    max_workers=None,
+    sweep_id=None,
+    user_id=None,
+):
+    """Run a parameter sweep and stream its progress.
+
+    The sweep forks its own process pool, so this task is routed to the
+    ``analysis-sweep`` queue, whose worker runs ``-P solo`` rather than as a
+    daemonic prefork child.
+    """
+    ctx_app = task_app()
+    with ctx_app.app_context():
+        sweep_id = sweep_id or self.request.id.replace("-", "")
+        state = {"last": 0}
+
+        def _progress(done, total):
+            # Yaklaşık her %1'de bir bildirim yeterli
+            if done < total and done - state["last"] < max(1, total // 100):
+                return
+            state["last"] = done
+            meta = {"sweep_id": sweep_id, "done": done, "total": total}
+            self.update_state(state="PROGRESS", meta=meta)
+            if user_id is None:
+                return
+            try:
+                # Yalnızca taramayı başlatan yönetici bilgilendirilir
+                socketio.emit("sweep_progress", meta, to=user_room(user_id), namespace="/")
+            except Exception:
+                logger.exception("Sweep progress emit failed")
+
+        logger.info("Parameter sweep %s started: %d configs", sweep_id, len(configs))
+        return run_sweep(
+            coins,
+            profile,
+            start,
+            end,
+            configs,
+            load_decision_rules(),
+            objective=objective,
+            max_workers=max_workers,
+            progress=_progress,
+            sweep_id=sweep_id,
+        )
@@ -2,16 +2,11 @@
 
 from datetime import datetime
 import os
-import json
-import traceback
 from dataclasses import asdict
-try:
-    import numpy as np  # Ağır bağımlılık, test ortamında mevcut olmayabilir
-except Exception:  # pragma: no cover
-    np = None
 
-from backend import celery_app, socketio, logger, create_app
-from flask import current_app
+from backend import celery_app, socketio, logger
+from backend.constants import CELERY_ANALYSIS_TIME_LIMIT
+from flask import has_app_context
 # Test ortamında 'backend.core.services' bağımlılığını yüklemek gereksizdir.
 try:
     from backend.core.services import YTDCryptoSystem, AnalysisResult
@@ -20,134 +15,105 @@ except Exception:  # pragma: no cover
 from backend.db.models import (
     User,
     SubscriptionPlan,
-    CeleryTaskLog,
-    CeleryTaskStatus,
 )
 from backend import db
+from backend.services.analysis_cache import (
+    release_analysis,
+    store_analysis_failure,
+    store_analysis_result,
+)
+from backend.services.realtime import publish_analysis
+from backend.services.universe import decision_fields, get_coin_snapshot
+from backend.tasks.worker import analysis_system, task_app
 
 
 
-@celery_app.task(name="backend.tasks.celery_tasks.run_full_analysis", bind=True)
-def run_full_analysis(self, coin_id: str, investor_profile: str = "moderate", user_id: int | None = None):
+@celery_app.task(
+    name="backend.tasks.celery_tasks.run_full_analysis",
+    bind=True,
+    acks_late=True,
+    time_limit=CELERY_ANALYSIS_TIME_LIMIT,
+)
+def run_full_analysis(
+    self,
+    coin_id: str,
+    investor_profile: str = "moderate",
+    user_id: int | None = None,
+    data_version: int | None = None,
+    task_id: str | None = None,
+):
+    task_id = task_id or self.request.id
     logger.info(
         f"Celery: {coin_id.upper()} analizi arka planda baslatildi. Profil: {investor_profile}"
     )
-    with app.app_context():
-        system = YTDCryptoSystem()
-        user = User.query.get(user_id) if user_id is not None else None
-
-        log = CeleryTaskLog(
-            task_id=self.request.id,
-            task_name=self.name,
-            status=CeleryTaskStatus.STARTED,
-        )
-        db.session.add(log)
-        db.session.commit()
+    ctx_app = task_app()
+    with ctx_app.app_context():
+        system = analysis_system(ctx_app)
 
         try:
-            price_data = system.collector.collect_price_data(coin_id)
-            onchain = system.collector.collect_onchain_data(coin_id)
-            social = system.collector.collect_social_data(coin_id)
-            news = system.collector.collect_news_data(coin_id)
-            all_news_text = " ".join(
-                f"{n.get('title','')} {n.get('description','')}" for n in news
-            )
-
-            _, news_score = system.ai.analyze_sentiment(all_news_text)
-            (
-                forecast,
-                _method,
-                forecast_bounds,
-                _dates,
-                _confidence,
-                forecast_exp,
-            ) = system.ai.forecast(
-                price_data["prices"],
-                price_data["times"],
-                coin_name=coin_id,
-            )
-
-            volatility = float(np.std(price_data["prices"]) / np.mean(price_data["prices"]))
-
-            decision_input = {
-                "current_price": price_data["current_price"],
-                "rsi": price_data["rsi"],
-                "macd": price_data["macd"],
-                "bb_upper": price_data["bb_upper"],
-                "bb_lower": price_data["bb_lower"],
-                "stochastic": price_data["stochastic"],
-                "news_sentiment": news_score,
-                **social,
-                **onchain,
-                "volatility": volatility,
-            }
-
-            decision = system.engine.decide(decision_input, investor_profile)
-
+            # Coin aşamaları (toplama, indikatörler, duygu, tahmin) evren analiziyle
+            # paylaşılan anlık görüntüden gelir; burada yalnızca profil kararı verilir
+            snapshot = get_coin_snapshot(system, coin_id, system.redis)
+            decision = system.engine.decide(snapshot["decision_input"], investor_profile)
+            fields = decision_fields(snapshot, decision)
             analysis_result = AnalysisResult(
                 coin=coin_id,
-                timestamp=datetime.utcnow(),
-                rsi=price_data["rsi"],
-                macd=price_data["macd"],
-                bb_upper=price_data["bb_upper"],
-                bb_lower=price_data["bb_lower"],
-                stochastic=price_data["stochastic"],
-                candlestick_pattern=price_data["candlestick_pattern"],
-                news_sentiment=news_score,
-                twitter_sentiment=social["twitter_sentiment"],
-                social_volume=social["social_volume"],
-                active_addresses=onchain["active_addresses"],
-                exchange_inflow=onchain["exchange_inflow"],
-                exchange_outflow=onchain["exchange_outflow"],
-                forecast_next_day=forecast,
-                forecast_explanation=forecast_exp,
-                forecast_upper_bound=forecast_bounds.get("upper"),
-                forecast_lower_bound=forecast_bounds.get("lower"),
-                volatility=volatility,
-                signal=decision["signal"],
-                confidence=decision["confidence"],
-                risk_level="high" if volatility > 0.1 else "medium" if volatility > 0.05 else "low",
-                suggested_stop_loss=decision["stop_loss"],
-                suggested_position_size=decision["position_size_pct"],
+                timestamp=datetime.fromisoformat(snapshot["timestamp"]),
+                stochastic=fields.pop("stochastic_oscillator"),
+                **fields,
             )
 
             system.save_to_dbh(analysis_result)
 
             result_dict = asdict(analysis_result)
-            log.status = CeleryTaskStatus.SUCCESS
-            log.result = json.dumps(result_dict)
-            log.completed_at = datetime.utcnow()
-            db.session.commit()
+            # Bekleyen istekler bu sonucu önbellekten alır
+            store_analysis_result(
+                system.redis, coin_id, investor_profile, result_dict, task_id, data_version
+            )
+            if data_version is not None:
+                release_analysis(system.redis, coin_id, investor_profile, data_version, task_id)
 
             if socketio:
-                socketio.emit(
-                    "analysis_completed",
-                    {"coin": coin_id, "result": result_dict},
-                    namespace="/",
+                # Yalnızca coin odasına küçük bir delta, isteyene ise sonuç bağlantısı
+                publish_analysis(
+                    socketio, system.redis, coin_id, investor_profile, result_dict, task_id, user_id
                 )
 
             return result_dict
         except Exception as e:  # pragma: no cover - logging
-            log.status = CeleryTaskStatus.FAILURE
-            log.traceback = traceback.format_exc()
-            log.completed_at = datetime.utcnow()
-            db.session.commit()
+            # Süre/durum telemetrisi Celery sinyalleriyle toplanır (backend.tasks.telemetry)
+            store_analysis_failure(system.redis, task_id, coin_id, investor_profile)
+            if data_version is not None:
+                release_analysis(system.redis, coin_id, investor_profile, data_version, task_id)
             logger.error(f"Celery gorevi sirasinda hata: {e}")
             raise
 
 
-@celery_app.task(name="backend.tasks.celery_tasks.analyze_coin_task")
-def analyze_coin_task(coin_id: str, investor_profile: str = "moderate", user_id: int | None = None):
+@celery_app.task(
+    name="backend.tasks.celery_tasks.analyze_coin_task",
+    bind=True,
+    acks_late=True,
+    time_limit=CELERY_ANALYSIS_TIME_LIMIT,
+)
+def analyze_coin_task(
+    self,
+    coin_id: str,
+    investor_profile: str = "moderate",
+    user_id: int | None = None,
+    data_version: int | None = None,
+):
     """Backward compatible wrapper for the analysis task."""
-    return run_full_analysis(coin_id, investor_profile, user_id)
+    return run_full_analysis(
+        coin_id, investor_profile, user_id, data_version=data_version, task_id=self.request.id
+    )
 
 
 @celery_app.task
 def check_and_downgrade_subscriptions():
     """Downgrade expired or trial subscriptions to BASIC."""
     logger.info("Celery: abonelikleri kontrol ediyor.")
-    # Mevcut bir Flask uygulama bağlamı yoksa yeni bir uygulama oluştururuz.
-    ctx_app = current_app._get_current_object() if current_app else create_app()
+    # Mevcut bir Flask uygulama bağlamı yoksa işçi sürecinin uygulamasını kullanırız.
+    ctx_app = task_app()
 
     def _process():
         now = datetime.utcnow()
@@ -171,19 +137,63 @@ def check_and_downgrade_subscriptions():
             # Testlerde degisikliklerin hemen gorunmesi icin oturumu yenile
             db.session.remove()
 
-    if current_app:
+    if has_app_context():
         _process()
     else:
         with ctx_app.app_context():
             _process()
 
 
-from backend.utils.alarms import send_alarm, AlarmSeverityEnum
+@celery_app.task(name="backend.tasks.celery_tasks.purge_task_telemetry")
+def purge_task_telemetry():
+    """Delete task telemetry older than ``TASK_TELEMETRY_RETENTION_DAYS``."""
+    from backend.tasks.telemetry import purge_telemetry
+
+    ctx_app = task_app()
+    with ctx_app.app_context():
+        deleted = purge_telemetry()
+        logger.info(f"Celery: {deleted} eski görev telemetrisi silindi.")
+        return deleted
+
+
+@celery_app.task(name="backend.tasks.celery_tasks.purge_usage_history")
+def purge_usage_history():
+    """Apply the raw ``usage_log`` and hourly rollup retention."""
+    from backend.services.usage_rollup import purge_usage_history as purge
+
+    ctx_app = task_app()
+    with ctx_app.app_context():
+        deleted = purge()
+        logger.info(
+            f"Celery: {deleted['usage_log']} eski usage_log kaydı ve "
+            f"{deleted['hourly_rollups']} saatlik kullanım özeti silindi."
+        )
+        return deleted
+
+
+from backend.utils.alarms import send_alarm, pending_alarm_digests, AlarmSeverityEnum
 
 @celery_app.task
 def send_security_alert_task(alert_type: str, details: str = "", severity: str = "INFO"):
     """Send a security alert to external channels."""
     logger.warning(f"Security alert: {alert_type} - {details}")
-    with app.app_context():
+    with task_app().app_context():
         sev = AlarmSeverityEnum[severity] if isinstance(severity, str) else severity
         send_alarm(alert_type, sev, details)
+
+
+@celery_app.task
+def send_alarm_digests():
+    """Bastırılan alarmların tekrar sayılarını özet alarm olarak gönderir."""
+    ctx_app = task_app()
+    with ctx_app.app_context():
+        digests = pending_alarm_digests(ctx_app.extensions["redis_client"])
+        window = ctx_app.config.get("ALARM_SUPPRESS_SECONDS")
+        for digest in digests:
+            send_alarm(
+                digest["alert_type"],
+                AlarmSeverityEnum[digest["severity"]],
+                f"[Özet] {digest['count']} tekrar bastırıldı ({window} sn kayan pencere). "
+                f"Son örnek: {digest['details']}",
+            )
+        return len(digests)
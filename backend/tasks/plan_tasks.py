@@ -1,13 +1,13 @@
 from datetime import datetime
 import logging
 
-from flask import current_app
-
-from backend import celery_app, create_app, db
+from backend import celery_app, db
 from backend.db.models import User, UserRole
 from backend.models.plan import Plan
 from backend.models.pending_plan import PendingPlan
 from backend.models.plan_history import PlanHistory
+from backend.services.limits_cache import invalidate_limits
+from backend.tasks.worker import task_app
 from backend.utils.helpers import add_audit_log
 
 logger = logging.getLogger(__name__)
@@ -17,7 +17,7 @@ logger = logging.getLogger(__name__)
 def auto_downgrade_expired_plans():
     """Downgrade users whose plan has expired to the Free plan."""
     logger.info("Checking for expired plans to downgrade")
-    ctx_app = current_app._get_current_object() if current_app else create_app()
+    ctx_app = task_app()
     with ctx_app.app_context():
         now = datetime.utcnow()
         free_plan = Plan.query.filter_by(name="Free").first()
@@ -44,7 +44,7 @@ def auto_downgrade_expired_plans():
 def auto_expire_boosts():
     """Clear boost features for users where the boost period expired."""
     logger.info("Checking for expired boosts")
-    ctx_app = current_app._get_current_object() if current_app else create_app()
+    ctx_app = task_app()
     with ctx_app.app_context():
         now = datetime.utcnow()
         users = User.query.filter(
@@ -55,13 +55,14 @@ def auto_expire_boosts():
             u.boost_features = None
             u.boost_expire_at = None
             db.session.commit()
+            invalidate_limits(user_id=u.id)
             logger.info("Expired boost cleared for user %s", u.username)
 
 @celery_app.task
 def activate_pending_plans():
     """Activate queued plans when their start time arrives."""
     logger.info("Checking for pending plans to activate")
-    ctx_app = current_app._get_current_object() if current_app else create_app()
+    ctx_app = task_app()
     with ctx_app.app_context():
         now = datetime.utcnow()
         pendings = PendingPlan.query.filter(PendingPlan.start_at <= now).all()
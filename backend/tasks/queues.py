@@ -0,0 +1,187 @@
+"""Celery queue topology, routing and queue SLA metrics.
+
+Redis brokers do not reorder messages by priority inside a queue, so work is
+separated by tier and workload class instead: interactive analyses go to a
+premium or standard queue chosen by plan, batch analysis to
+``analysis-batch``, parameter sweeps (which fork their own process pool) to
+``analysis-sweep`` served by a solo worker, periodic housekeeping to ``maintenance`` and security
+alerts to ``alerts``.  Each queue is consumed by its own worker pool (see
+``CELERY_WORKER_POOLS`` and ``scripts/run_workers.sh``).
+
+Only the idempotent analysis tasks (``run_full_analysis``,
+``analyze_coin_task``, ``coin_stage_task``) acknowledge late, so a worker
+crash re-runs them; they carry a ``time_limit`` well below the Redis
+``visibility_timeout`` so a slow run is not delivered to a second worker.
+Everything else (sweeps, alerts, plan changes) is acknowledged on receipt.
+
+Publishers stamp an ``enqueued_at`` header; workers record the time a task
+spent waiting in its queue so the per-tier SLA can be checked.
+"""
+
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from celery.signals import before_task_publish, task_prerun
+from kombu import Exchange, Queue
+from loguru import logger
+
+from backend.constants import (
+    CELERY_ALERTS_QUEUE,
+    CELERY_ANALYSIS_QUEUE,
+    CELERY_DEFAULT_QUEUE,
+    CELERY_MAINTENANCE_QUEUE,
+    CELERY_PREMIUM_QUEUE,
+    CELERY_QUEUE_SLA_SECONDS,
+    CELERY_STANDARD_QUEUE,
+    CELERY_SWEEP_QUEUE,
+    CELERY_VISIBILITY_TIMEOUT,
+)
+
+QUEUE_NAMES = [
+    CELERY_PREMIUM_QUEUE,
+    CELERY_STANDARD_QUEUE,
+    CELERY_ANALYSIS_QUEUE,
+    CELERY_SWEEP_QUEUE,
+    CELERY_MAINTENANCE_QUEUE,
+    CELERY_ALERTS_QUEUE,
+    CELERY_DEFAULT_QUEUE,
+]
+
+TASK_ROUTES = {
+    "backend.tasks.celery_tasks.run_full_analysis": {"queue": CELERY_STANDARD_QUEUE},
+    "backend.tasks.celery_tasks.analyze_coin_task": {"queue": CELERY_STANDARD_QUEUE},
+    "backend.tasks.universe_tasks.*": {"queue": CELERY_ANALYSIS_QUEUE},
+    "backend.tasks.backtest_tasks.*": {"queue": CELERY_SWEEP_QUEUE},
+    "backend.tasks.celery_tasks.check_and_downgrade_subscriptions": {"queue": CELERY_MAINTENANCE_QUEUE},
+    "backend.tasks.celery_tasks.purge_task_telemetry": {"queue": CELERY_MAINTENANCE_QUEUE},
+    "backend.tasks.celery_tasks.purge_usage_history": {"queue": CELERY_MAINTENANCE_QUEUE},
+    "backend.tasks.plan_tasks.*": {"queue": CELERY_MAINTENANCE_QUEUE},
+    "backend.tasks.celery_tasks.send_security_alert_task": {"queue": CELERY_ALERTS_QUEUE},
+    "backend.tasks.celery_tasks.send_alarm_digests": {"queue": CELERY_ALERTS_QUEUE},
+    "backend.tasks.send_reset_email": {"queue": CELERY_ALERTS_QUEUE},
+}
+
+# Bekleme süresi örnekleri kuyruk başına bu kadar tutulur
+WAIT_SAMPLE_SIZE = 1000
+WAIT_KEY = "celery:queue_wait:{queue}"
+
+
+def celery_queue_config() -> Dict[str, Any]:
+    """Celery settings declaring the tiered queues and their routes."""
+    return {
+        "task_queues": [Queue(name, Exchange(name), routing_key=name) for name in QUEUE_NAMES],
+        "task_routes": TASK_ROUTES,
+        "task_default_queue": CELERY_STANDARD_QUEUE,
+        # Uzun görevler kısa olanların önünü tıkamasın
+        "worker_prefetch_multiplier": 1,
+        # acks_late yalnızca tekrar çalıştırılabilir analiz görevlerinde açıktır
+        # (görev tanımlarında); diğerleri alındığında onaylanır ve yinelenmez.
+        "task_acks_late": False,
+        "broker_transport_options": {"visibility_timeout": CELERY_VISIBILITY_TIMEOUT},
+    }
+
+
+def celery_settings(config) -> Dict[str, Any]:
+    """Translate the Flask ``CELERY_*`` config into Celery setting names.
+
+    ``CELERY_BROKER_URL`` and ``CELERY_BEAT_SCHEDULE`` are not Celery's own
+    (old or new) setting names, so passing the Flask config through as-is
+    leaves the broker and the beat schedule unset.  Celery also refuses to
+    mix old and new names, hence the explicit mapping.
+    """
+    settings = {
+        "broker_url": config.get("CELERY_BROKER_URL"),
+        "result_backend": config.get("CELERY_RESULT_BACKEND"),
+        "timezone": config.get("CELERY_TIMEZONE"),
+        "enable_utc": config.get("CELERY_ENABLE_UTC", True),
+        "beat_schedule": config.get("CELERY_BEAT_SCHEDULE", {}),
+        "task_serializer": "json",
+        "result_serializer": "json",
+        "accept_content": ["json"],
+        **celery_queue_config(),
+    }
+    return {k: v for k, v in settings.items() if v is not None}
+
+
+def analysis_queue_for_plan(plan) -> str:
+    """Queue for an interactive analysis requested by a user on ``plan``."""
+    name = getattr(plan, "name", str(plan)).upper()
+    return CELERY_PREMIUM_QUEUE if name in ("PREMIUM", "ADVANCED") else CELERY_STANDARD_QUEUE
+
+
+_redis = None
+
+
+def _redis_client():
+    global _redis
+    if _redis is None:
+        from redis import Redis
+
+        _redis = Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    return _redis
+
+
+@before_task_publish.connect
+def _stamp_enqueue_time(headers=None, **kwargs):
+    if headers is not None:
+        headers.setdefault("enqueued_at", time.time())
+
+
+@task_prerun.connect
+def _record_queue_wait(task=None, **kwargs):
+    request = getattr(task, "request", None)
+    enqueued_at = getattr(request, "enqueued_at", None) if request else None
+    if not enqueued_at:
+        return
+    queue = (request.delivery_info or {}).get("routing_key") or CELERY_DEFAULT_QUEUE
+    record_wait(_redis_client(), queue, time.time() - float(enqueued_at))
+
+
+def record_wait(redis_client, queue: str, seconds: float) -> None:
+    try:
+        pipe = redis_client.pipeline()
+        pipe.lpush(WAIT_KEY.format(queue=queue), round(max(seconds, 0.0), 3))
+        pipe.ltrim(WAIT_KEY.format(queue=queue), 0, WAIT_SAMPLE_SIZE - 1)
+        pipe.execute()
+    except Exception as e:  # Metrik yazılamaması görevi etkilememeli
+        logger.debug(f"Queue wait sample dropped ({queue}): {e}")
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def queue_metrics(redis_client) -> List[Dict[str, Any]]:
+    """Depth, recent wait percentiles and SLA status for every queue.
+
+    Depth is the length of the broker list (Redis transport keeps each queue
+    in a list named after it).
+    """
+    metrics = []
+    for queue in QUEUE_NAMES:
+        depth = None
+        waits: List[float] = []
+        try:
+            depth = int(redis_client.llen(queue))
+            waits = [float(v) for v in redis_client.lrange(WAIT_KEY.format(queue=queue), 0, -1)]
+        except Exception as e:
+            logger.warning(f"Queue metrics unavailable ({queue}): {e}")
+        p95 = _percentile(waits, 95)
+        sla = CELERY_QUEUE_SLA_SECONDS.get(queue)
+        metrics.append(
+            {
+                "queue": queue,
+                "depth": depth,
+                "samples": len(waits),
+                "wait_p50": _percentile(waits, 50),
+                "wait_p95": p95,
+                "wait_max": max(waits) if waits else None,
+                "sla_seconds": sla,
+                "sla_ok": None if p95 is None or sla is None else p95 <= sla,
+            }
+        )
+    return metrics
@@ -0,0 +1,173 @@
+"""Buffered Celery task telemetry.
+
+Task lifecycle signals (``task_prerun``/``task_postrun``/``task_failure``)
+produce one compact ``TaskTelemetry`` record per task: status, queue wait,
+runtime and a pointer to where the result lives.  Records are kept in an
+in-process buffer and bulk-inserted by a background thread every
+``TASK_TELEMETRY_FLUSH_SECONDS`` (or once ``TASK_TELEMETRY_BATCH_SIZE``
+records are waiting), so tasks never pay for a database round trip.
+"""
+
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+from celery.signals import task_failure, task_postrun, task_prerun, worker_process_shutdown
+from loguru import logger
+from sqlalchemy import case, func
+
+from backend.db import db
+from backend.db.models import TaskTelemetry
+from backend.db.write_behind import MAX_BUFFERED, WriteBehindBuffer
+from backend.services.analysis_cache import task_result_key
+
+DEFAULT_FLUSH_SECONDS = 5.0
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_RETENTION_DAYS = 14
+
+# Gecikme histogramı kova üst sınırları (ms); son kova açık uçludur
+LATENCY_BUCKETS_MS = [10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000]
+
+
+def _analysis_ref(task_id: str, retval: Any) -> Optional[str]:
+    return task_result_key(task_id)
+
+
+def _sweep_ref(task_id: str, retval: Any) -> Optional[str]:
+    if isinstance(retval, dict) and retval.get("sweep_id"):
+        return f"backtest_results?sweep_id={retval['sweep_id']}"
+    return None
+
+
+# Görev adı -> sonucun nerede saklandığını gösteren işaretçi üretici
+RESULT_POINTERS: Dict[str, Callable[[str, Any], Optional[str]]] = {
+    "backend.tasks.celery_tasks.run_full_analysis": _analysis_ref,
+    "backend.tasks.celery_tasks.analyze_coin_task": _analysis_ref,
+    "backend.tasks.backtest_tasks.run_parameter_sweep": _sweep_ref,
+}
+
+
+class TelemetryBuffer(WriteBehindBuffer):
+    """Write-behind buffer for ``task_telemetry`` rows."""
+
+    def __init__(self, flush_seconds: float = DEFAULT_FLUSH_SECONDS, batch_size: int = DEFAULT_BATCH_SIZE):
+        super().__init__(TaskTelemetry, flush_seconds, batch_size, MAX_BUFFERED)
+
+    def bind(self, app) -> None:
+        super().bind(
+            app,
+            app.config.get("TASK_TELEMETRY_FLUSH_SECONDS", self.flush_seconds),
+            app.config.get("TASK_TELEMETRY_BATCH_SIZE", self.batch_size),
+        )
+
+
+buffer = TelemetryBuffer()
+
+# task_id -> (başlangıç perf_counter, başlangıç zamanı, hata)
+_inflight: Dict[str, Dict[str, Any]] = {}
+
+
+def init_task_telemetry(app) -> None:
+    """Bind the telemetry buffer to ``app`` for database writes."""
+    buffer.bind(app)
+
+
+@worker_process_shutdown.connect
+def _flush_on_shutdown(**kwargs):
+    buffer.flush()
+
+
+@task_prerun.connect
+def _on_task_prerun(task_id=None, task=None, **kwargs):
+    _inflight[task_id] = {"t0": time.perf_counter(), "started_at": datetime.utcnow(), "error": None}
+
+
+@task_failure.connect
+def _on_task_failure(task_id=None, exception=None, **kwargs):
+    entry = _inflight.get(task_id)
+    if entry is not None:
+        entry["error"] = f"{type(exception).__name__}: {exception}"[:255]
+
+
+@task_postrun.connect
+def _on_task_postrun(task_id=None, task=None, retval=None, state=None, **kwargs):
+    entry = _inflight.pop(task_id, None)
+    if entry is None or task is None:
+        return
+    request = task.request
+    enqueued_at = getattr(request, "enqueued_at", None)
+    wait_ms = None
+    if enqueued_at:
+        wait_ms = max(0.0, (entry["started_at"].timestamp() - float(enqueued_at)) * 1000.0)
+    pointer = RESULT_POINTERS.get(task.name)
+    buffer.record(
+        {
+            "task_id": task_id,
+            "task_name": task.name,
+            "queue": (request.delivery_info or {}).get("routing_key"),
+            "status": state or "UNKNOWN",
+            "wait_ms": wait_ms,
+            "runtime_ms": (time.perf_counter() - entry["t0"]) * 1000.0,
+            "started_at": entry["started_at"],
+            "result_ref": pointer(task_id, retval) if pointer and state == "SUCCESS" else None,
+            "error": entry["error"],
+        }
+    )
+
+
+def purge_telemetry(retention_days: Optional[int] = None) -> int:
+    """Delete telemetry older than the retention window."""
+    from flask import current_app
+
+    days = retention_days or int(
+        current_app.config.get("TASK_TELEMETRY_RETENTION_DAYS", DEFAULT_RETENTION_DAYS)
+    )
+    threshold = datetime.utcnow() - timedelta(days=days)
+    deleted = TaskTelemetry.query.filter(TaskTelemetry.started_at < threshold).delete(
+        synchronize_session=False
+    )
+    db.session.commit()
+    return deleted
+
+
+def latency_histograms(
+    since: datetime, task_name: Optional[str] = None
+) -> Dict[str, Dict[str, Any]]:
+    """Per task type runtime histogram computed in the database.
+
+    Returns ``{task_name: {"count", "failures", "avg_ms", "max_ms", "buckets"}}``
+    where ``buckets`` maps each upper bound (``"+Inf"`` for the last) to the
+    number of runs that fell into it.
+    """
+    bucket = case(
+        *[(TaskTelemetry.runtime_ms <= bound, i) for i, bound in enumerate(LATENCY_BUCKETS_MS)],
+        else_=len(LATENCY_BUCKETS_MS),
+    ).label("bucket")
+    query = db.session.query(TaskTelemetry.task_name, bucket, func.count()).filter(
+        TaskTelemetry.started_at >= since, TaskTelemetry.runtime_ms.isnot(None)
+    )
+    summary = db.session.query(
+        TaskTelemetry.task_name,
+        func.count(),
+        func.sum(case((TaskTelemetry.status == "FAILURE", 1), else_=0)),
+        func.avg(TaskTelemetry.runtime_ms),
+        func.max(TaskTelemetry.runtime_ms),
+    ).filter(TaskTelemetry.started_at >= since)
+    if task_name:
+        query = query.filter(TaskTelemetry.task_name == task_name)
+        summary = summary.filter(TaskTelemetry.task_name == task_name)
+
+    labels = [str(b) for b in LATENCY_BUCKETS_MS] + ["+Inf"]
+    out: Dict[str, Dict[str, Any]] = {}
+    for name, count, failures, avg_ms, max_ms in summary.group_by(TaskTelemetry.task_name):
+        out[name] = {
+            "count": count,
+            "failures": int(failures or 0),
+            "avg_ms": float(avg_ms) if avg_ms is not None else None,
+            "max_ms": float(max_ms) if max_ms is not None else None,
+            "buckets": {label: 0 for label in labels},
+        }
+    for name, index, count in query.group_by(TaskTelemetry.task_name, bucket):
+        if name in out:
+            out[name]["buckets"][labels[index]] = count
+    return out
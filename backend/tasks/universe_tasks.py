@@ -0,0 +1,73 @@
+"""Celery tasks analysing the whole coin universe for every profile.
+
+``analyze_universe`` fans out one ``coin_stage_task`` per coin as a chord
+header; the callback ``decide_universe_task`` runs the cheap per-profile
+decisions for all coins and stores them with a single bulk write.
+"""
+
+import logging
+
+from celery import chord
+
+from backend import celery_app, socketio
+from backend.constants import CELERY_ANALYSIS_TIME_LIMIT
+from backend.services.universe import (
+    decide_profiles,
+    get_coin_snapshot,
+    universe_coins,
+    universe_profiles,
+    write_analysis_rows,
+)
+from backend.tasks.worker import analysis_system, task_app
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(
+    name="backend.tasks.universe_tasks.coin_stage_task",
+    acks_late=True,
+    time_limit=CELERY_ANALYSIS_TIME_LIMIT,
+)
+def coin_stage_task(coin: str):
+    """Compute (or reuse) the coin-level snapshot for the current interval."""
+    ctx_app = task_app()
+    with ctx_app.app_context():
+        try:
+            return get_coin_snapshot(
+                analysis_system(ctx_app), coin, ctx_app.extensions.get("redis_client")
+            )
+        except Exception:
+            # Tek coin hatası tüm chord'u düşürmesin; karar aşaması atlar
+            logger.exception("Coin stage failed: %s", coin)
+            return None
+
+
+@celery_app.task(name="backend.tasks.universe_tasks.decide_universe_task")
+def decide_universe_task(snapshots, profiles=None):
+    """Chord callback: decide every profile for every coin and bulk write."""
+    ctx_app = task_app()
+    with ctx_app.app_context():
+        profiles = profiles or universe_profiles()
+        rows = decide_profiles(analysis_system(ctx_app).engine, snapshots, profiles)
+        written = write_analysis_rows(rows)
+        coins = [s["coin"] for s in snapshots if s]
+        summary = {"coins": coins, "profiles": profiles, "rows": written}
+        try:
+            socketio.emit("universe_analysis_completed", summary, namespace="/")
+        except Exception:
+            logger.exception("Universe analysis emit failed")
+        return summary
+
+
+@celery_app.task(name="backend.tasks.universe_tasks.analyze_universe")
+def analyze_universe(coins=None, profiles=None):
+    """Start a universe analysis and return the chord's result id."""
+    ctx_app = task_app()
+    with ctx_app.app_context():
+        coins = list(dict.fromkeys(coins or universe_coins()))
+        profiles = profiles or universe_profiles()
+    result = chord(coin_stage_task.s(coin) for coin in coins)(
+        decide_universe_task.s(profiles)
+    )
+    logger.info("Universe analysis started: %d coins x %d profiles", len(coins), len(profiles))
+    return result.id
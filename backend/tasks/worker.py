@@ -0,0 +1,56 @@
+"""Per-process Flask app for Celery workers.
+
+Celery (broker, queues, routes, task registry) is configured once when the
+worker imports ``backend.celery_worker``.  What stays per process is the
+Flask app and its database engine: each prefork child builds one lightweight
+app at ``worker_process_init`` (solo/threads pools build it on the first
+task) and every task reuses it, so no task pays for ``create_app()`` with
+its blueprints, ``create_all`` and analysis-system construction.
+"""
+
+import threading
+
+from celery.signals import worker_process_init
+from flask import current_app, has_app_context
+
+_worker_app = None
+_lock = threading.Lock()
+
+
+def get_worker_app():
+    """Return this process' worker app, building it on first use."""
+    global _worker_app
+    if _worker_app is None:
+        with _lock:
+            if _worker_app is None:
+                from backend import create_worker_app
+
+                _worker_app = create_worker_app()
+    return _worker_app
+
+
+@worker_process_init.connect
+def _init_worker_app(**kwargs):
+    # Fork sonrası her çocuk süreç kendi bağlantılarıyla yeni bir uygulama kurar
+    global _worker_app
+    _worker_app = None
+    get_worker_app()
+
+
+def task_app():
+    """App for the running task: the active one, else the worker app."""
+    if has_app_context():
+        return current_app._get_current_object()
+    return get_worker_app()
+
+
+def analysis_system(app):
+    """Return the app's ``YTDCryptoSystem``, creating it once per process."""
+    system = getattr(app, "ytd_system_instance", None)
+    if system is None or getattr(system, "collector", None) is None:
+        from backend.core.services import YTDCryptoSystem
+
+        with app.app_context():
+            system = YTDCryptoSystem()
+        app.ytd_system_instance = system
+    return system
@@ -1,12 +1,18 @@
 # backend/utils/alarms.py
 
-import requests
-from flask import current_app
+import hashlib
+import json
+import re
+import threading
+import time
+
+from flask import current_app, has_app_context
 from loguru import logger
 from sqlalchemy.exc import SQLAlchemyError
 
 from backend.db import db
 from backend.db.models import SecurityAlarmLog, AlarmSeverityEnum
+from backend.utils.notifications import notify_slack
 
 # SLACK_COLORS, enum tanımının dışına taşındı ve enum üyeleriyle eşleştirildi.
 SLACK_COLORS = {
@@ -25,9 +31,9 @@ def send_alarm(
     user_agent: str = None
 ):
     """
-    Veritabanına bir güvenlik alarmı kaydeder ve yapılandırılmışsa Slack'e bildirim gönderir.
-    Slack bildirimi, ana işlemi engellememek için kısa bir zaman aşımı ile "fire-and-forget"
-    prensibiyle çalışır.
+    Veritabanına bir güvenlik alarmı kaydeder ve yapılandırılmışsa Slack bildirimini
+    kuyruğa alır. Gönderim ``backend.utils.notifications`` işçisinde yapılır; bu çağrı
+    ağ isteği beklemez.
     """
     try:
         # 1. Veritabanına alarmı kaydet.
@@ -55,41 +61,31 @@ def send_alarm(
         db.session.rollback()
         return
 
-    # 2. Slack'e bildirim gönder (Veritabanı işlemi başarılı olduktan sonra).
+    # 2. Slack bildirimi kuyruğa alınır (Veritabanı işlemi başarılı olduktan sonra).
+    socketio = current_app.extensions.get('socketio')
     webhook = current_app.config.get('SLACK_ALARM_WEBHOOK_URL')
     if not webhook:
         logger.warning("SLACK_ALARM_WEBHOOK_URL tanımlı değil, Slack bildirimi atlanıyor.")
-    
-    socketio = current_app.extensions.get('socketio')
-
-    # Slack'e gönderilecek payload oluşturuluyor.
-    payload = {
-        "attachments": [{
-            "color": SLACK_COLORS.get(severity.value, "#808080"),
-            "pretext": f":warning: *New Security Alarm: {alert_type}* | Severity: *{severity.name}*",
-            "fields": [
-                # Slack'e orijinal, kırpılmamış detayı gönderiyoruz.
-                {"title":"Details", "value":details, "short":False},
-                # Sadece değer varsa alanı ekle
-                *([{"title":"User","value":username,"short":True}] if username else []),
-                *([{"title":"IP Address","value":ip_address,"short":True}] if ip_address else []),
-                *([{"title":"User Agent","value":user_agent,"short":False}] if user_agent else [])
-            ],
-            "footer": "YTDCrypto Alarm System",
-            "ts": int(alarm_log.created_at.timestamp())
-        }]
-    }
-
-    try:
-        # Kısa timeout ile Slack'e gönder. Bu işlem ana akışı yavaşlatmaz.
-        # Hata durumunda sadece loglanır, veritabanı işlemi etkilenmez.
-        response = requests.post(webhook, json=payload, timeout=3)
-        response.raise_for_status()
-        logger.info(f"Slack alarm sent successfully: {alert_type}")
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Slack bildirimi gönderilemedi (RequestException): {e}")
-    except Exception as e:
-        logger.error(f"Slack bildirimi gönderilirken beklenmedik bir hata oluştu: {e}")
+    else:
+        # Slack'e gönderilecek payload oluşturuluyor.
+        payload = {
+            "attachments": [{
+                "color": SLACK_COLORS.get(severity.value, "#808080"),
+                "pretext": f":warning: *New Security Alarm: {alert_type}* | Severity: *{severity.name}*",
+                "fields": [
+                    # Slack'e orijinal, kırpılmamış detayı gönderiyoruz.
+                    {"title":"Details", "value":details, "short":False},
+                    # Sadece değer varsa alanı ekle
+                    *([{"title":"User","value":username,"short":True}] if username else []),
+                    *([{"title":"IP Address","value":ip_address,"short":True}] if ip_address else []),
+                    *([{"title":"User Agent","value":user_agent,"short":False}] if user_agent else [])
+                ],
+                "footer": "YTDCrypto Alarm System",
+                "ts": int(alarm_log.created_at.timestamp())
+            }]
+        }
+        # Gönderim, yeniden deneme ve hız sınırı bildirim işçisinde yapılır.
+        notify_slack(webhook, payload)
 
     if socketio:
         try:
@@ -104,3 +100,108 @@ def send_alarm(
             )
         except Exception as e:
             logger.error(f"WebSocket alert emit failed: {e}")
+
+
+# --- Alarm birleştirme ve fırtına bastırma ---
+#
+# Aynı (alert_type, severity, parmak izi) için yalnızca pencere içindeki ilk
+# alarm kuyruğa alınır.  Tekrarlar Redis'te sayılır ve her tekrar pencereyi
+# uzatır (kayan pencere); biriken sayılar ``send_alarm_digests`` görevi ile
+# periyodik özet olarak gönderilir.  Redis yoksa bastırma süreç içinde yapılır.
+
+ALARM_SUPPRESS_KEY = "alarm:sup:{key}"
+ALARM_META_KEY = "alarm:meta:{key}"
+ALARM_PENDING_KEY = "alarm:pending"
+DEFAULT_SUPPRESS_SECONDS = 300
+# Özeti bekleyen alarmın açıklaması en fazla bu kadar tutulur
+ALARM_META_TTL_SECONDS = 24 * 60 * 60
+
+# Sayılar, adresler ve kimlikler parmak izine girmez: aynı hatanın kopyaları eşleşir
+_VOLATILE = re.compile(r"0x[0-9a-f]+|\b[0-9a-f]{8,}\b|\d+", re.IGNORECASE)
+# Sistem olay seviyeleri alarm şiddetine çevrilir
+_SEVERITY_ALIASES = {"ERROR": "CRITICAL"}
+_local_seen = {}
+_local_lock = threading.Lock()
+
+
+def alarm_fingerprint(details) -> str:
+    text = _VOLATILE.sub("#", str(details or "")).strip().lower()
+    return hashlib.sha1(text[:500].encode()).hexdigest()[:16]
+
+
+def _aggregate_key(alert_type: str, severity: str, fingerprint: str) -> str:
+    return hashlib.sha1(f"{alert_type}|{severity}|{fingerprint}".encode()).hexdigest()[:24]
+
+
+def _suppress_locally(key: str, window: int) -> bool:
+    now = time.monotonic()
+    with _local_lock:
+        for stale in [k for k, seen in _local_seen.items() if now - seen > window]:
+            del _local_seen[stale]
+        suppressed = key in _local_seen
+        _local_seen[key] = now
+        return suppressed
+
+
+def raise_alarm(alert_type: str, details="", severity="CRITICAL", fingerprint: str = None) -> bool:
+    """Enqueue ``send_security_alert_task`` unless the same alarm is in its window.
+
+    Returns True if a task was enqueued.
+    """
+    severity = severity.name if isinstance(severity, AlarmSeverityEnum) else str(severity).upper()
+    severity = _SEVERITY_ALIASES.get(severity, severity)
+    details = details if isinstance(details, str) else json.dumps(details, default=str)
+    key = _aggregate_key(alert_type, severity, fingerprint or alarm_fingerprint(details))
+    window = DEFAULT_SUPPRESS_SECONDS
+    redis_client = None
+    if has_app_context():
+        window = int(current_app.config.get("ALARM_SUPPRESS_SECONDS", DEFAULT_SUPPRESS_SECONDS))
+        redis_client = current_app.extensions.get("redis_client")
+
+    suppressed = None
+    if redis_client is not None:
+        try:
+            suppress_key = ALARM_SUPPRESS_KEY.format(key=key)
+            suppressed = not redis_client.set(suppress_key, 1, nx=True, ex=window)
+            if suppressed:
+                meta = {"alert_type": alert_type, "severity": severity, "details": details[:2000]}
+                pipe = redis_client.pipeline()
+                pipe.expire(suppress_key, window)
+                pipe.hincrby(ALARM_PENDING_KEY, key, 1)
+                pipe.set(ALARM_META_KEY.format(key=key), json.dumps(meta), ex=ALARM_META_TTL_SECONDS)
+                pipe.execute()
+        except Exception as e:
+            logger.debug(f"Alarm aggregation unavailable, suppressing locally: {e}")
+            suppressed = None
+    if suppressed is None:
+        suppressed = _suppress_locally(key, window)
+    if suppressed:
+        return False
+
+    try:
+        from backend.tasks.celery_tasks import send_security_alert_task
+
+        send_security_alert_task.delay(alert_type, details, severity=severity)
+    except Exception as e:
+        logger.error(f"Alarm görevi kuyruğa alınamadı: {alert_type} - {e}")
+        return False
+    return True
+
+
+def pending_alarm_digests(redis_client):
+    """Take the suppressed-alarm counts accumulated since the last digest."""
+    digests = []
+    for field, count in redis_client.hgetall(ALARM_PENDING_KEY).items():
+        key = field.decode() if isinstance(field, bytes) else field
+        count = int(count)
+        if count > 0:
+            # Okuma ile azaltma arasında gelen tekrarlar bir sonraki özete kalır
+            if redis_client.hincrby(ALARM_PENDING_KEY, key, -count) <= 0:
+                redis_client.hdel(ALARM_PENDING_KEY, key)
+        else:
+            redis_client.hdel(ALARM_PENDING_KEY, key)
+            continue
+        meta = redis_client.get(ALARM_META_KEY.format(key=key))
+        if meta is not None:
+            digests.append({**json.loads(meta), "count": count})
+    return digests
@@ -1,15 +1,96 @@
+import atexit
+import json
+from celery.signals import worker_process_shutdown
 from flask import request
 from backend.db import db
 from backend.db.models import AuditLog
+from backend.db.write_behind import WriteBehindBuffer
+from backend.utils.helpers import audit_log_fallback_file
+from loguru import logger
 import os
 
-import requests
-import smtplib
-from email.mime.text import MIMEText
+from backend.utils.notifications import notify_email, notify_slack
 
 SLACK_WEBHOOK_URL = os.getenv("SLACK_WEBHOOK_URL")
 ADMIN_ALERT_EMAIL = os.getenv("ADMIN_ALERT_EMAIL")
 
+DEFAULT_FLUSH_MS = 500
+DEFAULT_BATCH_SIZE = 200
+# Güvenlik açısından kritik olaylar tamponu beklemeden, istek içinde yazılır
+DEFAULT_SYNC_ACTIONS = (
+    "PAYMENT_COMPLETED_SUCCESS",
+    "PAYMENT_COMPLETED_FAILURE",
+    "PAYMENT_CALLBACK_FAILED_PRICE_MISMATCH",
+    "PLAN_UPGRADED",
+)
+
+
+class AuditLogBuffer(WriteBehindBuffer):
+    """Write-behind buffer for ``audit_logs`` rows.
+
+    A failed batch is split instead of retried whole, and rows that still
+    cannot be inserted, rows that do not fit in the buffer and rows still
+    waiting at interpreter exit go to the audit fallback file in the same
+    format ``add_audit_log`` uses.
+    """
+
+    def __init__(self):
+        super().__init__(AuditLog, DEFAULT_FLUSH_MS / 1000.0, DEFAULT_BATCH_SIZE, max_attempts=1)
+
+    def record(self, row) -> None:
+        if len(self._records) >= self._records.maxlen:
+            self.spill([row], "audit buffer full")
+            return
+        super().record(row)
+
+    def _quarantine(self, rows, error) -> None:
+        logger.error(f"audit_logs flush failed, {len(rows)} records written to fallback file: {error}")
+        self.spill(rows, str(error))
+
+    @staticmethod
+    def spill(rows, error: str) -> None:
+        for row in rows:
+            details = row.get("details")
+            audit_log_fallback_file(
+                {
+                    "action_type": row.get("action"),
+                    "actor_username": row.get("username"),
+                    "details": json.loads(details) if details else None,
+                    "ip_address": row.get("ip_address"),
+                    "timestamp": row["created_at"].isoformat(),
+                    "error": error,
+                }
+            )
+
+    def close(self) -> None:
+        """Flush what is left; whatever cannot be written is spilled."""
+        self.flush()
+        rows = self.drain()
+        if rows:
+            self.spill(rows, "process exit")
+
+
+audit_log_buffer = AuditLogBuffer()
+
+
+def init_audit_log(app) -> None:
+    """Bind the audit write-behind buffer to ``app``."""
+    audit_log_buffer.bind(
+        app,
+        float(app.config.get("AUDIT_LOG_FLUSH_MS", DEFAULT_FLUSH_MS)) / 1000.0,
+        app.config.get("AUDIT_LOG_BATCH_SIZE", audit_log_buffer.batch_size),
+    )
+
+
+atexit.register(audit_log_buffer.close)
+
+
+@worker_process_shutdown.connect
+def _flush_on_shutdown(**kwargs):
+    # Celery alt süreçleri atexit çalıştırmadan çıkar
+    audit_log_buffer.close()
+
+
 # Aksiyon listesi kritik olaylari belirtir
 CRITICAL_ACTIONS = [
     "admin_user_deleted",
@@ -31,7 +112,7 @@ def log_action(user=None, action: str = "", details=None) -> None:
     db.session.add(log)
     db.session.commit()
 
-    # OTOMATIK UYARI SISTEMI
+    # OTOMATIK UYARI SISTEMI: bildirimler kuyruğa alınır, istek beklemez
     if action in CRITICAL_ACTIONS:
         msg = (
             f"[ALERT] {action} by {log.username} from {log.ip_address} at "
@@ -39,24 +120,7 @@ def log_action(user=None, action: str = "", details=None) -> None:
         )
 
         if SLACK_WEBHOOK_URL:
-            try:
-                requests.post(SLACK_WEBHOOK_URL, json={"text": msg}, timeout=3)
-            except Exception:
-                pass
+            notify_slack(SLACK_WEBHOOK_URL, {"text": msg})
 
         if ADMIN_ALERT_EMAIL:
-            try:
-                mail = MIMEText(msg)
-                mail["Subject"] = f"ALERT: {action}"
-                mail["From"] = "noreply@ytdcrypto.com"
-                mail["To"] = ADMIN_ALERT_EMAIL
-                with smtplib.SMTP(os.getenv("MAIL_SERVER", "localhost"), int(os.getenv("MAIL_PORT", 25))) as server:
-                    if os.getenv("MAIL_USE_TLS", "false").lower() == "true":
-                        server.starttls()
-                    username = os.getenv("MAIL_USERNAME")
-                    password = os.getenv("MAIL_PASSWORD")
-                    if username and password:
-                        server.login(username, password)
-                    server.send_message(mail)
-            except Exception:
-                pass
+            notify_email(ADMIN_ALERT_EMAIL, f"ALERT: {action}", msg)
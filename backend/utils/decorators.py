@@ -3,6 +3,7 @@
 from functools import wraps
 from flask import g, jsonify, request
 from loguru import logger
+from backend.auth.principal import request_principal, resolve_principal
 from backend.db.models import User, SubscriptionPlan, UserRole
 
 def _error_response(message: str, status_code: int):
@@ -20,8 +21,8 @@ def admin_required(f):
             return jsonify({"error": "Token gerekli"}), 401
         if token.startswith("Bearer "):
             token = token.split(" ", 1)[1]
-        user = User.query.filter_by(api_key=token).first()
-        if not user or user.role not in [UserRole.ADMIN, UserRole.SYSTEM_ADMIN]:
+        principal = resolve_principal(token)
+        if not principal or principal.role not in [UserRole.ADMIN, UserRole.SYSTEM_ADMIN]:
             return jsonify({"error": "Yetkisiz erişim"}), 403
         return f(*args, **kwargs)
 
@@ -69,34 +70,31 @@ def require_subscription_plan(minimum_plan: SubscriptionPlan):
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            if not hasattr(g, 'user') or not isinstance(g.user, User):
-                api_key = request.headers.get('X-API-KEY')
-                if api_key:
-                    user = User.query.filter_by(api_key=api_key).first()
-                    if user:
-                        g.user = user
-            if not hasattr(g, 'user') or not isinstance(g.user, User):
+            # Kontroller isteğin kimlik anlık görüntüsüyle yapılır (istek başına tek çözümleme)
+            principal = request_principal()
+            if principal is None:
                 return _error_response(
                     "Yetkilendirme hatası: Kullanıcı bilgisi bulunamadı.", 401
                 )
 
-            user_plan_level = g.user.subscription_level.value
+            user_plan_level = principal.subscription_level.value
             required_plan_level = minimum_plan.value
 
             # Kullanıcının aboneliğinin aktif olup olmadığını kontrol et
-            if not g.user.is_subscription_active():
+            if not principal.is_subscription_active():
                 logger.warning(
-                    f"Kullanıcı {g.user.username} aktif olmayan abonelikle erişmeye çalıştı. Plan: {g.user.subscription_level.name}"
+                    f"Kullanıcı {principal.username} aktif olmayan abonelikle erişmeye çalıştı. Plan: {principal.subscription_level.name}"
                 )
                 return _error_response("Aktif bir aboneliğiniz bulunmamaktadır.", 403)
 
             # Kullanıcının plan seviyesi, gerekli minimum seviyeden düşükse erişimi engelle
             if user_plan_level < required_plan_level:
                 logger.warning(
-                    f"Yetersiz abonelik seviyesi. Kullanıcı: {g.user.username}, Mevcut Plan: {g.user.subscription_level.name}, Gerekli Plan: {minimum_plan.name}"
+                    f"Yetersiz abonelik seviyesi. Kullanıcı: {principal.username}, Mevcut Plan: {principal.subscription_level.name}, Gerekli Plan: {minimum_plan.name}"
                 )
                 return _error_response(f"Bu özelliğe erişim için en az '{minimum_plan.name.capitalize()}' abonelik planı gereklidir.", 403)
-            
+
+            # ORM kullanıcısı yalnızca ihtiyaç duyan görünümde current_user() ile yüklenir
             return f(*args, **kwargs)
         return decorated_function
     return decorator
@@ -22,7 +22,7 @@ from typing import Any, Dict, List, Optional
 
 
 
-from flask import request
+from flask import current_app, has_app_context, has_request_context, request
 
 from loguru import logger
 
@@ -196,41 +196,92 @@ def add_audit_log(
 
     ip_address: Optional[str] = None,
 
-    commit: bool = True
+    commit: bool = True,
+
+    durability: Optional[str] = None
 
 ) -> None:
 
-    """Sistemdeki önemli eylemleri denetim amacıyla kaydeder."""
+    """Sistemdeki önemli eylemleri denetim amacıyla kaydeder.
 
-    sanitized_details = sanitize_dict(details)
+    Varsayılan olarak kayıt süreç içi tampona alınır ve toplu yazılır
+    (``AUDIT_LOG_DURABILITY``).  ``durability="sync"``, ``AUDIT_SYNC_ACTIONS``
+    içindeki eylemler ve ``commit=False`` (çağıranın transaction'ı) anında
+    oturuma eklenir.
+    """
 
-    sanitized_ip = sanitize_log_string(ip_address or request.remote_addr)
+    sanitized_details = sanitize_dict(details) if details else {}
 
+    if not isinstance(sanitized_details, dict):
 
+        sanitized_details = {"details": sanitized_details}
 
-    try:
+    if target_id is not None:
 
-        if AuditLog is None:
-            raise RuntimeError("AuditLog model not available")
-        log_entry = AuditLog(
+        sanitized_details.setdefault("target_id", target_id)
+
+    if target_username:
+
+        sanitized_details.setdefault("target_username", sanitize_log_string(target_username))
+
+    remote_addr = request.remote_addr if has_request_context() else None
+
+    sanitized_ip = sanitize_log_string(ip_address or remote_addr)
+
+    row = {
+
+        "user_id": actor_id,
+
+        "username": sanitize_log_string(actor_username),
+
+        "action": action_type,
+
+        "ip_address": sanitized_ip,
+
+        "details": json.dumps(sanitized_details, default=str) if sanitized_details else None,
+
+        "created_at": datetime.utcnow(),
+
+    }
+
+
+
+    from backend.utils.audit import DEFAULT_SYNC_ACTIONS, audit_log_buffer
+
+    app = current_app._get_current_object() if has_app_context() else None
+
+    config = app.config if app is not None else {}
+
+    durability = durability or config.get("AUDIT_LOG_DURABILITY", "async")
+
+    sync_actions = config.get("AUDIT_SYNC_ACTIONS", DEFAULT_SYNC_ACTIONS)
+
+    if (
 
-            action_type=action_type,
+        commit
 
-            actor_id=actor_id,
+        and durability != "sync"
 
-            actor_username=sanitize_log_string(actor_username),
+        and action_type not in sync_actions
 
-            target_id=target_id,
+        and audit_log_buffer.app is app
 
-            target_username=sanitize_log_string(target_username),
+        and app is not None
 
-            details=json.dumps(sanitized_details, default=str) if sanitized_details else None,
+    ):
 
-            ip_address=sanitized_ip
+        audit_log_buffer.record(row)
 
-        )
+        return
+
+
+
+    try:
+
+        if AuditLog is None:
+            raise RuntimeError("AuditLog model not available")
 
-        db.session.add(log_entry)
+        db.session.add(AuditLog(**row))
 
         if commit:
 
@@ -246,9 +297,9 @@ def add_audit_log(
 
             "action_type": action_type, "actor_username": actor_username,
 
-            "details": sanitized_details, "ip_address": sanitized_ip,
+            "details": sanitized_details or None, "ip_address": sanitized_ip,
 
-            "timestamp": datetime.utcnow().isoformat(), "error": str(e)
+            "timestamp": row["created_at"].isoformat(), "error": str(e)
 
         }
 
@@ -0,0 +1,253 @@
+"""Outbound notifications (Slack webhooks, e-mail) sent off the request path.
+
+Request handlers call ``notify_slack`` / ``notify_email``, which only put the
+message on a bounded per-channel queue.  Each channel has its own daemon
+worker, so a slow mail relay never delays Slack alerts, and that worker
+
+* honours a token-bucket rate limit (``NOTIFY_SLACK_PER_MINUTE``,
+  ``NOTIFY_EMAIL_PER_MINUTE``) so an alert burst does not get the webhook
+  throttled or flood the mail relay,
+* posts webhooks through one pooled ``requests.Session`` that retries
+  connection errors and 429/5xx responses with backoff,
+* keeps its SMTP connection open between messages and reconnects when the
+  server has dropped it or it has been idle for too long.
+
+When a queue is full the message is dropped and counted; the caller never
+waits.
+"""
+
+import os
+import smtplib
+import threading
+import time
+from email.mime.text import MIMEText
+from queue import Empty, Full, Queue
+from typing import Any, Callable, Dict, Optional
+
+import requests
+from flask import current_app, has_app_context
+from loguru import logger
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+SLACK = "slack"
+EMAIL = "email"
+DEFAULT_QUEUE_SIZE = 1000
+DEFAULT_PER_MINUTE = {SLACK: 60, EMAIL: 30}
+HTTP_TIMEOUT_SECONDS = 5
+HTTP_RETRIES = 3
+# Sunucular boşta bağlantıları kapatır; bu süreden uzun bekleyen bağlantı yenilenir
+SMTP_IDLE_SECONDS = 60
+DEFAULT_SENDER = "noreply@ytdcrypto.com"
+
+
+class TokenBucket:
+    """``per_minute`` messages on average, in bursts of up to ``burst``."""
+
+    def __init__(self, per_minute: float, burst: Optional[int] = None, clock: Callable[[], float] = time.monotonic):
+        self.rate = per_minute / 60.0
+        self.capacity = float(burst or max(1, int(per_minute // 6)))
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated = clock()
+
+    def reserve(self) -> float:
+        """Take one token; returns how many seconds to wait before using it."""
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class SMTPConnection:
+    """One SMTP session kept open across messages."""
+
+    def __init__(self, host: str, port: int, use_tls: bool = False, username: str = None, password: str = None):
+        self.host = host
+        self.port = port
+        self.use_tls = use_tls
+        self.username = username
+        self.password = password
+        self._server: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=HTTP_TIMEOUT_SECONDS * 2)
+        if self.use_tls:
+            server.starttls()
+        if self.username and self.password:
+            server.login(self.username, self.password)
+        return server
+
+    def close(self) -> None:
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except Exception:
+                pass
+            self._server = None
+
+    def send(self, message) -> None:
+        if self._server is not None and time.monotonic() - self._last_used > SMTP_IDLE_SECONDS:
+            self.close()
+        for attempt in (1, 2):
+            if self._server is None:
+                self._server = self._connect()
+            try:
+                self._server.send_message(message)
+                self._last_used = time.monotonic()
+                return
+            except (smtplib.SMTPServerDisconnected, OSError):
+                # Sunucu bağlantıyı düşürmüş olabilir; bir kez yeniden bağlanılır
+                self._server = None
+                if attempt == 2:
+                    raise
+
+
+class ChannelWorker:
+    """Bounded queue and daemon worker for one notification channel."""
+
+    def __init__(self, name: str, send: Callable[[Dict[str, Any]], None], per_minute: float, queue_size: int):
+        self.name = name
+        self.send = send
+        self.bucket = TokenBucket(per_minute)
+        self.sent = self.failed = self.dropped = 0
+        self._queue: Queue = Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def put(self, message: Dict[str, Any]) -> bool:
+        try:
+            self._queue.put_nowait(message)
+        except Full:
+            self.dropped += 1
+            logger.warning(f"{self.name} notification queue full, message dropped")
+            return False
+        self._ensure_thread()
+        return True
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
+
+    def _handle(self, message: Dict[str, Any]) -> None:
+        delay = self.bucket.reserve()
+        if delay:
+            time.sleep(delay)
+        try:
+            self.send(message)
+            self.sent += 1
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"{self.name} notification could not be sent: {e}")
+
+    def process_pending(self) -> int:
+        """Send everything queued so far on the calling thread."""
+        count = 0
+        while True:
+            try:
+                message = self._queue.get_nowait()
+            except Empty:
+                return count
+            self._handle(message)
+            count += 1
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name=f"notify-{self.name}", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._handle(self._queue.get())
+
+
+class NotificationDispatcher:
+    """Slack and e-mail channels sharing one configuration."""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.http = requests.Session()
+        retry = Retry(
+            total=HTTP_RETRIES,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({"POST"}),
+            respect_retry_after_header=True,
+        )
+        self.http.mount("https://", HTTPAdapter(max_retries=retry))
+        self.http.mount("http://", HTTPAdapter(max_retries=retry))
+        self.smtp = SMTPConnection(
+            config.get("MAIL_SERVER") or "localhost",
+            int(config.get("MAIL_PORT") or 25),
+            str(config.get("MAIL_USE_TLS", "false")).lower() == "true",
+            config.get("MAIL_USERNAME"),
+            config.get("MAIL_PASSWORD"),
+        )
+        queue_size = int(config.get("NOTIFY_QUEUE_SIZE", DEFAULT_QUEUE_SIZE))
+        self.channels = {
+            SLACK: ChannelWorker(
+                SLACK, self._send_slack, float(config.get("NOTIFY_SLACK_PER_MINUTE", DEFAULT_PER_MINUTE[SLACK])), queue_size
+            ),
+            EMAIL: ChannelWorker(
+                EMAIL, self._send_email, float(config.get("NOTIFY_EMAIL_PER_MINUTE", DEFAULT_PER_MINUTE[EMAIL])), queue_size
+            ),
+        }
+
+    def _send_slack(self, message: Dict[str, Any]) -> None:
+        response = self.http.post(message["webhook"], json=message["payload"], timeout=HTTP_TIMEOUT_SECONDS)
+        response.raise_for_status()
+
+    def _send_email(self, message: Dict[str, Any]) -> None:
+        mail = MIMEText(message["body"])
+        mail["Subject"] = message["subject"]
+        mail["From"] = message["sender"]
+        mail["To"] = message["to"]
+        self.smtp.send(mail)
+
+    def slack(self, webhook: str, payload: Dict[str, Any]) -> bool:
+        return self.channels[SLACK].put({"webhook": webhook, "payload": payload})
+
+    def email(self, to: str, subject: str, body: str, sender: str = DEFAULT_SENDER) -> bool:
+        return self.channels[EMAIL].put({"to": to, "subject": subject, "body": body, "sender": sender})
+
+    def metrics(self) -> Dict[str, Dict[str, int]]:
+        return {
+            name: {"queued": len(w), "sent": w.sent, "failed": w.failed, "dropped": w.dropped}
+            for name, w in self.channels.items()
+        }
+
+
+_default: Optional[NotificationDispatcher] = None
+_default_lock = threading.Lock()
+
+
+def init_notifications(app) -> NotificationDispatcher:
+    # SMTP ayarları uygulama yapılandırmasında yoksa ortam değişkenlerinden okunur
+    config = {key: os.getenv(key) for key in ("MAIL_SERVER", "MAIL_PORT", "MAIL_USE_TLS", "MAIL_USERNAME", "MAIL_PASSWORD")}
+    config.update({k: v for k, v in app.config.items() if k.startswith(("MAIL_", "NOTIFY_")) and v is not None})
+    dispatcher = NotificationDispatcher(config)
+    app.extensions["notifications"] = dispatcher
+    return dispatcher
+
+
+def notifications() -> NotificationDispatcher:
+    global _default
+    if has_app_context() and "notifications" in current_app.extensions:
+        return current_app.extensions["notifications"]
+    with _default_lock:
+        if _default is None:
+            _default = NotificationDispatcher(dict(os.environ))
+        return _default
+
+
+def notify_slack(webhook: str, payload: Dict[str, Any]) -> bool:
+    return notifications().slack(webhook, payload)
+
+
+def notify_email(to: str, subject: str, body: str, sender: str = DEFAULT_SENDER) -> bool:
+    return notifications().email(to, subject, body, sender)
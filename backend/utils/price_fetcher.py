@@ -21,3 +21,27 @@ def fetch_current_price(symbol: str = "bitcoin", currency: str = "usd") -> float
     except Exception as exc:  # pragma: no cover - network calls
         logger.warning(f"Could not fetch price for {symbol}: {exc}")
         return None
+
+
+_session = requests.Session()
+
+
+def fetch_current_prices(symbols, currency: str = "usd") -> dict:
+    """Return ``{symbol: price}`` for all ``symbols`` with a single request.
+
+    Symbols CoinGecko does not know are missing from the result; on any error
+    an empty dict is returned.
+    """
+    symbols = sorted({s.lower() for s in symbols})
+    if not symbols:
+        return {}
+    url = "https://api.coingecko.com/api/v3/simple/price"
+    params = {"ids": ",".join(symbols), "vs_currencies": currency}
+    try:
+        res = _session.get(url, params=params, timeout=5)
+        res.raise_for_status()
+        data = res.json()
+    except Exception as exc:  # pragma: no cover - network calls
+        logger.warning(f"Could not fetch prices for {len(symbols)} coins: {exc}")
+        return {}
+    return {s: data[s][currency] for s in symbols if currency in data.get(s, {})}
@@ -26,8 +26,9 @@ def log_event(event_type: str, level: str, message: str, meta=None, user_id=None
 
     if level.upper() in ("ERROR", "CRITICAL"):
         try:
-            from backend.tasks.celery_tasks import send_security_alert_task
+            from backend.utils.alarms import raise_alarm
 
-            send_security_alert_task.delay(event_type, message, severity=level.upper())
+            # Aynı olayın tekrarları bastırılır ve özet olarak raporlanır
+            raise_alarm(event_type, message, severity=level.upper())
         except Exception:
             logger.exception("Failed to dispatch alert for system event")
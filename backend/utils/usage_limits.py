@@ -1,23 +1,127 @@
-from functools import wraps
-from flask import g, request, jsonify, current_app
-from datetime import datetime
+from functools import lru_cache, wraps
+from flask import after_this_request, g, has_request_context, request, jsonify, current_app
+from datetime import datetime, timedelta
+
+from loguru import logger
+
+from backend.auth.principal import request_principal
+from backend.db.models import UsageLimitModel, SubscriptionPlan
+from backend.services.usage_counters import usage_key
+
+# Günlük ve aylık pencereyi tek seferde, atomik olarak kontrol edip artırır.
+# KEYS: gün, ay  ARGV: günlük limit, aylık limit (-1 = sınırsız), gün TTL, ay TTL
+# Dönüş: {izin (1/0), gün sayacı, ay sayacı, aşılan pencere (0 yok, 1 gün, 2 ay)}
+USAGE_LIMIT_LUA = """
+local day = tonumber(redis.call('GET', KEYS[1]) or '0')
+local month = tonumber(redis.call('GET', KEYS[2]) or '0')
+local daily_limit = tonumber(ARGV[1])
+local monthly_limit = tonumber(ARGV[2])
+if daily_limit >= 0 and day >= daily_limit then
+  return {0, day, month, 1}
+end
+if monthly_limit >= 0 and month >= monthly_limit then
+  return {0, day, month, 2}
+end
+day = redis.call('INCR', KEYS[1])
+if redis.call('TTL', KEYS[1]) < 0 then
+  redis.call('EXPIRE', KEYS[1], ARGV[3])
+end
+month = redis.call('INCR', KEYS[2])
+if redis.call('TTL', KEYS[2]) < 0 then
+  redis.call('EXPIRE', KEYS[2], ARGV[4])
+end
+return {1, day, month, 0}
+"""
+
+# Pencere bitiminden sonra anahtarın yaşayacağı ek süre (saat kayması payı)
+_TTL_GRACE_SECONDS = 60
+
+
+@lru_cache(maxsize=8)
+def _usage_script(redis_client):
+    # Script nesnesi EVALSHA kullanır, sunucuda yoksa EVAL ile yükler
+    return redis_client.register_script(USAGE_LIMIT_LUA)
+
+
+def _window_resets(now):
+    day_reset = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    month_reset = (now.replace(day=1) + timedelta(days=32)).replace(
+        day=1, hour=0, minute=0, second=0, microsecond=0
+    )
+    return day_reset, month_reset
+
+
+def consume_usage(redis_client, user_id, feature_name, daily_limit, monthly_limit, now=None):
+    """Atomically check both windows and count one use if allowed.
+
+    Returns a dict with ``allowed``, the window that decides the remaining
+    quota (``limit``, ``remaining``, ``reset`` as epoch seconds) and
+    ``exceeded`` (``"day"``/``"month"``) when the request is refused.
+    """
+    now = now or datetime.utcnow()
+    day_key = usage_key(user_id, feature_name, "day", now)
+    month_key = usage_key(user_id, feature_name, "month", now)
+    day_reset, month_reset = _window_resets(now)
+    allowed, day_count, month_count, exceeded = _usage_script(redis_client)(
+        keys=[day_key, month_key],
+        args=[
+            -1 if daily_limit is None else daily_limit,
+            -1 if monthly_limit is None else monthly_limit,
+            int((day_reset - now).total_seconds()) + _TTL_GRACE_SECONDS,
+            int((month_reset - now).total_seconds()) + _TTL_GRACE_SECONDS,
+        ],
+    )
 
-from backend.db.models import UsageLimitModel, SubscriptionPlan, UsageLog
+    windows = []
+    if daily_limit is not None:
+        windows.append(("day", daily_limit, daily_limit - int(day_count), day_reset))
+    if monthly_limit is not None:
+        windows.append(("month", monthly_limit, monthly_limit - int(month_count), month_reset))
+    exceeded = {1: "day", 2: "month"}.get(int(exceeded))
+    if exceeded:
+        name, limit, remaining, reset = next(w for w in windows if w[0] == exceeded)
+    elif windows:
+        name, limit, remaining, reset = min(windows, key=lambda w: w[2])
+    else:
+        name, limit, remaining, reset = None, None, None, None
+    return {
+        "allowed": bool(int(allowed)),
+        "exceeded": exceeded,
+        "window": name,
+        "limit": limit,
+        "remaining": None if remaining is None else max(remaining, 0),
+        "reset": None if reset is None else int((reset - datetime(1970, 1, 1)).total_seconds()),
+    }
+
+
+def rate_limit_headers(result):
+    if result.get("limit") is None:
+        return {}
+    headers = {
+        "X-RateLimit-Limit": str(result["limit"]),
+        "X-RateLimit-Remaining": str(result["remaining"]),
+        "X-RateLimit-Reset": str(result["reset"]),
+        "X-RateLimit-Window": result["window"],
+    }
+    if not result["allowed"]:
+        headers["Retry-After"] = str(
+            max(0, result["reset"] - int((datetime.utcnow() - datetime(1970, 1, 1)).total_seconds()))
+        )
+    return headers
 
 
 def check_usage_limit(feature_name):
-    """Enforces daily and monthly usage limits for a feature."""
+    """Enforces daily and monthly usage limits for a feature.
+
+    Both windows are checked and incremented by one Lua script, so
+    concurrent requests cannot overshoot the quota; the result is exposed as
+    ``X-RateLimit-*`` headers.
+    """
 
     def decorator(f):
         @wraps(f)
         def wrapper(*args, **kwargs):
-            user = getattr(g, "user", None)
-            if not user:
-                api_key = request.headers.get("X-API-KEY")
-                if api_key:
-                    user = User.query.filter_by(api_key=api_key).first()
-                    if user:
-                        g.user = user
+            user = request_principal()
             if not user:
                 return jsonify({"error": "Yetkilendirme hatası"}), 401
 
@@ -41,31 +145,34 @@ def check_usage_limit(feature_name):
             if not redis_client:
                 return jsonify({"error": "Rate kontrol altyapısı pasif."}), 500
 
-            now = datetime.utcnow()
-            day_key = f"usage:{user.id}:{feature_name}:day:{now.strftime('%Y%m%d')}"
-            month_key = f"usage:{user.id}:{feature_name}:month:{now.strftime('%Y%m')}"
-
-            daily_count = int(redis_client.get(day_key) or 0)
-            monthly_count = int(redis_client.get(month_key) or 0)
+            try:
+                result = consume_usage(
+                    redis_client, user.id, feature_name, limit.daily_limit, limit.monthly_limit
+                )
+            except Exception as e:
+                logger.error(f"Usage limit check failed ({feature_name}): {e}")
+                return jsonify({"error": "Rate kontrol altyapısı pasif."}), 500
+            headers = rate_limit_headers(result)
 
-            if limit.daily_limit is not None and daily_count >= limit.daily_limit:
+            if result["exceeded"] == "day":
                 return (
                     jsonify({"error": f"Günlük limit aşıldı: {limit.daily_limit} / {feature_name}"}),
                     429,
+                    headers,
                 )
 
-            if limit.monthly_limit is not None and monthly_count >= limit.monthly_limit:
+            if result["exceeded"] == "month":
                 return (
                     jsonify({"error": f"Aylık limit aşıldı: {limit.monthly_limit} / {feature_name}"}),
                     429,
+                    headers,
                 )
 
-            pipe = redis_client.pipeline()
-            pipe.incr(day_key)
-            pipe.expire(day_key, 86400)
-            pipe.incr(month_key)
-            pipe.expire(month_key, 2678400)
-            pipe.execute()
+            if headers and has_request_context():
+                @after_this_request
+                def _add_headers(response):
+                    response.headers.extend(headers)
+                    return response
 
             return f(*args, **kwargs)
 
@@ -76,10 +183,6 @@ def check_usage_limit(feature_name):
 
 def get_usage_count(user, feature):
     """Return today's usage count for the given feature."""
-    start_of_day = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    return (
-        UsageLog.query
-        .filter_by(user_id=user.id, action=feature)
-        .filter(UsageLog.timestamp >= start_of_day)
-        .count()
-    )
+    from backend.services.usage_counters import usage_counters
+
+    return usage_counters().count(user.id, feature, "day")
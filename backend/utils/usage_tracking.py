@@ -1,12 +1,6 @@
-from datetime import datetime
+from backend.services.usage_counters import usage_counters
 
-from backend import db
-from backend.db.models import UsageLog
 
-
-def record_usage(user, action: str) -> UsageLog:
-    """Persist a usage log entry for the given user action."""
-    log = UsageLog(user_id=user.id, action=action, timestamp=datetime.utcnow())
-    db.session.add(log)
-    db.session.commit()
-    return log
+def record_usage(user, action: str) -> None:
+    """Count a usage of ``action``; the ``usage_log`` row is written behind."""
+    usage_counters().record(user.id, action)
@@ -0,0 +1,28 @@
+"""Add sweep fields to backtest_results
+
+Revision ID: 20261019_02
+Revises: 20261019_01
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '20261019_02'
+down_revision = '20261019_01'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('backtest_results', sa.Column('sweep_id', sa.String(length=32), nullable=True))
+    op.add_column('backtest_results', sa.Column('params', sa.Text(), nullable=True))
+    op.add_column('backtest_results', sa.Column('rank', sa.Integer(), nullable=True))
+    op.create_index('ix_backtest_results_sweep_id', 'backtest_results', ['sweep_id'])
+
+
+def downgrade():
+    op.drop_index('ix_backtest_results_sweep_id', table_name='backtest_results')
+    op.drop_column('backtest_results', 'rank')
+    op.drop_column('backtest_results', 'params')
+    op.drop_column('backtest_results', 'sweep_id')
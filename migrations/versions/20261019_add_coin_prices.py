@@ -0,0 +1,29 @@
+"""Add coin_prices table for backtesting
+
+Revision ID: 20261019_01
+Revises: 20251010_01
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '20261019_01'
+down_revision = '20251010_01'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'coin_prices',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('coin', sa.String(length=50), nullable=False),
+        sa.Column('timestamp', sa.DateTime(), nullable=False),
+        sa.Column('price', sa.Float(), nullable=False),
+        sa.UniqueConstraint('coin', 'timestamp', name='_coin_price_ts_uc'),
+    )
+
+
+def downgrade():
+    op.drop_table('coin_prices')
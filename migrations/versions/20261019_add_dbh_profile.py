@@ -0,0 +1,24 @@
+"""Add profile column to dbh_data
+
+Revision ID: 20261019_03
+Revises: 20261019_02
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '20261019_03'
+down_revision = '20261019_02'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('dbh_data', sa.Column('profile', sa.String(length=20), nullable=True))
+    op.create_index('ix_dbh_data_profile', 'dbh_data', ['profile'])
+
+
+def downgrade():
+    op.drop_index('ix_dbh_data_profile', table_name='dbh_data')
+    op.drop_column('dbh_data', 'profile')
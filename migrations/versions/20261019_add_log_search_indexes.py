@@ -0,0 +1,75 @@
+"""Add keyset and text search indexes for audit logs and system events
+
+(created_at, id) indexes serve the cursor pagination of both admin lists.
+On PostgreSQL the searched text columns get pg_trgm GIN indexes so that
+ILIKE '%term%' no longer scans the table; on SQLite an FTS5 trigram table
+with sync triggers is created per log table and filled from existing rows.
+
+Revision ID: 20261019_09
+Revises: 20261019_08
+Create Date: 2026-10-19
+"""
+
+import sqlite3
+
+from alembic import op
+
+revision = '20261019_09'
+down_revision = '20261019_08'
+branch_labels = None
+depends_on = None
+
+SEARCH_COLUMNS = {
+    'audit_logs': ('username', 'action', 'details'),
+    'system_events': ('message',),
+}
+
+
+def _sqlite_fts(table, columns):
+    fts = f'{table}_fts'
+    cols = ', '.join(columns)
+    new = ', '.join(f'new.{c}' for c in columns)
+    old = ', '.join(f'old.{c}' for c in columns)
+    insert = f'INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new});'
+    delete = f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{cols}, content='{table}', content_rowid='id', tokenize='trigram')",
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN {insert} END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN {delete} END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table} BEGIN {delete} {insert} END',
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def upgrade():
+    op.create_index('ix_audit_logs_created_id', 'audit_logs', ['created_at', 'id'])
+    op.create_index('ix_system_events_created_id', 'system_events', ['created_at', 'id'])
+
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for table, columns in SEARCH_COLUMNS.items():
+            for col in columns:
+                op.execute(
+                    f'CREATE INDEX IF NOT EXISTS ix_{table}_{col}_trgm '
+                    f'ON {table} USING gin ({col} gin_trgm_ops)'
+                )
+    elif dialect == 'sqlite' and sqlite3.sqlite_version_info >= (3, 34):
+        for table, columns in SEARCH_COLUMNS.items():
+            for statement in _sqlite_fts(table, columns):
+                op.execute(statement)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    for table, columns in SEARCH_COLUMNS.items():
+        if dialect == 'postgresql':
+            for col in columns:
+                op.execute(f'DROP INDEX IF EXISTS ix_{table}_{col}_trgm')
+        elif dialect == 'sqlite':
+            for suffix in ('ai', 'ad', 'au'):
+                op.execute(f'DROP TRIGGER IF EXISTS {table}_fts_{suffix}')
+            op.execute(f'DROP TABLE IF EXISTS {table}_fts')
+    op.drop_index('ix_system_events_created_id', table_name='system_events')
+    op.drop_index('ix_audit_logs_created_id', table_name='audit_logs')
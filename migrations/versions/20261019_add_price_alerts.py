@@ -0,0 +1,38 @@
+"""Add price_alerts table
+
+Revision ID: 20261019_05
+Revises: 20261019_04
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '20261019_05'
+down_revision = '20261019_04'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'price_alerts',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('coin', sa.String(length=50), nullable=False),
+        sa.Column('field', sa.String(length=32), nullable=False),
+        sa.Column('direction', sa.String(length=8), nullable=False),
+        sa.Column('threshold', sa.Float(), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=False, server_default=sa.true()),
+        sa.Column('triggered_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index('ix_price_alerts_user_id', 'price_alerts', ['user_id'])
+    op.create_index('ix_price_alerts_updated_at', 'price_alerts', ['updated_at'])
+
+
+def downgrade():
+    op.drop_index('ix_price_alerts_updated_at', table_name='price_alerts')
+    op.drop_index('ix_price_alerts_user_id', table_name='price_alerts')
+    op.drop_table('price_alerts')
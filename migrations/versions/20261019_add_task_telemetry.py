@@ -0,0 +1,40 @@
+"""Add task_telemetry table
+
+Revision ID: 20261019_04
+Revises: 20261019_03
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '20261019_04'
+down_revision = '20261019_03'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'task_telemetry',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('task_id', sa.String(length=64), nullable=False),
+        sa.Column('task_name', sa.String(length=255), nullable=False),
+        sa.Column('queue', sa.String(length=50), nullable=True),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('wait_ms', sa.Float(), nullable=True),
+        sa.Column('runtime_ms', sa.Float(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=False),
+        sa.Column('result_ref', sa.String(length=255), nullable=True),
+        sa.Column('error', sa.String(length=255), nullable=True),
+    )
+    op.create_index('ix_task_telemetry_task_id', 'task_telemetry', ['task_id'])
+    op.create_index('ix_task_telemetry_started_at', 'task_telemetry', ['started_at'])
+    op.create_index('ix_task_telemetry_name_started', 'task_telemetry', ['task_name', 'started_at'])
+
+
+def downgrade():
+    op.drop_index('ix_task_telemetry_name_started', table_name='task_telemetry')
+    op.drop_index('ix_task_telemetry_started_at', table_name='task_telemetry')
+    op.drop_index('ix_task_telemetry_task_id', table_name='task_telemetry')
+    op.drop_table('task_telemetry')
@@ -0,0 +1,21 @@
+"""Add composite index on usage_log (user_id, action, timestamp)
+
+Revision ID: 20261019_06
+Revises: 20261019_05
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+revision = '20261019_06'
+down_revision = '20261019_05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_usage_log_user_action_ts', 'usage_log', ['user_id', 'action', 'timestamp'])
+
+
+def downgrade():
+    op.drop_index('ix_usage_log_user_action_ts', table_name='usage_log')
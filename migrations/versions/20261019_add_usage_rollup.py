@@ -0,0 +1,61 @@
+"""Add usage_rollup table and backfill it from usage_log
+
+Revision ID: 20261019_07
+Revises: 20261019_06
+Create Date: 2026-10-19
+"""
+
+from collections import Counter
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '20261019_07'
+down_revision = '20261019_06'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    rollup = op.create_table(
+        'usage_rollup',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('action', sa.String(length=64), nullable=False),
+        sa.Column('granularity', sa.String(length=8), nullable=False),
+        sa.Column('bucket', sa.DateTime(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+        sa.UniqueConstraint('granularity', 'user_id', 'action', 'bucket', name='uq_usage_rollup_key'),
+    )
+    op.create_index('ix_usage_rollup_granularity_bucket', 'usage_rollup', ['granularity', 'bucket'])
+
+    # Mevcut usage_log geçmişi kovalara toplanır (yalnızca anahtar sayısı kadar bellek)
+    usage_log = sa.table(
+        'usage_log',
+        sa.column('user_id', sa.Integer),
+        sa.column('action', sa.String),
+        sa.column('timestamp', sa.DateTime),
+    )
+    counts = Counter()
+    result = op.get_bind().execution_options(stream_results=True).execute(
+        sa.select(usage_log.c.user_id, usage_log.c.action, usage_log.c.timestamp)
+    )
+    for user_id, action, ts in result:
+        if ts is None:
+            continue
+        hour = ts.replace(minute=0, second=0, microsecond=0)
+        counts[('hour', user_id, action, hour)] += 1
+        counts[('day', user_id, action, hour.replace(hour=0))] += 1
+    if counts:
+        op.bulk_insert(
+            rollup,
+            [
+                {'granularity': g, 'user_id': u, 'action': a, 'bucket': b, 'count': n}
+                for (g, u, a, b), n in counts.items()
+            ],
+        )
+
+
+def downgrade():
+    op.drop_index('ix_usage_rollup_granularity_bucket', table_name='usage_rollup')
+    op.drop_table('usage_rollup')
@@ -0,0 +1,30 @@
+"""Store refresh sessions as HMAC digests
+
+Sessions now hold an HMAC-SHA256 hex digest of the refresh token, looked up
+through the unique index on ``refresh_token``.  Rows written with the old
+salted password hashes can no longer be matched and are revoked; their users
+sign in again.
+
+Revision ID: 20261019_08
+Revises: 20261019_07
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+revision = '20261019_08'
+down_revision = '20261019_07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        "UPDATE user_sessions SET revoked = true "
+        "WHERE revoked = false AND length(refresh_token) <> 64"
+    )
+
+
+def downgrade():
+    # Eski parola özetleri geri üretilemez; iptal edilen oturumlar iptal kalır
+    pass
@@ -0,0 +1,6 @@
+#!/usr/bin/env bash
+# Fiyat ticker üreticisini başlatır. Birden fazla kopya çalışırsa yalnızca
+# Redis kirasını (ticker:producer) tutan yayın yapar.
+set -e
+
+exec python -m backend.services.ticker
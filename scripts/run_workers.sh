@@ -0,0 +1,14 @@
+#!/usr/bin/env bash
+# Her kuyruk için ayrı boyutlandırılmış bir Celery worker başlatır.
+# Havuz ayarları backend/constants.py içindeki CELERY_WORKER_POOLS ile aynıdır.
+set -e
+
+celery -A backend.celery_worker worker -Q interactive-premium -n interactive-premium@%h -P prefork -c "${PREMIUM_CONCURRENCY:-4}" &
+celery -A backend.celery_worker worker -Q interactive-standard,default -n interactive-standard@%h -P prefork -c "${STANDARD_CONCURRENCY:-4}" &
+celery -A backend.celery_worker worker -Q analysis-batch -n analysis-batch@%h -P prefork -c "${BATCH_CONCURRENCY:-4}" &
+# Parametre taramaları kendi süreç havuzunu açar; daemon prefork çocukları bunu yapamaz
+celery -A backend.celery_worker worker -Q analysis-sweep -n analysis-sweep@%h -P solo &
+celery -A backend.celery_worker worker -Q maintenance -n maintenance@%h -P prefork -c "${MAINTENANCE_CONCURRENCY:-1}" &
+celery -A backend.celery_worker worker -Q alerts -n alerts@%h -P prefork -c "${ALERTS_CONCURRENCY:-2}" &
+
+wait
@@ -1,3 +1,6 @@
+import fnmatch
+import threading
+
 import factory
 from backend import db
 from backend.db.models import PromotionCode
@@ -22,3 +25,184 @@ class PromotionCodeFactory(factory.alchemy.SQLAlchemyModelFactory):
     user_segment = "all"
     custom_users = None
     is_active = True
+
+
+def _usage_limit_script(r, keys, args):
+    """Python twin of ``USAGE_LIMIT_LUA`` (runs under the fake's lock)."""
+    day_key, month_key = keys
+    daily_limit, monthly_limit, day_ttl, month_ttl = (int(a) for a in args)
+    day = int(r.store.get(day_key) or 0)
+    month = int(r.store.get(month_key) or 0)
+    if daily_limit >= 0 and day >= daily_limit:
+        return [0, day, month, 1]
+    if monthly_limit >= 0 and month >= monthly_limit:
+        return [0, day, month, 2]
+    r.store[day_key] = str(day + 1).encode()
+    r.store[month_key] = str(month + 1).encode()
+    r.ttls.setdefault(day_key, day_ttl)
+    r.ttls.setdefault(month_key, month_ttl)
+    return [1, day + 1, month + 1, 0]
+
+
+def _consume_usage_script(r, keys, args):
+    """Python twin of ``CONSUME_USAGE_LUA``."""
+    day_key, month_key, total_key, marker, *hours = keys
+    seed = str(args[0]) == "1"
+    day_ttl, month_ttl, hour_ttl, total_ttl, window, limit = (int(a) for a in args[1:7])
+    if not seed:
+        if any(key not in r.store for key in keys[:4]):
+            return [-1, 0]
+    else:
+        r.set(day_key, str(args[7]), nx=True, ex=day_ttl)
+        r.set(month_key, str(args[8]), nx=True, ex=month_ttl)
+        r.set(total_key, str(args[9]), nx=True, ex=total_ttl)
+        if r.set(marker, "1", nx=True, ex=hour_ttl):
+            for key, value in zip(hours, args[10:]):
+                if int(value) > 0:
+                    r.set(key, str(value), ex=hour_ttl)
+    if window == 4:
+        used = sum(int(r.store.get(key) or 0) for key in hours)
+    elif window > 0:
+        used = int(r.store.get(keys[window - 1]) or 0)
+    else:
+        used = 0
+    if limit >= 0 and used >= limit:
+        return [0, used]
+    for key, ttl in ((day_key, day_ttl), (month_key, month_ttl), (total_key, total_ttl), (hours[0], hour_ttl)):
+        r.incr(key)
+        r.expire(key, ttl)
+    r.expire(marker, hour_ttl)
+    return [1, used + 1]
+
+
+def _release_inflight_script(r, keys, args):
+    """Python twin of ``RELEASE_INFLIGHT_LUA``."""
+    owner = str(args[0]).encode()
+    if r.store.get(keys[0]) == owner:
+        r.delete(keys[0])
+        return 1
+    return 0
+
+
+def _swap_summary_script(r, keys, args):
+    """Python twin of ``SWAP_SUMMARY_LUA``."""
+    previous = r.store.get(keys[0])
+    r.set(keys[0], args[0], ex=int(args[1]))
+    return previous
+
+
+class DictRedis:
+    """In-memory stand-in for the subset of the Redis client the app uses."""
+
+    def __init__(self):
+        self.store = {}
+        self.ttls = {}
+        self.script_calls = 0
+        self.published = []
+        self._lock = threading.Lock()
+
+    def register_script(self, script):
+        from backend.services.analysis_cache import RELEASE_INFLIGHT_LUA
+        from backend.services.realtime import SWAP_SUMMARY_LUA
+        from backend.services.usage_counters import CONSUME_USAGE_LUA
+        from backend.utils.usage_limits import USAGE_LIMIT_LUA
+
+        scripts = {
+            USAGE_LIMIT_LUA: _usage_limit_script,
+            CONSUME_USAGE_LUA: _consume_usage_script,
+            SWAP_SUMMARY_LUA: _swap_summary_script,
+            RELEASE_INFLIGHT_LUA: _release_inflight_script,
+        }
+
+        def run(keys=(), args=()):
+            # Redis betikleri atomik çalışır
+            with self._lock:
+                self.script_calls += 1
+                return scripts[script](self, list(keys), list(args))
+
+        return run
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.store:
+            return None
+        self.store[key] = value.encode() if isinstance(value, str) else value
+        if ex is not None:
+            self.ttls[key] = ex
+        return True
+
+    def delete(self, *keys):
+        for key in keys:
+            self.store.pop(key, None)
+
+    def scan_iter(self, match="*", count=None):
+        return [key for key in list(self.store) if fnmatch.fnmatchcase(key, match)]
+
+    def mget(self, keys):
+        return [self.store.get(key) for key in keys]
+
+    def incr(self, key, amount=1):
+        value = int(self.store.get(key) or 0) + amount
+        self.store[key] = str(value).encode()
+        return value
+
+    def expire(self, key, seconds):
+        self.ttls[key] = seconds
+        return key in self.store
+
+    def lpush(self, key, *values):
+        items = self.store.setdefault(key, [])
+        for value in values:
+            items.insert(0, str(value).encode())
+        return len(items)
+
+    def ltrim(self, key, start, end):
+        items = self.store.get(key, [])
+        self.store[key] = items[start:None if end == -1 else end + 1]
+
+    def lrange(self, key, start, end):
+        return self.store.get(key, [])[start:None if end == -1 else end + 1]
+
+    def llen(self, key):
+        return len(self.store.get(key, []))
+
+    def brpoplpush(self, src, dst, timeout=0):
+        # Engellemez: bekleme süresi kaydedilir, liste boşsa zaman aşımı gibi davranır
+        self.block_timeouts = getattr(self, "block_timeouts", []) + [timeout]
+        items = self.store.get(src)
+        if not items:
+            return None
+        value = items.pop()
+        self.store.setdefault(dst, []).insert(0, value)
+        return value
+
+    def hincrby(self, key, field, amount=1):
+        items = self.store.setdefault(key, {})
+        field = field.encode() if isinstance(field, str) else field
+        items[field] = int(items.get(field, 0)) + amount
+        return items[field]
+
+    def hset(self, key, field, value):
+        items = self.store.setdefault(key, {})
+        items[field.encode() if isinstance(field, str) else field] = value
+        return 1
+
+    def hdel(self, key, *fields):
+        items = self.store.get(key, {})
+        for field in fields:
+            items.pop(field.encode() if isinstance(field, str) else field, None)
+
+    def hgetall(self, key):
+        return {k: str(v).encode() for k, v in self.store.get(key, {}).items()}
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+        return 0
+
+    def pipeline(self):
+        return self
+
+    def execute(self):
+        return []
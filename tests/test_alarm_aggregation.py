@@ -0,0 +1,62 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend import create_app
+from backend.utils import alarms
+from backend.utils.alarms import ALARM_PENDING_KEY, pending_alarm_digests, raise_alarm
+from backend.utils.system_events import log_event
+from tests.factories import DictRedis
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app()
+    app.extensions["redis_client"] = DictRedis()
+    app.enqueued = []
+    monkeypatch.setattr(
+        "backend.tasks.celery_tasks.send_security_alert_task.delay",
+        lambda *args, **kwargs: app.enqueued.append((args, kwargs)),
+    )
+    monkeypatch.setattr(alarms, "_local_seen", {})
+    with app.app_context():
+        yield app
+
+
+def test_health_check_storm_enqueues_one_alarm(app):
+    client = app.test_client()
+    # DictRedis'in ping'i yok: Redis yoklaması her istekte başarısız olur
+    for _ in range(50):
+        assert client.get("/health").get_json()["redis"].startswith("error")
+
+    assert len(app.enqueued) == 1
+    (alert_type, details), kwargs = app.enqueued[0]
+    assert alert_type == "Redis Bağlantı Hatası"
+    assert kwargs == {"severity": "FATAL"}
+
+    redis_client = app.extensions["redis_client"]
+    digests = pending_alarm_digests(redis_client)
+    assert [(d["alert_type"], d["count"]) for d in digests] == [("Redis Bağlantı Hatası", 49)]
+    assert pending_alarm_digests(redis_client) == []
+    assert redis_client.hgetall(ALARM_PENDING_KEY) == {}
+
+
+def test_fingerprint_ignores_volatile_parts(app):
+    log_event("worker", "ERROR", "Job 1234 failed after 30s")
+    log_event("worker", "ERROR", "Job 98765 failed after 12s")
+    log_event("worker", "ERROR", "Disk full on /var")
+    assert [(args[1], kwargs["severity"]) for args, kwargs in app.enqueued] == [
+        ("Job 1234 failed after 30s", "CRITICAL"),
+        ("Disk full on /var", "CRITICAL"),
+    ]
+
+
+def test_without_redis_alarms_are_suppressed_in_process(app):
+    app.extensions["redis_client"] = None
+    assert raise_alarm("cache", "down", severity="WARNING") is True
+    assert raise_alarm("cache", "down", severity="WARNING") is False
+    assert raise_alarm("cache", "down", severity="CRITICAL") is True
+    assert len(app.enqueued) == 2
@@ -0,0 +1,68 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend import create_app
+from backend.constants import ANALYSIS_CACHE_VERSION
+from backend.services.analysis_cache import (
+    claim_analysis,
+    data_version,
+    inflight_key,
+    load_cached_analysis,
+    release_analysis,
+    result_cache_key,
+    store_analysis_result,
+)
+from tests.factories import DictRedis
+
+
+def test_identical_requests_share_one_task(monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app()
+    with app.app_context():
+        r = DictRedis()
+        version = data_version()
+        first = claim_analysis(r, "bitcoin", "moderate", version, "task-1")
+        assert first == ("task-1", True)
+        for i in range(100):
+            assert claim_analysis(r, "bitcoin", "moderate", version, f"t{i}") == ("task-1", False)
+
+        # Farklı profil ya da yeni veri sürümü ayrı iş sayılır
+        assert claim_analysis(r, "bitcoin", "aggressive", version, "task-2") == ("task-2", True)
+        assert claim_analysis(r, "bitcoin", "moderate", version + 1, "task-3") == ("task-3", True)
+
+        # Anahtarı yalnızca sahibi olan görev bırakabilir
+        assert not release_analysis(r, "bitcoin", "moderate", version, "t0")
+        assert inflight_key("bitcoin", "moderate", version) in r.store
+        assert release_analysis(r, "bitcoin", "moderate", version, "task-1")
+        assert inflight_key("bitcoin", "moderate", version) not in r.store
+        assert claim_analysis(r, "bitcoin", "moderate", version, "task-4") == ("task-4", True)
+
+
+def test_without_redis_every_request_creates_task(monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app()
+    with app.app_context():
+        assert claim_analysis(None, "bitcoin", "moderate", 1, "a") == ("a", True)
+
+
+def test_data_version_follows_price_cache_window(monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app()
+    app.config["PRICE_CACHE_TTL"] = 300
+    with app.app_context():
+        assert data_version(1000) == data_version(1199)
+        assert data_version(1199) != data_version(1200)
+
+
+def test_completion_populates_versioned_cache(monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app()
+    with app.app_context():
+        r = DictRedis()
+        store_analysis_result(r, "bitcoin", "moderate", {"coin": "bitcoin", "signal": "BUY"}, "task-1", 7)
+        cached = load_cached_analysis(r, "bitcoin", "moderate")
+        assert cached["result"]["signal"] == "BUY"
+        assert cached["task_id"] == "task-1"
+        assert cached["data_version"] == 7
+        assert result_cache_key("bitcoin", "moderate").startswith(f"analysis:v{ANALYSIS_CACHE_VERSION}:")
@@ -0,0 +1,133 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy.pool import StaticPool
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend import create_app, db
+from backend.db.models import Role, SubscriptionPlan, User
+from backend.services.analysis_cache import (
+    grant_task_access,
+    store_analysis_failure,
+    store_analysis_result,
+    wait_for_task_result,
+)
+from tests.factories import DictRedis
+
+RESULT = {
+    "coin": "bitcoin",
+    "signal": "BUY",
+    "confidence": 0.7,
+    "forecast_next_day": 101.0,
+    "forecast_upper_bound": 105.0,
+    "forecast_lower_bound": 97.0,
+    "suggested_position_size": 0.1,
+}
+
+
+def setup_app(monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    monkeypatch.setattr("backend.Config.SQLALCHEMY_DATABASE_URI", "sqlite:///:memory:")
+    monkeypatch.setattr(
+        "backend.Config.SQLALCHEMY_ENGINE_OPTIONS",
+        {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}},
+        raising=False,
+    )
+    app = create_app()
+    app.extensions["redis_client"] = DictRedis()
+    with app.app_context():
+        role = Role.query.filter_by(name="user").first()
+        for name, plan in (("basicuser", SubscriptionPlan.BASIC), ("premiumuser", SubscriptionPlan.PREMIUM)):
+            user = User(
+                username=name,
+                api_key=f"{name}-key",
+                role_id=role.id,
+                subscription_level=plan,
+                subscription_end=datetime.utcnow() + timedelta(days=30),
+            )
+            user.set_password("pass")
+            db.session.add(user)
+        db.session.commit()
+    return app
+
+
+def test_result_is_redacted_per_plan_with_etag(monkeypatch):
+    app = setup_app(monkeypatch)
+    client = app.test_client()
+    with app.app_context():
+        store_analysis_result(app.extensions["redis_client"], "bitcoin", "moderate", RESULT, "t1", 1)
+        for user in User.query.all():
+            grant_task_access(app.extensions["redis_client"], "t1", user.id)
+
+    premium = client.get("/api/analysis/t1", headers={"X-API-KEY": "premiumuser-key"})
+    assert premium.status_code == 200
+    assert premium.get_json()["result"]["forecast_upper_bound"] == 105.0
+
+    basic = client.get("/api/analysis/t1", headers={"X-API-KEY": "basicuser-key"})
+    body = basic.get_json()["result"]
+    assert body["signal"] == "BUY"
+    assert "forecast_upper_bound" not in body
+    assert "suggested_position_size" not in body
+    assert basic.headers["ETag"] != premium.headers["ETag"]
+
+    again = client.get(
+        "/api/analysis/t1",
+        headers={"X-API-KEY": "basicuser-key", "If-None-Match": basic.headers["ETag"]},
+    )
+    assert again.status_code == 304
+    assert again.headers["ETag"] == basic.headers["ETag"]
+
+
+def test_pending_and_failed_results(monkeypatch):
+    app = setup_app(monkeypatch)
+    client = app.test_client()
+    r = app.extensions["redis_client"]
+    with app.app_context():
+        basic_id = User.query.filter_by(username="basicuser").first().id
+        grant_task_access(r, "queued", basic_id)
+        grant_task_access(r, "t2", basic_id)
+    pending = client.get("/api/analysis/queued?wait=60", headers={"X-API-KEY": "basicuser-key"})
+    assert pending.status_code == 202
+    assert pending.get_json()["status"] == "pending"
+    assert pending.headers["Retry-After"] == "2"
+    # Uyku döngüsü yerine tek bir engelleyici Redis çağrısı, birkaç saniyeyle sınırlı
+    assert r.block_timeouts == [5]
+
+    with app.app_context():
+        store_analysis_failure(r, "t2", "bitcoin", "moderate")
+    failed = client.get("/api/analysis/t2", headers={"X-API-KEY": "basicuser-key"})
+    assert failed.status_code == 500
+    assert failed.get_json()["status"] == "failed"
+
+
+def test_requires_authentication(monkeypatch):
+    app = setup_app(monkeypatch)
+    assert app.test_client().get("/api/analysis/t1").status_code == 401
+
+
+def test_result_is_only_visible_to_requesters(monkeypatch):
+    app = setup_app(monkeypatch)
+    client = app.test_client()
+    r = app.extensions["redis_client"]
+    with app.app_context():
+        premium_id = User.query.filter_by(username="premiumuser").first().id
+        grant_task_access(r, "t3", premium_id)
+        store_analysis_result(r, "bitcoin", "moderate", RESULT, "t3", 1)
+
+    assert client.get("/api/analysis/t3", headers={"X-API-KEY": "premiumuser-key"}).status_code == 200
+    other = client.get("/api/analysis/t3", headers={"X-API-KEY": "basicuser-key"})
+    assert other.status_code == 404
+    assert "result" not in other.get_json()
+
+
+def test_waiters_wake_on_done_token(monkeypatch):
+    app = setup_app(monkeypatch)
+    r = app.extensions["redis_client"]
+    with app.app_context():
+        store_analysis_result(r, "bitcoin", "moderate", RESULT, "t4", 1)
+        r.delete("analysis:v1:task:t4")
+        # Jeton her uyanışta listeye geri döner; diğer bekleyenler de görür
+        for _ in range(3):
+            wait_for_task_result(r, "t4", 2)
+        assert r.llen("analysis:v1:task:t4:done") == 1
@@ -0,0 +1,69 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend import create_app, db
+from backend.db.models import AuditLog
+from backend.utils.audit import AuditLogBuffer, audit_log_buffer
+from backend.utils.helpers import add_audit_log
+
+
+@pytest.fixture
+def app(monkeypatch, tmp_path):
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    monkeypatch.setenv("AUDIT_FALLBACK_LOG_DIR", str(tmp_path))
+    app = create_app()
+    # Arka plan iş parçacığı yerine flush() elle çağrılır
+    monkeypatch.setattr(audit_log_buffer, "_ensure_thread", lambda: None)
+    audit_log_buffer.drain()
+    with app.test_request_context(environ_base={"REMOTE_ADDR": "10.0.0.7"}):
+        yield app
+    audit_log_buffer.drain()
+
+
+def test_audit_rows_are_batched_off_the_request_path(app):
+    for symbol in ("BTC", "ETH", "SOL"):
+        add_audit_log(
+            action_type="COIN_ANALYSIS_REQUESTED",
+            actor_id=4,
+            actor_username="alice",
+            target_id=9,
+            details={"coin": symbol},
+        )
+    assert AuditLog.query.count() == 0
+    assert len(audit_log_buffer) == 3
+
+    assert audit_log_buffer.flush() == 3
+    row = AuditLog.query.order_by(AuditLog.id).first()
+    assert (row.user_id, row.username, row.action, row.ip_address) == (4, "alice", "COIN_ANALYSIS_REQUESTED", "10.0.0.7")
+    assert json.loads(row.details) == {"coin": "BTC", "target_id": 9}
+
+
+def test_security_critical_actions_are_written_synchronously(app):
+    add_audit_log(action_type="PLAN_UPGRADED", actor_id=4, actor_username="alice")
+    add_audit_log(action_type="LLM_QUERY", actor_id=4, durability="sync")
+    assert len(audit_log_buffer) == 0
+    assert {r.action for r in AuditLog.query.all()} == {"PLAN_UPGRADED", "LLM_QUERY"}
+
+
+def test_failed_batch_spills_to_fallback_file(app, monkeypatch, tmp_path):
+    add_audit_log(action_type="LLM_QUERY", actor_username="bob", details={"q": "hi"})
+
+    def broken(self, rows):
+        raise RuntimeError("db down")
+
+    monkeypatch.setattr(AuditLogBuffer, "_write", broken)
+    assert audit_log_buffer.flush() == 0
+    assert len(audit_log_buffer) == 0
+
+    lines = (tmp_path / "auditlog-failsafe.log").read_text().splitlines()
+    entry = json.loads(lines[0])
+    assert entry["action_type"] == "LLM_QUERY"
+    assert entry["actor_username"] == "bob"
+    assert entry["details"] == {"q": "hi"}
+    assert entry["ip_address"] == "10.0.0.7"
+    assert entry["error"] == "db down"
+    assert set(entry) == {"action_type", "actor_username", "details", "ip_address", "timestamp", "error"}
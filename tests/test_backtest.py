@@ -0,0 +1,119 @@
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend import create_app, db
+from backend.db.models import BacktestResult, CoinPrice
+from backend.engine.backtest import (
+    BUY,
+    HOLD,
+    SELL,
+    compute_indicators,
+    generate_signals,
+    run_backtest,
+    simulate_trades,
+)
+
+RULES = {
+    "moderate": {
+        "buy": [{"metric": "rsi", "operator": "<", "value": 35, "weight": 20}],
+        "sell": [{"metric": "rsi", "operator": ">", "value": 65, "weight": 20}],
+        "threshold": 10,
+        "stop_loss_pct": 0.05,
+        "position_size_pct": 0.5,
+    }
+}
+
+
+def _wave(n=24 * 365):
+    t = np.arange(n)
+    return 100 + 10 * np.sin(t / 24.0) + 0.01 * t
+
+
+def test_signals_follow_rule_weights():
+    metrics = {
+        "current_price": np.array([1.0, 1.0, 1.0]),
+        "rsi": np.array([20.0, 50.0, 80.0]),
+        "volatility": np.zeros(3),
+    }
+    signals = generate_signals(RULES["moderate"], metrics)
+    assert signals.tolist() == [BUY, HOLD, SELL]
+
+
+def test_stop_loss_closes_position():
+    prices = np.array([100.0, 99.0, 94.0, 90.0, 120.0])
+    signals = np.array([BUY, HOLD, HOLD, HOLD, SELL], dtype=np.int8)
+    replay = simulate_trades(prices, signals, stop_loss_pct=0.05, position_size_pct=1.0)
+    assert np.allclose(replay["trade_returns"], [-0.06])
+    assert np.isclose(replay["equity"][-1], 0.94)
+
+
+def test_sell_signal_exits_and_reenters():
+    prices = np.array([100.0, 110.0, 100.0, 105.0])
+    signals = np.array([BUY, SELL, BUY, SELL], dtype=np.int8)
+    replay = simulate_trades(prices, signals, position_size_pct=0.5)
+    assert np.allclose(replay["trade_returns"], [0.10, 0.05])
+    assert np.isclose(replay["equity"][-1], 1.05 * 1.025)
+
+
+def test_year_of_hourly_data_is_fast():
+    prices = _wave()
+    started = time.perf_counter()
+    report = run_backtest(prices, RULES["moderate"])
+    assert time.perf_counter() - started < 1.0
+    assert report.total_trades > 0
+    assert 0.0 <= report.win_rate <= 1.0
+    assert report.max_drawdown >= 0.0
+    assert len(compute_indicators(prices)["rsi"]) == len(prices)
+
+
+def test_backtest_profile_persists_result(monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app()
+    with app.app_context():
+        from backend.services.backtest import backtest_profile, store_price_points
+
+        start = datetime(2025, 1, 1)
+        prices = _wave(24 * 60)
+        times = [start + timedelta(hours=i) for i in range(len(prices))]
+        assert store_price_points("bitcoin", times, prices) == len(prices)
+        assert store_price_points("bitcoin", times, prices) == 0
+
+        out = backtest_profile("bitcoin", "moderate", start, times[-1], rules=RULES)
+        assert out["bars"] == len(prices)
+        assert out["trades"] > 0
+        stored = db.session.get(BacktestResult, out["id"])
+        assert stored.total_trades == out["trades"]
+        assert stored.profit_pct == out["profit_pct"]
+        CoinPrice.query.delete()
+        db.session.commit()
+
+
+def test_store_price_points_skips_rows_written_concurrently(monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app()
+    with app.app_context():
+        from backend.services import backtest
+
+        start = datetime(2025, 1, 1)
+        times = [start + timedelta(hours=i) for i in range(10)]
+        parse = backtest.to_datetime
+        raced = []
+
+        def racing_to_datetime(value):
+            # Son zaman damgası okunduktan sonra başka bir toplayıcı aynı noktayı yazar
+            if not raced:
+                raced.append(True)
+                db.session.add(CoinPrice(coin="racecoin", timestamp=times[3], price=1.0))
+                db.session.commit()
+            return parse(value)
+
+        monkeypatch.setattr(backtest, "to_datetime", racing_to_datetime)
+        assert backtest.store_price_points("racecoin", times, [2.0] * len(times)) == len(times) - 1
+        assert CoinPrice.query.filter_by(coin="racecoin").count() == len(times)
+        CoinPrice.query.delete()
+        db.session.commit()
@@ -61,3 +61,46 @@ def test_limit_status_endpoint(test_app, test_user):
     data = resp.get_json()
     assert data["limits"]["predict_daily"]["used"] == 1
     assert data["limits"]["predict_daily"]["remaining"] == 4
+
+
+def test_limit_status_cost_is_independent_of_feature_count(test_app, test_user):
+    from sqlalchemy import event
+
+    from tests.factories import DictRedis
+
+    with test_app.app_context():
+        plan = db.session.get(Plan, test_user.plan_id)
+        plan.features = json.dumps({f"feature_{i}": 10 for i in range(12)} | {"can_export_csv": True})
+        db.session.add_all(
+            [UsageLog(user_id=test_user.id, action="feature_3", timestamp=datetime.utcnow()) for _ in range(4)]
+        )
+        db.session.commit()
+
+    redis = DictRedis()
+    test_app.extensions["redis_client"] = redis
+    mgets = []
+    original_mget = redis.mget
+    redis.mget = lambda keys: mgets.append(len(keys)) or original_mget(keys)
+
+    statements = []
+
+    def count_sql(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    client = test_app.test_client()
+    with test_app.app_context():
+        event.listen(db.engine, "before_cursor_execute", count_sql)
+        try:
+            for _ in range(2):
+                g.user = db.session.merge(test_user)
+                resp = client.get("/api/limits/status")
+                assert resp.status_code == 200
+        finally:
+            event.remove(db.engine, "before_cursor_execute", count_sql)
+
+    limits = resp.get_json()["limits"]
+    assert len(limits) == 12 and "can_export_csv" not in limits
+    assert limits["feature_3"] == {"limit": 10, "used": 4, "remaining": 6, "percent_used": 40}
+    # Her istekte tek MGET; eksik sayaçlar yalnızca ilk istekte tek gruplu sorguyla tohumlanır
+    assert mgets == [12, 12]
+    assert len([s for s in statements if "usage_log" in s]) == 1
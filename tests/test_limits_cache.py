@@ -0,0 +1,103 @@
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend import create_app, db
+from backend.db.models import Role, User, UserRole
+from backend.models.plan import Plan
+from backend.services import limits_cache
+from backend.services.limits_cache import INVALIDATION_CHANNEL, VERSION_KEY, invalidate_limits
+from backend.utils.plan_limits import get_user_effective_limits, give_user_boost
+from tests.factories import DictRedis
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app()
+    app.extensions["redis_client"] = DictRedis()
+    with app.app_context():
+        role = Role.query.filter_by(name="user").first()
+        plan = Plan(name="Cached", price=0.0, features=json.dumps({"predict_daily": 5, "export": 1}))
+        other = Plan(name="Other", price=0.0, features=json.dumps({"predict_daily": 50}))
+        db.session.add_all([plan, other])
+        db.session.commit()
+        for name, plan_id in (("alice", plan.id), ("bob", plan.id), ("carol", other.id)):
+            user = User(username=name, api_key=f"{name}-key", role_id=role.id, role=UserRole.USER, plan_id=plan_id)
+            user.set_password("pass")
+            db.session.add(user)
+        db.session.commit()
+        yield app
+
+
+def _user(name):
+    return User.query.filter_by(username=name).first()
+
+
+def _count_compiles(monkeypatch):
+    calls = []
+    original = limits_cache.compile_limits
+    monkeypatch.setattr(limits_cache, "compile_limits", lambda user, *a: calls.append(user.id) or original(user, *a))
+    return calls
+
+
+def test_limits_are_compiled_once_and_invalidated_by_plan_or_user(app, monkeypatch):
+    compiles = _count_compiles(monkeypatch)
+    alice, bob, carol = _user("alice"), _user("bob"), _user("carol")
+    for _ in range(3):
+        assert get_user_effective_limits(alice) == {"predict_daily": 5, "export": 1}
+        get_user_effective_limits(bob)
+        get_user_effective_limits(carol)
+    assert compiles == [alice.id, bob.id, carol.id]
+
+    plan = db.session.get(Plan, alice.plan_id)
+    plan.features = json.dumps({"predict_daily": 7})
+    db.session.commit()
+    invalidate_limits(plan_id=plan.id)
+    assert get_user_effective_limits(alice) == {"predict_daily": 7}
+    get_user_effective_limits(carol)
+    assert compiles[3:] == [alice.id]
+
+    redis = app.extensions["redis_client"]
+    assert redis.store[VERSION_KEY] == b"1"
+    channel, message = redis.published[-1]
+    assert channel == INVALIDATION_CHANNEL
+    assert json.loads(message) == {"version": 1, "user_id": None, "plan_id": plan.id}
+
+    # Kullanıcı satırı değişince yayın beklenmeden yeniden derlenir
+    bob.custom_features = json.dumps({"predict_daily": 99})
+    assert get_user_effective_limits(bob)["predict_daily"] == 99
+
+
+def test_boost_expiry_sets_entry_lifetime(app, monkeypatch):
+    alice = _user("alice")
+    give_user_boost(alice, {"predict_daily": 20}, datetime.utcnow() + timedelta(minutes=1))
+    assert json.loads(app.extensions["redis_client"].published[-1][1])["user_id"] == alice.id
+    assert get_user_effective_limits(alice)["predict_daily"] == 20
+
+    entry = app.extensions["limits_cache"].get(alice)
+    boost_end = (alice.boost_expire_at - datetime(1970, 1, 1)).total_seconds()
+    assert entry.expires_at == pytest.approx(boost_end)
+
+    compiles = _count_compiles(monkeypatch)
+    monkeypatch.setattr(limits_cache.time, "time", lambda: boost_end + 1)
+    assert get_user_effective_limits(alice)["predict_daily"] == 5
+    assert compiles == [alice.id]
+
+
+def test_listener_messages_and_version_gaps(app):
+    cache = app.extensions["limits_cache"]
+    users = [_user(n) for n in ("alice", "bob", "carol")]
+    for user in users:
+        cache.get(user)
+    cache.version = 4
+
+    cache.apply({"version": 5, "user_id": users[0].id, "plan_id": None})
+    assert len(cache) == 2 and cache.version == 5
+    # Atlanan sürüm (kaçırılmış mesaj) tüm önbelleği boşaltır
+    cache.apply({"version": 7, "user_id": users[1].id, "plan_id": None})
+    assert len(cache) == 0 and cache.version == 7
@@ -0,0 +1,117 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend import create_app, db
+from backend.db.models import AuditLog, SystemEvent
+from backend.services.log_search import audit_log_search, system_event_search
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr("flask_jwt_extended.jwt_required", lambda *a, **k: (lambda f: f))
+    monkeypatch.setattr("backend.auth.middlewares.admin_required", lambda: (lambda f: f))
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app()
+    with app.app_context():
+        yield app
+
+
+def _add_logs(rows):
+    db.session.add_all(rows)
+    db.session.commit()
+
+
+def _ids(query):
+    return sorted(row.id for row in query.all())
+
+
+def test_search_uses_trigram_index(app):
+    _add_logs([
+        AuditLog(username="alice", action="LOGIN_SUCCESS", details='{"ip": "10.0.0.1"}'),
+        AuditLog(username="bob", action="PASSWORD_RESET", details='{"reason": "forgot"}'),
+        AuditLog(username="Alicia", action="LOGOUT"),
+    ])
+    statements = []
+    listener = lambda *a: statements.append(a[2])
+    event.listen(db.engine, "before_cursor_execute", listener)
+    found = AuditLog.query.filter(audit_log_search.contains("ALI", ["username"])).all()
+    by_detail = AuditLog.query.filter(audit_log_search.contains("forgo")).all()
+    event.remove(db.engine, "before_cursor_execute", listener)
+
+    assert sorted(l.username for l in found) == ["Alicia", "alice"]
+    assert [l.username for l in by_detail] == ["bob"]
+    searches = [s for s in statements if "FROM audit_logs" in s]
+    assert len(searches) == 2 and all("audit_logs_fts MATCH" in s for s in searches)
+
+    # İki karakterlik terimler trigram indeksine girmez, LIKE ile aranır
+    assert len(AuditLog.query.filter(audit_log_search.contains("bo")).all()) == 1
+
+
+def test_index_follows_updates_and_deletes(app):
+    event_row = SystemEvent(event_type="worker", level="ERROR", message="disk almost full")
+    db.session.add(event_row)
+    db.session.commit()
+    assert _ids(SystemEvent.query.filter(system_event_search.contains("almost"))) == [event_row.id]
+
+    event_row.message = "disk cleaned"
+    db.session.commit()
+    assert _ids(SystemEvent.query.filter(system_event_search.contains("almost"))) == []
+    assert _ids(SystemEvent.query.filter(system_event_search.contains("cleaned"))) == [event_row.id]
+
+    db.session.delete(event_row)
+    db.session.commit()
+    assert _ids(SystemEvent.query.filter(system_event_search.contains("cleaned"))) == []
+
+
+def test_audit_logs_are_paged_with_cursor(app):
+    ts = datetime(2026, 1, 1)
+    # Aynı zaman damgasına sahip kayıtlar sayfalar arasında kaybolmamalı
+    _add_logs(
+        [AuditLog(username="u", action=f"act_{i}", created_at=ts) for i in range(12)]
+        + [AuditLog(username="u", action=f"old_{i}", created_at=ts - timedelta(days=1)) for i in range(13)]
+    )
+    client = app.test_client()
+
+    resp = client.get("/api/admin/audit-logs?limit=10")
+    assert resp.headers["X-Total-Estimate"] == "25"
+    assert resp.headers["X-Total-Exact"] == "true"
+    seen = [l["id"] for l in resp.get_json()]
+    cursor = resp.headers["X-Next-Cursor"]
+    while cursor:
+        resp = client.get(f"/api/admin/audit-logs?limit=10&cursor={cursor}")
+        assert "X-Total-Estimate" not in resp.headers
+        seen += [l["id"] for l in resp.get_json()]
+        cursor = resp.headers.get("X-Next-Cursor")
+
+    expected = [l.id for l in AuditLog.query.order_by(AuditLog.created_at.desc(), AuditLog.id.desc())]
+    assert seen == expected
+    assert client.get("/api/admin/audit-logs?cursor=not-a-cursor").status_code == 400
+
+
+def test_estimate_is_capped(app):
+    _add_logs([AuditLog(username="u", action="ping") for _ in range(8)])
+    app.config["LOG_SEARCH_COUNT_CAP"] = 5
+    assert audit_log_search.estimate(AuditLog.query) == (5, False)
+    resp = app.test_client().get("/api/admin/audit-logs?action=ping")
+    assert resp.headers["X-Total-Estimate"] == "5"
+    assert resp.headers["X-Total-Exact"] == "false"
+
+
+def test_json_columns_are_parsed_on_request(app):
+    _add_logs([
+        AuditLog(username="u", action="export", details='{"rows": 3}'),
+        SystemEvent(event_type="backup", level="INFO", message="backup finished", meta='{"size": 42}'),
+    ])
+    client = app.test_client()
+
+    assert client.get("/api/admin/audit-logs").get_json()[0]["details"] == '{"rows": 3}'
+    assert client.get("/api/admin/audit-logs?expand=details").get_json()[0]["details"] == {"rows": 3}
+
+    events = client.get("/api/admin/events?search=finish").get_json()
+    assert [(e["message"], e["meta"]) for e in events] == [("backup finished", {"size": 42})]
+    assert "meta" not in client.get("/api/admin/events?expand=").get_json()[0]
@@ -0,0 +1,108 @@
+import os
+import smtplib
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend import create_app
+from backend.db.models import AlarmSeverityEnum
+from backend.utils import audit
+from backend.utils.alarms import send_alarm
+from backend.utils.notifications import EMAIL, SLACK, ChannelWorker, NotificationDispatcher, TokenBucket
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app()
+    dispatcher = app.extensions["notifications"]
+    sent = []
+    for name, channel in dispatcher.channels.items():
+        # İşçi iş parçacığı yerine process_pending() elle çağrılır
+        monkeypatch.setattr(channel, "_ensure_thread", lambda: None)
+        monkeypatch.setattr(channel, "send", lambda message, name=name: sent.append((name, message)))
+    app.sent = sent
+    with app.test_request_context():
+        yield app
+
+
+def test_critical_log_action_only_enqueues(app, monkeypatch):
+    monkeypatch.setattr(audit, "SLACK_WEBHOOK_URL", "https://hooks.example/x")
+    monkeypatch.setattr(audit, "ADMIN_ALERT_EMAIL", "ops@example.com")
+
+    audit.log_action(SimpleNamespace(id=1, username="root"), action="admin_login")
+    assert app.sent == []
+
+    dispatcher = app.extensions["notifications"]
+    assert dispatcher.channels[SLACK].process_pending() == 1
+    assert dispatcher.channels[EMAIL].process_pending() == 1
+    (slack, slack_msg), (email, email_msg) = app.sent
+    assert slack_msg["webhook"] == "https://hooks.example/x"
+    assert "[ALERT] admin_login by root" in slack_msg["payload"]["text"]
+    assert email_msg["to"] == "ops@example.com"
+    assert email_msg["subject"] == "ALERT: admin_login"
+
+
+def test_send_alarm_queues_slack_after_commit(app):
+    app.config["SLACK_ALARM_WEBHOOK_URL"] = "https://hooks.example/alarm"
+    send_alarm("brute_force", AlarmSeverityEnum.CRITICAL, "10 failed logins", username="eve")
+    app.config["SLACK_ALARM_WEBHOOK_URL"] = None
+    send_alarm("noise", AlarmSeverityEnum.INFO, "no webhook")
+
+    channel = app.extensions["notifications"].channels[SLACK]
+    assert len(channel) == 1
+    channel.process_pending()
+    payload = app.sent[0][1]["payload"]["attachments"][0]
+    assert "brute_force" in payload["pretext"]
+
+
+def test_full_queue_drops_instead_of_blocking():
+    worker = ChannelWorker("test", lambda message: None, per_minute=60, queue_size=2)
+    worker._ensure_thread = lambda: None
+    assert [worker.put({"n": i}) for i in range(3)] == [True, True, False]
+    assert worker.dropped == 1
+
+
+def test_token_bucket_spaces_out_bursts():
+    now = [0.0]
+    bucket = TokenBucket(per_minute=60, burst=2, clock=lambda: now[0])
+    assert [bucket.reserve(), bucket.reserve()] == [0.0, 0.0]
+    assert bucket.reserve() == pytest.approx(1.0)
+    now[0] = 10.0
+    assert bucket.reserve() == 0.0
+
+
+def test_smtp_connection_is_reused_and_reconnected(monkeypatch):
+    connections = []
+
+    class FakeSMTP:
+        def __init__(self, host, port, timeout=None):
+            self.sent = 0
+            self.dead = False
+            connections.append(self)
+
+        def send_message(self, message):
+            if self.dead:
+                raise smtplib.SMTPServerDisconnected("gone")
+            self.sent += 1
+
+        def quit(self):
+            pass
+
+    monkeypatch.setattr(smtplib, "SMTP", FakeSMTP)
+    dispatcher = NotificationDispatcher({"MAIL_SERVER": "mail.local", "NOTIFY_EMAIL_PER_MINUTE": 600})
+    email = dispatcher.channels[EMAIL]
+    email._ensure_thread = lambda: None
+
+    for i in range(3):
+        dispatcher.email("ops@example.com", f"s{i}", "body")
+    email.process_pending()
+    assert len(connections) == 1 and connections[0].sent == 3
+
+    connections[0].dead = True
+    dispatcher.email("ops@example.com", "again", "body")
+    email.process_pending()
+    assert len(connections) == 2 and connections[1].sent == 1
+    assert dispatcher.metrics()[EMAIL] == {"queued": 0, "sent": 4, "failed": 0, "dropped": 0}
@@ -0,0 +1,114 @@
+import os
+import sys
+import threading
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend import create_app, db
+from backend.auth.password_hashing import HashingOverloaded, PasswordHasher
+from backend.db.models import Role, User
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app()
+    with app.app_context():
+        yield app
+
+
+def _user(username, password_hash):
+    role = Role.query.filter_by(name="user").first()
+    user = User(username=username, api_key=f"{username}-key", role_id=role.id, password_hash=password_hash)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def test_excess_hashing_is_shed_instead_of_queued():
+    hasher = PasswordHasher(workers=1, max_pending=0, method="pbkdf2:sha256:1000")
+    release, started = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return True
+
+    busy = threading.Thread(target=hasher._run, args=(slow,))
+    busy.start()
+    assert started.wait(5)
+    with pytest.raises(HashingOverloaded):
+        hasher.hash("secret")
+    release.set()
+    busy.join()
+
+    assert hasher.verify(hasher.hash("secret"), "secret")
+    metrics = hasher.metrics()
+    assert metrics["rejected"] == 1
+    assert metrics["in_flight"] == 0
+    assert metrics["hash"]["count"] == 3
+    assert metrics["queue_wait"]["count"] == 3
+    hasher.shutdown()
+
+
+def test_login_upgrades_outdated_hash(app):
+    user = _user("legacy", generate_password_hash("pass", method="pbkdf2:sha256:1000"))
+    hasher = app.extensions["password_hasher"]
+    assert hasher.needs_rehash(user.password_hash)
+
+    resp = app.test_client().post("/api/auth/login", json={"username": "legacy", "password": "pass"})
+    assert resp.status_code == 200
+    db.session.refresh(user)
+    assert not hasher.needs_rehash(user.password_hash)
+    assert user.check_password("pass")
+
+
+def test_login_answers_503_when_hashing_is_saturated(app, monkeypatch):
+    _user("crowded", generate_password_hash("pass"))
+
+    def overloaded(*args):
+        raise HashingOverloaded("full")
+
+    monkeypatch.setattr(app.extensions["password_hasher"], "_run", overloaded)
+    resp = app.test_client().post("/api/auth/login", json={"username": "crowded", "password": "pass"})
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == "5"
+
+
+def test_unknown_user_login_still_runs_the_kdf(app, monkeypatch):
+    hasher = app.extensions["password_hasher"]
+    calls = []
+    run = hasher._run
+
+    def counting(fn, *args):
+        calls.append(args[0])
+        return run(fn, *args)
+
+    monkeypatch.setattr(hasher, "_run", counting)
+    resp = app.test_client().post("/api/auth/login", json={"username": "nobody", "password": "pass"})
+    assert resp.status_code == 401
+    # Var olmayan kullanıcı için de sabit bir özete karşı doğrulama yapılır
+    assert len(calls) == 1 and calls[0].startswith(hasher.method)
+
+
+def test_model_and_admin_hashes_use_the_configured_hasher(app):
+    import inspect
+
+    from backend.api.admin.users import create_user
+
+    hasher = app.extensions["password_hasher"]
+    # Yetki dekoratörleri atlanır; yalnızca şifre özeti incelenir
+    with app.test_request_context(json={"email": "new@example.com", "password": "pass"}):
+        _, status = inspect.unwrap(create_user)()
+    assert status == 201
+    created = User.query.filter_by(email="new@example.com").one()
+    assert not hasher.needs_rehash(created.password_hash)
+
+    user = User(username="modeluser")
+    user.set_password("pass")
+    assert not hasher.needs_rehash(user.password_hash)
+    assert user.check_password("pass") and not user.check_password("wrong")
+    assert created.check_password("pass")
+    assert hasher.metrics()["hash"]["count"] == 5
@@ -0,0 +1,169 @@
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.pool import StaticPool
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend import create_app, db
+from backend.constants import ALERTS_NAMESPACE
+from backend.db.models import PriceAlert, Role, SubscriptionPlan, User
+from backend.services.price_alerts import AlertEngine, deliver_alerts
+from backend.services.realtime import user_room
+from backend.services.ticker import TickerProducer
+from tests.factories import DictRedis
+
+
+class RecordingSocketIO:
+    def __init__(self):
+        self.sent = []
+
+    def emit(self, event, data, to=None, namespace=None):
+        self.sent.append((event, data, to, namespace))
+
+
+def test_crossed_alerts_fire_once():
+    engine = AlertEngine()
+    engine.add(1, 10, "BTC", "current_price", "above", 100.0)
+    engine.add(2, 11, "btc", "current_price", "above", 110.0)
+    engine.add(3, 12, "btc", "current_price", "below", 90.0)
+    engine.add(4, 13, "btc", "rsi", "below", 30.0)
+    engine.add(5, 14, "eth", "current_price", "above", 1.0)
+
+    assert engine.evaluate("btc", {"current_price": 99.0, "rsi": 50.0}) == []
+    fired = engine.evaluate("btc", {"current_price": 105.0, "rsi": 25.0})
+    assert sorted(f.alert_id for f in fired) == [1, 4]
+    # Tetiklenen alarm tekrar gelmez
+    assert engine.evaluate("btc", {"current_price": 105.0}) == []
+    assert [f.alert_id for f in engine.evaluate("btc", {"current_price": 80.0})] == [3]
+
+    assert engine.remove(2)
+    assert engine.evaluate("btc", {"current_price": 200.0}) == []
+    assert engine.coins() == {"eth"}
+
+    sio = RecordingSocketIO()
+    deliver_alerts(sio, fired)
+    assert {(e, to, ns) for e, _, to, ns in sio.sent} == {
+        ("price_alert", user_room(10), ALERTS_NAMESPACE),
+        ("price_alert", user_room(13), ALERTS_NAMESPACE),
+    }
+
+
+def _random_alerts(count, coins, seed=7):
+    rng = random.Random(seed)
+    # Fiyat 100 civarında: "above" eşikleri üstünde, "below" eşikleri altında
+    return [
+        (i, i % 5000, coins[i % len(coins)], "current_price", "above", rng.uniform(100, 150))
+        if i % 2
+        else (i, i % 5000, coins[i % len(coins)], "current_price", "below", rng.uniform(50, 100))
+        for i in range(count)
+    ]
+
+
+def test_bulk_loaded_alerts_fire_exactly_the_crossed_thresholds():
+    coins = [f"coin{i}" for i in range(5)]
+    rows = _random_alerts(10_000, coins)
+    engine = AlertEngine()
+    assert engine.bulk_load(rows) == len(rows)
+
+    fired = set()
+    for coin in coins:
+        fired |= {f.alert_id for f in engine.evaluate(coin, {"current_price": 100.5})}
+        fired |= {f.alert_id for f in engine.evaluate(coin, {"current_price": 99.5})}
+    expected = {
+        alert_id
+        for alert_id, _, _, _, direction, threshold in rows
+        if (direction == "above" and threshold <= 100.5) or (direction == "below" and threshold >= 99.5)
+    }
+    assert fired == expected
+    assert len(engine) == len(rows) - len(expected)
+
+
+@pytest.mark.skipif(not os.getenv("RUN_BENCHMARKS"), reason="set RUN_BENCHMARKS=1 to run benchmarks")
+def test_million_alert_benchmark():
+    coins = [f"coin{i}" for i in range(50)]
+    engine = AlertEngine()
+    assert engine.bulk_load(_random_alerts(1_000_000, coins)) == 1_000_000
+
+    started = time.perf_counter()
+    fired = 0
+    for coin in coins:
+        # Yalnızca eşiğe çok yakın alarmlar tetiklenir (k küçük)
+        fired += len(engine.evaluate(coin, {"current_price": 100.0 + 1e-3}))
+        fired += len(engine.evaluate(coin, {"current_price": 100.0 - 1e-3}))
+    elapsed = time.perf_counter() - started
+    assert fired < 100
+    assert elapsed < 0.05
+    assert len(engine) == 1_000_000 - fired
+
+
+def setup_app(monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    monkeypatch.setattr("backend.Config.SQLALCHEMY_DATABASE_URI", "sqlite:///:memory:")
+    monkeypatch.setattr(
+        "backend.Config.SQLALCHEMY_ENGINE_OPTIONS",
+        {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}},
+        raising=False,
+    )
+    app = create_app()
+    app.extensions["redis_client"] = DictRedis()
+    with app.app_context():
+        role = Role.query.filter_by(name="user").first()
+        for name, plan in (("basicuser", SubscriptionPlan.BASIC), ("premiumuser", SubscriptionPlan.PREMIUM)):
+            user = User(
+                username=name,
+                api_key=f"{name}-key",
+                role_id=role.id,
+                subscription_level=plan,
+                subscription_end=datetime.utcnow() + timedelta(days=30),
+            )
+            user.set_password("pass")
+            db.session.add(user)
+        db.session.commit()
+    return app
+
+
+def test_alert_api_and_producer_delivery(monkeypatch):
+    app = setup_app(monkeypatch)
+    client = app.test_client()
+    headers = {"X-API-KEY": "premiumuser-key"}
+
+    resp = client.post(
+        "/api/alerts", json={"coin": "Bitcoin", "direction": "above", "threshold": 100}, headers=headers
+    )
+    assert resp.status_code == 201
+    alert_id = resp.get_json()["id"]
+    bad = {"coin": "bitcoin", "direction": "sideways", "threshold": 1}
+    assert client.post("/api/alerts", json=bad, headers=headers).status_code == 400
+    basic = client.post(
+        "/api/alerts",
+        json={"coin": "bitcoin", "direction": "above", "threshold": 1},
+        headers={"X-API-KEY": "basicuser-key"},
+    )
+    assert basic.status_code == 403
+    second = client.post(
+        "/api/alerts", json={"coin": "bitcoin", "direction": "below", "threshold": 50}, headers=headers
+    )
+    assert client.delete(f"/api/alerts/{second.get_json()['id']}", headers=headers).status_code == 200
+    assert [a["id"] for a in client.get("/api/alerts", headers=headers).get_json()] == [alert_id]
+
+    sio = RecordingSocketIO()
+    engine = AlertEngine(app)
+    producer = TickerProducer(
+        sio, DictRedis(), lambda coins: {c: 120.0 for c in coins}, base_interval=2, alerts=engine, alert_interval=10
+    )
+    assert producer.tick(5) == 1
+    event, payload, room, namespace = sio.sent[0]
+    assert (event, namespace, payload["id"], payload["value"]) == ("price_alert", ALERTS_NAMESPACE, alert_id, 120.0)
+
+    with app.app_context():
+        user = User.query.filter_by(username="premiumuser").first()
+        assert room == user_room(user.id)
+        stored = db.session.get(PriceAlert, alert_id)
+        assert stored.is_active is False and stored.triggered_at is not None
+    assert client.get("/api/alerts", headers=headers).get_json() == []
+    # Tetiklenen alarm bir sonraki senkronda geri yüklenmez
+    assert producer.tick(10) == 0
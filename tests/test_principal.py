@@ -0,0 +1,165 @@
+import inspect
+import os
+import sys
+from datetime import datetime, timedelta
+
+from flask import jsonify, request
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend import create_app, db, limiter
+from backend.auth.principal import PRINCIPAL_KEY, api_key_digest, current_user, request_principal
+from backend.db.models import Role, SubscriptionPlan, UsageLimitModel, User
+from backend.limiting import get_plan_rate_limit
+from backend.models.plan import Plan
+from backend.services.limits_cache import invalidate_limits
+from backend.utils.decorators import require_subscription_plan
+from backend.utils.usage_limits import check_usage_limit
+from tests.factories import DictRedis
+
+
+def setup_app(monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    monkeypatch.setattr("backend.Config.SQLALCHEMY_DATABASE_URI", "sqlite:///:memory:")
+    monkeypatch.setattr(
+        "backend.Config.SQLALCHEMY_ENGINE_OPTIONS",
+        {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}},
+        raising=False,
+    )
+    app = create_app()
+    app.extensions["redis_client"] = DictRedis()
+
+    @app.route("/guarded")
+    @limiter.limit(get_plan_rate_limit, key_func=lambda: request.headers.get("X-API-KEY") or request.remote_addr)
+    @require_subscription_plan(SubscriptionPlan.BASIC)
+    @check_usage_limit("coin_analysis")
+    def guarded():
+        return jsonify({"user": current_user().username})
+
+    @app.route("/plan-only")
+    @require_subscription_plan(SubscriptionPlan.BASIC)
+    def plan_only():
+        return jsonify({"id": request_principal().id})
+
+    with app.app_context():
+        role = Role.query.filter_by(name="user").first()
+        plan = Plan(name="Pro", price=1.0, features='{"api_rate_limit_per_minute": 90}')
+        db.session.add(plan)
+        db.session.add(UsageLimitModel(plan_name="BASIC", feature="coin_analysis", daily_limit=100))
+        db.session.commit()
+        user = User(
+            username="keyholder",
+            api_key="holder-key",
+            role_id=role.id,
+            plan_id=plan.id,
+            subscription_level=SubscriptionPlan.BASIC,
+            subscription_end=datetime.utcnow() + timedelta(days=30),
+        )
+        user.set_password("pass")
+        db.session.add(user)
+        db.session.commit()
+    return app
+
+
+def _user_queries(app, client, path="/guarded"):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        if "FROM users" in statement:
+            statements.append(statement)
+
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        resp = client.get(path, headers={"X-API-KEY": "holder-key"})
+    finally:
+        with app.app_context():
+            event.remove(db.engine, "before_cursor_execute", record)
+    return resp, statements
+
+
+def test_api_key_is_resolved_once_per_request_and_shared(monkeypatch):
+    app = setup_app(monkeypatch)
+    client = app.test_client()
+
+    resp, queries = _user_queries(app, client)
+    assert resp.status_code == 200 and resp.get_json() == {"user": "keyholder"}
+    assert len([q for q in queries if "WHERE users.api_key" in q]) == 1
+
+    snapshot = app.extensions["redis_client"].store[PRINCIPAL_KEY.format(digest=api_key_digest("holder-key"))]
+    assert b"holder-key" not in snapshot and b'"rate_limit_per_minute": 90' in snapshot
+
+    # Paylaşılan önbellekten: API anahtarı sorgusu yok, görünüm için tek birincil anahtar okuması
+    resp, queries = _user_queries(app, client)
+    assert resp.status_code == 200
+    assert not [q for q in queries if "WHERE users.api_key" in q]
+    assert len(queries) == 1
+
+    # Plan denetimi anlık görüntüyle yapılır; kullanıcıyı okumayan görünüm veritabanına gitmez
+    resp, queries = _user_queries(app, client, "/plan-only")
+    assert resp.status_code == 200 and resp.get_json()["id"]
+    assert queries == []
+
+
+def test_user_and_limit_changes_invalidate_the_snapshot(monkeypatch):
+    app = setup_app(monkeypatch)
+    client = app.test_client()
+    assert client.get("/guarded", headers={"X-API-KEY": "holder-key"}).status_code == 200
+
+    with app.app_context():
+        user = User.query.filter_by(username="keyholder").first()
+        user.subscription_level = SubscriptionPlan.TRIAL
+        db.session.commit()
+    assert client.get("/guarded", headers={"X-API-KEY": "holder-key"}).status_code == 403
+
+    with app.app_context():
+        user = User.query.filter_by(username="keyholder").first()
+        user.subscription_level = SubscriptionPlan.BASIC
+        user.api_key = "rotated-key"
+        db.session.commit()
+    assert client.get("/guarded", headers={"X-API-KEY": "holder-key"}).status_code == 401
+    assert client.get("/guarded", headers={"X-API-KEY": "rotated-key"}).status_code == 200
+
+    redis = app.extensions["redis_client"]
+    key = PRINCIPAL_KEY.format(digest=api_key_digest("rotated-key"))
+    with app.app_context():
+        plan = Plan.query.filter_by(name="Pro").first()
+        plan.features = '{"api_rate_limit_per_minute": 5}'
+        db.session.commit()
+        invalidate_limits(plan_id=plan.id)
+    # limits:version ilerlediği için anlık görüntü yeniden oluşturulur
+    assert client.get("/guarded", headers={"X-API-KEY": "rotated-key"}).status_code == 200
+    assert b'"rate_limit_per_minute": 5' in redis.store[key]
+
+
+def test_socket_connects_resolve_keys_from_the_principal_cache(monkeypatch):
+    from backend import socketio
+    from backend.constants import TICKER_NAMESPACE
+
+    app = setup_app(monkeypatch)
+    app.secret_key = "socket-test"
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        if "FROM users" in statement:
+            statements.append(statement)
+
+    # Kullanım limiti dekoratörü atlanır; yalnızca anahtar çözümü incelenir
+    ticker_connect = inspect.unwrap(socketio.server.handlers[TICKER_NAMESPACE]["connect"])
+    alerts_connect = inspect.unwrap(socketio.server.handlers["/alerts"]["connect"])
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        # Her bağlantı kendi uygulama bağlamında (boş g) çalışır
+        for _ in range(3):
+            with app.test_request_context():
+                assert ticker_connect({"api_key": "holder-key"}) is None
+            with app.test_request_context():
+                # BASIC plan alarm kanalına bağlanamaz
+                assert alerts_connect({"api_key": "holder-key"}) is False
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    # Anahtar yalnızca ilk bağlantıda veritabanından çözülür
+    assert len(statements) == 1
@@ -0,0 +1,108 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend import celery_app, create_app
+from backend.db.models import SubscriptionPlan
+from backend.tasks.queues import analysis_queue_for_plan, queue_metrics, record_wait
+from tests.factories import DictRedis
+
+
+def _queue(task_name):
+    return celery_app.amqp.router.route({}, task_name)["queue"].name
+
+
+def test_tiered_queues_and_routes(monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    create_app()
+    names = {q.name for q in celery_app.conf.task_queues}
+    assert {
+        "interactive-premium",
+        "interactive-standard",
+        "analysis-batch",
+        "maintenance",
+        "alerts",
+    } <= names
+    assert _queue("backend.tasks.universe_tasks.analyze_universe") == "analysis-batch"
+    assert _queue("backend.tasks.backtest_tasks.run_parameter_sweep") == "analysis-sweep"
+    assert _queue("backend.tasks.plan_tasks.auto_expire_boosts") == "maintenance"
+    assert _queue("backend.tasks.celery_tasks.send_security_alert_task") == "alerts"
+    assert _queue("backend.tasks.celery_tasks.analyze_coin_task") == "interactive-standard"
+
+
+def test_plan_selects_interactive_queue():
+    assert analysis_queue_for_plan(SubscriptionPlan.PREMIUM) == "interactive-premium"
+    assert analysis_queue_for_plan(SubscriptionPlan.ADVANCED) == "interactive-premium"
+    assert analysis_queue_for_plan(SubscriptionPlan.BASIC) == "interactive-standard"
+    assert analysis_queue_for_plan(SubscriptionPlan.TRIAL) == "interactive-standard"
+
+
+def test_queue_metrics_report_depth_and_sla():
+    r = DictRedis()
+    r.lpush("interactive-premium", "m1", "m2", "m3")
+    for seconds in (0.5, 1.0, 2.0, 9.0):
+        record_wait(r, "interactive-premium", seconds)
+    record_wait(r, "alerts", 1.0)
+
+    metrics = {m["queue"]: m for m in queue_metrics(r)}
+    premium = metrics["interactive-premium"]
+    assert premium["depth"] == 3
+    assert premium["samples"] == 4
+    assert premium["wait_max"] == 9.0
+    assert premium["sla_ok"] is False
+    assert metrics["alerts"]["sla_ok"] is True
+    assert metrics["maintenance"]["wait_p95"] is None
+
+
+def test_worker_entry_point_configures_celery():
+    import importlib
+
+    from backend import Config
+
+    entry = importlib.import_module("backend.celery_worker")
+    conf = entry.celery.conf
+    assert entry.celery is celery_app
+    assert conf.broker_url == Config.CELERY_BROKER_URL
+    assert conf.result_backend == Config.CELERY_RESULT_BACKEND
+    assert {q.name for q in conf.task_queues} >= {
+        "interactive-premium",
+        "interactive-standard",
+        "analysis-batch",
+        "maintenance",
+        "alerts",
+    }
+    assert {
+        "backend.tasks.celery_tasks.run_full_analysis",
+        "backend.tasks.celery_tasks.send_security_alert_task",
+        "backend.tasks.backtest_tasks.run_parameter_sweep",
+        "backend.tasks.universe_tasks.analyze_universe",
+        "backend.tasks.plan_tasks.auto_expire_boosts",
+    } <= set(entry.celery.tasks)
+
+
+def test_only_idempotent_analysis_tasks_ack_late():
+    import importlib
+
+    from backend.constants import CELERY_VISIBILITY_TIMEOUT
+
+    entry = importlib.import_module("backend.celery_worker")
+    tasks = entry.celery.tasks
+    assert not entry.celery.conf.task_acks_late
+    assert entry.celery.conf.broker_transport_options["visibility_timeout"] == CELERY_VISIBILITY_TIMEOUT
+    late = {name for name, task in tasks.items() if name.startswith("backend.") and task.acks_late}
+    assert late == {
+        "backend.tasks.celery_tasks.run_full_analysis",
+        "backend.tasks.celery_tasks.analyze_coin_task",
+        "backend.tasks.universe_tasks.coin_stage_task",
+    }
+    assert all(tasks[name].time_limit < CELERY_VISIBILITY_TIMEOUT for name in late)
+    assert not tasks["backend.tasks.celery_tasks.send_security_alert_task"].acks_late
+
+
+def test_sweeps_have_a_solo_worker():
+    from backend.constants import CELERY_WORKER_POOLS
+
+    script = open(os.path.join(os.path.dirname(__file__), "..", "scripts", "run_workers.sh")).read()
+    assert CELERY_WORKER_POOLS["analysis-sweep"]["pool"] == "solo"
+    assert "-Q analysis-sweep -n analysis-sweep@%h -P solo" in script
+    assert "-P threads" not in script
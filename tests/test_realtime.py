@@ -0,0 +1,128 @@
+import itertools
+import json
+import os
+import queue
+import sys
+from types import SimpleNamespace
+
+import socketio as python_socketio
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend.services.realtime import (
+    SlowConsumerGuard,
+    coin_room,
+    publish_analysis,
+    subscription_snapshot,
+    user_room,
+)
+from tests.factories import DictRedis
+
+
+class RecordingSocketIO:
+    def __init__(self):
+        self.sent = []
+
+    def emit(self, event, data, to=None, namespace=None):
+        self.sent.append((event, data, to))
+
+
+RESULT = {
+    "coin": "bitcoin",
+    "signal": "BUY",
+    "confidence": 0.71234567,
+    "risk_level": "medium",
+    "forecast_next_day": 65000.5,
+    "volatility": 0.06,
+    "forecast_explanation": "x" * 5000,
+}
+
+
+def test_coin_room_gets_small_delta_and_user_gets_pointer():
+    sio, r = RecordingSocketIO(), DictRedis()
+    first = publish_analysis(sio, r, "bitcoin", "moderate", RESULT, "task-1", user_id=7)
+    assert first["full"] is True
+    assert first["href"] == "/api/analysis/task-1"
+    assert "forecast_explanation" not in first["changes"]
+    assert len(json.dumps(first)) < 400
+    assert [(e, to) for e, _, to in sio.sent] == [
+        ("analysis_update", coin_room("bitcoin")),
+        ("analysis_ready", user_room(7)),
+    ]
+
+    # Değişmeyen sonuç coin odasına yayınlanmaz
+    sio.sent.clear()
+    assert publish_analysis(sio, r, "bitcoin", "moderate", RESULT, "task-2") is None
+    assert sio.sent == []
+
+    changed = dict(RESULT, signal="SELL", confidence=0.71234999)
+    delta = publish_analysis(sio, r, "bitcoin", "moderate", changed, "task-3")
+    assert delta["changes"] == {"signal": "SELL"}
+    assert delta["full"] is False
+
+
+def test_concurrent_publishers_each_diff_against_the_summary_they_replace():
+    sio, r = RecordingSocketIO(), DictRedis()
+    publish_analysis(sio, r, "bitcoin", "moderate", RESULT, "task-1")
+    calls = r.script_calls
+
+    # Özet tek betikte okunup yazılır; araya giren yayın değişiklik kaybettirmez
+    first = publish_analysis(sio, r, "bitcoin", "moderate", dict(RESULT, signal="SELL"), "task-2")
+    second = publish_analysis(sio, r, "bitcoin", "moderate", dict(RESULT, signal="SELL", risk_level="high"), "task-3")
+    assert first["changes"] == {"signal": "SELL"}
+    assert second["changes"] == {"risk_level": "high"}
+    assert r.script_calls == calls + 2
+
+
+def test_subscription_snapshot_returns_baseline():
+    sio, r = RecordingSocketIO(), DictRedis()
+    publish_analysis(sio, r, "bitcoin", "moderate", RESULT, "task-1")
+    snapshot = subscription_snapshot(r, ["bitcoin", "ethereum"], ["moderate"])
+    assert len(snapshot) == 1
+    assert snapshot[0]["changes"]["signal"] == "BUY"
+    assert subscription_snapshot(None, ["bitcoin"], ["moderate"]) == []
+
+
+class _LocalManager(python_socketio.Manager):
+    def _handle_emit(self, message):
+        super().emit(
+            message["event"],
+            message["data"],
+            namespace=message["namespace"],
+            room=message.get("room"),
+            skip_sid=message.get("skip_sid"),
+        )
+
+
+class GuardedManager(SlowConsumerGuard, _LocalManager):
+    max_send_queue = 2
+
+
+def test_slow_consumer_skipped_and_evicted():
+    sockets = {"fast": SimpleNamespace(queue=queue.Queue()), "slow": SimpleNamespace(queue=queue.Queue())}
+    for _ in range(5):
+        sockets["slow"].queue.put("pkt")
+    delivered, disconnected = [], []
+    ids = itertools.count()
+    server = SimpleNamespace(
+        eio=SimpleNamespace(sockets=sockets, generate_id=lambda: f"sid-{next(ids)}"),
+        packet_class=python_socketio.packet.Packet,
+        _send_eio_packet=lambda eio_sid, pkt: delivered.append(eio_sid),
+        disconnect=lambda sid, namespace=None: disconnected.append(sid),
+    )
+    manager = GuardedManager()
+    manager.set_server(server)
+    manager.initialize()
+    fast = manager.connect("fast", "/")
+    slow = manager.connect("slow", "/")
+    manager.enter_room(fast, "/", coin_room("bitcoin"), eio_sid="fast")
+    manager.enter_room(slow, "/", coin_room("bitcoin"), eio_sid="slow")
+    other = manager.connect("other", "/")
+    sockets["other"] = SimpleNamespace(queue=queue.Queue())
+
+    manager._handle_emit(
+        {"event": "analysis_update", "data": {"coin": "bitcoin"}, "namespace": "/", "room": coin_room("bitcoin")}
+    )
+    assert delivered == ["fast"]
+    assert disconnected == [slow]
+    assert other not in disconnected
+    assert manager.evicted == 1
@@ -0,0 +1,135 @@
+import os
+import sys
+from http.cookies import SimpleCookie
+
+import jwt
+import pytest
+from flask import jsonify
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend import create_app, db
+from backend.auth import middlewares
+from backend.auth.claims import ROLES_CHANGED_KEY, USER_CHANGED_KEY
+from backend.db.models import Role, User, UserRole
+from tests.factories import DictRedis
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    monkeypatch.setattr("backend.Config.SQLALCHEMY_DATABASE_URI", "sqlite:///:memory:")
+    monkeypatch.setattr(
+        "backend.Config.SQLALCHEMY_ENGINE_OPTIONS",
+        {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}},
+        raising=False,
+    )
+    app = create_app()
+    app.extensions["redis_client"] = DictRedis()
+
+    @app.route("/admin-only")
+    @middlewares.admin_required()
+    def admin_only():
+        return jsonify({"ok": True})
+
+    with app.app_context():
+        role = Role.query.filter_by(name="admin").first()
+        admin = User(username="boss", api_key="boss-key", role=UserRole.ADMIN, role_id=role.id)
+        admin.set_password("pass")
+        db.session.add(admin)
+        db.session.commit()
+    return app
+
+
+def _login_claims(app, monkeypatch, username="boss"):
+    resp = app.test_client().post("/api/auth/login", json={"username": username, "password": "pass"})
+    cookies = SimpleCookie()
+    for header in resp.headers.getlist("Set-Cookie"):
+        cookies.load(header)
+    claims = jwt.decode(
+        cookies["accessToken"].value,
+        app.config["ACCESS_TOKEN_SECRET"],
+        algorithms=["HS256"],
+        audience=app.config.get("JWT_AUDIENCE", "ytdcrypto_users"),
+    )
+    monkeypatch.setattr(middlewares, "get_jwt", lambda: claims)
+    monkeypatch.setattr(middlewares, "get_jwt_identity", lambda: claims["sub"])
+    return claims
+
+
+def _get(app):
+    statements = []
+    listener = lambda *a: statements.append(a[2])
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", listener)
+        resp = app.test_client().get("/admin-only")
+        event.remove(db.engine, "before_cursor_execute", listener)
+    return resp.status_code, [s for s in statements if "FROM users" in s]
+
+
+def test_admin_check_uses_token_claims(app, monkeypatch):
+    claims = _login_claims(app, monkeypatch)
+    assert claims["role"] == "admin"
+    assert claims["perms"] == ["admin_access"]
+
+    status, user_queries = _get(app)
+    assert status == 200
+    assert user_queries == []
+
+
+def test_demotion_overrides_older_tokens(app, monkeypatch):
+    _login_claims(app, monkeypatch)
+    with app.app_context():
+        user = User.query.filter_by(username="boss").first()
+        user.role = UserRole.USER
+        user.role_id = Role.query.filter_by(name="user").first().id
+        db.session.commit()
+        uid = user.id
+    assert USER_CHANGED_KEY.format(user_id=uid) in app.extensions["redis_client"].store
+
+    status, user_queries = _get(app)
+    assert status == 403
+    assert len(user_queries) == 1
+
+
+def test_role_permission_edits_invalidate_all_claims(app, monkeypatch):
+    _login_claims(app, monkeypatch)
+    with app.app_context():
+        Role.query.filter_by(name="admin").first().name = "superuser"
+        db.session.commit()
+    assert ROLES_CHANGED_KEY in app.extensions["redis_client"].store
+
+    status, user_queries = _get(app)
+    assert status == 200
+    assert len(user_queries) == 1
+
+
+def test_without_redis_admin_check_reads_database(app, monkeypatch):
+    _login_claims(app, monkeypatch)
+    app.extensions["redis_client"] = None
+    status, user_queries = _get(app)
+    assert status == 200
+    assert len(user_queries) == 1
+
+
+def test_rbac_admin_role_passes_every_admin_path(app, monkeypatch):
+    # Enum rolü USER, RBAC rolü "admin" olan kullanıcı her iki yolda da yöneticidir
+    with app.app_context():
+        role = Role.query.filter_by(name="admin").first()
+        user = User(username="rbac-admin", api_key="rbac-key", role=UserRole.USER, role_id=role.id)
+        user.set_password("pass")
+        db.session.add(user)
+        db.session.commit()
+
+    claims = _login_claims(app, monkeypatch, "rbac-admin")
+    assert (claims["role"], claims["role_name"]) == ("user", "admin")
+    status, user_queries = _get(app)
+    assert status == 200 and user_queries == []
+
+    app.extensions["redis_client"] = None
+    assert _get(app)[0] == 200
+
+    monkeypatch.setenv("ADMIN_ACCESS_KEY", "secret")
+    resp = app.test_client().get("/admin-only", headers={"X-ADMIN-API-KEY": "secret", "X-API-KEY": "rbac-key"})
+    assert resp.status_code == 200
@@ -2,6 +2,8 @@ import os
 import sys
 from http.cookies import SimpleCookie
 
+from sqlalchemy import event
+
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from backend import create_app, db
 from backend.db.models import User, Role, UserSession
@@ -83,3 +85,42 @@ def test_refresh_rotates_session_token(monkeypatch):
     client.set_cookie("localhost", "refreshToken", new_refresh)
     valid = client.post("/api/auth/refresh")
     assert valid.status_code == 200
+
+
+def test_each_device_refreshes_its_own_session(monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app()
+    with app.app_context():
+        role = Role.query.filter_by(name="user").first()
+        user = User(username="multi", api_key="multikey", role_id=role.id)
+        user.set_password("pass")
+        db.session.add(user)
+        db.session.commit()
+
+    def login(client):
+        resp = client.post("/api/auth/login", json={"username": "multi", "password": "pass"})
+        cookies = SimpleCookie()
+        cookies.load(resp.headers.get("Set-Cookie"))
+        return cookies.get("refreshToken").value
+
+    phone, laptop = app.test_client(), app.test_client()
+    tokens = {phone: login(phone), laptop: login(laptop)}
+
+    # Yenileme yavaş parola özetini kullanmaz
+    def no_kdf(*args, **kwargs):
+        raise AssertionError("password hash used for refresh")
+
+    monkeypatch.setattr("werkzeug.security.check_password_hash", no_kdf)
+    monkeypatch.setattr("werkzeug.security.generate_password_hash", no_kdf)
+
+    statements = []
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+        for client in (laptop, phone):
+            client.set_cookie("localhost", "refreshToken", tokens[client])
+            assert client.post("/api/auth/refresh").status_code == 200
+        lookups = [s for s in statements if s.lstrip().startswith("SELECT") and "user_sessions" in s]
+        assert UserSession.query.filter_by(revoked=False).count() == 2
+
+    assert len(lookups) == 2
+    assert all("user_sessions.refresh_token = " in s for s in lookups)
@@ -0,0 +1,133 @@
+import inspect
+import os
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend import create_app, db
+from backend.db.models import BacktestResult, CoinPrice
+from backend.services.sweep import apply_params, expand_grid, run_sweep, sample_random
+
+RULES = {
+    "moderate": {
+        "buy": [{"metric": "rsi", "operator": "<", "value": 35, "weight": 20}],
+        "sell": [{"metric": "rsi", "operator": ">", "value": 65, "weight": 20}],
+        "threshold": 10,
+        "stop_loss_pct": 0.05,
+        "position_size_pct": 0.5,
+    }
+}
+
+
+def test_grid_random_and_overrides():
+    grid = expand_grid({"threshold": [5, 10], "stop_loss_pct": [0.02, 0.05, 0.1]})
+    assert len(grid) == 6
+    assert {"threshold": 10, "stop_loss_pct": 0.1} in grid
+
+    samples = sample_random({"threshold": [1, 3], "position_size_pct": [0.1, 0.2]}, 20, seed=1)
+    assert len(samples) == 20
+    assert all(1 <= s["threshold"] <= 3 and isinstance(s["threshold"], int) for s in samples)
+    assert all(0.1 <= s["position_size_pct"] <= 0.2 for s in samples)
+
+    updated = apply_params(RULES["moderate"], {"threshold": 3, "buy.0.weight": 7})
+    assert updated["threshold"] == 3
+    assert updated["buy"][0]["weight"] == 7
+    assert RULES["moderate"]["buy"][0]["weight"] == 20
+
+
+def _seed_prices(coin, start, n=24 * 30):
+    t = np.arange(n)
+    prices = 100 + 10 * np.sin(t / 24.0)
+    db.session.bulk_insert_mappings(
+        CoinPrice,
+        [{"coin": coin, "timestamp": start + timedelta(hours=i), "price": float(p)} for i, p in enumerate(prices)],
+    )
+    db.session.commit()
+    return start + timedelta(hours=n - 1)
+
+
+def test_run_sweep_ranks_and_stores(monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app()
+    with app.app_context():
+        start = datetime(2025, 3, 1)
+        end = _seed_prices("sweepcoin", start)
+        configs = expand_grid({"threshold": [5, 10, 25], "position_size_pct": [0.1, 0.5]})
+        progress = []
+
+        out = run_sweep(
+            ["sweepcoin"], "moderate", start, end, configs, RULES,
+            max_workers=2, progress=lambda done, total: progress.append((done, total)),
+        )
+
+        assert out["total"] == 6
+        assert progress[-1] == (6, 6)
+        rows = (
+            BacktestResult.query.filter_by(sweep_id=out["sweep_id"])
+            .order_by(BacktestResult.rank)
+            .all()
+        )
+        assert [r.rank for r in rows] == [1, 2, 3, 4, 5, 6]
+        sharpes = [r.sharpe_ratio for r in rows]
+        assert sharpes == sorted(sharpes, reverse=True)
+        assert rows[0].to_dict()["params"] == out["best"]["sweepcoin"]["params"]
+
+        inline = run_sweep(["sweepcoin"], "moderate", start, end, configs, RULES, max_workers=0)
+        assert inline["best"]["sweepcoin"]["metrics"] == out["best"]["sweepcoin"]["metrics"]
+        CoinPrice.query.delete()
+        db.session.commit()
+
+
+def test_sweep_endpoint_rejects_malformed_specs(monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app()
+    # Yetki dekoratörleri atlanır; yalnızca istek doğrulaması incelenir
+    app.config["DECISION_RULES"] = RULES
+    start_sweep = inspect.unwrap(app.view_functions["backtests.start_sweep"])
+    sweep_results = inspect.unwrap(app.view_functions["backtests.sweep_results"])
+    base = {"coins": ["bitcoin"], "start": "2025-01-01", "end": "2025-02-01"}
+
+    for spec in (
+        {"random": {"samples": "many", "ranges": {"threshold": [1, 3]}}},
+        {"random": {"samples": 0, "ranges": {"threshold": [1, 3]}}},
+        {"random": {"samples": 10, "ranges": {"threshold": []}}},
+        {"random": {"samples": 10**9, "ranges": {"threshold": [1, 3]}}},
+        {"random": [1, 2]},
+        {"grid": {"threshold": 5}},
+        {"grid": [5, 10]},
+        {"grid": {"a": list(range(200)), "b": list(range(200))}},
+        {"coins": "bitcoin", "grid": {"threshold": [5]}},
+        {},
+        {"start": "yesterday", "grid": {"threshold": [5]}},
+        {"start": "2025-03-01", "grid": {"threshold": [5]}},
+        {"max_workers": "4", "grid": {"threshold": [5]}},
+        {"grid": {"buy.5.weight": [5]}},
+        {"grid": {"buy.0.nope": [5]}},
+        {"grid": {"buy": [5]}},
+        {"random": {"samples": 5, "ranges": {"tresh": [1, 3]}}},
+    ):
+        with app.test_request_context(json=dict(base, **spec)):
+            resp, status = start_sweep()
+        assert status == 400, spec
+        assert resp.get_json()["error"]
+
+    with app.test_request_context(query_string={"limit": "many"}):
+        resp, status = sweep_results("x")
+    assert status == 400
+
+    from backend.api.admin import backtests
+    from backend.tasks.backtest_tasks import run_parameter_sweep
+
+    calls = []
+    monkeypatch.setattr(backtests, "request_principal", lambda: type("P", (), {"id": 7})())
+    monkeypatch.setattr(
+        run_parameter_sweep, "delay", lambda *a, **kw: calls.append(kw) or type("T", (), {"id": "t1"})()
+    )
+    spec = dict(base, grid={"buy.0.weight": [5, 10]}, max_workers=10**6)
+    with app.test_request_context(json=spec):
+        resp, status = start_sweep()
+    assert status == 202
+    assert calls[0]["max_workers"] == os.cpu_count()
+    assert calls[0]["user_id"] == 7
@@ -0,0 +1,64 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend import celery_app, create_app, db
+from backend.db.models import TaskTelemetry
+from backend.tasks import telemetry
+from backend.tasks.telemetry import TelemetryBuffer, latency_histograms, purge_telemetry
+
+
+@celery_app.task(name="tests.telemetry.echo")
+def echo(value):
+    if value == "boom":
+        raise ValueError("boom")
+    return value
+
+
+def test_signals_buffer_compact_records_and_flush_in_bulk(monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app()
+    buffer = TelemetryBuffer()
+    buffer.bind(app)
+    # Arka plan iş parçacığı yerine flush() elle çağrılır
+    monkeypatch.setattr(buffer, "_ensure_thread", lambda: None)
+    monkeypatch.setattr(telemetry, "buffer", buffer)
+    with app.app_context():
+        for _ in range(3):
+            echo.apply(args=("ok",))
+        echo.apply(args=("boom",))
+
+        # Görevler veritabanına dokunmaz; kayıtlar tamponda bekler
+        assert TaskTelemetry.query.count() == 0
+        assert buffer.flush() == 4
+
+        rows = TaskTelemetry.query.filter_by(task_name="tests.telemetry.echo").all()
+        assert sorted(r.status for r in rows) == ["FAILURE", "SUCCESS", "SUCCESS", "SUCCESS"]
+        failed = next(r for r in rows if r.status == "FAILURE")
+        assert failed.error == "ValueError: boom"
+        assert all(r.runtime_ms is not None and r.runtime_ms >= 0 for r in rows)
+
+        hist = latency_histograms(datetime.utcnow() - timedelta(hours=1))["tests.telemetry.echo"]
+        assert hist["count"] == 4
+        assert hist["failures"] == 1
+        assert sum(hist["buckets"].values()) == 4
+        assert hist["buckets"]["10"] >= 3
+        assert hist["buckets"]["+Inf"] == 0
+
+
+def test_retention_purges_old_records(monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app()
+    with app.app_context():
+        now = datetime.utcnow()
+        db.session.bulk_insert_mappings(
+            TaskTelemetry,
+            [
+                {"task_id": "old", "task_name": "t", "status": "SUCCESS", "runtime_ms": 5, "started_at": now - timedelta(days=30)},
+                {"task_id": "new", "task_name": "t", "status": "SUCCESS", "runtime_ms": 5, "started_at": now},
+            ],
+        )
+        db.session.commit()
+        assert purge_telemetry(retention_days=14) == 1
+        assert [r.task_id for r in TaskTelemetry.query.all()] == ["new"]
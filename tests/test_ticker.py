@@ -0,0 +1,115 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend.constants import TICKER_NAMESPACE
+from backend.services import ticker
+from tests.factories import DictRedis
+
+
+class RecordingSocketIO:
+    def __init__(self):
+        self.sent = []
+
+    def emit(self, event, data, to=None, namespace=None):
+        self.sent.append((event, data, to, namespace))
+
+
+def test_plan_limits_cap_coins_and_cadence():
+    r = DictRedis()
+    basic = ticker.subscribe(r, "sid-basic", "BASIC", ["btc", "eth", "sol", "ada"], interval=1)
+    assert basic["subscribed"] == ["btc", "eth", "sol"]
+    assert basic["rejected"] == ["ada"]
+    assert basic["interval"] == 30
+
+    premium = ticker.subscribe(r, "sid-premium", "PREMIUM", ["btc"], interval=1)
+    assert premium["interval"] == 2
+    assert ticker.active_channels(r) == {30: {"btc", "eth", "sol"}, 2: {"btc"}}
+
+    ticker.unsubscribe(r, "sid-basic")
+    ticker.unsubscribe(r, "sid-premium", ["btc"])
+    assert ticker.active_channels(r) == {}
+
+
+def test_resubscribe_moves_coin_to_new_cadence():
+    r = DictRedis()
+    ticker.subscribe(r, "sid", "PREMIUM", ["btc"], interval=60)
+    ticker.subscribe(r, "sid", "PREMIUM", ["btc"], interval=10)
+    assert ticker.active_channels(r) == {10: {"btc"}}
+    ticker.unsubscribe(r, "sid")
+
+
+class InlineExecutor:
+    def __init__(self):
+        self.jobs = []
+
+    def submit(self, fn, *args):
+        self.jobs.append((fn, args))
+
+    def run_all(self):
+        jobs, self.jobs = self.jobs, []
+        for fn, args in jobs:
+            fn(*args)
+
+
+def test_producer_fetches_all_spot_prices_in_one_call():
+    r = DictRedis()
+    for i in range(1000):
+        ticker.subscribe(r, f"fast-{i}", "PREMIUM", ["btc"], interval=2)
+    ticker.subscribe(r, "slow", "BASIC", ["btc", "eth"], interval=30)
+    price_calls, indicator_calls = [], []
+
+    def prices(coins):
+        price_calls.append(sorted(coins))
+        return {c: 100.0 + len(price_calls) for c in coins}
+
+    def indicators(coin):
+        indicator_calls.append(coin)
+        return {"current_price": 1.0, "rsi": 55.0, "prices": [1, 2, 3]}
+
+    sio = RecordingSocketIO()
+    executor = InlineExecutor()
+    producer = ticker.TickerProducer(sio, r, prices, indicators, base_interval=2, executor=executor)
+    assert producer.hold_lease()
+    assert not ticker.TickerProducer(sio, r, prices).hold_lease()
+
+    # 1000 abone tek bir yayın alır; göstergeler henüz yüklenmediği için tik beklemez
+    assert producer.tick(1) == 1
+    assert sio.sent[0][2:] == (ticker.ticker_room("btc", 2), TICKER_NAMESPACE)
+    assert sio.sent[0][1]["current_price"] == 101.0 and "rsi" not in sio.sent[0][1]
+    assert price_calls == [["btc"]] and indicator_calls == []
+    executor.run_all()
+
+    sio.sent.clear()
+    assert producer.tick(15) == 3  # 30 saniyelik kanal da sırada
+    assert price_calls[-1] == ["btc", "eth"]
+    tick = sio.sent[0][1]
+    # Anlık fiyat her tikte taze; göstergeler yavaş döngüden gelir
+    assert (tick["current_price"], tick["rsi"]) == (102.0, 55.0)
+    assert "prices" not in tick
+    executor.run_all()
+    producer.tick(16)
+    executor.run_all()
+    assert sorted(indicator_calls) == ["btc", "eth"]
+
+    for i in range(1000):
+        ticker.unsubscribe(r, f"fast-{i}")
+    ticker.unsubscribe(r, "slow")
+
+
+def test_counts_of_dead_process_expire(monkeypatch):
+    r = DictRedis()
+    own = ticker.PROCESS_ID
+    ticker.subscribe(r, "sid", "PREMIUM", ["btc"], interval=2)
+    monkeypatch.setattr(ticker, "PROCESS_ID", "other-process")
+    ticker.subscribe(r, "sid-2", "PREMIUM", ["eth"], interval=2)
+    assert ticker.active_channels(r) == {2: {"btc", "eth"}}
+
+    # "other-process" kalp atışı göndermeyi bırakır
+    r.hset(ticker.PROCESSES_KEY, "other-process", 0)
+    assert ticker.active_channels(r) == {2: {"btc"}}
+    assert ticker.SUBSCRIPTIONS_KEY.format(process="other-process") not in r.store
+    ticker._connections.pop("sid-2", None)
+    monkeypatch.setattr(ticker, "PROCESS_ID", own)
+    ticker.unsubscribe(r, "sid")
+    assert ticker.active_channels(r) == {}
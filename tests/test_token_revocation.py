@@ -0,0 +1,102 @@
+import os
+import sys
+import time
+from http.cookies import SimpleCookie
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend import create_app, db
+from backend.auth.revocation import REVOCATION_CHANNEL, RevocationStore
+from backend.db.models import Role, User
+from tests.factories import DictRedis
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app()
+    app.extensions["redis_client"] = DictRedis()
+    with app.app_context():
+        yield app
+
+
+class CountingRedis(DictRedis):
+    def __init__(self):
+        super().__init__()
+        self.gets = 0
+
+    def get(self, key):
+        self.gets += 1
+        return super().get(key)
+
+
+def test_revoke_is_first_use_wins_across_processes(app):
+    redis_client = app.extensions["redis_client"]
+    # İki worker aynı Redis'i paylaşır
+    one, two = RevocationStore(app), RevocationStore(app)
+    exp = time.time() + 3600
+
+    assert one.revoke("abc", exp) is True
+    assert two.revoke("abc", exp) is False
+    assert two.is_revoked("abc", exp)
+    assert redis_client.ttls["revoked:rt:abc"] > 3600
+    assert redis_client.published == [(REVOCATION_CHANNEL, f"abc {int(exp)}")]
+
+
+def test_synced_filter_answers_negatives_without_redis(app):
+    redis_client = CountingRedis()
+    app.extensions["redis_client"] = redis_client
+    exp = time.time() + 3600
+    RevocationStore(app).revoke("seeded", exp)
+
+    store = RevocationStore(app)
+    assert store.sync() == 1
+    redis_client.gets = 0
+    for i in range(200):
+        assert not store.is_revoked(f"fresh-{i}", exp)
+    # Yanlış pozitifler dışında hiçbir kontrol Redis'e gitmez
+    assert redis_client.gets <= 2
+
+    # Başka bir worker'ın iptali yayın kanalından gelir
+    store.apply(f"remote {int(exp)}".encode())
+    redis_client.set("revoked:rt:remote", int(exp))
+    assert store.is_revoked("remote", exp)
+    assert store.is_revoked("seeded", exp)
+
+
+def test_expired_days_are_dropped(app):
+    store = RevocationStore(app)
+    now = time.time()
+    store.apply(f"old {int(now - 3 * 86400)}")
+    store.apply(f"new {int(now + 3600)}")
+    assert list(store._blooms) == [store._bucket(now + 3600)]
+
+
+def test_without_redis_revocations_stay_local(app):
+    app.extensions["redis_client"] = None
+    store = RevocationStore(app)
+    exp = time.time() + 60
+    assert store.revoke("x", exp) is True
+    assert store.revoke("x", exp) is False
+    assert store.is_revoked("x", exp)
+
+
+def test_refresh_token_cannot_be_replayed(app):
+    role = Role.query.filter_by(name="user").first()
+    user = User(username="replay", api_key="replaykey", role_id=role.id)
+    user.set_password("pass")
+    db.session.add(user)
+    db.session.commit()
+
+    client = app.test_client()
+    resp = client.post("/api/auth/login", json={"username": "replay", "password": "pass"})
+    cookies = SimpleCookie()
+    cookies.load(resp.headers.get("Set-Cookie"))
+    refresh = cookies.get("refreshToken").value
+
+    client.set_cookie("localhost", "refreshToken", refresh)
+    assert client.post("/api/auth/refresh").status_code == 200
+    client.set_cookie("localhost", "refreshToken", refresh)
+    assert client.post("/api/auth/refresh").status_code == 401
+    assert any(k.startswith("revoked:rt:") for k in app.extensions["redis_client"].store)
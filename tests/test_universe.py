@@ -0,0 +1,148 @@
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend import create_app, db
+from backend.db.models import DBHData
+from backend.services.universe import decide_profiles, get_coin_snapshot, write_analysis_rows
+
+
+class CountingCollector:
+    def __init__(self):
+        self.calls = []
+
+    def collect_price_data(self, coin):
+        self.calls.append(coin)
+        prices = [100.0, 101.0, 99.0, 102.0]
+        return {
+            "current_price": prices[-1],
+            "prices": prices,
+            "times": ["2025-01-01T00:00:00"] * len(prices),
+            "rsi": 25.0,
+            "macd": 0.5,
+            "bb_upper": 110.0,
+            "bb_lower": 90.0,
+            "stochastic": 40.0,
+            "candlestick_pattern": "None",
+        }
+
+    def collect_onchain_data(self, coin):
+        return {"active_addresses": 0, "exchange_inflow": 0.0, "exchange_outflow": 0.0}
+
+    def collect_social_data(self, coin):
+        return {"twitter_sentiment": 0.0, "social_volume": 0}
+
+    def collect_news_data(self, coin):
+        return []
+
+
+class DictRedis:
+    def __init__(self):
+        self.store = {}
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def set(self, key, value, ex=None):
+        self.store[key] = value
+
+
+class ThresholdEngine:
+    def decide(self, analysis, profile):
+        limit = {"aggressive": 30, "moderate": 25, "conservative": 20}[profile]
+        signal = "BUY" if analysis["rsi"] < limit else "HOLD"
+        return {"signal": signal, "confidence": 0.6, "stop_loss": 95.0, "position_size_pct": 0.1}
+
+
+def _system():
+    return SimpleNamespace(
+        collector=CountingCollector(),
+        ai=SimpleNamespace(
+            analyze_sentiment=lambda text: ("neutral", 0.5),
+            forecast=lambda prices, times, coin_name=None: (
+                103.0, "prophet", {"upper": 105.0, "lower": 101.0}, [], 0.8, "artış",
+            ),
+        ),
+        engine=ThresholdEngine(),
+    )
+
+
+def test_coin_stage_computed_once_per_interval(monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app()
+    with app.app_context():
+        system = _system()
+        cache = DictRedis()
+        first = get_coin_snapshot(system, "bitcoin", cache, interval=900)
+        second = get_coin_snapshot(system, "bitcoin", cache, interval=900)
+        assert system.collector.calls == ["bitcoin"]
+        assert first == second
+        assert first["forecast"]["next_day"] == 103.0
+
+
+def test_profiles_fan_out_and_bulk_write(monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app()
+    with app.app_context():
+        system = _system()
+        snapshots = [get_coin_snapshot(system, c, None) for c in ("bitcoin", "ethereum")]
+        rows = decide_profiles(
+            system.engine, snapshots + [None], ["aggressive", "moderate", "conservative"]
+        )
+        assert len(rows) == 6
+        assert write_analysis_rows(rows) == 6
+
+        stored = {(r.coin, r.profile): r.signal for r in DBHData.query.all()}
+        assert stored[("bitcoin", "aggressive")] == "BUY"
+        assert stored[("bitcoin", "conservative")] == "HOLD"
+        assert len(stored) == 6
+
+
+def test_universe_chord_runs_eagerly(monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app()
+    from backend import celery_app
+    from backend.tasks.universe_tasks import analyze_universe
+
+    monkeypatch.setattr(celery_app.conf, "task_always_eager", True)
+    app.ytd_system_instance = _system()
+    app.config["ANALYSIS_UNIVERSE"] = ["bitcoin", "ethereum", "bitcoin"]
+    app.config["ANALYSIS_PROFILES"] = ["moderate", "aggressive"]
+    with app.app_context():
+        analyze_universe.delay()
+        assert app.ytd_system_instance.collector.calls == ["bitcoin", "ethereum"]
+        assert DBHData.query.count() == 4
+
+
+def test_full_analysis_reuses_the_shared_coin_snapshot(monkeypatch):
+    import dataclasses
+
+    from backend.services.universe import decision_fields
+    from backend.tasks import celery_tasks
+    from tests.factories import DictRedis as FakeRedis
+
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app()
+    system = _system()
+    system.redis = FakeRedis()
+    saved = []
+    system.save_to_dbh = saved.append
+    app.ytd_system_instance = system
+    with app.app_context():
+        snapshot = get_coin_snapshot(system, "bitcoin", system.redis)
+        # backend.core.services ağır bağımlılıklar olmadan yüklenemeyebilir
+        fields = ["coin", "timestamp", "stochastic"] + [
+            name for name in decision_fields(snapshot, ThresholdEngine().decide({"rsi": 0}, "moderate"))
+            if name != "stochastic_oscillator"
+        ]
+        monkeypatch.setattr(celery_tasks, "AnalysisResult", dataclasses.make_dataclass("AnalysisResult", fields))
+        monkeypatch.setattr(celery_tasks, "socketio", None)
+
+        result = celery_tasks.run_full_analysis.run("bitcoin", "aggressive", task_id="t1")
+
+    # Coin aşamaları yeniden çalışmaz; yalnızca profil kararı uygulanır
+    assert system.collector.calls == ["bitcoin"]
+    assert result["signal"] == "BUY" and result["rsi"] == 25.0
+    assert result["forecast_next_day"] == 103.0
+    assert saved[0].coin == "bitcoin"
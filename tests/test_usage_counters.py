@@ -0,0 +1,174 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend import create_app, db
+from backend.db.models import UsageLog, User
+from backend.db.write_behind import WriteBehindBuffer
+from backend.services.usage_counters import UsageCounters, usage_log_buffer
+from backend.services.usage_rollup import bump_rollups
+from backend.utils.usage_limits import consume_usage
+from tests.factories import DictRedis
+
+NOW = datetime(2026, 10, 19, 15, 30)
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app()
+    with app.app_context():
+        yield app
+
+
+def _buffer(app, monkeypatch):
+    buffer = WriteBehindBuffer(UsageLog)
+    buffer.bind(app)
+    # Arka plan iş parçacığı yerine flush() elle çağrılır
+    monkeypatch.setattr(buffer, "_ensure_thread", lambda: None)
+    return buffer
+
+
+def test_counters_seed_from_usage_log_then_stay_in_redis(app, monkeypatch):
+    rows = [
+        {"user_id": 1, "action": "predict_daily", "timestamp": NOW - timedelta(minutes=5)},
+        {"user_id": 1, "action": "predict_daily", "timestamp": NOW - timedelta(hours=3)},
+        {"user_id": 1, "action": "predict_daily", "timestamp": NOW - timedelta(hours=20)},
+        {"user_id": 1, "action": "predict_daily", "timestamp": NOW - timedelta(days=5)},
+        {"user_id": 1, "action": "export", "timestamp": NOW},
+    ]
+    db.session.add_all([UsageLog(**row) for row in rows])
+    bump_rollups(rows)
+    db.session.commit()
+
+    counters = UsageCounters(DictRedis(), _buffer(app, monkeypatch))
+    assert counters.counts(1, "predict_daily", NOW) == {"day": 2, "rolling_24h": 3, "month": 4}
+    assert counters.total(1, "predict_daily", NOW) == 4
+
+    # Tohumlandıktan sonra sayım veritabanına gitmez (geçmiş büyüklüğünden bağımsız)
+    def no_db(*args, **kwargs):
+        raise AssertionError("usage_log queried")
+
+    with monkeypatch.context() as m:
+        m.setattr(UsageCounters, "_db_count", staticmethod(no_db))
+        m.setattr(UsageCounters, "_seed_hours", no_db)
+        for _ in range(3):
+            counters.record(1, "predict_daily", NOW)
+        assert counters.counts(1, "predict_daily", NOW) == {"day": 5, "rolling_24h": 6, "month": 7}
+        assert counters.total(1, "predict_daily", NOW) == 7
+
+    # Ertesi gün yeni gün anahtarı tohumlanır; kayan pencere saatlik kovalardan gelir
+    later = counters.counts(1, "predict_daily", NOW + timedelta(hours=22))
+    assert later["rolling_24h"] == 4
+
+
+def test_consume_checks_and_counts_in_one_step(app, monkeypatch):
+    buffer = _buffer(app, monkeypatch)
+    counters = UsageCounters(DictRedis(), buffer)
+    assert counters.consume(4, "predict_daily", 5, "rolling_24h", NOW) == (True, 1)
+
+    # Eşzamanlı istekler denetimi birlikte geçip limiti aşamaz
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: counters.consume(4, "predict_daily", 5, "rolling_24h", NOW), range(20)))
+
+    assert sum(allowed for allowed, _ in results) == 4
+    assert counters.counts(4, "predict_daily", NOW)["rolling_24h"] == 5
+    assert counters.total(4, "predict_daily", NOW) == 5
+    assert len(buffer) == 5
+
+
+def test_counters_share_the_check_usage_limit_keyspace(app, monkeypatch):
+    redis_client = DictRedis()
+    counters = UsageCounters(redis_client, _buffer(app, monkeypatch))
+    counters.record(6, "forecast", NOW)
+    consume_usage(redis_client, 6, "forecast", 10, 100, now=NOW)
+
+    assert counters.counts(6, "forecast", NOW)["day"] == 2
+    assert all(key.startswith("usage:6:forecast:") for key in redis_client.store)
+
+
+def test_usage_log_rows_are_written_behind(app, monkeypatch):
+    buffer = _buffer(app, monkeypatch)
+    counters = UsageCounters(DictRedis(), buffer)
+    for _ in range(4):
+        counters.record(7, "generate_chart", NOW)
+
+    assert UsageLog.query.filter_by(user_id=7).count() == 0
+    assert len(buffer) == 4
+    assert buffer.flush() == 4
+    assert UsageLog.query.filter_by(user_id=7, action="generate_chart").count() == 4
+
+
+def test_without_redis_counts_come_from_usage_log(app):
+    counters = UsageCounters(None)
+    counters.record(3, "download", NOW)
+    assert UsageLog.query.filter_by(user_id=3).count() == 1
+    assert counters.counts(3, "download", NOW) == {"day": 1, "rolling_24h": 1, "month": 1}
+
+
+def test_seeding_counts_rows_still_in_the_buffer(app, monkeypatch):
+    buffer = _buffer(app, monkeypatch)
+    counters = UsageCounters(DictRedis(), buffer)
+    for _ in range(2):
+        counters.record(5, "predict_daily", NOW)
+
+    # Redis anahtarları kaybolsa da henüz yazılmamış kullanımlar sayılır
+    counters.redis = DictRedis()
+    assert counters.counts(5, "predict_daily", NOW) == {"day": 2, "rolling_24h": 2, "month": 2}
+
+    fresh = DictRedis()
+    counters.redis = fresh
+    counters.record(5, "predict_daily", NOW)
+    assert fresh.script_calls == 2
+    assert counters.counts(5, "predict_daily", NOW) == {"day": 3, "rolling_24h": 3, "month": 3}
+
+    counters.record(5, "predict_daily", NOW)
+    assert fresh.script_calls == 3
+
+
+def test_poison_row_is_quarantined_and_the_rest_written(app, monkeypatch, tmp_path):
+    monkeypatch.setenv("AUDIT_FALLBACK_LOG_DIR", str(tmp_path))
+    buffer = _buffer(app, monkeypatch)
+    write = buffer._write
+
+    def strict_write(rows):
+        if any(row["action"] == "bad" for row in rows):
+            raise ValueError("constraint violated")
+        write(rows)
+
+    monkeypatch.setattr(buffer, "_write", strict_write)
+    for action in ("a", "b", "bad", "c"):
+        buffer.record({"user_id": 9, "action": action, "timestamp": NOW})
+
+    written = sum(buffer.flush() for _ in range(10))
+    buffer.record({"user_id": 9, "action": "d", "timestamp": NOW})
+    written += buffer.flush()
+
+    assert written == 4 and len(buffer) == 0
+    assert sorted(l.action for l in UsageLog.query.filter_by(user_id=9)) == ["a", "b", "c", "d"]
+    lines = (tmp_path / "usage_log-quarantine.jsonl").read_text().splitlines()
+    assert len(lines) == 1 and '"action": "bad"' in lines[0] and "constraint violated" in lines[0]
+
+
+def test_user_usage_count_defaults_to_whole_history(app, monkeypatch):
+    user = User(username="history_user")
+    user.set_password("pass")
+    user.generate_api_key()
+    db.session.add(user)
+    db.session.commit()
+    old = {"user_id": user.id, "action": "prediction", "timestamp": NOW - timedelta(days=40)}
+    db.session.add(UsageLog(**old))
+    bump_rollups([old])
+    db.session.commit()
+
+    monkeypatch.setattr(usage_log_buffer, "_ensure_thread", lambda: None)
+    monkeypatch.setattr(usage_log_buffer, "_records", type(usage_log_buffer._records)(maxlen=10))
+    usage_log_buffer.record({"user_id": user.id, "action": "prediction", "timestamp": NOW})
+
+    # enforce_plan_limit varsayılan olarak tüm geçmişi sayar; pencere açıkça istenir
+    assert user.get_usage_count("prediction") == 2
+    assert user.get_usage_count("prediction", window="month") == 0
@@ -21,3 +21,93 @@ def test_check_usage_limit_decorator():
             return True
 
         assert test_fn() is True
+
+
+def _limited_app(monkeypatch):
+    import os
+    from datetime import datetime, timedelta
+
+    from sqlalchemy.pool import StaticPool
+
+    from backend import create_app, db
+    from backend.db.models import Role, SubscriptionPlan, UsageLimitModel, User
+    from tests.factories import DictRedis
+
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    monkeypatch.setattr("backend.Config.SQLALCHEMY_DATABASE_URI", "sqlite:///:memory:")
+    monkeypatch.setattr(
+        "backend.Config.SQLALCHEMY_ENGINE_OPTIONS",
+        {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}},
+        raising=False,
+    )
+    app = create_app()
+    app.extensions["redis_client"] = DictRedis()
+
+    @app.route("/limited")
+    @check_usage_limit("forecast")
+    def limited():
+        return {"ok": True}
+
+    with app.app_context():
+        role = Role.query.filter_by(name="user").first()
+        user = User(
+            username="basicuser",
+            api_key="basic-key",
+            role_id=role.id,
+            subscription_level=SubscriptionPlan.BASIC,
+            subscription_end=datetime.utcnow() + timedelta(days=30),
+        )
+        user.set_password("pass")
+        db.session.add(user)
+        db.session.add(UsageLimitModel(plan_name="BASIC", feature="forecast", daily_limit=3, monthly_limit=100))
+        db.session.commit()
+    return app
+
+
+def test_usage_limit_headers_and_exact_quota(monkeypatch):
+    app = _limited_app(monkeypatch)
+    client = app.test_client()
+    headers = {"X-API-KEY": "basic-key"}
+
+    remaining = []
+    for _ in range(3):
+        resp = client.get("/limited", headers=headers)
+        assert resp.status_code == 200
+        assert resp.headers["X-RateLimit-Limit"] == "3"
+        assert resp.headers["X-RateLimit-Window"] == "day"
+        remaining.append(resp.headers["X-RateLimit-Remaining"])
+    assert remaining == ["2", "1", "0"]
+
+    refused = client.get("/limited", headers=headers)
+    assert refused.status_code == 429
+    assert refused.headers["X-RateLimit-Remaining"] == "0"
+    assert int(refused.headers["Retry-After"]) > 0
+    # Her istek tek bir betik çağrısı (tek gidiş-dönüş)
+    assert app.extensions["redis_client"].script_calls == 4
+
+
+def test_concurrent_consumers_never_overshoot():
+    import threading
+
+    from backend.utils.usage_limits import consume_usage
+    from tests.factories import DictRedis
+
+    r = DictRedis()
+    allowed = []
+    barrier = threading.Barrier(50)
+
+    def worker():
+        barrier.wait()
+        allowed.append(consume_usage(r, 1, "forecast", 10, 12)["allowed"])
+
+    threads = [threading.Thread(target=worker) for _ in range(50)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert allowed.count(True) == 10
+
+    # Aylık pencere günlükten önce dolarsa aylık limit belirleyicidir
+    result = consume_usage(r, 2, "forecast", None, 1)
+    assert result["allowed"] and result["window"] == "month" and result["remaining"] == 0
+    assert consume_usage(r, 2, "forecast", None, 1)["exceeded"] == "month"
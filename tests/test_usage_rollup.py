@@ -0,0 +1,146 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend import create_app, db
+from backend.db.models import Role, UsageLog, UsageRollup, User, UserRole
+from backend.services.usage_counters import UsageCounters, UsageLogBuffer
+from backend.services.usage_rollup import purge_usage_history, usage_series, usage_totals
+
+NOW = datetime(2026, 10, 19, 15, 30)
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app()
+    with app.app_context():
+        yield app
+
+
+def _buffer(app, monkeypatch):
+    buffer = UsageLogBuffer()
+    buffer.bind(app)
+    monkeypatch.setattr(buffer, "_ensure_thread", lambda: None)
+    return buffer
+
+
+def _rollups(granularity):
+    return {
+        (r.user_id, r.action, r.bucket): r.count
+        for r in UsageRollup.query.filter_by(granularity=granularity)
+    }
+
+
+def test_flush_maintains_hourly_and_daily_rollups(app, monkeypatch):
+    buffer = _buffer(app, monkeypatch)
+    for ts in (NOW, NOW + timedelta(minutes=10), NOW + timedelta(hours=2)):
+        buffer.record({"user_id": 1, "action": "predict_daily", "timestamp": ts})
+    buffer.record({"user_id": 2, "action": "export", "timestamp": NOW})
+    assert buffer.flush() == 4
+
+    day = NOW.replace(hour=0, minute=0)
+    assert _rollups("day") == {(1, "predict_daily", day): 3, (2, "export", day): 1}
+    assert _rollups("hour") == {
+        (1, "predict_daily", NOW.replace(minute=0)): 2,
+        (1, "predict_daily", NOW.replace(hour=17, minute=0)): 1,
+        (2, "export", NOW.replace(minute=0)): 1,
+    }
+
+    # Sonraki toplu yazım mevcut kovaları artırır
+    buffer.record({"user_id": 1, "action": "predict_daily", "timestamp": NOW + timedelta(minutes=20)})
+    buffer.flush()
+    assert _rollups("day")[(1, "predict_daily", day)] == 4
+    assert UsageRollup.query.count() == 5
+    assert UsageLog.query.count() == 5
+
+
+def test_synchronous_fallback_bumps_rollups(app):
+    UsageCounters(None).record(3, "download", NOW)
+    UsageCounters(None).record(3, "download", NOW)
+    assert _rollups("day") == {(3, "download", NOW.replace(hour=0, minute=0)): 2}
+
+
+def test_views_read_rollups_and_survive_retention(app, monkeypatch):
+    role = Role.query.filter_by(name="admin").first() or Role(name="admin")
+    db.session.add(role)
+    db.session.commit()
+    admin = User(username="admin", api_key="adminkey", role=UserRole.ADMIN, role_id=role.id)
+    admin.set_password("pass")
+    user = User(username="heavy", api_key="heavykey", role_id=role.id)
+    user.set_password("pass")
+    db.session.add_all([admin, user])
+    db.session.commit()
+
+    now = datetime.utcnow()
+    buffer = _buffer(app, monkeypatch)
+    for days_ago in (0, 0, 1, 40, 400):
+        buffer.record({"user_id": user.id, "action": "predict_daily", "timestamp": now - timedelta(days=days_ago)})
+    buffer.flush()
+
+    # Ham kayıtlar en az bir ay tutulur; saatlik özetler kendi süresine göre silinir
+    deleted = purge_usage_history(log_retention_days=7, hourly_retention_days=30)
+    assert deleted == {"usage_log": 2, "hourly_rollups": 2}
+    assert UsageLog.query.count() == 3
+    # Ömür boyu limitler silinen ham kayıtları da saymaya devam eder
+    assert UsageCounters(None, buffer).total(user.id, "predict_daily") == 5
+
+    assert usage_totals(now - timedelta(days=60)) == [
+        {"user_id": user.id, "username": "heavy", "action": "predict_daily", "count": 4}
+    ]
+    daily = usage_series(user.id, "day")["predict_daily"]
+    assert [d["count"] for d in daily] == [1, 1, 1, 2]
+    assert sum(h["count"] for h in usage_series(user.id, "hour")["predict_daily"]) == 3
+
+    monkeypatch.setenv("ADMIN_ACCESS_KEY", "secret")
+    resp = app.test_client().get(
+        "/api/admin/limit-usage?days=30",
+        headers={"X-ADMIN-API-KEY": "secret", "X-API-KEY": "adminkey"},
+    )
+    assert resp.status_code == 200
+    assert resp.get_json()["stats"] == [
+        {"user_id": user.id, "username": "heavy", "action": "predict_daily", "count": 3}
+    ]
+
+    # days verilmezse tüm geçmiş toplanır
+    resp = app.test_client().get(
+        "/api/admin/limit-usage",
+        headers={"X-ADMIN-API-KEY": "secret", "X-API-KEY": "adminkey"},
+    )
+    assert resp.get_json() == {
+        "stats": [{"user_id": user.id, "username": "heavy", "action": "predict_daily", "count": 5}]
+    }
+
+
+
+@pytest.mark.parametrize("upsert", [True, False])
+def test_concurrently_inserted_buckets_are_merged(app, monkeypatch, upsert):
+    from backend.services import usage_rollup
+
+    day = NOW.replace(hour=0, minute=0)
+    calls = []
+    original = usage_rollup._bump_existing_then_insert
+
+    def racing(keys, counts):
+        # Başka bir yazıcı kovayı seçim ile ekleme arasında eklemiş gibi davranılır
+        calls.append(keys)
+        if len(calls) == 1:
+            raise IntegrityError("INSERT INTO usage_rollup", {}, Exception("UNIQUE constraint failed"))
+        original(keys, counts)
+
+    if not upsert:
+        monkeypatch.setattr(usage_rollup, "_UPSERT_INSERTS", {})
+    monkeypatch.setattr(usage_rollup, "_bump_existing_then_insert", racing)
+    db.session.add(UsageRollup(granularity="day", user_id=4, action="export", bucket=day, count=5))
+    db.session.flush()
+
+    usage_rollup.bump_rollups([{"user_id": 4, "action": "export", "timestamp": NOW}])
+    db.session.commit()
+
+    assert _rollups("day") == {(4, "export", day): 6}
+    assert _rollups("hour") == {(4, "export", NOW.replace(minute=0)): 1}
+    assert len(calls) == (0 if upsert else 2)
@@ -0,0 +1,72 @@
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend import create_app, create_worker_app
+from backend.tasks import worker
+
+
+def test_worker_app_skips_web_setup(monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_worker_app()
+    assert not app.blueprints
+    assert [r.endpoint for r in app.url_map.iter_rules()] == ["static"]
+    assert app.ytd_system_instance is None
+    for name in ("db", "celery", "socketio", "redis_client"):
+        assert name in app.extensions
+    assert app.config["SQLALCHEMY_DATABASE_URI"] == "sqlite:///:memory:"
+
+
+def test_worker_app_built_once_per_process(monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    monkeypatch.setattr(worker, "_worker_app", None)
+    calls = []
+
+    def fake_create():
+        calls.append(1)
+        return SimpleNamespace(name="worker")
+
+    monkeypatch.setattr("backend.create_worker_app", fake_create)
+    first = worker.get_worker_app()
+    for _ in range(100):
+        assert worker.get_worker_app() is first
+    assert len(calls) == 1
+
+    # Fork sonrası sinyal yeni bir uygulama kurar
+    worker._init_worker_app()
+    assert len(calls) == 2
+
+
+def test_task_app_prefers_active_context(monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_app()
+    sentinel = SimpleNamespace(name="worker")
+    monkeypatch.setattr(worker, "_worker_app", sentinel)
+    with app.app_context():
+        assert worker.task_app() is app
+    assert worker.task_app() is sentinel
+
+
+def test_analysis_system_reused_per_app(monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    app = create_worker_app()
+    system = SimpleNamespace(collector=object(), engine=object())
+    app.ytd_system_instance = system
+    assert worker.analysis_system(app) is system
+
+
+def test_entry_point_registers_tasks_before_any_child(monkeypatch):
+    import importlib
+
+    monkeypatch.setattr(worker, "_worker_app", None)
+    entry = importlib.import_module("backend.celery_worker")
+    assert "backend.tasks.celery_tasks.run_full_analysis" in entry.celery.tasks
+    assert "backend.tasks.universe_tasks.coin_stage_task" in entry.celery.tasks
+    # Celery ayarları giriş modülünde yapılır; süreç uygulaması henüz kurulmamıştır
+    assert worker._worker_app is None
+
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    before = dict(entry.celery.conf.task_routes)
+    create_worker_app()
+    assert entry.celery.conf.task_routes == before